@@ -0,0 +1,86 @@
+"""A leak regression benchmark: build the Sandia blade many times in one
+process, and check that every blade is freed.
+
+Each blade is built in a scratch copy of the Sandia blade definition and
+airfoils, with all of its structural parts (the shapely polygons of every
+layer), then closed and dropped. Blades, stations, structures, parts, and
+layers only keep weak references to their parents, so a dropped blade is
+freed right away by reference counting. If any blade is still alive (or
+the garbage collector finds uncollectable objects), a Warning is raised.
+
+The number of live blades and the peak memory use (where the resource
+module is available) are printed after each blade, and should stay
+constant.
+
+Usage
+-----
+This script must be run from the project root directory (spardesign2).
+|> %run benchmark_blade_memory
+
+Last updated: May 13, 2014
+
+"""
+
+
+import os
+import gc
+import time
+import shutil
+import weakref
+import tempfile
+import lib.blade as bl
+reload(bl)
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+n_blades = 20
+blade_path = 'sandia_blade'
+
+
+def peak_memory():
+    """Returns the peak memory use of this process [MB] (or None)."""
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss/1024.0
+
+
+scratch_path = tempfile.mkdtemp()
+try:
+    path = os.path.join(scratch_path, 'blade')
+    os.mkdir(path)
+    shutil.copy(os.path.join(blade_path, 'blade_definition.csv'), path)
+    shutil.copytree(os.path.join(blade_path, 'airfoils'),
+        os.path.join(path, 'airfoils'))
+    refs = []
+    t0 = time.time()
+    results = []
+    for i in range(n_blades):
+        b = bl.MonoplaneBlade('blade {0}'.format(i), path,
+            matl_filename=os.path.abspath(os.path.join(blade_path,
+                'materials.csv')))
+        for station in b.list_of_stations:
+            station.airfoil.create_polygon()
+            station.structure.create_all_layers()
+        b.calculate_all_masses()
+        refs.append(weakref.ref(b))
+        b.close()
+        del b, station
+        alive = len([r for r in refs if r() is not None])
+        results.append((i+1, alive, peak_memory(), time.time()-t0))
+    gc.collect()
+finally:
+    shutil.rmtree(scratch_path, ignore_errors=True)
+
+print ''
+print 'blades   alive   peak memory [MB]   time [s]'
+print '------   -----   ----------------   --------'
+for (n, alive, mb, t) in results:
+    print '{0:6d}   {1:5d}   {2:>16}   {3:8.1f}'.format(n, alive,
+        '-' if mb is None else '{0:.1f}'.format(mb), t)
+alive = len([r for r in refs if r() is not None])
+if alive > 0 or gc.garbage:
+    raise Warning("{0} of {1} blades were not freed ({2} uncollectable objects)!".format(alive, n_blades, len(gc.garbage)))
+print 'All {0} blades were freed.'.format(n_blades)
@@ -13,6 +13,7 @@ erase *.eig
 erase *~
 
 erase .\FIGURES\*.mdt
+erase .\FIGURES\*.mdt.npy
 erase .\FIGURES\*.png
 erase .\FIGURES\*.eps
 erase .\FIGURES\*.ps
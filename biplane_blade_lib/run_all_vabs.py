@@ -7,12 +7,15 @@ Last modified: April 25, 2014
 
 
 import os
+import lib.station_store as ss
+reload(ss)
 
 
 # -----------------------------------------------
 # update these parameters!
-# list_of_station_nums = range(1,40+1)
-list_of_station_nums = [1,2,3,4,5,6,7,8,9,10,25,28,29,30,31,32,33,34,35,36,37,38,39,40]
+# (stations with a .K file in the station path or in the station store are
+#  skipped; see lib/station_store.py)
+list_of_station_nums = ss.stations_missing('biplane_blade', '.vabs.K')
 # -----------------------------------------------
 
 for station_num in list_of_station_nums:
@@ -38,3 +41,7 @@ for station_num in list_of_station_nums:
     if os.path.exists(absolute_path_to_VABS_input_file + '.K'):
         print "generated {0}.K with mass and stiffness matrices!".format(VABS_input_filename)
     os.chdir(cwd)
+
+# add the new .K files to the station store, and link any stored .K files
+#   into this blade's station paths
+ss.sync_blade('biplane_blade')
@@ -14,7 +14,9 @@ def clean_blade_path(blade_path,
                  'percent_masses.csv',
                  'config_name.txt',
                  'blade_props_from_Sandia.csv',
-                 'blade_props_from_VABS.csv']):
+                 'blade_props_from_VABS.csv',
+                 'layer_plane_angle_rules.csv',
+                 'element_fixes.csv']):
     """Removes all files except blade defintion and airfoil path."""
     clean_list = os.listdir(blade_path)
     for item in clean_list:
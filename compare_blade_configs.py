@@ -0,0 +1,28 @@
+"""A script to compare the Sandia blade, the biplane blade, and the alt
+biplane configs in 'alt_biplane_configs/'.
+
+Every configuration in lib.compare_blades.CONFIGS is built in parallel, and
+the properties of all their stations are saved to 'blade_configs.csv'. Then,
+the chord, twist, gap, mass, and flapwise stiffness of every configuration
+are plotted vs. span.
+
+Usage
+-----
+This script must be run from the project root directory (spardesign2).
+|> %run compare_blade_configs
+
+Last updated: May 13, 2014
+
+"""
+
+
+import lib.compare_blades as cb
+reload(cb)
+
+
+# the worker processes re-import this script on Windows
+if __name__ == '__main__':
+    data = cb.compare_configs(cb.CONFIGS, csv_filename='blade_configs.csv')
+    for prop in ['chord', 'twist', 'gap', 'mass', 'EI_flap']:
+        cb.plot_property(data, prop)
+    print cb.pivot(data, 'mass').to_string()
@@ -102,6 +102,27 @@ class AbaqusGrid:
         elem_num: An integer that represents a unique element.
     number_of_nodes - An integer for the number of nodes in the grid.
     number_of_elements - An integer for the number of elements in the grid.
+    node_coords - A (number_of_nodes x 2) array of (x2, x3) node coordinates,
+        where row i holds node #(i+1).
+    connectivity - A (number_of_elements x 9) integer array of node numbers in
+        the VABS node slots (node1-node9) of each element; 0 marks a node that
+        is not present. Rows follow the order of list_of_elements.
+    element_types - An integer array of element type codes, which index into
+        gr.ELEMENT_TYPES.
+    orientation_summary - A dict returned by check_orientation() during
+        parsing.
+    element_set_names - A list of element set names, in file order. An
+        element set's position in this list is its integer set code.
+    element_set_codes - An integer array with the set code of each element
+        (-1 if the element is not in any set). Rows follow the order of
+        list_of_elements.
+    element_set_index - A dict that maps each element set name to a sorted
+        array of row indices into list_of_elements. Each element is in at most
+        one set, the last one it was listed in or assigned to, so the index
+        always agrees with element_set_codes and element.element_set. Use
+        element_set_rows(), element_set_mask(), and elements_in_sets() to
+        select (unions and differences of) whole sets at once, and
+        assign_element_set() to move elements into a different set.
 
     """
     def __init__(self, filename, debug_flag=False, soft_warning=False,
@@ -127,6 +148,15 @@ class AbaqusGrid:
         # attributes for self._parse_elements()
         self.number_of_elements = None
         self.list_of_elements = []
+        # attributes for self._build_arrays()
+        self.node_coords = None
+        self.connectivity = None
+        self.element_types = None
+        self.orientation_summary = None
+        # attributes for self._parse_elementsets()
+        self.element_set_names = []
+        self.element_set_codes = None
+        self.element_set_index = {}
         if auto_parse:
             # parse the ABAQUS output file into grid objects
             self._parse_abaqus(debug_flag=debug_flag,
@@ -151,6 +181,9 @@ class AbaqusGrid:
         # Sort list_of_elements by element number.
         #   This MUST happen before calling self._parse_elementsets()
         self.list_of_elements.sort(key=attrgetter('elem_num'))
+        self._build_arrays()
+        self.orientation_summary = self.check_orientation(fix=True,
+            print_flag=debug_flag, soft_warning=soft_warning)
         self._parse_elementsets(debug_flag=debug_flag, 
             soft_warning=soft_warning)
         if debug_flag:
@@ -341,7 +374,8 @@ class AbaqusGrid:
                     node6 = self.list_of_nodes[int(node6_num)-1],
                     node7 = self.list_of_nodes[int(node7_num)-1],
                     node8 = self.list_of_nodes[int(node8_num)-1],
-                    layer_num = int(layer_num))
+                    layer_num = int(layer_num),
+                    autocorrect = False)
                 self.list_of_elements.append(e)
             elif quadrilateral_linear_element_match:
                 if debug_flag and new_element_header_found:
@@ -355,7 +389,8 @@ class AbaqusGrid:
                     node2 = self.list_of_nodes[int(node2_num)-1],
                     node3 = self.list_of_nodes[int(node3_num)-1],
                     node4 = self.list_of_nodes[int(node4_num)-1],
-                    layer_num = int(layer_num))
+                    layer_num = int(layer_num),
+                    autocorrect = False)
                 self.list_of_elements.append(e)
             elif triangular_quadratic_element_match:
                 if debug_flag and new_element_header_found:
@@ -371,7 +406,8 @@ class AbaqusGrid:
                     node5 = self.list_of_nodes[int(node5_num)-1],
                     node6 = self.list_of_nodes[int(node6_num)-1],
                     node7 = self.list_of_nodes[int(node7_num)-1],
-                    layer_num = int(layer_num))
+                    layer_num = int(layer_num),
+                    autocorrect = False)
                 self.list_of_elements.append(e)
             elif triangular_linear_element_match:
                 if debug_flag and new_element_header_found:
@@ -388,26 +424,263 @@ class AbaqusGrid:
                 self.list_of_elements.append(e)
         self.number_of_elements = len(self.list_of_elements)
 
+    def _build_arrays(self):
+        """Save the node coordinates and element connectivity as arrays.
+
+        Must be run after list_of_elements has been sorted by element number.
+
+        Saves:
+        self.node_coords
+        self.connectivity
+        self.element_types
+
+        """
+        self.node_coords = np.array(
+            [(node.x2, node.x3) for node in self.list_of_nodes], dtype=float)
+        self.connectivity = np.array(
+            [(e.node1.node_num, e.node2.node_num, e.node3.node_num,
+              e.node4.node_num, e.node5.node_num, e.node6.node_num,
+              e.node7.node_num, e.node8.node_num, e.node9.node_num)
+             for e in self.list_of_elements], dtype=int).reshape(-1,9)
+        type_codes = dict([(cls, i) for (i, cls) in
+            enumerate(gr.ELEMENT_TYPES)])
+        self.element_types = np.array(
+            [type_codes[e.__class__] for e in self.list_of_elements],
+            dtype=int)
+
+    def check_orientation(self, fix=True, print_flag=False,
+        soft_warning=False):
+        """Check (and optionally fix) the orientation of every element at once.
+
+        Signed areas and corner Jacobians are computed for all elements of
+        each type in one vectorized pass. Elements with a negative signed area
+        (clockwise node ordering) are reversed in bulk, both in
+        self.connectivity and in the element objects.
+
+        Returns a dict with the keys:
+        'number_of_elements' - the number of elements checked
+        'number_of_cw_elements' - the number of clockwise elements found
+        'cw_elements' - element numbers of the clockwise elements
+        'number_of_bad_elements' - the number of elements that are still
+            invalid (a non-positive corner Jacobian, i.e. degenerate, inverted
+            or non-convex) after fixing
+        'bad_elements' - element numbers of the invalid elements
+
+        Parameters
+        ----------
+        fix : bool, reverse the node ordering of clockwise elements
+        print_flag : bool, print the summary to the screen
+        soft_warning : bool, print (instead of raise) a warning for elements
+            with zero area
+
+        """
+        cw_rows = []
+        bad_rows = []
+        degenerate_rows = []
+        for (code, cls) in enumerate(gr.ELEMENT_TYPES):
+            rows = np.nonzero(self.element_types == code)[0]
+            if len(rows) == 0:
+                continue
+            area = gr.signed_areas(self.node_coords,
+                self.connectivity[rows], cls)
+            cw = rows[area < 0.0]
+            if fix and len(cw) > 0:
+                # reverse the orientation of all clockwise elements at once
+                slots = np.array(cls.reversed_slots) - 1
+                self.connectivity[cw] = self.connectivity[cw][:,slots]
+                for i in cw:
+                    self.list_of_elements[i].reverse_nodes()
+            jac = gr.corner_jacobians(self.node_coords,
+                self.connectivity[rows], cls)
+            cw_rows.extend(cw)
+            bad_rows.extend(rows[np.any(jac <= 0.0, axis=1)])
+            degenerate_rows.extend(rows[area == 0.0])
+        elem_nums = [e.elem_num for e in self.list_of_elements]
+        summary = {
+            'number_of_elements': len(self.list_of_elements),
+            'number_of_cw_elements': len(cw_rows),
+            'cw_elements': sorted([elem_nums[i] for i in cw_rows]),
+            'number_of_bad_elements': len(bad_rows),
+            'bad_elements': sorted([elem_nums[i] for i in bad_rows])}
+        if print_flag:
+            fmt = 'orientation: {0} elements, {1} clockwise ({2}), {3} bad'
+            print fmt.format(summary['number_of_elements'],
+                summary['number_of_cw_elements'],
+                'reversed' if fix else 'not reversed',
+                summary['number_of_bad_elements'])
+            if summary['number_of_bad_elements'] > 0:
+                print '  bad elements:', summary['bad_elements']
+        if len(degenerate_rows) > 0:
+            msg = "Elements {0} have zero area!".format(
+                sorted([elem_nums[i] for i in degenerate_rows]))
+            if not soft_warning:
+                raise Warning(msg)
+            else:
+                print msg
+        return summary
+
     def _parse_elementsets(self, debug_flag=False, soft_warning=False):
-        """Save all the element sets as attributes of their Elements.
+        """Save all the element sets as attributes of their Elements, and build
+        the element set index.
+
+        The element numbers of each set are converted to an integer array in
+        one call, and checked against the sorted element numbers all at once.
+        If an element is listed in more than one set, the last set wins.
+
+        Saves:
+        self.element_set_names
+        self.element_set_codes
+        self.element_set_index
 
         """
+        set_names = []
+        set_lines = []
         for line in self._abq_file[self._elementset_block_start:]:
             elementset_header_match = self._elementset_header_pattern.match(line)
             if elementset_header_match:
                 # Extract the elementset name
                 elementset_name = line.strip().split('=')[-1]
+                set_names.append(elementset_name)
+                set_lines.append([])
                 if debug_flag:
-                    print 'element set: ' + line.strip().split('=')[-1]
-            else:
-                # Save the elementset name to each element in the block
-                element_nums = line.strip().strip(',').split(',')
-                for elem_num in element_nums:
-                    # make sure the list of elements have been sorted
-                    #   before assigning element sets to elements
-                    if int(elem_num) != self.list_of_elements[int(elem_num)-1].elem_num:
-                        if not soft_warning:
-                            raise Warning("The element set '{0}' may be assigned to the wrong element (#{1}), instead of to the correct element (#{2}). In <grid>._parse_abaqus(), run:\n-->  <grid>.list_of_elements.sort(key=attrgetter('elem_num'))\nbefore calling:\n-->  <grid>._parse_elementsets(debug_flag=debug_flag)".format(elementset_name, self.list_of_elements[int(elem_num)-1].elem_num, int(elem_num)))
-                        else:
-                            print "The element set '{0}' may be assigned to the wrong element (#{1}), instead of to the correct element (#{2}). In <grid>._parse_abaqus(), run:\n-->  <grid>.list_of_elements.sort(key=attrgetter('elem_num'))\nbefore calling:\n-->  <grid>._parse_elementsets(debug_flag=debug_flag)".format(elementset_name, self.list_of_elements[int(elem_num)-1].elem_num, int(elem_num))
-                    self.list_of_elements[int(elem_num)-1].element_set = elementset_name
+                    print 'element set: ' + elementset_name
+            elif line.strip():
+                set_lines[-1].append(line.strip().strip(','))
+        elem_nums = np.array([e.elem_num for e in self.list_of_elements],
+            dtype=int)
+        self.element_set_names = []
+        self.element_set_codes = -np.ones(self.number_of_elements, dtype=int)
+        self.element_set_index = {}
+        for (elementset_name, lines) in zip(set_names, set_lines):
+            nums = np.array(','.join(lines).split(','), dtype=int)
+            rows = nums - 1
+            # make sure the list of elements have been sorted
+            #   before assigning element sets to elements
+            in_range = (rows >= 0) & (rows < self.number_of_elements)
+            wrong = ~in_range
+            wrong[in_range] = (elem_nums[rows[in_range]] != nums[in_range])
+            if np.any(wrong):
+                msg = "The element set '{0}' may be assigned to the wrong elements {1}. In <grid>._parse_abaqus(), run:\n-->  <grid>.list_of_elements.sort(key=attrgetter('elem_num'))\nbefore calling:\n-->  <grid>._parse_elementsets(debug_flag=debug_flag)".format(elementset_name, list(nums[wrong]))
+                if not soft_warning:
+                    raise Warning(msg)
+                else:
+                    print msg
+                rows = rows[~wrong]
+            self._add_element_set(elementset_name, rows)
+        for (code, name) in enumerate(self.element_set_names):
+            for i in np.nonzero(self.element_set_codes == code)[0]:
+                self.list_of_elements[i].element_set = name
+
+    def _add_element_set(self, name, rows):
+        """Add the element rows to an element set (create it if needed).
+
+        The last set wins: the rows are removed from any other set they were
+        in, so the index and the set codes always agree.
+
+        """
+        rows = np.unique(np.asarray(rows, dtype=int))
+        if name in self.element_set_index:
+            code = self.element_set_names.index(name)
+        else:
+            code = len(self.element_set_names)
+            self.element_set_names.append(name)
+            self.element_set_index[name] = np.zeros(0, dtype=int)
+        for old_code in np.unique(self.element_set_codes[rows]):
+            if old_code >= 0 and old_code != code:
+                old_name = self.element_set_names[old_code]
+                self.element_set_index[old_name] = np.setdiff1d(
+                    self.element_set_index[old_name], rows)
+        self.element_set_index[name] = np.union1d(
+            self.element_set_index[name], rows)
+        self.element_set_codes[rows] = code
+
+    def element_set_rows(self, names, exclude=()):
+        """Returns the sorted row indices (into list_of_elements) of all the
+        elements in one or more element sets.
+
+        Parameters
+        ----------
+        names : str or list of str, element set names; the union of all these
+            sets is returned
+        exclude : str or list of str, element set names to subtract from the
+            union (set difference)
+
+        """
+        if isinstance(names, basestring):
+            names = [names]
+        if isinstance(exclude, basestring):
+            exclude = [exclude]
+        for name in list(names) + list(exclude):
+            if name not in self.element_set_index:
+                raise Warning("The element set '{0}' does not exist in the grid '{1}'".format(name, self.filename))
+        empty = np.zeros(0, dtype=int)
+        rows = reduce(np.union1d,
+            [self.element_set_index[name] for name in names], empty)
+        if len(exclude) > 0:
+            rows = np.setdiff1d(rows, reduce(np.union1d,
+                [self.element_set_index[name] for name in exclude], empty))
+        return rows.astype(int)
+
+    def element_set_mask(self, names, exclude=()):
+        """Returns a boolean mask (one entry per element) that selects all the
+        elements in one or more element sets (see element_set_rows)."""
+        mask = np.zeros(self.number_of_elements, dtype=bool)
+        mask[self.element_set_rows(names, exclude=exclude)] = True
+        return mask
+
+    def elements_in_sets(self, names, exclude=()):
+        """Returns a list of the element objects in one or more element sets
+        (see element_set_rows)."""
+        return [self.list_of_elements[i] for i in
+            self.element_set_rows(names, exclude=exclude)]
+
+    def assign_element_set(self, elem_nums, name):
+        """Move elements into an element set (it is created if needed).
+
+        The elements are removed from their old sets, and element_set is
+        updated on each element object.
+
+        Usage:
+        g.assign_element_set([4747], 'is4tteu2_tri')
+
+        """
+        rows = np.atleast_1d(np.asarray(elem_nums, dtype=int)) - 1
+        self._add_element_set(name, rows)
+        for i in rows:
+            self.list_of_elements[i].element_set = name
+
+    def calculate_layer_plane_angles(self, rows, outer_edge_node_nums=[1,4],
+        inner_edge_node_nums=[2,3]):
+        """Calculate the layer plane angles (theta1) of many elements at once.
+
+        This is a vectorized version of calculate_layer_plane_angle() for the
+        elements in list_of_elements[rows] (e.g. from element_set_rows()). The
+        theta1 and edge node attributes of each element are updated, so the
+        elements can still be plotted with their outer and inner edges.
+
+        Triangular elements only have an outer edge, so inner_edge_node_nums
+        must be None for them.
+
+        Returns an array of the theta1 values.
+
+        """
+        rows = np.asarray(rows, dtype=int)
+        triangle_codes = [i for (i, cls) in enumerate(gr.ELEMENT_TYPES) if cls
+            in (gr.TriangularLinearElement, gr.TriangularQuadraticElement)]
+        is_triangle = np.in1d(self.element_types[rows], triangle_codes)
+        if inner_edge_node_nums is not None and np.any(is_triangle):
+            raise Warning("Elements {0} do not have an inner edge defined!".format([self.list_of_elements[i].elem_num for i in rows[is_triangle]]))
+        if inner_edge_node_nums is None and not np.all(is_triangle):
+            raise Warning("Elements {0} need an inner edge!".format([self.list_of_elements[i].elem_num for i in rows[~is_triangle]]))
+        theta1 = gr.layer_plane_angles(self.node_coords,
+            self.connectivity[rows], outer_edge_node_nums,
+            inner_edge_node_nums)
+        for (i, t) in zip(rows, theta1):
+            e = self.list_of_elements[i]
+            e.theta1 = t
+            e._outer_edge_node0 = e.nodes[outer_edge_node_nums[0]-1]
+            e._outer_edge_node1 = e.nodes[outer_edge_node_nums[1]-1]
+            if inner_edge_node_nums is not None:
+                e._inner_edge_node0 = e.nodes[inner_edge_node_nums[0]-1]
+                e._inner_edge_node1 = e.nodes[inner_edge_node_nums[1]-1]
+        return theta1
@@ -6,8 +6,11 @@ Last updated: April 14, 2014
 """
 
 
+import weakref
 import numpy as np
 import transformation as tf
+import airfoil_utils as afu
+reload(afu)
 import scipy.interpolate as ipl
 from shapely.geometry import Polygon
 
@@ -30,7 +33,7 @@ class MonoplaneAirfoil(_Airfoil):
     def __init__(self, name, filename, chord, pitch_axis, twist, has_sharp_TE,
         parent_station):
         _Airfoil.__init__(self, name, pitch_axis, twist)
-        self.parent_station = parent_station
+        self.parent_station = weakref.proxy(parent_station)
         self.filename = filename
         self.path = None        # assigned later by Blade.copy_airfoil_coords()
         self.chord = chord      # units [m]
@@ -39,6 +42,7 @@ class MonoplaneAirfoil(_Airfoil):
         self.suction = None     # assigned later by split_at_LE_and_TE()
         self.pressure = None    # assigned later by split_at_LE_and_TE()
         self.polygon = None     # assigned later by create_polygon()
+        self.part_edges = []    # assigned later by resample_coords()
         if has_sharp_TE == 'yes':
             self.has_sharp_TE = True
         elif has_sharp_TE == 'no':
@@ -130,6 +134,9 @@ Twist:       {4:6.4f} (degrees)""".format(self.name, self.filename,
         self.scale_coords(scale_factor=self.chord)
         self.translate_coords_chordwise(x=self.pitch_axis*self.chord,
             direc='fwd')
+        # put the resampled points at the part edges exactly on the edges
+        self.coords['x'] = afu.snap(self.coords['x'], self.part_edges,
+            1.0e-9*self.chord)
 
     def rotate_coords(self):
         """Rotate the airfoil coordinates wrt the local twist angle.
@@ -163,18 +170,34 @@ Twist:       {4:6.4f} (degrees)""".format(self.name, self.filename,
             self.suction = self.coords[self.LE_index:]
             self.pressure = self.coords[:self.LE_index+1]
 
+    def resample_coords(self, max_error=1.0e-4, spacing='curvature',
+        part_edges=()):
+        """Resample the airfoil coordinates to a chordal error.
+
+        Must run <Airfoil>.read_coords() first, and before
+        <Airfoil>.scale_and_translate_coords(). See airfoil_utils.resample().
+
+        Parameters
+        ----------
+        max_error : float, the largest distance between the new and the
+            original airfoil curve (chord fraction)
+        spacing : str, 'curvature' or 'cosine'
+        part_edges : list of floats, chordwise coords of the part edges (in
+            meters, from <Station>.find_part_edges()), where points are kept
+
+        """
+        self.part_edges = list(part_edges)
+        keep_x = [x/self.chord + self.pitch_axis for x in part_edges]
+        self.coords = afu.resample(self.coords, max_error, spacing, keep_x)
+
     def create_polygon(self):
         """Convert the numpy array of coordinates into a polygon object.
 
         This allows us to use offset and clipping methods in the Shapely module
 
         """
-        l = []
-        for point in self.coords:
-            x = float(point['x'])
-            y = float(point['y'])
-            l.append((x,y))
-        self.polygon = Polygon(l)
+        self.polygon = Polygon(np.column_stack((self.coords['x'],
+            self.coords['y'])))
 
     def plot_coords(self, axes, split_flag=False):
         """Plot the monoplane airfoil coordinates of this station."""
@@ -260,7 +283,7 @@ class BiplaneAirfoil(_Airfoil):
         gap_to_chord_ratio, gap_fraction, stagger_to_chord_ratio,
         parent_station):
         _Airfoil.__init__(self, name, pitch_axis, twist)
-        self.parent_station = parent_station
+        self.parent_station = weakref.proxy(parent_station)
         self.lower_name = name_L
         self.lower_filename = filename_L
         self.lower_path = None
@@ -283,6 +306,8 @@ class BiplaneAirfoil(_Airfoil):
         self.total_chord = self.stagger + chord_L
         self.lower_polygon = None     # assigned later by create_polygon()
         self.upper_polygon = None     # assigned later by create_polygon()
+        self.lower_part_edges = []    # assigned later by resample_coords()
+        self.upper_part_edges = []    # assigned later by resample_coords()
 
     def __str__(self):
         return """Biplane Airfoil ---
@@ -482,6 +507,11 @@ Twist:                   {14:6.4f} (degrees)""".format(self.name,
             upper_direc='fwd',
             lower_x=self.pitch_axis*self.total_chord,
             lower_direc='fwd')
+        # put the resampled points at the part edges exactly on the edges
+        self.lower_coords['x'] = afu.snap(self.lower_coords['x'],
+            self.lower_part_edges, 1.0e-9*self.lower_chord)
+        self.upper_coords['x'] = afu.snap(self.upper_coords['x'],
+            self.upper_part_edges, 1.0e-9*self.upper_chord)
 
     def rotate_coords(self):
         """Rotate the airfoil coordinates wrt the local twist angle.
@@ -539,24 +569,45 @@ Twist:                   {14:6.4f} (degrees)""".format(self.name,
             self.upper_suction = self.upper_coords[self.upper_LE_index:]
             self.upper_pressure = self.upper_coords[:self.upper_LE_index+1]
 
+    def resample_coords(self, max_error=1.0e-4, spacing='curvature',
+        lower_part_edges=(), upper_part_edges=()):
+        """Resample the lower and upper airfoil coordinates to a chordal error.
+
+        Must run <Airfoil>.read_coords() first, and before
+        <Airfoil>.scale_and_translate_coords(). See airfoil_utils.resample().
+
+        Parameters
+        ----------
+        max_error : float, the largest distance between the new and the
+            original airfoil curves (fraction of each airfoil's chord)
+        spacing : str, 'curvature' or 'cosine'
+        lower_part_edges, upper_part_edges : lists of floats, chordwise coords
+            of the part edges on each airfoil (in meters, from
+            <Station>.find_part_edges()), where points are kept
+
+        """
+        self.lower_part_edges = list(lower_part_edges)
+        self.upper_part_edges = list(upper_part_edges)
+        offset = self.pitch_axis*self.total_chord
+        lower_keep_x = [(x + offset - self.stagger)/self.lower_chord
+            for x in lower_part_edges]
+        upper_keep_x = [(x + offset)/self.upper_chord
+            for x in upper_part_edges]
+        self.lower_coords = afu.resample(self.lower_coords, max_error,
+            spacing, lower_keep_x)
+        self.upper_coords = afu.resample(self.upper_coords, max_error,
+            spacing, upper_keep_x)
+
     def create_polygon(self):
         """Convert the numpy array of coordinates into a polygon object.
 
         This allows us to use offset and clipping methods in the Shapely module
 
         """
-        l = []
-        for point in self.lower_coords:
-            x = float(point['x'])
-            y = float(point['y'])
-            l.append((x,y))
-        self.lower_polygon = Polygon(l)
-        u = []
-        for point in self.upper_coords:
-            x = float(point['x'])
-            y = float(point['y'])
-            u.append((x,y))
-        self.upper_polygon = Polygon(u)
+        self.lower_polygon = Polygon(np.column_stack((self.lower_coords['x'],
+            self.lower_coords['y'])))
+        self.upper_polygon = Polygon(np.column_stack((self.upper_coords['x'],
+            self.upper_coords['y'])))
 
     def plot_coords(self, axes, split_flag=False):
         """Plot the biplane airfoil coordinates of this station."""
@@ -0,0 +1,206 @@
+"""Resample airfoil coordinates to a target chordal error.
+
+Raw airfoil files have whatever point density their source gave them (e.g.
+about 100 points for the SNL transition shapes, and denser DU/NACA files), and
+every later buffer, difference, and intersection in the structure, and every
+TrueGrid curve, inherits that density. resample() picks a subset of the
+airfoil curve that stays within a chordal error of the original curve:
+
+  'curvature' : points are spaced by the local curvature, h = sqrt(8*e/k),
+                so flat regions get few points and the LE gets many
+  'cosine'    : points are cosine-spaced between breakpoints
+
+Either way, the TE points, the LE point (y = 0), sharp corners (e.g. a blunt
+TE), and the points where the part edges cross the airfoil are always kept,
+and segments that are still too far from the original curve are split until
+the error is met.
+
+All coordinates here are normalized by the chord (as in the airfoil files),
+so one resampled profile serves every station that uses it. Results are
+cached per profile, tolerance, and part edges.
+
+Usage:
+import lib.airfoil_utils as afu
+coords = np.loadtxt('sandia_blade/airfoils/DU99-W-405.txt',
+    dtype=[('x', 'f8'), ('y', 'f8')], comments='#')
+new_coords = afu.resample(coords, max_error=1.0e-4, keep_x=[0.2, 0.4])
+afu.clear_cache()
+
+Last updated: May 13, 2014
+
+"""
+
+
+import numpy as np
+
+
+# {(profile, settings): resampled coords}
+_resample_cache = {}
+
+
+def clear_cache():
+    """Forget all the resampled profiles."""
+    _resample_cache.clear()
+
+
+def arc_lengths(P):
+    """Returns the cumulative arc length at each point of a curve, shape (n,).
+    """
+    return np.concatenate(([0.0],
+        np.cumsum(np.sqrt(np.sum(np.diff(P, axis=0)**2, axis=1)))))
+
+
+def turning_angles(P):
+    """Returns the turning angle [deg] at each point of a curve (zero at the
+    end points)."""
+    d = np.diff(P, axis=0)
+    a = np.arctan2(d[:,1], d[:,0])
+    turn = np.zeros(len(P))
+    turn[1:-1] = np.abs((np.diff(a) + np.pi) % (2.0*np.pi) - np.pi)
+    return np.degrees(turn)
+
+
+def snap(x, values, tol):
+    """Returns a copy of the coords x, where the coords within tol of one of
+    the values are set to exactly that value.
+
+    The part edges are kept in chord-normalized coords, so after scaling they
+    can be off the part edges by round-off. Clipping a polygon with a vertex
+    that close to the clip line leaves slivers that break shapely's unions.
+
+    """
+    x = np.array(x, dtype=float)
+    for v in values:
+        x[np.abs(x - v) < tol] = v
+    return x
+
+
+def _crossings(P, s, x):
+    """Returns the arc lengths where the curve crosses the line x = const."""
+    (x0, x1) = (P[:-1,0] - x, P[1:,0] - x)
+    i = np.nonzero((x0*x1 <= 0.0) & (x0 != x1))[0]
+    t = x0[i]/(x0[i] - x1[i])
+    return s[i] + t*(s[i+1] - s[i])
+
+
+def _density(P, s, max_error, max_spacing):
+    """Returns the cumulative number of points needed along a curve, at each
+    of its points, for a chordal error of max_error. A chord of length h on a
+    curve of curvature k is off the curve by about k*h^2/8."""
+    l = np.diff(s)
+    turn = np.radians(turning_angles(P))
+    k = np.zeros(len(P))
+    k[1:-1] = turn[1:-1]/(0.5*(l[:-1] + l[1:]))
+    rho = np.maximum(np.sqrt(k/(8.0*max_error)), 1.0/max_spacing)
+    return np.concatenate(([0.0], np.cumsum(0.5*(rho[:-1] + rho[1:])*l)))
+
+
+def _spread(sa, sb, Ga, Gb, s, G, spacing):
+    """Returns the interior arc lengths of the points between the
+    breakpoints sa and sb.
+
+    The points are snapped to the nearest original points, so the new curve
+    is a subset of the original one, and points that land within half a
+    spacing of a breakpoint are dropped (no slivers).
+
+    """
+    m = max(int(np.ceil(Gb - Ga)), 1)
+    u = np.linspace(0.0, 1.0, m+1)[1:-1]
+    if spacing == 'curvature':
+        t = np.interp(Ga + u*(Gb - Ga), G, s)
+    else:
+        t = sa + (sb - sa)*0.5*(1.0 - np.cos(np.pi*u))
+    i = np.clip(np.searchsorted(s, t), 1, len(s)-1)
+    t = np.where(t - s[i-1] < s[i] - t, s[i-1], s[i])
+    return t[np.minimum(t - sa, sb - t) > 0.5*(sb - sa)/m]
+
+
+def _chord_errors(P, s, Q, t):
+    """Returns (chord index, error, arc length) of the worst original point
+    under each new chord that has any, where the new points Q are at arc
+    lengths t."""
+    j = np.searchsorted(t, s, side='right') - 1
+    inside = (j >= 0) & (j < len(t)-1)
+    inside[inside] = (s[inside] > t[j[inside]]) & (s[inside] < t[j[inside]+1])
+    (j, p, sp) = (j[inside], P[inside], s[inside])
+    (a, b) = (Q[j], Q[j+1])
+    ab = b - a
+    L2 = np.maximum(np.sum(ab**2, axis=1), 1.0e-300)
+    u = np.clip(np.sum((p - a)*ab, axis=1)/L2, 0.0, 1.0)
+    d = np.sqrt(np.sum((a + u[:,np.newaxis]*ab - p)**2, axis=1))
+    order = np.lexsort((-d, j))
+    (first, k) = np.unique(j[order], return_index=True)
+    return (first, d[order][k], sp[order][k])
+
+
+def resample(coords, max_error=1.0e-4, spacing='curvature', keep_x=(),
+    max_spacing=0.1, corner_angle=30.0):
+    """Resample airfoil coordinates to a chordal error.
+
+    Parameters
+    ----------
+    coords : structured np.array with fields 'x' and 'y', normalized by the
+        chord, from TE around the LE (y = 0) and back to the TE, as read by
+        <Airfoil>.read_coords()
+    max_error : float, the largest distance between the new and the original
+        curve (chord fraction)
+    spacing : str, 'curvature' or 'cosine'
+    keep_x : list of floats, chordwise coords of the part edges (chord
+        fraction); the points where they cross the airfoil are kept
+    max_spacing : float, the largest distance between new points, along the
+        curve (chord fraction)
+    corner_angle : float, original points that turn more than this [deg]
+        are kept
+
+    Returns a new structured array, with the same fields as coords.
+
+    """
+    if spacing not in ('curvature', 'cosine'):
+        raise ValueError("keyword 'spacing' must be 'curvature' or 'cosine'.")
+    keep_x = tuple(np.round(np.sort(np.asarray(keep_x, dtype=float)), 12))
+    key = (coords.tostring(), max_error, spacing, keep_x, max_spacing,
+        corner_angle)
+    if key not in _resample_cache:
+        _resample_cache[key] = _resample(coords, max_error, spacing, keep_x,
+            max_spacing, corner_angle)
+    return _resample_cache[key].copy()
+
+
+def _resample(coords, max_error, spacing, keep_x, max_spacing, corner_angle):
+    P = np.column_stack((coords['x'], coords['y'])).astype(float)
+    # drop repeated points, so the arc length is strictly increasing
+    repeated = np.concatenate(([False], np.all(np.diff(P, axis=0) == 0.0,
+        axis=1)))
+    P = P[~repeated]
+    s = arc_lengths(P)
+    # breakpoints: the TE, the LE (as in split_at_LE_and_TE), sharp corners,
+    #   and the part edges
+    breaks = [s[0], s[-1]]
+    LE = np.nonzero(P[1:,1] == 0.0)[0]
+    if len(LE):
+        breaks.append(s[LE[0]+1])
+    breaks.extend(s[turning_angles(P) > corner_angle])
+    for x in keep_x:
+        breaks.extend(_crossings(P, s, x))
+    breaks = np.unique(breaks)
+    breaks = breaks[np.concatenate(([True], np.diff(breaks) > 1.0e-9))]
+    # spread points between the breakpoints
+    G = _density(P, s, max_error, max_spacing)
+    Gb = np.interp(breaks, s, G)
+    t = [breaks]
+    for i in range(len(breaks)-1):
+        t.append(_spread(breaks[i], breaks[i+1], Gb[i], Gb[i+1], s, G,
+            spacing))
+    t = np.unique(np.concatenate(t))
+    # split the chords that are still too far from the original curve at
+    #   their worst original point
+    while True:
+        Q = np.column_stack((np.interp(t, s, P[:,0]), np.interp(t, s, P[:,1])))
+        (j, err, sp) = _chord_errors(P, s, Q, t)
+        if not np.any(err > max_error):
+            break
+        t = np.unique(np.concatenate((t, sp[err > max_error])))
+    new_coords = np.zeros(len(Q), dtype=coords.dtype)
+    new_coords['x'] = Q[:,0]
+    new_coords['y'] = Q[:,1]
+    return new_coords
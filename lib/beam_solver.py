@@ -0,0 +1,844 @@
+"""A finite element beam solver for the static deflection of a blade.
+
+This solves the same problems as the DYMORE models in each blade's
+'beam_model/' directory (tip loads, uniform and BEM distributed loads), in
+the same process, without running DYMORE and post-processing .mdt files.
+
+The blade is modeled as a linear, 3D frame of 2-node Timoshenko beam elements,
+with one element between each pair of adjacent stations. Each element uses
+the full 6x6 stiffness matrices from VABS (all couplings included), linearly
+interpolated between its two stations, and is oriented by the twist angles in
+the blade definition file. The element stiffness matrices are built from the
+exact flexibility of each element, all at once, and assembled into a sparse
+global stiffness matrix. The global matrix is factored once (scipy.sparse's
+SuperLU), so many load cases can be solved for the cost of one.
+
+The same model gives the natural frequencies and mode shapes of the blade.
+The consistent element mass matrices are built from each station's mass per
+unit span, mass moments of inertia, and center of mass (the same section
+mass properties as the DYMORE model), and the first few modes are found with
+a shift-invert sparse eigensolver that reuses the factored stiffness matrix.
+
+The VABS ordering is used everywhere for a section's 6 components:
+  [extension, shear along x2, shear along x3, twist, bending about x2,
+   bending about x3]
+Each node has 6 degrees of freedom in the inertial frame,
+  [u1, u2, u3, theta1, theta2, theta3]
+(theta = small rotation vector). Section resultants are reported in the
+element's local frame (b1 along the element, b2 and b3 rotated by the twist
+angle), as the forces and moments that the outboard part of the blade exerts
+on the inboard part.
+
+Nodes and edges use the same names as the DYMORE vertices and edges, so the
+DYMORE load files can be solved directly:
+  Sandia blade:  edge 'edgeBlade', from vertex 'vertexA' (root) to 'vertexB'
+  biplane blade: edges 'edge_01_09', 'lower_edge_09_10', ..., 'upper_edge_24_25',
+                 'edge_25_40', joined at vertices 'root_joint_v' and
+                 'midblade_joint_v' (see beam_model/biplane_blade.dat)
+As in the DYMORE model, the lower and upper beams of each biplane station
+share the station's (combined) stiffness and mass properties, and the distributed
+loads on the lower and upper beams are scaled by 0.5 in the load files.
+
+Usage:
+import lib.beam_solver as bs
+m = bs.monoplane_model('sandia_blade')
+loads = bs.read_dymore_load_cases('sandia_blade/beam_model')
+s = m.solve(loads.values(), case_names=loads.keys())
+s.edge('edgeBlade')['displacement']   # shape (n_nodes, 3, n_cases)
+
+m = bs.biplane_model('biplane_blade')
+s = m.solve([[bs.tip_load('tip_v', forces=[0,0,1.0e+05])]])
+s.vertex('tip_v')
+
+(station_nums, r) = s.station_resultants()   # shape (n_stations, 6, 1)
+
+modes = m.modes(n_modes=6)
+modes.frequencies        # [Hz]
+modes.vertex('tip_v')    # shape (6, n_modes)
+
+Last updated: May 13, 2014
+
+"""
+
+
+import os
+import re
+import glob
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+import scipy.sparse.linalg as spla
+import dymore_model as dm
+reload(dm)
+
+
+# skew-symmetric (cross product) matrix of the element axis, e1 x (.)
+_S = np.array([[0.0, 0.0,  0.0],
+               [0.0, 0.0, -1.0],
+               [0.0, 1.0,  0.0]])
+
+# DYMORE loading components, e.g. '@APPLIED_FORCE_ALONG_i3'
+_COMPONENTS = {'i1': 0, 'i2': 1, 'i3': 2}
+
+
+def joint_stations(types, station_nums):
+    """Returns (root_joint, midblade_joint) station numbers for a biplane blade.
+
+    This is the same rule as BiplaneBlade.assign_joint_stations(): the root
+    joint is the station just before the first biplane station, and the
+    mid-blade joint is the first monoplane station after that.
+
+    Parameters
+    ----------
+    types : list of strs, the type ('monoplane' or 'biplane') of each station
+    station_nums : list of ints, the station numbers
+
+    """
+    root_joint = 0
+    midblade_joint = 0
+    for (station_type, station_num) in zip(types, station_nums):
+        if station_type == 'biplane' and root_joint == 0:
+            root_joint = station_num - 1
+        if (station_type == 'monoplane' and root_joint != 0 and
+            midblade_joint == 0):
+            midblade_joint = station_num
+    return (root_joint, midblade_joint)
+
+
+def biplane_segments(station_nums, root_joint, midblade_joint):
+    """Returns the edges of a biplane blade's beam model, as a list of
+    (edge name, beam, station_nums) tuples, where beam is 'single', 'lower',
+    or 'upper'.
+
+    The inboard and outboard monoplane segments are single edges, e.g.
+    'edge_01_09' and 'edge_25_40', and the lower and upper beams of the
+    biplane segment have one edge between each pair of stations, e.g.
+    'lower_edge_09_10', ..., 'upper_edge_24_25'. (These are the names in
+    'biplane_blade/beam_model/biplane_blade.dat'.)
+
+    """
+    inboard = [n for n in station_nums if n <= root_joint]
+    outboard = [n for n in station_nums if n >= midblade_joint]
+    nums = ([root_joint] + [n for n in station_nums
+        if root_joint < n < midblade_joint] + [midblade_joint])
+    segments = [('edge_{0:02d}_{1:02d}'.format(inboard[0], inboard[-1]),
+        'single', inboard)]
+    for beam in ['lower', 'upper']:
+        for j in range(len(nums)-1):
+            segments.append(('{0}_edge_{1:02d}_{2:02d}'.format(beam, nums[j],
+                nums[j+1]), beam, nums[j:j+2]))
+    segments.append(('edge_{0:02d}_{1:02d}'.format(outboard[0],
+        outboard[-1]), 'single', outboard))
+    return segments
+
+
+def _transfer(r):
+    """Returns stacked 6x6 matrices that move section resultants a distance r
+    along the element axis, [F; M] --> [F; M + r e1 x F]."""
+    T = np.tile(np.eye(6), (len(r),1,1))
+    T[:,3:,:3] = r[:,np.newaxis,np.newaxis]*_S
+    return T
+
+
+def element_stiffness(L, K1, K2, n_gauss=3):
+    """Returns the 12x12 stiffness matrices of Timoshenko beam elements, in
+    their local frames.
+
+    The section stiffness is linearly interpolated from K1 (node 1) to K2
+    (node 2). The flexibility of each element (node 1 clamped, node 2 loaded)
+    is integrated with Gauss quadrature, and inverted.
+
+    Parameters
+    ----------
+    L : array, shape (m,), the element lengths
+    K1, K2 : arrays, shape (m,6,6), the section stiffness matrices at each end
+    n_gauss : int, the number of Gauss points
+
+    """
+    (xi, w) = np.polynomial.legendre.leggauss(n_gauss)
+    xi = (xi + 1.0)/2.0
+    w = w/2.0
+    G = np.zeros(K1.shape)
+    for (x, wg) in zip(xi, w):
+        C = np.linalg.inv((1.0-x)*K1 + x*K2)
+        T = _transfer(L*(1.0-x))
+        G += (wg*L)[:,np.newaxis,np.newaxis]*np.einsum('mji,mjk,mkl->mil',
+            T, C, T)
+    K22 = np.linalg.inv(G)
+    # element forces at (node 1, node 2) from the node 2 resultants
+    B = np.concatenate((-_transfer(L), np.tile(np.eye(6), (len(L),1,1))),
+        axis=1)
+    return np.einsum('mij,mjk,mlk->mil', B, K22, B)
+
+
+def section_mass_matrix(mass_per_unit_span, moments_of_inertia,
+    centre_of_mass):
+    """Returns the 6x6 mass matrix of a cross-section about its reference
+    point, from the section mass properties in a VABS output file.
+
+    Parameters
+    ----------
+    mass_per_unit_span : float
+    moments_of_inertia : (i1, i2, i3), mass moments of inertia about the mass
+        center (x1, x2, and x3 axes)
+    centre_of_mass : (x2, x3), the coords of the mass center
+
+    """
+    m = mass_per_unit_span
+    c = np.array([0.0, centre_of_mass[0], centre_of_mass[1]])
+    c_skew = np.array([[  0.0, -c[2],  c[1]],
+                       [ c[2],   0.0, -c[0]],
+                       [-c[1],  c[0],   0.0]])
+    M = np.zeros((6,6))
+    M[:3,:3] = m*np.eye(3)
+    M[:3,3:] = -m*c_skew
+    M[3:,:3] = m*c_skew
+    M[3:,3:] = np.diag(moments_of_inertia) + m*np.dot(c_skew.T, c_skew)
+    return M
+
+
+def _shape_functions(x, L):
+    """Returns stacked 6x12 matrices that interpolate the section
+    displacements and rotations at x (0 to 1) from the element's nodal
+    degrees of freedom: linear for extension and twist, cubic (Hermite) for
+    bending."""
+    h = [1.0 - 3*x**2 + 2*x**3, L*(x - 2*x**2 + x**3), 3*x**2 - 2*x**3,
+         L*(-x**2 + x**3)]
+    dh = [(-6*x + 6*x**2)/L, 1.0 - 4*x + 3*x**2, (6*x - 6*x**2)/L,
+          -2*x + 3*x**2]
+    N = np.zeros((len(L),6,12))
+    N[:,0,0] = N[:,3,3] = 1.0 - x
+    N[:,0,6] = N[:,3,9] = x
+    # u2, with theta3 = du2/dx1
+    (N[:,1,1], N[:,1,5], N[:,1,7], N[:,1,11]) = h
+    (N[:,5,1], N[:,5,5], N[:,5,7], N[:,5,11]) = dh
+    # u3, with theta2 = -du3/dx1
+    (N[:,2,2], N[:,2,4], N[:,2,8], N[:,2,10]) = (h[0], -h[1], h[2], -h[3])
+    (N[:,4,2], N[:,4,4], N[:,4,8], N[:,4,10]) = (-dh[0], dh[1], -dh[2],
+                                                 dh[3])
+    return N
+
+
+def element_mass(L, M1, M2, n_gauss=4):
+    """Returns the 12x12 consistent mass matrices of beam elements, in their
+    local frames.
+
+    The section mass matrix is linearly interpolated from M1 (node 1) to M2
+    (node 2), and integrated with the shape functions in _shape_functions().
+
+    """
+    (xi, w) = np.polynomial.legendre.leggauss(n_gauss)
+    xi = (xi + 1.0)/2.0
+    w = w/2.0
+    Me = np.zeros((len(L),12,12))
+    for (x, wg) in zip(xi, w):
+        N = _shape_functions(x, L)
+        Me += (wg*L)[:,np.newaxis,np.newaxis]*np.einsum('mji,mjk,mkl->mil',
+            N, (1.0-x)*M1 + x*M2, N)
+    return Me
+
+
+def element_frames(X1, X2, twist):
+    """Returns the element lengths and rotation matrices (rows: b1, b2, b3).
+
+    b1 points from node 1 to node 2. Without twist, b2 is the inertial x2 axis,
+    made normal to b1. Then b2 and b3 are rotated about b1 by the twist angle
+    (degrees), in the same sense as transformation.rotate_coord_pair().
+
+    """
+    d = X2 - X1
+    L = np.sqrt((d**2).sum(axis=1))
+    b1 = d/L[:,np.newaxis]
+    b2 = np.array([0.0, 1.0, 0.0]) - b1*b1[:,1:2]
+    n2 = np.sqrt((b2**2).sum(axis=1))
+    if np.any(n2 < 1.0e-08):
+        raise Warning("Elements {0} are parallel to the x2 axis!".format(
+            list(np.nonzero(n2 < 1.0e-08)[0])))
+    b2 = b2/n2[:,np.newaxis]
+    b3 = np.cross(b1, b2)
+    t = np.deg2rad(twist)[:,np.newaxis]
+    R = np.empty((len(L),3,3))
+    R[:,0] = b1
+    R[:,1] = np.cos(t)*b2 + np.sin(t)*b3
+    R[:,2] = -np.sin(t)*b2 + np.cos(t)*b3
+    return (L, R)
+
+
+def tip_load(vertex_name, forces=(0,0,0), moments=(0,0,0)):
+    """Returns a concentrated load (like a DYMORE dead load) at a vertex."""
+    return {'type': 'dead', 'vertex': vertex_name,
+            'forces': np.array(forces, dtype=float),
+            'moments': np.array(moments, dtype=float)}
+
+
+def edge_load(edge_name, eta, values, component='i3'):
+    """Returns a distributed force (per unit length, like a DYMORE edge load)
+    along the inertial 'i1', 'i2', or 'i3' axis, tabulated vs. the edge's
+    ETA_COORDINATE (0 to 1)."""
+    return {'type': 'edge', 'edge': edge_name, 'component': component,
+            'eta': np.array(eta, dtype=float),
+            'values': np.array(values, dtype=float)}
+
+
+def _named_blocks(text, keyword):
+    """Returns a list of (name, body) for each '@keyword {name} {body}' block
+    in the text of a DYMORE input file."""
+    blocks = []
+    for match in re.finditer(r'@' + keyword + r'\s*\{\s*([^}]*?)\s*\}\s*\{',
+        text):
+        depth = 0
+        for i in xrange(match.end()-1, len(text)):
+            if text[i] == '{':
+                depth += 1
+            elif text[i] == '}':
+                depth -= 1
+                if depth == 0:
+                    break
+        else:
+            raise Warning("Unmatched braces in the '@{0}' block.".format(
+                keyword))
+        blocks.append((match.group(1), text[match.end():i]))
+    return blocks
+
+
+def _value(body, keyword):
+    match = re.search(r'@' + keyword + r'\s*\{\s*([^}]*?)\s*\}', body)
+    if match is None:
+        return None
+    return match.group(1)
+
+
+def read_dymore_loads(filename):
+    """Read the dead loads and edge loads in a DYMORE load file, e.g.
+    'sandia_blade/beam_model/load_tip_fwd_flap.dat'.
+
+    The scaling factors are applied, and time functions are ignored (each
+    load is applied at full scale). Returns a list of loads (see tip_load and
+    edge_load), which is one load case.
+
+    """
+    with open(filename, 'rb') as f:
+        text = f.read().replace('\r\n', '\n')
+    tables = {}
+    for (name, body) in _named_blocks(text, 'DATA_TABLE_NAME'):
+        entries = re.findall(r'@X_ENTRY\s*\{([^}]*)\}\s*@Y_ENTRY\s*\{([^}]*)\}',
+            body)
+        tables[name] = np.array(entries, dtype=float)
+    loads = []
+    for (name, body) in _named_blocks(text, 'DEAD_LOAD_NAME'):
+        scale = float(_value(body, 'SCALING_FACTOR') or 1.0)
+        forces = _value(body, 'APPLIED_FORCES') or '0,0,0'
+        moments = _value(body, 'APPLIED_MOMENTS') or '0,0,0'
+        loads.append(tip_load(_value(body, 'CONNECTED_TO_VERTEX'),
+            forces=scale*np.array(forces.split(','), dtype=float),
+            moments=scale*np.array(moments.split(','), dtype=float)))
+    for (name, body) in _named_blocks(text, 'EDGE_LOAD_NAME'):
+        scale = float(_value(body, 'SCALING_FACTOR') or 1.0)
+        match = re.search(r'@APPLIED_(\w+)_ALONG_(i[123])\s*\{\s*([^}]*?)\s*\}',
+            body)
+        if match is None or match.group(1) != 'FORCE':
+            raise Warning("Edge load '{0}' is not a distributed force.".format(
+                name))
+        table = tables[match.group(3)]
+        loads.append(edge_load(_value(body, 'EDGE_NAME'), table[:,0],
+            scale*table[:,1], component=match.group(2)))
+    return loads
+
+
+def read_dymore_load_cases(beam_model_path, pattern='load_*.dat'):
+    """Read every DYMORE load file in a beam model directory.
+
+    Returns a dict of {case name: list of loads}, where the case name is the
+    filename without 'load_' and '.dat', e.g. 'tip_fwd_flap'.
+
+    """
+    cases = {}
+    for filename in sorted(glob.glob(os.path.join(beam_model_path, pattern))):
+        name = os.path.splitext(os.path.basename(filename))[0]
+        if name.startswith('load_'):
+            name = name[len('load_'):]
+        cases[name] = read_dymore_loads(filename)
+    return cases
+
+
+class BeamModel:
+    """A frame of Timoshenko beam elements, with named vertices and edges.
+
+    Usage:
+    m = BeamModel()
+    a = m.add_node((0,0,0), station_num=1, K=K1, twist=13.308, vertex='A',
+        M=M1)
+    b = m.add_node((5,0,0), station_num=2, K=K2, twist=13.308, vertex='B',
+        M=M2)
+    m.add_edge('edgeAB', [a,b])
+    m.clamp(a)
+    s = m.solve([[tip_load('B', forces=[0,0,1.0])]])
+    modes = m.modes(n_modes=4)   (only if every node has a mass matrix)
+
+    """
+    def __init__(self):
+        self.coords = []          # (x1, x2, x3) of each node
+        self.station_nums = []    # station number of each node
+        self.K = []               # 6x6 stiffness matrix at each node
+        self.M = []               # 6x6 mass matrix at each node (or None)
+        self.twist = []           # twist angle (degrees) at each node
+        self.vertices = {}        # {vertex name: node index}
+        self.edges = {}           # {edge name: list of node indices}
+        self.edge_names = []      # edge names, in the order they were added
+        self.elements = []        # (node 1, node 2) of each element
+        self.element_edges = []   # edge name of each element
+        self.clamped_nodes = []
+        self.sections = {}        # {station num: (reference coords, twist)}
+        self._lu = None
+
+    def add_node(self, coords, station_num, K, twist, vertex=None, M=None):
+        """Add a node and return its index. M is the section mass matrix
+        (see section_mass_matrix), which is only needed for modes()."""
+        self.coords.append(np.array(coords, dtype=float))
+        self.station_nums.append(station_num)
+        self.K.append(np.array(K, dtype=float))
+        if M is not None:
+            M = np.array(M, dtype=float)
+        self.M.append(M)
+        self.twist.append(float(twist))
+        if vertex is not None:
+            self.vertices[vertex] = len(self.coords) - 1
+        self._lu = None
+        return len(self.coords) - 1
+
+    def add_section(self, station_num, coords, twist):
+        """Set the reference point (the origin of the VABS cross-section) and
+        twist angle (degrees) of a station, for StaticSolution.
+        station_resultants(). (By default, a station's section is at its first
+        node.)"""
+        self.sections[station_num] = (np.array(coords, dtype=float),
+            float(twist))
+
+    def add_edge(self, edge_name, node_nums):
+        """Add an edge with one element between each pair of nodes, from the
+        first node (ETA_COORDINATE=0) to the last (ETA_COORDINATE=1)."""
+        if edge_name in self.edges:
+            raise Warning("Edge '{0}' already exists!".format(edge_name))
+        self.edges[edge_name] = list(node_nums)
+        self.edge_names.append(edge_name)
+        for (n1, n2) in zip(node_nums[:-1], node_nums[1:]):
+            self.elements.append((n1, n2))
+            self.element_edges.append(edge_name)
+        self._lu = None
+
+    def clamp(self, node_num):
+        """Fix all 6 degrees of freedom of a node."""
+        self.clamped_nodes.append(node_num)
+        self._lu = None
+
+    def node_num(self, vertex_or_node):
+        """Returns the node index of a vertex name (or of a node index)."""
+        if isinstance(vertex_or_node, str):
+            return self.vertices[vertex_or_node]
+        return vertex_or_node
+
+    @property
+    def n_dofs(self):
+        return 6*len(self.coords)
+
+    def _element_arrays(self):
+        e = np.array(self.elements)
+        X = np.array(self.coords)
+        twist = np.array(self.twist)
+        (L, R) = element_frames(X[e[:,0]], X[e[:,1]],
+            (twist[e[:,0]] + twist[e[:,1]])/2.0)
+        K = np.array(self.K)
+        Ke = element_stiffness(L, K[e[:,0]], K[e[:,1]])
+        # 12x12 rotation from the inertial frame to each local frame
+        T = np.zeros((len(L),12,12))
+        for i in range(4):
+            T[:,3*i:3*i+3,3*i:3*i+3] = R
+        dofs = (6*e[:,:,np.newaxis] + np.arange(6)).reshape(len(L),12)
+        return (L, R, Ke, T, dofs)
+
+    def factorize(self):
+        """Assemble the global stiffness matrix and factor it. (This is done
+        automatically, and only once, by solve().)"""
+        if len(self.clamped_nodes) == 0:
+            raise Warning("The beam model isn't clamped anywhere!")
+        (L, R, Ke, T, dofs) = self._element_arrays()
+        fixed = np.zeros(self.n_dofs, dtype=bool)
+        for n in self.clamped_nodes:
+            fixed[6*n:6*n+6] = True
+        free = np.nonzero(~fixed)[0]
+        self._free = free
+        self._elements = (L, R, Ke, T, dofs)
+        self._K = self._assemble(Ke)
+        self._lu = spla.splu(self._K)
+        return self._lu
+
+    def _assemble(self, element_matrices):
+        """Returns the global matrix (free degrees of freedom only, sparse
+        CSC format) from 12x12 element matrices in their local frames."""
+        (L, R, Ke, T, dofs) = self._elements
+        Ag = np.einsum('mji,mjk,mkl->mil', T, element_matrices, T)
+        rows = np.repeat(dofs, 12, axis=1).ravel()
+        cols = np.tile(dofs, (1,12)).ravel()
+        A = sp.coo_matrix((Ag.ravel(), (rows, cols)),
+            shape=(self.n_dofs, self.n_dofs)).tocsc()
+        return A[self._free][:,self._free].tocsc()
+
+    def modes(self, n_modes=10):
+        """Solve for the lowest natural frequencies and mode shapes.
+
+        The eigenproblem K x = w**2 M x is solved with scipy's ARPACK wrapper
+        (eigsh) in shift-invert mode about zero, with the stiffness matrix
+        that was already factored for solve().
+
+        Returns a ModalSolution.
+
+        """
+        if self._lu is None:
+            self.factorize()
+        missing = [i for (i, M) in enumerate(self.M) if M is None]
+        if len(missing) > 0:
+            raise Warning("Nodes {0} have no mass matrix!".format(missing))
+        (L, R, Ke, T, dofs) = self._elements
+        e = np.array(self.elements)
+        M = np.array(self.M)
+        Mg = self._assemble(element_mass(L, M[e[:,0]], M[e[:,1]]))
+        n = len(self._free)
+        OPinv = spla.LinearOperator((n,n), matvec=self._lu.solve,
+            dtype=float)
+        (w2, x) = spla.eigsh(self._K, k=min(n_modes, n-1), M=Mg, sigma=0.0,
+            OPinv=OPinv)
+        order = np.argsort(w2)
+        shapes = np.zeros((self.n_dofs, len(order)))
+        shapes[self._free] = x[:,order]
+        return ModalSolution(self, np.sqrt(np.abs(w2[order]))/(2.0*np.pi),
+            shapes.reshape(len(self.coords), 6, -1))
+
+    def load_vectors(self, load_cases):
+        """Returns the global load vectors, shape (n_dofs, n_cases), and the
+        equivalent nodal loads on each element, shape (m, 12, n_cases), in the
+        inertial frame.
+
+        Distributed loads are linear between nodes, and are lumped with the
+        consistent (cubic beam) nodal forces and moments.
+
+        """
+        if self._lu is None:
+            self.factorize()
+        (L, R, Ke, T, dofs) = self._elements
+        n_cases = len(load_cases)
+        F = np.zeros((self.n_dofs, n_cases))
+        fe = np.zeros((len(L), 12, n_cases))
+        X = np.array(self.coords)
+        element_index = dict([(e, i) for (i, e) in enumerate(self.elements)])
+        for (c, loads) in enumerate(load_cases):
+            for load in loads:
+                if load['type'] == 'dead':
+                    n = self.vertices[load['vertex']]
+                    F[6*n:6*n+3,c] += load['forces']
+                    F[6*n+3:6*n+6,c] += load['moments']
+                elif load['type'] == 'edge':
+                    nodes = self.edges[load['edge']]
+                    s = np.concatenate(([0.0], np.cumsum(np.sqrt(
+                        (np.diff(X[nodes], axis=0)**2).sum(axis=1)))))
+                    q = np.zeros((len(nodes),3))
+                    q[:,_COMPONENTS[load['component']]] = np.interp(s/s[-1],
+                        load['eta'], load['values'])
+                    for j in range(len(nodes)-1):
+                        i = element_index[(nodes[j], nodes[j+1])]
+                        fe[i,:,c] += _consistent_loads(L[i], R[i,0], q[j],
+                            q[j+1])
+                else:
+                    raise Warning("Unknown load type '{0}'".format(
+                        load['type']))
+        np.add.at(F, dofs.ravel(), fe.reshape(-1, n_cases))
+        return (F, fe)
+
+    def solve(self, load_cases, case_names=None):
+        """Solve for the static deflection of the beam under many load cases.
+
+        Parameters
+        ----------
+        load_cases : list of load cases; each load case is a list of loads
+            (see tip_load, edge_load, and read_dymore_loads)
+        case_names : list of strs, a name for each load case
+
+        Returns a StaticSolution.
+
+        """
+        if self._lu is None:
+            self.factorize()
+        (L, R, Ke, T, dofs) = self._elements
+        (F, fe) = self.load_vectors(load_cases)
+        d = np.zeros(F.shape)
+        d[self._free] = self._lu.solve(F[self._free])
+        # element end forces in the local frames: K_e (T d_e) - T f_e
+        de = np.einsum('mij,mjc->mic', T, d[dofs])
+        Pe = (np.einsum('mij,mjc->mic', Ke, de) -
+              np.einsum('mij,mjc->mic', T, fe))
+        resultants = np.empty((len(L), 2, 6, F.shape[1]))
+        resultants[:,0] = -Pe[:,:6]
+        resultants[:,1] = Pe[:,6:]
+        return StaticSolution(self, d.reshape(len(self.coords), 6, -1),
+            resultants, case_names)
+
+
+def _consistent_loads(L, b1, q1, q2):
+    """Returns the 12 nodal loads (inertial frame) that are equivalent to a
+    force per unit length that varies linearly from q1 to q2 along an element
+    of length L and direction b1."""
+    a1 = np.dot(q1, b1)
+    a2 = np.dot(q2, b1)
+    t1 = q1 - a1*b1
+    t2 = q2 - a2*b1
+    f = np.empty(12)
+    f[0:3] = L*(2*a1 + a2)/6.0*b1 + L*(7*t1 + 3*t2)/20.0
+    f[3:6] = L**2/60.0*np.cross(b1, 3*t1 + 2*t2)
+    f[6:9] = L*(a1 + 2*a2)/6.0*b1 + L*(3*t1 + 7*t2)/20.0
+    f[9:12] = -L**2/60.0*np.cross(b1, 2*t1 + 3*t2)
+    return f
+
+
+class StaticSolution:
+    """The static deflection of a BeamModel under several load cases.
+
+    Attributes
+    ----------
+    .model : BeamModel
+    .case_names : list of strs
+    .displacements : array, shape (n_nodes, 6, n_cases), inertial frame
+        [u1, u2, u3, theta1, theta2, theta3] of each node
+    .resultants : array, shape (m, 2, 6, n_cases), local frame
+        [F1, F2, F3, M1, M2, M3] at the (node 1, node 2) end of each element
+
+    """
+    def __init__(self, model, displacements, resultants, case_names=None):
+        self.model = model
+        self.displacements = displacements
+        self.resultants = resultants
+        if case_names is None:
+            case_names = range(displacements.shape[2])
+        self.case_names = list(case_names)
+
+    def vertex(self, vertex_name):
+        """Returns the displacements and rotations of a vertex, shape
+        (6, n_cases)."""
+        return self.displacements[self.model.node_num(vertex_name)]
+
+    def edge(self, edge_name):
+        """Returns a dict of results at each node along an edge:
+          'station_num' : shape (n,)
+          'x1' : shape (n,), the spanwise coords
+          'displacement' : shape (n,3,n_cases)
+          'rotation' : shape (n,3,n_cases)
+          'forces' : shape (n,3,n_cases)
+          'moments' : shape (n,3,n_cases)
+        """
+        m = self.model
+        nodes = m.edges[edge_name]
+        e = [m.elements.index((n1, n2)) for (n1, n2) in zip(nodes[:-1],
+            nodes[1:])]
+        r = np.concatenate((self.resultants[e,0],
+            self.resultants[e[-1:],1]))
+        d = self.displacements[nodes]
+        return {'station_num': np.array(m.station_nums)[nodes],
+                'x1': np.array(m.coords)[nodes,0],
+                'displacement': d[:,:3],
+                'rotation': d[:,3:],
+                'forces': r[:,:3],
+                'moments': r[:,3:]}
+
+    def case(self, case_name):
+        """Returns the index of a load case."""
+        return self.case_names.index(case_name)
+
+    def station_resultants(self):
+        """Returns (station_nums, resultants), the force and moment resultants
+        [F1, F2, F3, M1, M2, M3] on the whole cross-section of each station,
+        shape (n_stations, 6, n_cases).
+
+        The resultants are taken just inboard of each station (just outboard
+        of the root), and are in the station's section frame, about its
+        reference point (see BeamModel.add_section). At a biplane station, the
+        resultants of the lower and upper beams are summed, so they are the
+        sectional loads on the station's (combined) VABS cross-section.
+
+        """
+        m = self.model
+        e = np.array(m.elements)
+        X = np.array(m.coords)
+        R = m._elements[1]
+        # each element's end 2 is just inboard of its node 2; the root nodes
+        #   (without an element ending at them) use end 1 of their elements
+        ends = [(k, 1, n2) for (k, (n1, n2)) in enumerate(m.elements)]
+        inboard = set(e[:,1])
+        ends += [(k, 0, n1) for (k, (n1, n2)) in enumerate(m.elements)
+                 if n1 not in inboard]
+        (k, end, node) = [np.array(a) for a in zip(*ends)]
+        r = self.resultants[k,end]
+        # forces and moments in the inertial frame
+        F = np.einsum('mji,mjc->mic', R[k], r[:,:3])
+        M = np.einsum('mji,mjc->mic', R[k], r[:,3:])
+        stations = np.array(m.station_nums)[node]
+        station_nums = np.unique(stations)
+        resultants = np.empty((len(station_nums), 6, r.shape[2]))
+        for (i, station_num) in enumerate(station_nums):
+            rows = np.nonzero(stations == station_num)[0]
+            (X0, twist) = m.sections.get(station_num,
+                (X[node[rows[0]]], m.twist[node[rows[0]]]))
+            # moments about the reference point
+            d = X[node[rows]] - X0
+            Mi = M[rows] + np.cross(d[:,:,np.newaxis], F[rows], axis=1)
+            Rs = element_frames(X0[np.newaxis],
+                X0[np.newaxis] + np.array([[1.0, 0.0, 0.0]]),
+                np.array([twist]))[1][0]
+            resultants[i,:3] = np.dot(Rs, F[rows].sum(axis=0))
+            resultants[i,3:] = np.dot(Rs, Mi.sum(axis=0))
+        return (station_nums, resultants)
+
+
+class ModalSolution:
+    """The natural frequencies and mode shapes of a BeamModel.
+
+    Attributes
+    ----------
+    .model : BeamModel
+    .frequencies : array, shape (n_modes,), natural frequencies [Hz]
+    .mode_shapes : array, shape (n_nodes, 6, n_modes), inertial frame
+        [u1, u2, u3, theta1, theta2, theta3] of each node (mass-normalized)
+
+    """
+    def __init__(self, model, frequencies, mode_shapes):
+        self.model = model
+        self.frequencies = frequencies
+        self.mode_shapes = mode_shapes
+
+    def vertex(self, vertex_name):
+        """Returns the mode shapes at a vertex, shape (6, n_modes)."""
+        return self.mode_shapes[self.model.node_num(vertex_name)]
+
+    def edge(self, edge_name):
+        """Returns a dict of the mode shapes at each node along an edge:
+          'station_num' : shape (n,)
+          'x1' : shape (n,), the spanwise coords
+          'displacement' : shape (n,3,n_modes)
+          'rotation' : shape (n,3,n_modes)
+        """
+        m = self.model
+        nodes = m.edges[edge_name]
+        d = self.mode_shapes[nodes]
+        return {'station_num': np.array(m.station_nums)[nodes],
+                'x1': np.array(m.coords)[nodes,0],
+                'displacement': d[:,:3],
+                'rotation': d[:,3:]}
+
+
+def _section_mass_matrices(props):
+    return [section_mass_matrix(props['mass_per_unit_span'][i],
+        props['moments_of_inertia'][i], props['centre_of_mass'][i])
+        for i in range(len(props['station_num']))]
+
+
+def _read_definition(blade_path, defn_filename, station_nums):
+    df = pd.read_csv(os.path.join(blade_path, defn_filename), index_col=0)
+    if station_nums is None:
+        station_nums = [int(n) for n in df.index]
+    df = df.loc[station_nums]
+    props = dm.read_beam_properties(blade_path, station_nums)
+    return (df, station_nums, props)
+
+
+def monoplane_model(blade_path, station_nums=None,
+    defn_filename='blade_definition.csv', edge_name='edgeBlade',
+    root_vertex='vertexA', tip_vertex='vertexB'):
+    """Build a beam model of a monoplane blade, clamped at the root.
+
+    The names of the edge and its root and tip vertices default to the names
+    in 'sandia_blade/beam_model/sandia_blade.dat'.
+
+    """
+    (df, station_nums, props) = _read_definition(blade_path, defn_filename,
+        station_nums)
+    M = _section_mass_matrices(props)
+    m = BeamModel()
+    nodes = []
+    for (i, station_num) in enumerate(station_nums):
+        s = df.loc[station_num]
+        vertex = None
+        if i == 0:
+            vertex = root_vertex
+        elif i == len(station_nums)-1:
+            vertex = tip_vertex
+        nodes.append(m.add_node((s['x1'], s['x2'], s['x3']), station_num,
+            props['K'][i], s['twist'], vertex=vertex, M=M[i]))
+        m.add_section(station_num, (s['x1'], s['x2'], s['x3']), s['twist'])
+    m.add_edge(edge_name, nodes)
+    m.clamp(nodes[0])
+    return m
+
+
+def biplane_model(blade_path, station_nums=None,
+    defn_filename='blade_definition.csv', root_joint=None,
+    midblade_joint=None):
+    """Build a beam model of a biplane blade, clamped at the root.
+
+    The inboard and outboard monoplane segments are single beams, and the
+    biplane segment is made of a lower and an upper beam, which are joined
+    to the monoplane segments at the root and mid-blade joint stations. The
+    joints default to the same stations as BiplaneBlade.assign_joint_stations.
+
+    The lower and upper beams are offset from the pitch axis by the gap (and
+    the lower beam by the stagger), rotated by the twist angle, and use the
+    names in 'biplane_blade/beam_model/biplane_blade.dat', e.g. vertices
+    'root_v', 'root_joint_v', 'lower_10_v', 'upper_10_v', 'midblade_joint_v',
+    'tip_v', and edges 'edge_01_09', 'lower_edge_09_10', 'upper_edge_09_10',
+    ..., 'edge_25_40'.
+
+    """
+    (df, station_nums, props) = _read_definition(blade_path, defn_filename,
+        station_nums)
+    M = _section_mass_matrices(props)
+    (rj, mj) = joint_stations(df['type'].values, station_nums)
+    if root_joint is None:
+        root_joint = rj
+    if midblade_joint is None:
+        midblade_joint = mj
+    if root_joint not in station_nums or midblade_joint not in station_nums:
+        raise Warning("Couldn't find the root and mid-blade joint stations!")
+    m = BeamModel()
+    nodes = {'single': {}, 'lower': {}, 'upper': {}}
+    for (i, station_num) in enumerate(station_nums):
+        s = df.loc[station_num]
+        m.add_section(station_num, (s['x1'], s['x2'], s['x3']), s['twist'])
+        if station_num <= root_joint or station_num >= midblade_joint:
+            vertex = None
+            if i == 0:
+                vertex = 'root_v'
+            elif station_num == root_joint:
+                vertex = 'root_joint_v'
+            elif station_num == midblade_joint:
+                vertex = 'midblade_joint_v'
+            elif i == len(station_nums)-1:
+                vertex = 'tip_v'
+            nodes['single'][station_num] = m.add_node(
+                (s['x1'], s['x2'], s['x3']), station_num, props['K'][i],
+                s['twist'], vertex=vertex, M=M[i])
+        else:
+            gap = s['gap-to-chord ratio']*s['chord']
+            stagger = s['stagger-to-chord ratio']*s['chord']
+            t = np.deg2rad(s['twist'])
+            for (beam, y, z) in [
+                ('lower', stagger, -(1.0-s['gap fraction'])*gap),
+                ('upper', 0.0, s['gap fraction']*gap)]:
+                nodes[beam][station_num] = m.add_node(
+                    (s['x1'],
+                     s['x2'] + y*np.cos(t) - z*np.sin(t),
+                     s['x3'] + y*np.sin(t) + z*np.cos(t)),
+                    station_num, props['K'][i], s['twist'],
+                    vertex='{0}_{1:02d}_v'.format(beam, station_num), M=M[i])
+    for (edge_name, beam, nums) in biplane_segments(station_nums, root_joint,
+        midblade_joint):
+        # the joint stations are on the single beam
+        m.add_edge(edge_name, [nodes[beam].get(n, nodes['single'].get(n))
+            for n in nums])
+    m.clamp(nodes['single'][station_nums[0]])
+    return m
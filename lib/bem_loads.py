@@ -0,0 +1,153 @@
+"""Generate the distributed BEM loads of each blade's beam model.
+
+The BEM results (WT_Perf blade-element data for the SNL100-00 rotor) are read
+once from 'WT_Perf_Results__SNL100.csv'. The thrust per length of each blade
+element is summed over its azimuthal positions, and placed at its spanwise
+location (the element radius minus the hub radius). The thrust is zero at the
+root and at the tip.
+
+The thrust is interpolated onto every edge of the blade's beam model (see
+beam_solver.biplane_segments), all at once. Each edge gets its own data table
+with an entry at every station and at every BEM sample point on the edge, so
+the tabulated load is exactly the piecewise linear BEM load at any point
+(e.g. DYMORE's Gauss points) along the edge. The lower and upper edges of a
+biplane blade share a data table, and are each scaled by 0.5.
+
+The @EDGE_LOAD_DEFINITION and @DATA_TABLE_DEFINITION blocks are written to
+'<blade_path>/beam_model/load_BEM_dist_flap.dat', so the loads follow the
+stations in the blade definition file whenever stations are added or moved.
+
+Usage:
+import lib.bem_loads as bem
+bem.write_bem_loads('sandia_blade')
+bem.write_bem_loads('biplane_blade')
+
+Last updated: May 13, 2014
+
+"""
+
+
+import os
+import numpy as np
+import pandas as pd
+import dymore_model as dm
+import beam_solver as bs
+reload(dm)
+reload(bs)
+
+
+DEFAULT_BEM_FILENAME = 'WT_Perf_Results__SNL100.csv'
+
+
+def read_bem_thrust(filename=DEFAULT_BEM_FILENAME, hub_radius=2.5,
+    span=100.0):
+    """Returns (x, thrust), the spanwise coords [m] and the summed thrust per
+    length [N/m] from a WT_Perf blade-element data table, with zero thrust at
+    the root (x=0) and the tip (x=span)."""
+    df = pd.read_csv(filename)
+    elements = df.groupby('Element')
+    x = elements['RElm'].first().values - hub_radius
+    thrust = elements['Thrust/Len'].sum().values
+    return (np.concatenate(([0.0], x, [span])),
+            np.concatenate(([0.0], thrust, [0.0])))
+
+
+def blade_segments(blade_path, defn_filename='blade_definition.csv'):
+    """Returns the edges of a blade's beam model, as a list of
+    (edge name, beam, station_nums, x1) tuples.
+
+    A monoplane blade has one edge, 'edgeBlade' (as in the Sandia blade's
+    DYMORE model). A biplane blade has the edges in
+    beam_solver.biplane_segments.
+
+    """
+    df = pd.read_csv(os.path.join(blade_path, defn_filename), index_col=0)
+    station_nums = [int(n) for n in df.index]
+    if 'type' in df.columns and (df['type'] == 'biplane').any():
+        (root_joint, midblade_joint) = bs.joint_stations(df['type'].values,
+            station_nums)
+        segments = bs.biplane_segments(station_nums, root_joint,
+            midblade_joint)
+    else:
+        segments = [('edgeBlade', 'single', station_nums)]
+    return [(edge_name, beam, nums, df.loc[nums, 'x1'].values)
+            for (edge_name, beam, nums) in segments]
+
+
+def segment_table(x1, bem_x, bem_y, bem_points=True):
+    """Returns (eta, values), a load table along an edge from x1[0] to x1[-1].
+
+    The table has an entry at every station in x1, and (if bem_points is True)
+    at every BEM sample point bem_x inside the edge.
+
+    """
+    x = np.asarray(x1, dtype=float)
+    if bem_points:
+        x = np.union1d(x, bem_x[(bem_x > x[0]) & (bem_x < x[-1])])
+    return (dm.segment_eta(x), np.interp(x, bem_x, bem_y))
+
+
+def bem_load_blocks(blade_path, bem=None, load_name='BEM_flap_load',
+    component='APPLIED_FORCE_ALONG_i3', data_type='FORCE_ALONG_I3',
+    bem_points=True,
+    comments='from WT_Perf_Results__SNL100.csv, summed thrust per length'):
+    """Returns [@EDGE_LOAD_DEFINITION block, @DATA_TABLE_DEFINITION block] for
+    the BEM loads on every edge of a blade's beam model.
+
+    Parameters
+    ----------
+    blade_path : str, the blade directory, e.g. 'biplane_blade'
+    bem : (x, thrust) from read_bem_thrust() (default: read it)
+    load_name : str, the load name; each edge's load and table name is this
+        name plus the edge's beam and station numbers, e.g.
+        'BEM_flap_load_lower_09_10' and 'BEM_flap_load_table_09_10' (if there
+        is only one edge, the names are 'BEM_flap_load' and
+        'BEM_flap_load_table')
+    component, data_type : str, the DYMORE loading component and data type
+    bem_points : bool, add the BEM sample points to each table (see
+        segment_table)
+    comments : str, comments for each data table
+
+    """
+    if bem is None:
+        bem = read_bem_thrust()
+    (bem_x, bem_y) = bem
+    segments = blade_segments(blade_path)
+    edge_loads = []
+    tables = []
+    table_names = []
+    for (edge_name, beam, station_nums, x1) in segments:
+        if len(segments) == 1:
+            suffix = ''
+        else:
+            suffix = '_{0:02d}_{1:02d}'.format(station_nums[0],
+                station_nums[-1])
+        table_name = load_name + '_table' + suffix
+        if beam == 'single':
+            (name, scaling_factor) = (load_name + suffix, 1.0)
+        else:
+            (name, scaling_factor) = (load_name + '_' + beam + suffix, 0.5)
+        edge_loads.append(dm.format_edge_load_name(name, edge_name,
+            table_name, component=component, scaling_factor=scaling_factor))
+        if table_name not in table_names:
+            table_names.append(table_name)
+            (eta, values) = segment_table(x1, bem_x, bem_y,
+                bem_points=bem_points)
+            tables.append(dm.format_data_table_name(table_name, eta, values,
+                data_type=data_type, comments=comments))
+    return [dm.format_definition('EDGE_LOAD_DEFINITION', edge_loads),
+            dm.format_definition('DATA_TABLE_DEFINITION', tables)]
+
+
+def write_bem_loads(blade_path, filename=None, **kwargs):
+    """Write the BEM loads on every edge of a blade's beam model to a DYMORE
+    include file (default: '<blade_path>/beam_model/load_BEM_dist_flap.dat').
+
+    kwargs are passed to bem_load_blocks().
+
+    """
+    if filename is None:
+        filename = os.path.join(blade_path, 'beam_model',
+            'load_BEM_dist_flap.dat')
+    dm.write_load_file(filename, bem_load_blocks(blade_path, **kwargs))
+    print " Wrote BEM loads: " + filename
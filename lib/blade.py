@@ -30,9 +30,21 @@ import matplotlib.pyplot as plt
 import matplotlib.colors as colors
 import vabs_utils as vu
 reload(vu)
+import loft as lf
+reload(lf)
+import blade_definition as bd
+reload(bd)
 from mayavi import mlab
 
 
+def _write_xyz(filename, x, y, z):
+    """Write (x,y,z) coords to a tab-delimited text file, in one write."""
+    xyz = np.column_stack((x, y, z))
+    f = open(filename, 'w')
+    f.write(('%12.9f\t%12.9f\t%12.9f\n'*len(xyz)) % tuple(xyz.ravel()))
+    f.close()
+
+
 class _Blade:
     """Define a wind turbine blade.
 
@@ -47,10 +59,23 @@ class _Blade:
     stn2 = b.list_of_stations[1]
     stn2.airfoil.chord
 
+    # delete all the station paths when you're done with the blade
+    b.close()
+
+    or, equivalently:
+    with bld.MonoplaneBlade('Sandia blade SNL100-00', 'sandia_blade') as b:
+        b.list_of_stations[1].airfoil.chord
+
+    Each station, structure, structural part, and layer only keeps a weak
+    reference (weakref.proxy) to its parent, so a blade is freed as soon as
+    it is no longer used, even in a long-running process that builds many
+    blades. (A station can't be used after its blade is freed.)
+
     """
     logfile_name = 'blade.log'
     def __init__(self, name, blade_path, defn_filename='blade_definition.csv',
-        airfoils_path='airfoils', matl_filename='materials.csv'):
+        airfoils_path='airfoils', matl_filename='materials.csv',
+        max_chordal_error=None, spacing='curvature'):
         """Create a new wind turbine blade.
 
         Parameters
@@ -60,12 +85,19 @@ class _Blade:
 
         defn_filename : str (for CSV file), the blade definition filename
         airfoils_path : str, local directory that contains airfoil coordinates
+        max_chordal_error : float, if given, resample the airfoil coordinates
+            of each station to this chordal error (chord fraction, e.g.
+            1.0e-4), with a point at each part edge (see airfoil_utils.py)
+        spacing : str, 'curvature' or 'cosine', the spacing of the resampled
+            airfoil coordinates
 
         Attributes
         ----------
         .airfoils_path : str, local directory that contains airfoil coords
         .blade_path : str, the local target directory for storing blade data
         .defn_filename : str, (for CSV file), the blade definition filename
+        .definition : blade_definition.BladeDefinition, the typed columns of
+            the blade definition file
         .list_of_stations : list, contains all the Stations of this blade
         .name : str, the name of this blade
         .number_of_stations : int, the total number of stations in this blade
@@ -80,11 +112,18 @@ class _Blade:
         .create_all_stations() : create all stations for this blade
         .create_plot() : create a plot for this blade
         .create_station(station_num) : create a new station for this blade
-        .get_LE_coords() : list, returns (x,y,z) coords for the blade LE
+        .close() : delete all the station paths of this blade
+        .get_LE_coords() : tuple, returns (x,y,z) coords for the blade LE
+            (numpy arrays for a MonoplaneBlade; lists for the lower and
+            upper airfoils of a BiplaneBlade)
         .get_SW_cross_section_coords(sw_num) : list, returns (x,y,z) coords for
             shear web 1, 2, or 3
-        .get_TE_coords() : list, returns (x,y,z) coords for the blade TE
+        .get_TE_coords() : tuple, returns (x,y,z) coords for the blade TE
+            (numpy arrays for a MonoplaneBlade; lists for the lower and
+            upper airfoils of a BiplaneBlade)
         .import_blade_definition() : import the blade defn from a CSV file
+        .loft_surface() : loft.Surface, returns a triangulated surface of the
+            blade skin and shear webs
         .plot_LE(lw) : plots the leading edge from root to tip
         .plot_TE(lw) : plots the trailing edge from root to tip
         .plot_all_SW_cross_sections(lw) : plots all shear web cross-sections
@@ -93,8 +132,16 @@ class _Blade:
         .plot_blade() : plots a wirerame representation of the blade
         .plot_chord_schedule() : plot the chord vs. span
         .plot_pitch_axis(lw) : plots the pitch axis from root to tip
+        .plot_surface() : plots the lofted blade surface as one mesh
         .plot_twist_schedule() : plot the twist vs. span
+        .prepare_station(station) : read, scale, and split the airfoil coords
+            of a station, and find its part edges
+        .rebuild_station(station_num, overrides) : replace one station with a
+            new one, built from its row of the blade definition (and some
+            overridden values)
         .show_plot() : pick a nice view and show the plot
+        .write_surface(filename) : write the lofted blade surface to a .stl,
+            .obj, or .vtk file
 
         Usage
         -----
@@ -113,6 +160,8 @@ class _Blade:
             self.logf.write("[{0}] Found blade path: {1}\n".format(datetime.datetime.now(), self.blade_path))
             self.defn_filename = os.path.join(self.blade_path, defn_filename)
             self.matl_filename = os.path.join(self.blade_path, matl_filename)
+            self.max_chordal_error = max_chordal_error
+            self.spacing = spacing
             self.logf.write("[{0}] Found blade definition file: {1}\n".format(datetime.datetime.now(), self.defn_filename))
             import_success = self.import_blade_definition()
             if import_success:
@@ -123,10 +172,7 @@ class _Blade:
                 self.copy_all_airfoil_coords()
                 # pre-process the airfoil coordinates and laminate schedule
                 for station in self.list_of_stations:
-                    station.airfoil.read_coords()
-                    station.airfoil.scale_and_translate_coords()
-                    station.airfoil.split_at_LE_and_TE()
-                    station.find_part_edges()
+                    self.prepare_station(station)
             material_import_success = self.import_material_properties()
             if material_import_success:
                 self.create_all_materials()
@@ -134,17 +180,29 @@ class _Blade:
         self.logf.close()
         self.mass = None
 
-    def __del__(self):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
         """Delete a wind turbine blade.
 
         Also deletes all the station paths inside the blade path.
 
         """
+        if getattr(self, '_closed', False):
+            return
+        self._closed = True
         self.logf = open(_Blade.logfile_name, "a")
-        for station in self.list_of_stations:
+        for station in getattr(self, 'list_of_stations', []):
             if os.path.exists(station.station_path):
                 # delete the station path, even if it has contents
                 shutil.rmtree(station.station_path)
+            station.close()
+        for material in getattr(self, 'dict_of_materials', {}).values():
+            material.close()
         print "Deleted blade '{0}' and all its station paths.".format(self.name)
         self.logf.write("[{0}] Deleted blade '{1}' and all its station paths.\n".format(datetime.datetime.now(), self.name))
         self.logf.flush()
@@ -162,9 +220,12 @@ class _Blade:
             # check that the blade definition file is a CSV file
             raise ValueError("blade definition file '{0}' must be of type *.csv".format(os.path.split(self.defn_filename)[-1]))
         else:
-            # import the blade definition file into a pandas DataFrame
-            self._df = pd.read_csv(self.defn_filename, index_col=0)
-            self.number_of_stations = len(self._df)
+            # import the blade definition file into typed column arrays
+            #   (validated, and cached in a binary sidecar; see
+            #   blade_definition.py), and a pandas DataFrame for plotting
+            self.definition = bd.load(self.defn_filename)
+            self._df = self.definition.to_dataframe()
+            self.number_of_stations = self.definition.number_of_stations
             import_result = True
         return import_result
 
@@ -188,11 +249,6 @@ class _Blade:
 
     def create_all_materials(self):
         """Create all materials for this blade."""
-        if mt._Material.number_of_materials != 0:
-            mt._Material.number_of_materials = 0  # initialize to zero
-            print " [Warning] The number of materials has been reset to zero."
-            self.logf = open(mt._Material.logfile_name, 'a')
-            self.logf.write("[{0}] [Warning] The number of materials (_Material.number_of_materials) was reset to zero.\n".format(datetime.datetime.now()))
         self.dict_of_materials = {}
         for m in range(1, self.number_of_materials+1):
             if self._mp.ix[m]['type'] == 'isotropic':
@@ -209,7 +265,8 @@ class _Blade:
             name=mt_series['name'],
             E=mt_series['E1'],
             nu=mt_series['nu12'],
-            rho=mt_series['rho'])
+            rho=mt_series['rho'],
+            material_num=material_num)
 
     def create_orthotropic_material(self, material_num):
         """Create a new orthotropic material for this blade."""
@@ -225,15 +282,50 @@ class _Blade:
             nu12=mt_series['nu12'],
             nu13=mt_series['nu13'],
             nu23=mt_series['nu23'],
-            rho=mt_series['rho'])
+            rho=mt_series['rho'],
+            material_num=material_num)
+
+    def prepare_station(self, station):
+        """Read, scale, and split the airfoil coords of a station, and find
+        its part edges.
+
+        The airfoil coords must be copied into the station path first.
+
+        """
+        station.airfoil.read_coords()
+        if self.max_chordal_error is not None:
+            # the part edges don't depend on the airfoil coords
+            station.find_part_edges()
+            station.resample_airfoil_coords(self.max_chordal_error,
+                self.spacing)
+        station.airfoil.scale_and_translate_coords()
+        station.airfoil.split_at_LE_and_TE()
+        station.find_part_edges()
+
+    def rebuild_station(self, station_num, overrides=None):
+        """Replace one station of this blade with a new one.
+
+        The new station is built from its row of the blade definition (which
+        may have been reloaded with import_blade_definition()), where the
+        columns in overrides are replaced, e.g. {'spar cap base': 1.2}. Its
+        airfoil coords are copied and prepared, but its layers are not created.
+
+        Returns the new station.
+
+        """
+        station = self.create_station(station_num, overrides)
+        self.copy_airfoil_coords(station)
+        self.prepare_station(station)
+        self.list_of_stations[station_num-1] = station
+        return station
 
     def create_all_stations(self):
-        """Create all stations for this blade."""
-        if stn._Station.number_of_stations != 0:
-            stn._Station.number_of_stations = 0  # initialize to zero
-            print " [Warning] The number of stations has been reset to zero."
-            self.logf = open(_Blade.logfile_name, 'a')
-            self.logf.write("[{0}] [Warning] The number of stations (_Station.number_of_stations) was reset to zero.\n".format(datetime.datetime.now()))
+        """Create all stations for this blade.
+
+        Each station is numbered by this blade (station i is row i of the
+        blade definition), so blades can be built concurrently.
+
+        """
         self.list_of_stations = []
         for station in range(1, self.number_of_stations+1):
             self.list_of_stations.append(self.create_station(station))
@@ -320,6 +412,46 @@ class _Blade:
             mlab.orientation_axes(xlabel='x1', ylabel='x2', zlabel='x3')
         mlab.show()
 
+    def loft_surface(self, points_per_side=60, twist_flag=True, SW=True,
+        caps=True):
+        """Returns a triangulated surface of the blade skin and shear webs
+        (a loft.Surface), lofted through all the airfoils.
+
+        Parameters
+        ----------
+        points_per_side : int, the number of points on each side of the LE of
+            every airfoil
+        twist_flag : bool, do/don't twist the airfoils about the pitch axis
+        SW : bool, do/don't include the shear webs
+        caps : bool, do/don't close the ends of the lofted parts
+
+        """
+        return lf.blade_surface(self, points_per_side=points_per_side,
+            twist_flag=twist_flag, SW=SW, caps=caps)
+
+    def write_surface(self, filename='blade.stl', **kwargs):
+        """Write the lofted blade surface to a .stl, .obj, or .vtk file in the
+        blade path, which can be imported into SolidWorks or Paraview.
+
+        Takes the same keyword arguments as <Blade>.loft_surface().
+
+        """
+        surface = self.loft_surface(**kwargs)
+        filename = os.path.join(self.blade_path, filename)
+        surface.write(filename)
+        print ' Wrote blade surface to {0}'.format(filename)
+        self.logf = open(_Blade.logfile_name, "a")
+        self.logf.write("[{0}] Wrote blade surface to: {1}\n".format(datetime.datetime.now(), filename))
+        self.logf.flush()
+        self.logf.close()
+        return surface
+
+    def plot_surface(self, twist_flag=True, SW=True, opacity=1.0):
+        """Plots the lofted blade surface as one Mayavi mesh, colored by part.
+        """
+        return self.loft_surface(twist_flag=twist_flag, SW=SW).plot(
+            opacity=opacity)
+
     def plot_pitch_axis(self, lw, color='r'):
         """Plots the pitch axis from root to tip.
 
@@ -778,10 +910,10 @@ class _Blade:
 
 class MonoplaneBlade(_Blade):
     """Define a monoplane (conventional) wind turbine blade."""
-    def create_station(self, station_num):
+    def create_station(self, station_num, overrides=None):
         """Create a new station for this blade."""
-        return stn.MonoplaneStation(self._df.ix[station_num], self.blade_path,
-            parent_blade=self)
+        return stn.MonoplaneStation(self.definition.row(station_num, overrides),
+            self.blade_path, parent_blade=self, station_num=station_num)
 
     def copy_airfoil_coords(self, station):
         """Copy airfoil coordinates from airfoils_path into this station_path."""
@@ -842,10 +974,7 @@ class MonoplaneBlade(_Blade):
             if export_flag:
                 filename = os.path.join(station.station_path,
                     'stn{0:02d}_coords.txt'.format(station.station_num))
-                f = open(filename, 'w')
-                for i in range(l):
-                    f.write('{0:12.9f}\t{1:12.9f}\t{2:12.9f}\n'.format(x[i],y[i],z[i]))
-                f.close()
+                _write_xyz(filename, x, y, z)
                 print ' Wrote airfoil coordinates to {0}'.format(filename)
                 self.logf = open(_Blade.logfile_name, "a")
                 self.logf.write("[{0}] Wrote airfoil coordinates to: {1}\n".format(datetime.datetime.now(), filename))
@@ -853,25 +982,17 @@ class MonoplaneBlade(_Blade):
                 self.logf.close()
 
     def get_LE_coords(self, twist_flag=True):
-        """Returns a list of (x,y,z) coordinates for the blade leading edge."""
-        x = []  # spanwise coordinate
-        y = []  # chordwise coordinate
-        z = []  # flapwise coordinate
-        for station in self.list_of_stations:
-            x.append(station.coords.x1)
-            # grab the unrotated LE coordinates
-            y_temp = -(station.airfoil.chord * station.airfoil.pitch_axis)
-            z_temp = 0.0
-            if twist_flag:
-                # rotate the LE coordinates wrt the twist angle
-                (y_new, z_new) = tf.rotate_coord_pair(y_temp, z_temp,
-                                                      station.airfoil.twist)
-            else:
-                # don't rotate the LE coordinates
-                (y_new, z_new) = (y_temp, z_temp)
-            # append the new LE coordinates
-            y.append(y_new)
-            z.append(z_new)
+        """Returns arrays of (x,y,z) coordinates for the blade leading edge."""
+        stations = self.list_of_stations
+        x = np.array([station.coords.x1 for station in stations])  # spanwise
+        # grab the unrotated LE coordinates (chordwise, flapwise)
+        y = np.array([-(station.airfoil.chord * station.airfoil.pitch_axis)
+            for station in stations])
+        z = np.zeros_like(y)
+        if twist_flag:
+            # rotate all the LE coordinates wrt their twist angles at once
+            (y, z) = tf.rotate_coords(y, z,
+                [station.airfoil.twist for station in stations])
         return (x,y,z)
 
     def plot_LE(self, lw, color='k', twist_flag=True):
@@ -893,25 +1014,17 @@ class MonoplaneBlade(_Blade):
         mlab.plot3d(x,y,z, color=c, tube_radius=lw)
 
     def get_TE_coords(self, twist_flag=True):
-        """Returns a list of (x,y,z) coordinates for the blade trailing edge."""
-        x = []  # spanwise coordinate
-        y = []  # chordwise coordinate
-        z = []  # flapwise coordinate
-        for station in self.list_of_stations:
-            x.append(station.coords.x1)
-            # grab the unrotated TE coordinates
-            y_temp = station.airfoil.chord * (1.0-station.airfoil.pitch_axis)
-            z_temp = 0.0
-            if twist_flag:
-                # rotate the TE coordinates wrt the twist angle
-                (y_new, z_new) = tf.rotate_coord_pair(y_temp, z_temp,
-                                                      station.airfoil.twist)
-            else:
-                # don't rotate the TE coordinates
-                (y_new, z_new) = (y_temp, z_temp)
-            # append the new TE coordinates
-            y.append(y_new)
-            z.append(z_new)
+        """Returns arrays of (x,y,z) coordinates for the blade trailing edge."""
+        stations = self.list_of_stations
+        x = np.array([station.coords.x1 for station in stations])  # spanwise
+        # grab the unrotated TE coordinates (chordwise, flapwise)
+        y = np.array([station.airfoil.chord * (1.0-station.airfoil.pitch_axis)
+            for station in stations])
+        z = np.zeros_like(y)
+        if twist_flag:
+            # rotate all the TE coordinates wrt their twist angles at once
+            (y, z) = tf.rotate_coords(y, z,
+                [station.airfoil.twist for station in stations])
         return (x,y,z)
 
     def plot_TE(self, lw, color='k', twist_flag=True):
@@ -1106,7 +1219,7 @@ class MonoplaneBlade(_Blade):
         LE=True, TE=True, twist=True, SW=True, color_airfoils='0.1',
         color_pitch_axis='r', color_LE='0.1', color_TE='0.1',
         color_SW=(37.0/256.0,197.0/256.0,85.0/256.0), stn_nums=False,
-        export=True):
+        export=True, surface=False, opacity=0.6):
         """Plots a wireframe representation of the blade, with Mayavi mlab.
 
         Parameters
@@ -1131,9 +1244,16 @@ class MonoplaneBlade(_Blade):
         stn_nums : boolean, plot/don't plot station numbers
         export : bool, do/don't write airfoil coords to a text file in the
             station path, which can be imported into SolidWorks as an XYZ curve
+        surface : bool, plot the lofted skin and shear webs as one mesh,
+            instead of the airfoils, LE, TE, and shear web lines (the
+            airfoil coords aren't exported then)
+        opacity : float, opacity of the lofted surface
 
         """
         self.create_plot()
+        if surface:
+            self.plot_surface(twist_flag=twist, SW=SW, opacity=opacity)
+            (airfoils, LE, TE, SW) = (False, False, False, False)
         if airfoils:
             self.plot_all_airfoils(lw=line_width, color=color_airfoils,
                 twist_flag=twist, export_flag=export)
@@ -1202,10 +1322,11 @@ class MonoplaneBlade(_Blade):
 class BiplaneBlade(_Blade):
     """Define a biplane wind turbine blade."""
     def __init__(self, name, blade_path, defn_filename='blade_definition.csv',
-        airfoils_path='airfoils', matl_filename='materials.csv'):
+        airfoils_path='airfoils', matl_filename='materials.csv',
+        max_chordal_error=None, spacing='curvature'):
         """Create a new biplane wind turbine blade."""
         _Blade.__init__(self, name, blade_path, defn_filename, airfoils_path,
-            matl_filename)
+            matl_filename, max_chordal_error, spacing)
         (self.root_joint_station,
             self.midblade_joint_station) = self.assign_joint_stations()
         print " Root joint found at station #{0}".format(
@@ -1220,18 +1341,27 @@ class BiplaneBlade(_Blade):
         self.logf.flush()
         self.logf.close()
 
-    def create_station(self, station_num):
+    def create_station(self, station_num, overrides=None):
         """Create a new station for this blade."""
-        if self._df.ix[station_num]['type'] == 'monoplane':
-            this_stn = stn.MonoplaneStation(self._df.ix[station_num],
-                self.blade_path, parent_blade=self)
-        elif self._df.ix[station_num]['type'] == 'biplane':
-            this_stn = stn.BiplaneStation(self._df.ix[station_num],
-                self.blade_path, parent_blade=self)
+        stn_row = self.definition.row(station_num, overrides)
+        if stn_row['type'] == 'monoplane':
+            this_stn = stn.MonoplaneStation(stn_row,
+                self.blade_path, parent_blade=self, station_num=station_num)
+        elif stn_row['type'] == 'biplane':
+            this_stn = stn.BiplaneStation(stn_row,
+                self.blade_path, parent_blade=self, station_num=station_num)
         else:
             raise ValueError("Values in the 'type' column of {0} must be either 'monoplane' or 'biplane'.".format(self.defn_filename))
         return this_stn
 
+    def rebuild_station(self, station_num, overrides=None):
+        """Replace one station of this blade with a new one, and mark the
+        joint stations again (see _Blade.rebuild_station)."""
+        station = _Blade.rebuild_station(self, station_num, overrides)
+        (self.root_joint_station,
+            self.midblade_joint_station) = self.assign_joint_stations()
+        return station
+
     def assign_joint_stations(self):
         """Identify and mark the root and mid-blade joint stations.
 
@@ -1346,10 +1476,7 @@ class BiplaneBlade(_Blade):
                 if export_flag:
                     filename = os.path.join(station.station_path,
                         'stn{0:02d}_coords.txt'.format(station.station_num))
-                    f = open(filename, 'w')
-                    for i in range(l):
-                        f.write('{0:12.9f}\t{1:12.9f}\t{2:12.9f}\n'.format(x[i],y[i],z[i]))
-                    f.close()
+                    _write_xyz(filename, x, y, z)
                     print ' Wrote airfoil coordinates to {0}'.format(filename)
                     self.logf = open(_Blade.logfile_name, "a")
                     self.logf.write("[{0}] Wrote airfoil coordinates to: {1}\n".format(datetime.datetime.now(), filename))
@@ -1371,10 +1498,7 @@ class BiplaneBlade(_Blade):
                 if export_flag:
                     filename = os.path.join(station.station_path,
                         'stn{0:02d}_lower_coords.txt'.format(station.station_num))
-                    f = open(filename, 'w')
-                    for i in range(l):
-                        f.write('{0:12.9f}\t{1:12.9f}\t{2:12.9f}\n'.format(x[i],y[i],z[i]))
-                    f.close()
+                    _write_xyz(filename, x, y, z)
                     print ' Wrote lower airfoil coordinates to {0}'.format(filename)
                     self.logf = open(_Blade.logfile_name, "a")
                     self.logf.write("[{0}] Wrote lower airfoil coordinates to: {1}\n".format(datetime.datetime.now(), filename))
@@ -1393,10 +1517,7 @@ class BiplaneBlade(_Blade):
                 if export_flag:
                     filename = os.path.join(station.station_path,
                         'stn{0:02d}_upper_coords.txt'.format(station.station_num))
-                    f = open(filename, 'w')
-                    for i in range(l):
-                        f.write('{0:12.9f}\t{1:12.9f}\t{2:12.9f}\n'.format(x[i],y[i],z[i]))
-                    f.close()
+                    _write_xyz(filename, x, y, z)
                     print ' Wrote upper airfoil coordinates to {0}'.format(filename)
                     self.logf = open(_Blade.logfile_name, "a")
                     self.logf.write("[{0}] Wrote upper airfoil coordinates to: {1}\n".format(datetime.datetime.now(), filename))
@@ -1863,7 +1984,7 @@ class BiplaneBlade(_Blade):
         LE=True, TE=True, twist=True, SW=True, color_airfoils='0.1',
         color_pitch_axis='r', color_LE='0.1', color_TE='0.1',
         color_SW=(37.0/256.0,197.0/256.0,85.0/256.0), stn_nums=False,
-        export=True):
+        export=True, surface=False, opacity=0.6):
         """Plots a wireframe representation of the blade, with Mayavi mlab.
 
         Parameters
@@ -1888,9 +2009,16 @@ class BiplaneBlade(_Blade):
         stn_nums : boolean, plot/don't plot station numbers
         export : bool, do/don't write airfoil coords to a text file in the
             station path, which can be imported into SolidWorks as an XYZ curve
+        surface : bool, plot the lofted skin and shear webs as one mesh,
+            instead of the airfoils, LE, TE, and shear web lines (the
+            airfoil coords aren't exported then)
+        opacity : float, opacity of the lofted surface
 
         """
         self.create_plot()
+        if surface:
+            self.plot_surface(twist_flag=twist, SW=SW, opacity=opacity)
+            (airfoils, LE, TE, SW) = (False, False, False, False)
         if airfoils:
             self.plot_all_airfoils(lw=line_width, color=color_airfoils,
                 twist_flag=twist, export_flag=export)
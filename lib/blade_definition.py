@@ -0,0 +1,353 @@
+"""Load, validate, and cache a blade definition file.
+
+The blade definition file (e.g. 'sandia_blade/blade_definition.csv') has one
+row per station and up to about 80 columns. load() reads every column into a
+typed numpy array (float64 for numbers, str for names), and checks the whole
+file at once against the schema below:
+
+  - the stations are numbered 1, 2, ..., n, and x1 increases along the span
+  - every station has a position, airfoil, chord, pitch axis, and twist
+  - biplane stations also have an upper airfoil, a gap, a gap fraction, a
+    stagger, and the reference points of their lower and upper shear webs
+  - numeric cells hold numbers, 'type' is 'monoplane' or 'biplane', and
+    'has sharp TE' is 'yes' or 'no'
+  - lengths (chord, bases, and heights) are in meters and not negative, and
+    fractions (pitch axis, gap fraction, SW ref pts) are between 0 and 1 (a
+    pitch axis of 37.5 was given in percent, not as a fraction)
+
+Older blade definition files (e.g. the ones in alt_biplane_configs) don't have
+the 'has sharp TE' and SW ref pt columns at all. They still load, without
+those columns; the stations that need them raise a KeyError when they're
+built, just like before.
+
+All the problems in a file are reported together, with their station
+numbers. Blank cells mean "this part doesn't exist at this station" and are
+stored as NaN (numbers) or '' (names); StationRow returns NaN for both, just
+like the pandas Series the stations used to be built from.
+
+The typed arrays are cached in a binary sidecar next to the CSV file (e.g.
+'blade_definition.csv.npy', one numpy record array), keyed by a hash of the
+CSV file, so the next load of an unchanged file skips the parsing and the
+checks.
+
+Usage:
+import lib.blade_definition as bd
+d = bd.load('sandia_blade/blade_definition.csv')
+d['chord']          # np.array of chords, one per station
+d.row(5)['chord']   # chord of station #5 (a float)
+d.row(5, {'chord': 5.5})['chord']   # ... with an overridden chord
+d.to_dataframe()    # the same table, as a pandas DataFrame
+
+Last updated: May 13, 2014
+
+"""
+
+
+import os
+import hashlib
+import numpy as np
+import pandas as pd
+
+
+# bump this when the schema or the cache layout changes
+SCHEMA_VERSION = 1
+
+# columns that hold names (all other columns hold numbers)
+STR_COLUMNS = ['type', 'airfoil', 'airfoil upper', 'has sharp TE', 'comment']
+
+# columns that can't be blank at any station
+REQUIRED_COLUMNS = ['x1', 'x2', 'x3', 'airfoil', 'has sharp TE', 'pitch axis',
+    'chord', 'twist']
+
+# columns that can't be blank at a biplane station
+BIPLANE_COLUMNS = ['airfoil upper', 'gap-to-chord ratio', 'gap fraction',
+    'stagger-to-chord ratio', 'lower SW ref pt fraction',
+    'upper SW ref pt fraction']
+
+# required columns that older blade definition files don't have (they're
+#   only checked if they're there)
+OPTIONAL_COLUMNS = ['has sharp TE', 'lower SW ref pt fraction',
+    'upper SW ref pt fraction']
+
+# the allowed values of name columns
+CHOICES = {'type': ['monoplane', 'biplane'], 'has sharp TE': ['yes', 'no']}
+
+# columns that must be between 0 and 1
+FRACTION_COLUMNS = ['pitch axis', 'gap fraction', 'lower SW ref pt fraction',
+    'upper SW ref pt fraction']
+
+# cell values that mean blank
+BLANKS = ['', 'nan', 'NaN', 'NA', 'N/A', '#N/A']
+
+
+def _is_length(column):
+    """Lengths [m] must not be negative."""
+    words = column.split()
+    return (column in ('chord', 'chord upper') or 'base' in words or
+        'height' in words or
+        (column.endswith('ratio') and not column.startswith('stagger')))
+
+
+def file_hash(filename):
+    """Returns the SHA-1 hash of a file."""
+    with open(filename, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def cache_filename(defn_filename):
+    """Returns the binary sidecar filename for a blade definition file."""
+    return defn_filename + '.npy'
+
+
+class StationRow:
+    """One station (row) of a BladeDefinition.
+
+    Looks like the pandas Series the stations used to be built from:
+    row['chord'] is a float, row['airfoil'] is a str, blank cells are NaN,
+    and row.name is the station number.
+
+    The values in overrides ({column: value}) replace the ones in the file.
+
+    """
+    def __init__(self, definition, index, overrides=None):
+        self.definition = definition
+        self.index = index
+        self.name = int(definition.station_nums[index])
+        self.overrides = dict(overrides or {})
+
+    def __getitem__(self, column):
+        if column in self.overrides:
+            return self.overrides[column]
+        value = self.definition.arrays[column][self.index]
+        if column in self.definition.str_columns:
+            return str(value) if value != '' else np.nan
+        return float(value)
+
+    def __contains__(self, column):
+        return column in self.definition.arrays
+
+    def get(self, column, default=None):
+        if column in self:
+            return self[column]
+        return default
+
+    def keys(self):
+        return list(self.definition.columns)
+
+    def iteritems(self):
+        for column in self.definition.columns:
+            yield (column, self[column])
+
+
+class BladeDefinition:
+    """The typed columns of a blade definition file.
+
+    Attributes
+    ----------
+    columns : list of str, the column names, in file order
+    str_columns : set of str, the columns that hold names
+    station_nums : np.array of ints, 1, 2, ..., n
+    arrays : {column: np.array}, float64 (NaN for blank) or str ('' for blank)
+    number_of_stations : int
+
+    """
+    def __init__(self, columns, str_columns, station_nums, arrays):
+        self.columns = list(columns)
+        self.str_columns = set(str_columns)
+        self.station_nums = np.asarray(station_nums, dtype=int)
+        self.arrays = arrays
+        self.number_of_stations = len(self.station_nums)
+        if 'type' not in self.arrays:
+            # a monoplane blade doesn't need a 'type' column
+            self.arrays['type'] = np.array(['monoplane']*self.number_of_stations)
+            self.str_columns.add('type')
+
+    def __getitem__(self, column):
+        return self.arrays[column]
+
+    def __contains__(self, column):
+        return column in self.arrays
+
+    def row(self, station_num, overrides=None):
+        """Returns the StationRow of station #station_num, where the columns
+        in overrides ({column: value}) are replaced."""
+        if not 1 <= station_num <= self.number_of_stations:
+            raise KeyError("Station #{0} is not in the blade definition!".format(station_num))
+        for column in (overrides or {}):
+            if column not in self.arrays:
+                raise KeyError("Column '{0}' is not in the blade definition!".format(column))
+        return StationRow(self, station_num - 1, overrides)
+
+    def to_dataframe(self):
+        """Returns the blade definition as a pandas DataFrame, indexed by
+        station number (blank cells are NaN), like pd.read_csv(...,
+        index_col=0)."""
+        data = {}
+        for column in self.columns:
+            a = self.arrays[column]
+            if column in self.str_columns:
+                a = np.where(a == '', np.nan, a.astype(object))
+            data[column] = a
+        return pd.DataFrame(data, columns=self.columns,
+            index=pd.Index(self.station_nums, name='blade station'))
+
+
+def _station_list(station_nums, mask):
+    return ', '.join(['#{0}'.format(n) for n in station_nums[mask]])
+
+
+def parse(defn_filename):
+    """Read and validate a blade definition file (without the cache).
+
+    Returns a BladeDefinition. Raises a Warning that lists every problem in
+    the file.
+
+    """
+    raw = pd.read_csv(defn_filename, dtype=str, keep_default_na=False)
+    raw.columns = [c.strip() for c in raw.columns]
+    cells = dict((c, raw[c].str.strip().values.astype(str))
+        for c in raw.columns)
+    index_column = raw.columns[0]
+    columns = list(raw.columns[1:])
+    problems = []
+    # station numbers
+    station_nums = pd.to_numeric(cells[index_column], errors='coerce')
+    n = len(station_nums)
+    if not np.array_equal(station_nums, np.arange(1, n+1)):
+        problems.append("the stations in column '{0}' must be numbered 1, 2, ..., {1}".format(
+            index_column, n))
+    station_nums = np.arange(1, n+1)
+    for column in REQUIRED_COLUMNS:
+        if column not in cells and column not in OPTIONAL_COLUMNS:
+            problems.append("column '{0}' is missing".format(column))
+    # typed columns
+    arrays = {}
+    str_columns = [c for c in columns if c in STR_COLUMNS]
+    for column in columns:
+        c = cells[column]
+        blank = np.in1d(c, BLANKS)
+        if column in STR_COLUMNS:
+            arrays[column] = np.where(blank, '', c)
+            continue
+        x = pd.to_numeric(np.where(blank, 'nan', c), errors='coerce')
+        bad = np.isnan(x) & ~blank
+        if np.any(bad):
+            problems.append("'{0}' isn't a number at station {1}".format(
+                column, _station_list(station_nums, bad)))
+        arrays[column] = np.asarray(x, dtype=float)
+    definition = BladeDefinition(columns, str_columns, station_nums, arrays)
+    # blanks
+    biplane = definition['type'] == 'biplane'
+    for (required, mask) in [(REQUIRED_COLUMNS, np.ones(n, dtype=bool)),
+                             (BIPLANE_COLUMNS, biplane)]:
+        for column in required:
+            if column not in arrays:
+                if (column in BIPLANE_COLUMNS and np.any(biplane) and
+                        column not in OPTIONAL_COLUMNS):
+                    problems.append("column '{0}' is missing (needed by biplane stations)".format(
+                        column))
+                continue
+            a = arrays[column]
+            blank = (a == '') if column in STR_COLUMNS else np.isnan(a)
+            if np.any(blank & mask):
+                problems.append("'{0}' is blank at station {1}".format(
+                    column, _station_list(station_nums, blank & mask)))
+    # choices
+    for (column, choices) in sorted(CHOICES.items()):
+        if column in arrays:
+            a = arrays[column]
+            bad = ~np.in1d(a, choices + [''])
+            if np.any(bad):
+                problems.append("'{0}' must be {1} at station {2}".format(
+                    column, ' or '.join(["'{0}'".format(c) for c in choices]),
+                    _station_list(station_nums, bad)))
+    # units
+    for column in columns:
+        if column in STR_COLUMNS:
+            continue
+        a = arrays[column]
+        with np.errstate(invalid='ignore'):
+            if _is_length(column) and np.any(a < 0.0):
+                problems.append("'{0}' is negative at station {1}".format(
+                    column, _station_list(station_nums, a < 0.0)))
+            if column in FRACTION_COLUMNS and np.any((a < 0.0) | (a > 1.0)):
+                problems.append("'{0}' must be a fraction (0 to 1) at station {1}".format(
+                    column, _station_list(station_nums, (a < 0.0) | (a > 1.0))))
+    if 'x1' in arrays and not np.all(np.diff(arrays['x1']) > 0.0):
+        problems.append("'x1' must increase from root to tip")
+    if problems:
+        raise Warning("The blade definition file '{0}' has errors:\n  ".format(
+            defn_filename) + '\n  '.join(problems))
+    return definition
+
+
+def _save(definition, filename, key):
+    """Write a BladeDefinition to a binary sidecar: one line with the key,
+    then all the columns as one numpy record array (.npy format)."""
+    records = np.zeros(definition.number_of_stations,
+        dtype=[(column, definition.arrays[column].dtype)
+               for column in definition.columns])
+    for column in definition.columns:
+        records[column] = definition.arrays[column]
+    # write a temp file first, so a blade built in parallel never reads half
+    #   a cache
+    temp_filename = '{0}.{1}.tmp'.format(filename, os.getpid())
+    f = open(temp_filename, 'wb')
+    f.write(key + '\n')
+    np.save(f, records, allow_pickle=False)
+    f.close()
+    # (Windows can't rename over an existing file, so remove a stale cache
+    #   first)
+    try:
+        if os.path.exists(filename):
+            os.remove(filename)
+        os.rename(temp_filename, filename)
+    except OSError:
+        # another process is writing the cache at the same time
+        if os.path.exists(temp_filename):
+            os.remove(temp_filename)
+
+
+def _load_cache(filename, key):
+    """Returns the BladeDefinition in a binary sidecar, or None if it's
+    missing or stale."""
+    if not os.path.exists(filename):
+        return None
+    f = open(filename, 'rb')
+    try:
+        if f.readline().strip() != key:
+            return None
+        records = np.load(f, allow_pickle=False)
+    except (IOError, ValueError):
+        return None
+    finally:
+        f.close()
+    columns = list(records.dtype.names)
+    str_columns = [column for column in columns
+        if records.dtype[column].kind == 'S']
+    arrays = dict((column, records[column]) for column in columns)
+    return BladeDefinition(columns, str_columns, np.arange(1, len(records)+1),
+        arrays)
+
+
+def load(defn_filename, use_cache=True):
+    """Returns the BladeDefinition of a blade definition file.
+
+    Parameters
+    ----------
+    defn_filename : str, the blade definition file (*.csv)
+    use_cache : bool, do/don't read and write the binary sidecar
+
+    """
+    if not use_cache:
+        return parse(defn_filename)
+    key = '{0}-{1}'.format(SCHEMA_VERSION, file_hash(defn_filename))
+    filename = cache_filename(defn_filename)
+    definition = _load_cache(filename, key)
+    if definition is None:
+        definition = parse(defn_filename)
+        try:
+            _save(definition, filename, key)
+        except (IOError, OSError):
+            pass  # the cache is optional, e.g. in a read-only blade path
+    return definition
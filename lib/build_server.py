@@ -0,0 +1,538 @@
+"""A long-lived build server that keeps blades warm in memory.
+
+Every mesh prep script starts by building a whole blade (reading the CSV
+files, copying airfoils, and preparing every station), just to cut the layers
+of one station. The build server builds each blade once, keeps it in memory,
+and answers requests from other processes (e.g. an IPython console) over a
+local socket:
+
+  rebuild_station : rebuild one station, with some overridden blade
+                    definition values, e.g. {'spar cap base': 1.2}
+  polygons        : the layer polygons of a station
+  edges           : the left, top, right, and bottom edges of its layers
+  masses          : its mass, area, and mass of each material and layer
+  cut             : cut its layers with bounding polygons (like
+                    poly_utils.cut_plot_and_write_alt_layer, without plotting
+                    or writing files)
+
+Only what changed is rebuilt. A station's layers are created the first time
+they're requested, and kept until the station goes stale: when its overrides
+change, or when its row of the blade definition file, its airfoil file(s), or
+the material file change on disk (checked on every request, by file size and
+modification time). A change to the number of stations or the columns of the
+blade definition rebuilds the whole blade.
+
+Requests are handled one at a time, in the order they arrive (the blades are
+not thread-safe). Clients are served one at a time, too: while one client is
+connected (e.g. an IPython console that holds `c`), all the other clients
+wait until it calls c.close(). The server never deletes the station paths of
+its blades.
+
+The socket only listens on localhost, and clients must know the authkey.
+(Requests are pickled, so anyone who knows the authkey can run any code as
+the server's user.) By default, the server makes a random authkey for each
+run and writes it to a file that only its user can read (AUTHKEY_FILENAME,
+in the user's home directory), and connect() reads it from there. Connections
+that fail the handshake are logged and dropped.
+
+Usage:
+In one terminal, start the server from the project root directory:
+$ python run_build_server.py
+Then, in an IPython console:
+import lib.build_server as bs
+c = bs.connect()
+c.masses('sandia_blade', 5)
+c.rebuild_station('sandia_blade', 5, {'spar cap base': 1.2})
+p = c.polygons('sandia_blade', 5)   # {'spar_cap/upper': Polygon, ...}
+c.cut('sandia_blade', 5, [('spar_cap', 'upper', 'upper spar cap',
+    [(-0.75, 2.5), (0.75, 2.5), (0.75, 3.0), (-0.75, 3.0)])])
+c.rebuild_station('sandia_blade', 5, reset=True)   # back to the CSV file
+c.shutdown()
+
+Last updated: May 13, 2014
+
+"""
+
+
+import os
+import time
+import traceback
+import numpy as np
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener, Client
+from shapely.geometry import Polygon
+import blade as bl
+import blade_definition as bd
+import structure as struc
+import poly_utils as pu
+reload(bl)
+reload(bd)
+reload(struc)
+reload(pu)
+
+
+DEFAULT_ADDRESS = ('localhost', 6050)
+
+# the file that holds the authkey of the running server (readable only by its
+#   user)
+AUTHKEY_FILENAME = os.path.join(os.path.expanduser('~'),
+    '.spardesign2_build_server')
+
+# the BuildServer methods that clients may call
+COMMANDS = ['ping', 'load', 'unload', 'status', 'invalidate',
+            'rebuild_station', 'polygons', 'edges', 'masses', 'cut',
+            'shutdown']
+
+# blade definition columns that name an airfoil file (without '.txt')
+AIRFOIL_COLUMNS = ['airfoil', 'airfoil upper']
+
+
+def write_authkey(filename=AUTHKEY_FILENAME):
+    """Make a random authkey, write it to a file that only this user can
+    read, and return it."""
+    authkey = os.urandom(32).encode('hex')
+    if os.path.exists(filename):
+        os.remove(filename)
+    # (create the file with its permissions, so it's never readable by others)
+    fd = os.open(filename, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0600)
+    f = os.fdopen(fd, 'w')
+    f.write(authkey)
+    f.close()
+    return authkey
+
+
+def read_authkey(filename=AUTHKEY_FILENAME):
+    """Returns the authkey of the running server."""
+    if not os.path.exists(filename):
+        raise Warning("The build server's authkey file '{0}' does not exist! Is the server running?".format(filename))
+    with open(filename, 'r') as f:
+        return f.read().strip()
+
+
+def _request_name(request):
+    """Returns the command name of a request, for the log."""
+    if (isinstance(request, tuple) and len(request) == 3 and
+            request[0] in COMMANDS):
+        return request[0]
+    return 'bad request'
+
+
+def _signature(filename):
+    """Returns (size, modification time) of a file, or None if it's missing.
+    """
+    try:
+        s = os.stat(filename)
+    except OSError:
+        return None
+    return (s.st_size, s.st_mtime)
+
+
+def changed_stations(old, new):
+    """Returns a boolean array, True for each station whose row differs
+    between two BladeDefinitions with the same stations and columns."""
+    changed = np.zeros(new.number_of_stations, dtype=bool)
+    for column in new.columns:
+        (a, b) = (old[column], new[column])
+        if column in new.str_columns:
+            changed |= (a != b)
+        else:
+            changed |= ~((a == b) | (np.isnan(a) & np.isnan(b)))
+    return changed
+
+
+def layer_items(structure):
+    """Returns a sorted list of ('<part>/<layer>', Layer) for every layer of a
+    structure, e.g. ('spar_cap/upper', <Layer>), where <part> is the
+    structure's attribute name for the part."""
+    items = []
+    for (part_name, part) in vars(structure).items():
+        if isinstance(part, struc.Part):
+            for (layer_name, layer) in part.layer.items():
+                items.append(('{0}/{1}'.format(part_name, layer_name), layer))
+    return sorted(items)
+
+
+class WarmBlade:
+    """A blade that is kept in memory, and rebuilt one station at a time.
+
+    Parameters
+    ----------
+    blade_path : str, the blade directory, e.g. 'sandia_blade'
+    name : str, the name of the blade (default: blade_path)
+    blade_kwargs : keyword arguments for MonoplaneBlade or BiplaneBlade (a
+        blade definition with a 'biplane' station builds a BiplaneBlade)
+
+    Attributes
+    ----------
+    blade : MonoplaneBlade or BiplaneBlade
+    overrides : {station_num: {column: value}}
+    stale : set of station numbers, stations to rebuild before their next use
+    results : {station_num: {result name: result}}, the results of the
+        stations whose layers have been created
+
+    """
+    def __init__(self, blade_path, name=None, **blade_kwargs):
+        self.blade_path = blade_path
+        self.name = name if name is not None else blade_path
+        self.blade_kwargs = blade_kwargs
+        self.build()
+
+    def build(self):
+        """Build the whole blade (again), and forget all the overrides."""
+        defn_filename = os.path.join(self.blade_path,
+            self.blade_kwargs.get('defn_filename', 'blade_definition.csv'))
+        if np.any(bd.load(defn_filename)['type'] == 'biplane'):
+            self.blade = bl.BiplaneBlade(self.name, self.blade_path,
+                **self.blade_kwargs)
+        else:
+            self.blade = bl.MonoplaneBlade(self.name, self.blade_path,
+                **self.blade_kwargs)
+        self.overrides = {}
+        self.stale = set()
+        self.results = {}
+        self.signatures = self._signatures()
+
+    def _airfoil_filename(self, name):
+        return os.path.join(self.blade.airfoils_path, name + '.txt')
+
+    def _signatures(self):
+        """Returns {filename: signature} of the files that the blade is built
+        from."""
+        d = self.blade.definition
+        filenames = [self.blade.defn_filename, self.blade.matl_filename]
+        for column in AIRFOIL_COLUMNS:
+            if column in d:
+                filenames.extend([self._airfoil_filename(name)
+                    for name in set(d[column]) if name != ''])
+        return dict((f, _signature(f)) for f in filenames)
+
+    def refresh(self):
+        """Mark the stations whose input files changed on disk as stale.
+
+        Returns a list of the station numbers that went stale.
+
+        """
+        signatures = self._signatures()
+        if signatures == self.signatures:
+            return []
+        changed = set(f for f in set(signatures) | set(self.signatures)
+            if signatures.get(f) != self.signatures.get(f))
+        b = self.blade
+        stale = np.zeros(b.number_of_stations, dtype=bool)
+        if b.defn_filename in changed:
+            old = b.definition
+            b.import_blade_definition()
+            if (b.number_of_stations != old.number_of_stations or
+                b.definition.columns != old.columns):
+                self.build()
+                return range(1, self.blade.number_of_stations+1)
+            stale |= changed_stations(old, b.definition)
+        if b.matl_filename in changed:
+            # every layer refers to the old materials
+            b.import_material_properties()
+            b.create_all_materials()
+            stale[:] = True
+        for column in AIRFOIL_COLUMNS:
+            if column in b.definition:
+                names = b.definition[column]
+                for name in set(names):
+                    if (name != '' and
+                        self._airfoil_filename(name) in changed):
+                        stale |= (names == name)
+        self.signatures = self._signatures()
+        station_nums = list(np.nonzero(stale)[0] + 1)
+        self.stale.update(station_nums)
+        return station_nums
+
+    def station(self, station_num, overrides=None, reset=False):
+        """Returns a station, with its layers created.
+
+        Parameters
+        ----------
+        station_num : int
+        overrides : dict of {column: value}, blade definition values that
+            replace the ones in the file (default: keep the last overrides)
+        reset : bool, forget the overrides of this station
+
+        The station is only rebuilt if it's stale or its overrides changed.
+
+        """
+        self.refresh()
+        # check the station number and override columns before changing
+        #   anything
+        self.blade.definition.row(station_num, overrides)
+        current = self.overrides.get(station_num, {})
+        if reset:
+            overrides = {}
+        if overrides is not None and overrides != current:
+            self.overrides[station_num] = dict(overrides)
+            self.stale.add(station_num)
+        if station_num in self.stale:
+            self.blade.rebuild_station(station_num,
+                self.overrides.get(station_num))
+            self.stale.discard(station_num)
+            self.results.pop(station_num, None)
+        station = self.blade.list_of_stations[station_num-1]
+        if station_num not in self.results:
+            station.airfoil.create_polygon()
+            station.structure.create_all_layers()
+            self.results[station_num] = {}
+        return station
+
+    def result(self, station_num, name, function):
+        """Returns a cached result of a station, or function(station)."""
+        self.station(station_num)
+        results = self.results[station_num]
+        if name not in results:
+            results[name] = function(self.blade.list_of_stations[station_num-1])
+        return results[name]
+
+
+def _polygons(station):
+    return dict((key, layer.polygon)
+        for (key, layer) in layer_items(station.structure))
+
+
+def _edges(station):
+    station.structure.save_all_layer_edges()
+    d = {}
+    for (key, layer) in layer_items(station.structure):
+        if layer.left is not None:
+            d[key] = {'left': layer.left, 'top': layer.top,
+                      'right': layer.right, 'bottom': layer.bottom}
+    return d
+
+
+def _masses(station):
+    st = station.structure
+    return {'mass': st.calculate_mass(), 'area': st.calculate_area(),
+            'materials': st.calculate_material_masses(),
+            'layers': dict((key, layer.mass)
+                for (key, layer) in layer_items(st))}
+
+
+class BuildServer:
+    """Keeps WarmBlades in memory, and answers the COMMANDS.
+
+    Blades are keyed by their blade path (relative to the server's working
+    directory, i.e. the project root directory), and built on first use.
+
+    """
+    def __init__(self):
+        self.blades = {}
+        self.running = True
+
+    def _blade(self, blade_path):
+        key = os.path.normpath(blade_path)
+        if key not in self.blades:
+            self.load(blade_path)
+        return self.blades[key]
+
+    def ping(self):
+        return 'pong'
+
+    def load(self, blade_path, **blade_kwargs):
+        """Build a blade, and keep it in memory. Returns its status."""
+        key = os.path.normpath(blade_path)
+        self.blades[key] = WarmBlade(key, **blade_kwargs)
+        return self.status()[key]
+
+    def unload(self, blade_path):
+        """Forget a blade (its station paths are not deleted)."""
+        self.blades.pop(os.path.normpath(blade_path), None)
+
+    def status(self):
+        """Returns {blade path: {'type', 'stations', 'built', 'stale',
+        'overrides'}} for every blade in memory."""
+        d = {}
+        for (key, w) in self.blades.items():
+            d[key] = {'type': w.blade.__class__.__name__,
+                      'stations': w.blade.number_of_stations,
+                      'built': sorted(w.results),
+                      'stale': sorted(w.stale),
+                      'overrides': dict(w.overrides)}
+        return d
+
+    def invalidate(self, blade_path, station_num=None):
+        """Rebuild a station (or all stations) on next use, keeping their
+        overrides."""
+        w = self._blade(blade_path)
+        if station_num is None:
+            w.stale.update(range(1, w.blade.number_of_stations+1))
+        else:
+            w.stale.add(station_num)
+
+    def rebuild_station(self, blade_path, station_num, overrides=None,
+        reset=False):
+        """Rebuild a station with new overrides (if needed).
+
+        Returns its masses (see masses()), and 'rebuilt': True if the station
+        was rebuilt, False if it was already up to date.
+
+        """
+        w = self._blade(blade_path)
+        w.blade.definition.row(station_num, overrides)
+        before = w.blade.list_of_stations[station_num-1]
+        w.station(station_num, overrides, reset)
+        d = dict(self.masses(blade_path, station_num))
+        d['rebuilt'] = w.blade.list_of_stations[station_num-1] is not before
+        return d
+
+    def polygons(self, blade_path, station_num):
+        """Returns {'<part>/<layer>': Polygon} of a station."""
+        return self._blade(blade_path).result(station_num, 'polygons',
+            _polygons)
+
+    def edges(self, blade_path, station_num):
+        """Returns {'<part>/<layer>': {'left', 'top', 'right', 'bottom'}} of a
+        station, for the layers whose edges can be found (see
+        <structure>.save_all_layer_edges())."""
+        return self._blade(blade_path).result(station_num, 'edges', _edges)
+
+    def masses(self, blade_path, station_num):
+        """Returns {'mass', 'area', 'materials': {name: mass}, 'layers':
+        {'<part>/<layer>': mass}} of a station (per unit length)."""
+        return self._blade(blade_path).result(station_num, 'masses', _masses)
+
+    def cut(self, blade_path, station_num, cuts, area_threshold=1.0e-08):
+        """Cut the layers of a station with bounding polygons.
+
+        Parameters
+        ----------
+        cuts : list of (part, layer, label, bounding points), e.g.
+            ('spar_cap', 'upper', 'upper spar cap', [(x2, x3), ...]), where
+            part is the structure's attribute name for the part
+
+        Returns {'<part>/<layer>, <label>': Polygon}, like the alt layers of
+        poly_utils.cut_plot_and_write_alt_layer (which aren't added to the
+        station).
+
+        """
+        st = self._blade(blade_path).station(station_num).structure
+        d = {}
+        for (part_name, layer_name, label, points) in cuts:
+            part = getattr(st, part_name, None)
+            if not isinstance(part, struc.Part):
+                raise Warning("Station #{0} has no part '{1}'!".format(
+                    station_num, part_name))
+            if layer_name not in part.layer:
+                raise Warning("Part '{0}' of station #{1} has no layer '{2}'!".format(
+                    part_name, station_num, layer_name))
+            d['{0}/{1}, {2}'.format(part_name, layer_name, label)] = (
+                pu.cut_polygon(part.layer[layer_name].polygon,
+                    Polygon(points), label, area_threshold))
+        return d
+
+    def shutdown(self):
+        """Stop serving after this request."""
+        self.running = False
+
+    def handle(self, request):
+        """Returns ('ok', result) or ('error', message) for a request, (name,
+        args, kwargs)."""
+        try:
+            (name, args, kwargs) = request
+            if name not in COMMANDS:
+                raise Warning("Unknown command '{0}'!".format(name))
+            return ('ok', getattr(self, name)(*args, **kwargs))
+        except Exception as e:
+            traceback.print_exc()
+            return ('error', '{0}: {1}'.format(e.__class__.__name__, e))
+
+
+def serve(address=DEFAULT_ADDRESS, authkey=None, blade_paths=()):
+    """Run a BuildServer until a client sends 'shutdown'.
+
+    The blades in blade_paths are built before the server starts listening.
+    Each client connection is served until the client closes it; the other
+    clients wait until then.
+
+    If authkey is None, a random authkey is written to AUTHKEY_FILENAME (see
+    write_authkey()), and the file is deleted when the server stops.
+
+    """
+    server = BuildServer()
+    for blade_path in blade_paths:
+        server.load(blade_path)
+    authkey_filename = None
+    if authkey is None:
+        authkey = write_authkey()
+        authkey_filename = AUTHKEY_FILENAME
+    listener = Listener(address, authkey=authkey)
+    print " Build server listening on {0}:{1}".format(*address)
+    try:
+        while server.running:
+            try:
+                conn = listener.accept()
+            except (AuthenticationError, EOFError, IOError) as e:
+                # a client with the wrong authkey, or one that hung up or sent
+                #   garbage during the handshake (socket.error is an IOError)
+                print " [Warning] Rejected a connection ({0}: {1})".format(
+                    e.__class__.__name__, e)
+                continue
+            try:
+                while server.running:
+                    try:
+                        request = conn.recv()
+                    except (EOFError, IOError):
+                        break
+                    except Exception:
+                        # (e.g. a request that can't be unpickled)
+                        traceback.print_exc()
+                        break
+                    t = time.time()
+                    response = server.handle(request)
+                    conn.send(response)
+                    print " {0}: {1} ({2:.3f} s)".format(
+                        _request_name(request), response[0], time.time() - t)
+            except (EOFError, IOError) as e:
+                print " [Warning] Lost a connection ({0}: {1})".format(
+                    e.__class__.__name__, e)
+            finally:
+                conn.close()
+    finally:
+        listener.close()
+        if authkey_filename is not None and os.path.exists(authkey_filename):
+            os.remove(authkey_filename)
+    print " Build server stopped"
+
+
+class BuildClient:
+    """A connection to a build server.
+
+    Every command in COMMANDS is a method, e.g. c.masses('sandia_blade', 5).
+    Errors on the server are raised here as Warnings. The server serves one
+    client at a time, so close() the client when you're done with it.
+
+    """
+    def __init__(self, address=DEFAULT_ADDRESS, authkey=None):
+        if authkey is None:
+            authkey = read_authkey()
+        self.conn = Client(address, authkey=authkey)
+
+    def call(self, name, *args, **kwargs):
+        self.conn.send((name, args, kwargs))
+        (status, result) = self.conn.recv()
+        if status != 'ok':
+            raise Warning("The build server failed: {0}".format(result))
+        return result
+
+    def __getattr__(self, name):
+        if name not in COMMANDS:
+            raise AttributeError(name)
+        return lambda *args, **kwargs: self.call(name, *args, **kwargs)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def connect(address=DEFAULT_ADDRESS, authkey=None):
+    """Returns a BuildClient connected to a running build server (with the
+    authkey in AUTHKEY_FILENAME, by default)."""
+    return BuildClient(address, authkey)
@@ -1,12 +1,250 @@
 """Plot properties of different blades on the same plot.
 
+Any number of blade configurations can be compared at once with
+compare_configs(). Each configuration is built in its own worker process (in
+a scratch copy of its blade definition and airfoils, so its station paths
+are never touched), and the per-station properties of every configuration
+are collected into one DataFrame, with one row per station:
+  config, station, type, x1, chord, twist, thickness, gap, stagger,
+  area, mass, EA, GJ, EI_flap, EI_edge, mass_VABS
+The geometry comes straight from each blade definition file. The areas and
+masses are from the blade's structural parts, and the stiffnesses and VABS
+mass per unit span are from each station's VABS output file (.vabs.K), where
+it exists. Missing values are NaN.
+
+Then, any property of all the configurations is one query, e.g.
+  pivot(data, 'mass')           (stations x configs)
+  plot_property(data, 'chord')  (vs. span)
+
+Usage:
+import lib.compare_blades as cb
+data = cb.compare_configs()   # cb.CONFIGS: Sandia, biplane, and alt configs
+cb.pivot(data, 'twist')
+cb.plot_property(data, 'EI_flap')
+
 Author: Perry Roth-Johnson
-Last updated: April 17, 2014
+Last updated: May 13, 2014
 
 """
 
 
+import os
+import shutil
+import tempfile
+import multiprocessing
+import numpy as np
+import pandas as pd
 import matplotlib.pyplot as plt
+import blade as bl
+import dymore_model as dm
+reload(bl)
+reload(dm)
+
+
+# blade configurations: (name, blade_path, blade type, material file)
+CONFIGS = [
+    ('Sandia blade SNL100-00', 'sandia_blade', 'monoplane',
+     'sandia_blade/materials.csv'),
+    ('biplane, flap-sym, no stagger', 'biplane_blade', 'biplane',
+     'biplane_blade/materials.csv'),
+    ('biplane, flap-asym, no stagger',
+     'alt_biplane_configs/biplane_flap-asym_no-stagger', 'biplane',
+     'biplane_blade/materials.csv'),
+    ('biplane, flap-asym, stagger',
+     'alt_biplane_configs/biplane_flap-asym_stagger', 'biplane',
+     'biplane_blade/materials.csv'),
+    ('biplane, flap-sym, stagger',
+     'alt_biplane_configs/biplane_flap-sym_stagger', 'biplane',
+     'biplane_blade/materials.csv')
+    ]
+
+# columns of the comparison DataFrame
+COLUMNS = ['config', 'station', 'type', 'x1', 'chord', 'twist', 'thickness',
+           'gap', 'stagger', 'area', 'mass', 'EA', 'GJ', 'EI_flap', 'EI_edge',
+           'mass_VABS']
+
+# labels for plot_property()
+LABELS = {
+    'chord': 'chord [m]',
+    'twist': 'twist [deg]',
+    'thickness': 'thickness [m]',
+    'gap': 'gap [m]',
+    'stagger': 'stagger [m]',
+    'area': 'area [m^2]',
+    'mass': 'mass [kg/m]',
+    'EA': 'axial stiffness, EA [N]',
+    'GJ': 'torsional stiffness, GJ [N*m^2]',
+    'EI_flap': 'flapwise stiffness, EI_flap [N*m^2]',
+    'EI_edge': 'edgewise stiffness, EI_edge [N*m^2]',
+    'mass_VABS': 'mass (VABS) [kg/m]'
+    }
+
+
+def _column(df, column):
+    if column in df.columns:
+        return df[column].values.astype(float)
+    return np.zeros(len(df))
+
+
+def definition_table(name, defn_filename):
+    """Returns a DataFrame of the geometry of each station in a blade
+    definition file (see COLUMNS)."""
+    df = pd.read_csv(defn_filename, index_col=0)
+    chord = _column(df, 'chord')
+    t = pd.DataFrame({
+        'config': name,
+        'station': df.index.values.astype(int),
+        'type': df['type'].values if 'type' in df.columns else 'monoplane',
+        'x1': _column(df, 'x1'),
+        'chord': chord,
+        'twist': _column(df, 'twist'),
+        'thickness': _column(df, 'thickness-to-chord ratio')*chord,
+        'gap': np.nan_to_num(_column(df, 'gap-to-chord ratio'))*chord,
+        'stagger': np.nan_to_num(_column(df, 'stagger-to-chord ratio'))*chord},
+        columns=COLUMNS)
+    return t
+
+
+def structural_properties(blade_path, blade_type, material_filename):
+    """Returns (areas, masses, errors) of each station of a blade, built in a
+    scratch copy of its blade definition and airfoils.
+
+    A station whose structural parts can't be built has a NaN area and mass,
+    and errors is a list of (station_num, message) for those stations.
+
+    """
+    blade_class = {'monoplane': bl.MonoplaneBlade,
+                   'biplane': bl.BiplaneBlade}[blade_type]
+    scratch_path = tempfile.mkdtemp()
+    try:
+        path = os.path.join(scratch_path, os.path.basename(blade_path))
+        os.mkdir(path)
+        shutil.copy(os.path.join(blade_path, 'blade_definition.csv'), path)
+        shutil.copytree(os.path.join(blade_path, 'airfoils'),
+            os.path.join(path, 'airfoils'))
+        b = blade_class(os.path.basename(blade_path), path,
+            matl_filename=os.path.abspath(material_filename))
+        areas = np.empty(len(b.list_of_stations))
+        masses = np.empty(len(b.list_of_stations))
+        errors = []
+        for (i, station) in enumerate(b.list_of_stations):
+            try:
+                station.airfoil.create_polygon()
+                station.structure.create_all_layers()
+                areas[i] = station.structure.calculate_area()
+                masses[i] = station.structure.calculate_mass()
+            except Exception as e:
+                (areas[i], masses[i]) = (np.nan, np.nan)
+                errors.append((station.station_num, repr(e)))
+        b.close()
+    finally:
+        shutil.rmtree(scratch_path, ignore_errors=True)
+    return (areas, masses, errors)
+
+
+def vabs_properties(blade_path, station_nums):
+    """Returns the EA, GJ, EI_flap, EI_edge, and mass per unit span of each
+    station from its VABS output file, shape (n_stations, 5) (NaN for
+    stations without a .vabs.K file)."""
+    a = np.nan*np.ones((len(station_nums), 5))
+    rows = [i for (i, station_num) in enumerate(station_nums)
+            if os.path.exists(os.path.join(blade_path,
+                'stn{0:02d}'.format(station_num),
+                'mesh_stn{0:02d}.vabs.K'.format(station_num)))]
+    if rows:
+        props = dm.read_beam_properties(blade_path,
+            [station_nums[i] for i in rows])
+        K = props['K']
+        a[rows] = np.column_stack((K[:,0,0], K[:,3,3], K[:,4,4], K[:,5,5],
+            props['mass_per_unit_span']))
+    return a
+
+
+def config_table(config):
+    """Returns (table, errors) for one blade configuration (see CONFIGS and
+    COLUMNS). This runs in a worker process of compare_configs()."""
+    (name, blade_path, blade_type, material_filename) = config
+    t = definition_table(name, os.path.join(blade_path,
+        'blade_definition.csv'))
+    errors = []
+    if material_filename is not None:
+        try:
+            (t['area'], t['mass'], errors) = structural_properties(
+                blade_path, blade_type, material_filename)
+        except KeyError as e:
+            # the blade definition file doesn't have a column that the
+            #   structural parts need (e.g. an older alt config)
+            errors = [(None, 'missing column ' + repr(e))]
+        except Warning as e:
+            # the blade definition file has errors (see blade_definition.py)
+            errors = [(None, str(e))]
+    t[['EA', 'GJ', 'EI_flap', 'EI_edge', 'mass_VABS']] = vabs_properties(
+        blade_path, t['station'].values)
+    return (t, errors)
+
+
+def compare_configs(configs=CONFIGS, n_processes=None, csv_filename=None):
+    """Build several blade configurations in parallel, and return the
+    properties of every station of every configuration in one DataFrame
+    (see COLUMNS).
+
+    Parameters
+    ----------
+    configs : list of (name, blade_path, blade type, material file) tuples;
+        blade type is 'monoplane' or 'biplane', and the material file is
+        None to skip the areas and masses
+    n_processes : int, the number of worker processes (default: the number
+        of CPUs)
+    csv_filename : str, save the DataFrame to this CSV file (optional)
+
+    Scripts that call this function on Windows must be guarded by
+    `if __name__ == '__main__':`.
+
+    """
+    configs = [(name, os.path.abspath(blade_path), blade_type,
+                None if f is None else os.path.abspath(f))
+               for (name, blade_path, blade_type, f) in configs]
+    pool = multiprocessing.Pool(n_processes)
+    try:
+        results = pool.map(config_table, configs)
+    finally:
+        pool.close()
+        pool.join()
+    for ((name, blade_path, blade_type, f), (t, errors)) in zip(configs,
+        results):
+        for (station_num, message) in errors:
+            if station_num is None:
+                print " [Warning] {0}: no areas or masses ({1})".format(name,
+                    message)
+            else:
+                print " [Warning] {0}, station #{1}: no area or mass ({2})".format(name, station_num, message)
+    data = pd.concat([t for (t, errors) in results], ignore_index=True)
+    if csv_filename is not None:
+        data.to_csv(csv_filename, index=False)
+    return data
+
+
+def pivot(data, prop, index='station'):
+    """Returns a DataFrame of one property of every configuration, with one
+    row per station (or per x1, with index='x1') and one column per
+    configuration."""
+    return data.pivot(index=index, columns='config', values=prop)
+
+
+def plot_property(data, prop, configs=None, legend_loc='best'):
+    """Plot one property vs. span for several configurations (default: all of
+    the configurations in data)."""
+    if configs is None:
+        configs = list(pd.unique(data['config']))
+    plt.figure(figsize=(7,4))
+    for name in configs:
+        t = data[data['config'] == name]
+        plt.plot(t['x1'], t[prop], '.-', label=name)
+    plt.xlabel('span, x1 [m]')
+    plt.ylabel(LABELS.get(prop, prop))
+    plt.legend(loc=legend_loc)
+    plt.grid('on')
+    plt.show()
 
 
 def plot_chord_schedule(list_of_blades):
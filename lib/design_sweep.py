@@ -0,0 +1,385 @@
+"""Run parametric design sweeps over the columns of a blade definition file,
+and keep the results in a SQLite database.
+
+A sweep is a list of parameters, each a tuple of
+  (column, values, how, station_nums)
+where how is 'set' (the column is set to each value) or 'scale' (the column
+is multiplied by each value), and station_nums are the stations that the
+parameter changes (None: every station with a value in that column). For
+example,
+  [('gap-to-chord ratio', [0.75, 1.0, 1.25], 'scale', range(10,25)),
+   ('spar cap height', [0.9, 1.0, 1.1], 'scale', None)]
+is a sweep of 9 variants of a blade. ('scale' keeps the shape of a
+spanwise schedule, e.g. the tapered gap of the biplane blade; 'set' makes
+the column constant over station_nums.) Only non-blank cells are changed, and
+every other cell is copied as is from the blade definition file (so
+unchanged stations keep their keys in the station store).
+
+Each variant is keyed by a hash of its blade definition (after the
+parameters are applied), its airfoils, materials, and layers, and the
+evaluation settings, so identical variants are only evaluated once, and
+rerunning a sweep skips every variant that is already in the database,
+except the ones without section properties ('no sections', see below):
+they are evaluated again on every run, in case their stations have been
+meshed and solved since.
+
+Each variant is evaluated in a worker process, in a scratch copy of the
+blade, through three stages:
+  geometry - build the blade's structural parts, for the area and mass of
+             each station and the total blade mass
+  sections - fetch the VABS mass and stiffness matrices of each station from
+             the station store (see station_store.py); stations that have
+             never been meshed and solved have no section properties
+             (the base blade's stations are added to the store first)
+  beam     - if every station has section properties, solve a tip flap load
+             and find the natural frequencies with the beam solver (see
+             beam_solver.py)
+The status of a variant is 'ok' (all stages), 'no sections' (the beam stage
+was skipped), or 'failed' (with the error message). Stations whose
+structural parts can't be built have no area or mass (and no blade mass),
+which is noted in the variant's message.
+
+The database has two tables:
+  variants (key, base, params, status, message, blade_mass, n_stations,
+            n_sections, tip_deflection, f1, f2, f3, evaluated)
+  stations (key, station, x1, area, mass, EA, GJ, EI_flap, EI_edge)
+
+Only the columns that don't change a station's cross-section (e.g. 'x1',
+see station_store.IGNORED_COLUMNS) keep its section properties; a variant
+that changes any other column has new stations, which have to be meshed,
+solved, and synced to the store before it gets beam results.
+
+Usage:
+import lib.design_sweep as ds
+sweep = [('x1', [0.95, 1.0, 1.05], 'scale', None)]   # blade length
+results = ds.run_sweep('biplane_blade', sweep)
+ds.read_results()                 # every variant in the database
+ds.read_stations(results['key'][0])
+
+Last updated: May 13, 2014
+
+"""
+
+
+import os
+import csv
+import json
+import shutil
+import sqlite3
+import hashlib
+import datetime
+import tempfile
+import itertools
+import StringIO
+import multiprocessing
+import numpy as np
+import pandas as pd
+import station_store as ss
+import compare_blades as cb
+import beam_solver as bs
+reload(ss)
+reload(cb)
+reload(bs)
+
+
+DEFAULT_DB_FILENAME = 'design_sweep.db'
+
+# change this whenever the evaluation of a variant changes, to re-evaluate
+#   every variant
+SWEEP_VERSION = 1
+
+_VARIANT_COLUMNS = ['key', 'base', 'params', 'status', 'message',
+                    'blade_mass', 'n_stations', 'n_sections',
+                    'tip_deflection', 'f1', 'f2', 'f3', 'evaluated']
+_STATION_COLUMNS = ['key', 'station', 'x1', 'area', 'mass', 'EA', 'GJ',
+                    'EI_flap', 'EI_edge']
+
+
+def connect(db_filename=DEFAULT_DB_FILENAME):
+    """Open the results database, and create its tables if needed."""
+    db = sqlite3.connect(db_filename)
+    db.execute("""CREATE TABLE IF NOT EXISTS variants (
+        key TEXT PRIMARY KEY, base TEXT, params TEXT, status TEXT,
+        message TEXT, blade_mass REAL, n_stations INTEGER,
+        n_sections INTEGER, tip_deflection REAL, f1 REAL, f2 REAL, f3 REAL,
+        evaluated TEXT)""")
+    db.execute("""CREATE TABLE IF NOT EXISTS stations (
+        key TEXT, station INTEGER, x1 REAL, area REAL, mass REAL, EA REAL,
+        GJ REAL, EI_flap REAL, EI_edge REAL, PRIMARY KEY (key, station))""")
+    db.execute("CREATE INDEX IF NOT EXISTS variants_status ON variants "
+        "(status)")
+    db.commit()
+    return db
+
+
+def sweep_points(sweep):
+    """Returns every combination of the parameter values in a sweep, as a
+    list of points; each point is a list of (column, how, station_nums,
+    value) tuples."""
+    axes = [[(column, how, station_nums, value) for value in values]
+            for (column, values, how, station_nums) in sweep]
+    return [list(point) for point in itertools.product(*axes)]
+
+
+def read_definition_rows(defn_filename):
+    """Returns the rows of a blade definition file (header first), as lists
+    of strs."""
+    with open(defn_filename, 'rb') as f:
+        return list(csv.reader(f))
+
+
+def apply_point(rows, point):
+    """Returns a copy of the rows of a blade definition file with the
+    parameters of one point applied to them."""
+    header = rows[0]
+    rows = [list(row) for row in rows]
+    for (column, how, station_nums, value) in point:
+        if column not in header:
+            raise Warning("The blade definition has no column '{0}'!".format(
+                column))
+        if how not in ['set', 'scale']:
+            raise Warning("Unknown parameter type '{0}'; use 'set' or 'scale'".format(how))
+        j = header.index(column)
+        for row in rows[1:]:
+            if row[j].strip() == '':
+                continue
+            if station_nums is not None and int(row[0]) not in station_nums:
+                continue
+            if how == 'set':
+                if isinstance(value, float):
+                    row[j] = repr(value)
+                else:
+                    row[j] = str(value)
+            else:
+                row[j] = repr(float(row[j])*value)
+    return rows
+
+
+def definition_text(rows):
+    """Returns the text of a blade definition file with these rows."""
+    f = StringIO.StringIO()
+    csv.writer(f, lineterminator='\n').writerows(rows)
+    return f.getvalue()
+
+
+def _params_json(point):
+    return json.dumps([[column, how, None if nums is None else list(nums),
+        value] for (column, how, nums, value) in point])
+
+
+def variant_key(defn_text, airfoils_hash, material_hash, layer_hash,
+    settings):
+    """Returns the SHA-1 key of a variant."""
+    s = json.dumps({'definition': hashlib.sha1(defn_text).hexdigest(),
+                    'airfoils': airfoils_hash,
+                    'materials': material_hash,
+                    'layers': layer_hash,
+                    'settings': settings,
+                    'version': SWEEP_VERSION}, sort_keys=True)
+    return hashlib.sha1(s).hexdigest()
+
+
+def _airfoils_hash(airfoils_path):
+    h = hashlib.sha1()
+    for name in sorted(os.listdir(airfoils_path)):
+        h.update(name + ss.file_hash(os.path.join(airfoils_path, name)))
+    return h.hexdigest()
+
+
+def _blade_type(df):
+    if 'type' in df.columns and (df['type'] == 'biplane').any():
+        return 'biplane'
+    return 'monoplane'
+
+
+def evaluate_variant(job):
+    """Evaluate one variant through the geometry, sections, and beam stages.
+    This runs in a worker process of run_sweep().
+
+    Returns (variant row, list of station rows) for the database.
+
+    """
+    (key, base, params, defn_text, airfoils_path, material_filename,
+        layer_filename, store_path, settings) = job
+    row = dict.fromkeys(_VARIANT_COLUMNS)
+    row.update({'key': key, 'base': base, 'params': params,
+        'evaluated': str(datetime.datetime.now())})
+    scratch_path = tempfile.mkdtemp()
+    try:
+        path = os.path.join(scratch_path, 'variant')
+        os.mkdir(path)
+        with open(os.path.join(path, 'blade_definition.csv'), 'w') as f:
+            f.write(defn_text)
+        shutil.copytree(airfoils_path, os.path.join(path, 'airfoils'))
+        df = pd.read_csv(os.path.join(path, 'blade_definition.csv'),
+            index_col=0)
+        station_nums = [int(n) for n in df.index]
+        x1 = df['x1'].values
+        blade_type = _blade_type(df)
+        row['n_stations'] = len(station_nums)
+        # geometry
+        (areas, masses, errors) = cb.structural_properties(path, blade_type,
+            material_filename)
+        if errors:
+            # keep going without those stations' areas and masses
+            row['message'] = "geometry: no mass at stations {0}: {1}".format(
+                [n for (n, message) in errors], errors[0][1])
+        row['blade_mass'] = np.trapz(masses, x=x1)
+        # sections
+        ss.sync_blade(path, store_path=store_path, print_flag=False,
+            material_filename=material_filename,
+            layer_filename=layer_filename,
+            rule_filename=os.path.join(base, 'layer_plane_angle_rules.csv'),
+            fixes_filename=os.path.join(base, 'element_fixes.csv'))
+        vabs = cb.vabs_properties(path, station_nums)
+        row['n_sections'] = int(np.isfinite(vabs[:,0]).sum())
+        # beam
+        if row['n_sections'] < len(station_nums):
+            row['status'] = 'no sections'
+        else:
+            if blade_type == 'biplane':
+                (m, tip_vertex) = (bs.biplane_model(path), 'tip_v')
+            else:
+                (m, tip_vertex) = (bs.monoplane_model(path), 'vertexB')
+            s = m.solve([[bs.tip_load(tip_vertex,
+                forces=[0.0, 0.0, settings['tip_load']])]])
+            row['tip_deflection'] = s.vertex(tip_vertex)[2,0]
+            f = m.modes(n_modes=3).frequencies
+            (row['f1'], row['f2'], row['f3']) = f
+            row['status'] = 'ok'
+        stations = [(key, station_nums[i], x1[i], areas[i], masses[i])
+            + tuple(vabs[i,:4]) for i in range(len(station_nums))]
+    except Exception as e:
+        row['status'] = 'failed'
+        row['message'] = repr(e)
+        stations = []
+    finally:
+        shutil.rmtree(scratch_path, ignore_errors=True)
+    return (row, stations)
+
+
+def _sql_value(value):
+    # sqlite3 can't store numpy scalars, and NaN should be NULL
+    if isinstance(value, (float, np.floating)):
+        return None if np.isnan(value) else float(value)
+    if isinstance(value, np.integer):
+        return int(value)
+    return value
+
+
+def _save(db, row, stations):
+    db.execute("DELETE FROM stations WHERE key = ?", (row['key'],))
+    db.execute("INSERT OR REPLACE INTO variants VALUES ({0})".format(
+        ','.join(len(_VARIANT_COLUMNS)*'?')),
+        [_sql_value(row[c]) for c in _VARIANT_COLUMNS])
+    db.executemany("INSERT INTO stations VALUES ({0})".format(
+        ','.join(len(_STATION_COLUMNS)*'?')),
+        [[_sql_value(v) for v in s] for s in stations])
+    db.commit()
+
+
+def run_sweep(blade_path, sweep, db_filename=DEFAULT_DB_FILENAME,
+    n_processes=None, material_filename=None, layer_filename=None,
+    store_path=ss.DEFAULT_STORE_PATH, tip_load=1.0e+05, rerun_failed=False):
+    """Evaluate every variant of a blade in a sweep, in parallel, and save
+    the results in the database.
+
+    Parameters
+    ----------
+    blade_path : str, the base blade directory, e.g. 'biplane_blade'
+    sweep : list of (column, values, how, station_nums) parameters
+    db_filename : str, the SQLite database file
+    n_processes : int, the number of worker processes (default: the number
+        of CPUs)
+    material_filename, layer_filename : str, default to 'materials.csv' and
+        'layers.csv' in blade_path
+    store_path : str, the station store directory
+    tip_load : float, the flapwise tip load [N] for the beam stage
+    rerun_failed : bool, evaluate failed variants again
+
+    The base blade is synced to the station store first (see
+    station_store.sync_blade()), so the variants can use its stations.
+    Variants that are already in the database are skipped, except the ones
+    with status 'no sections' (and 'failed', if rerun_failed). Returns a
+    DataFrame of the results of every variant in the sweep (in the database's
+    columns), in the order of sweep_points().
+
+    Scripts that call this function on Windows must be guarded by
+    `if __name__ == '__main__':`.
+
+    """
+    if material_filename is None:
+        material_filename = os.path.join(blade_path, 'materials.csv')
+    if layer_filename is None:
+        layer_filename = os.path.join(blade_path, 'layers.csv')
+    airfoils_path = os.path.abspath(os.path.join(blade_path, 'airfoils'))
+    base_rows = read_definition_rows(os.path.join(blade_path,
+        'blade_definition.csv'))
+    settings = {'tip_load': tip_load}
+    ss.sync_blade(blade_path, store_path=store_path, print_flag=False,
+        material_filename=material_filename, layer_filename=layer_filename)
+    hashes = (_airfoils_hash(airfoils_path),
+              ss.material_hash(material_filename),
+              ss.file_hash(layer_filename))
+    db = connect(db_filename)
+    done = dict(db.execute("SELECT key, status FROM variants").fetchall())
+    keys = []
+    jobs = {}
+    for point in sweep_points(sweep):
+        defn_text = definition_text(apply_point(base_rows, point))
+        key = variant_key(defn_text, hashes[0], hashes[1], hashes[2],
+            settings)
+        keys.append(key)
+        if key in jobs:
+            continue
+        # (variants without sections are evaluated again, in case their
+        #   stations are in the store now)
+        if key in done and (done[key] == 'ok' or
+                (done[key] == 'failed' and not rerun_failed)):
+            continue
+        jobs[key] = (key, blade_path, _params_json(point), defn_text,
+            airfoils_path, os.path.abspath(material_filename),
+            os.path.abspath(layer_filename), os.path.abspath(store_path),
+            settings)
+    print " Sweep of {0}: {1} variants, {2} to evaluate".format(blade_path,
+        len(set(keys)), len(jobs))
+    if jobs:
+        pool = multiprocessing.Pool(n_processes)
+        try:
+            # save each variant as soon as it is done, so an interrupted
+            #   sweep can be resumed
+            for (i, (row, stations)) in enumerate(pool.imap_unordered(
+                evaluate_variant, jobs.values())):
+                _save(db, row, stations)
+                print " [{0}/{1}] {2} {3}".format(i+1, len(jobs),
+                    row['key'][:10], row['status'])
+        finally:
+            pool.close()
+            pool.join()
+    results = pd.read_sql_query("SELECT * FROM variants", db, index_col='key')
+    db.close()
+    results = results.loc[keys]
+    results.reset_index(inplace=True)
+    return results
+
+
+def read_results(db_filename=DEFAULT_DB_FILENAME, status=None):
+    """Returns a DataFrame of every variant in the database (or only the
+    variants with this status)."""
+    db = connect(db_filename)
+    if status is None:
+        df = pd.read_sql_query("SELECT * FROM variants", db)
+    else:
+        df = pd.read_sql_query("SELECT * FROM variants WHERE status = ?", db,
+            params=(status,))
+    db.close()
+    return df
+
+
+def read_stations(key, db_filename=DEFAULT_DB_FILENAME):
+    """Returns a DataFrame of the station properties of one variant."""
+    db = connect(db_filename)
+    df = pd.read_sql_query("SELECT * FROM stations WHERE key = ? ORDER BY "
+        "station", db, params=(key,))
+    db.close()
+    return df
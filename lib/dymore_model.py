@@ -0,0 +1,329 @@
+"""Assemble a DYMORE beam model directly from a blade's VABS results.
+
+The mass and stiffness matrices of every station are read once into stacked
+arrays, and the @BEAM_PROPERTY_DEFINITION, @ORIENTATION_DISTRIBUTION_DEFINITION,
+and @CURVE_MESH_PARAMETERS_DEFINITION blocks are rendered in one pass and
+written into a template DYMORE input file (usually the blade's existing
+'beam_model/*.dat' file), replacing the old blocks. Everything else in the
+template (points, edges, beams, surveys, etc.) is kept as it is.
+
+A beam model is made of one or more segments. Each segment is a tuple of
+  (property name, orientation name, mesh name, list of station numbers)
+and the ETA_COORDINATE of each station runs from 0 to 1 along its segment.
+Set the mesh name to None to leave a segment out of the mesh parameters block.
+
+Usage:
+import lib.dymore_model as dm
+dm.write_blade_model('sandia_blade', 'sandia_blade/beam_model/sandia_blade.dat',
+    [('propBlade', 'orientationBlade', 'meshBlade', range(1,34+1))])
+
+Distributed loads are written to their own include files (see the
+'load_*.dat' files in each beam_model directory):
+dm.write_load_file('load_BEM_dist_flap.dat', [
+    dm.format_edge_load('BEM_flap_load', 'edgeBlade', 'BEM_flap_load_table'),
+    dm.format_data_table('BEM_flap_load_table', eta, thrust)])
+
+Last updated: May 13, 2014
+
+"""
+
+
+import os
+import re
+import numpy as np
+import pandas as pd
+import dymore_utils as du
+reload(du)
+
+
+# upper triangle of the 6x6 stiffness matrix, row by row
+_K_rows, _K_cols = np.triu_indices(6)
+
+# one station of a @BEAM_PROPERTY_NAME block (same layout as
+# dymore_utils.writeDymoreMK, plus a station comment)
+_station_property_fmt = ''.join(
+    ['    ! station %02d\n',
+     '    @ETA_COORDINATE {ETA_FMT} {\n',
+     '      @STIFFNESS_MATRIX {%17.10e,' + '%20.10e,'*5 + '\n'] +
+    ['      ' + ' '*(37+21*(r-1)) + '%20.10e,'*(5-r) + '%20.10e{end}\n'.format(
+        end=(',' if r < 5 else '}')) for r in range(1,6)] +
+    ['      @MASS_PER_UNIT_SPAN {%17.10e}\n',
+     '      @MOMENTS_OF_INERTIA {%17.10e,\n',
+     '      ' + ' '*21 + '%17.10e,\n',
+     '      ' + ' '*21 + '%17.10e}\n',
+     '      @CENTRE_OF_MASS_LOCATION {%17.10e,\n',
+     '      ' + ' '*26 + '%17.10e}\n',
+     '    }\n'])
+
+_station_orientation_fmt = ('    ! station %02d\n'
+                            '    @ETA_COORDINATE {ETA_FMT}\n'
+                            '    @TWIST_ANGLE    {%8.5f}\n')
+
+
+def read_beam_properties(blade_path, station_nums,
+    base_filename='mesh_stn{0:02d}.vabs.K'):
+    """Read the VABS mass and stiffness matrices of several stations.
+
+    Parameters
+    ----------
+    blade_path : str, the blade directory, e.g. 'sandia_blade'
+    station_nums : list of ints, the station numbers
+    base_filename : str, the VABS output filename in each station path
+
+    Returns a dict of stacked arrays, one row per station:
+      'station_num' : shape (n,)
+      'K' : shape (n,6,6), the Timoshenko stiffness matrices
+      'mass_per_unit_span' : shape (n,)
+      'moments_of_inertia' : shape (n,3), about the x1, x2, and x3 axes
+      'centre_of_mass' : shape (n,2), the (x2, x3) coords of the mass center
+
+    """
+    n = len(station_nums)
+    props = {
+        'station_num': np.array(station_nums),
+        'K': np.zeros((n,6,6)),
+        'mass_per_unit_span': np.zeros(n),
+        'moments_of_inertia': np.zeros((n,3)),
+        'centre_of_mass': np.zeros((n,2))}
+    for (i, station_num) in enumerate(station_nums):
+        filename = os.path.join(blade_path, 'stn{0:02d}'.format(station_num),
+            base_filename.format(station_num))
+        (cm_x2, cm_x3, mpus, i1, i2, i3, K) = du.pullMKmatrices(
+            du.readFile(filename))
+        props['K'][i] = K
+        props['mass_per_unit_span'][i] = mpus
+        props['moments_of_inertia'][i] = (i1, i2, i3)
+        props['centre_of_mass'][i] = (cm_x2, cm_x3)
+    return props
+
+
+def segment_eta(x1):
+    """Returns the ETA_COORDINATEs (0 to 1) of stations at spanwise coords x1."""
+    x1 = np.asarray(x1, dtype=float)
+    return (x1 - x1[0])/(x1[-1] - x1[0])
+
+
+def format_beam_property(name, station_nums, eta, K, mass_per_unit_span,
+    moments_of_inertia, centre_of_mass, eta_fmt='%11.9f'):
+    """Returns a @BEAM_PROPERTY_NAME block for the stations of one segment.
+
+    All the stations are formatted at once, with one format string.
+
+    """
+    values = np.column_stack((station_nums, eta, K[:,_K_rows,_K_cols],
+        mass_per_unit_span, moments_of_inertia, centre_of_mass))
+    fmt = _station_property_fmt.replace('ETA_FMT', eta_fmt)
+    header = ('  @BEAM_PROPERTY_NAME {{{0}}} {{\n'
+              '    @PROPERTY_DEFINITION_TYPE {{ 6X6_MATRICES }}\n'
+              '    @COORDINATE_TYPE {{ ETA_COORDINATE }}\n\n').format(name)
+    body = ('\n'.join([fmt]*len(values))) % tuple(values.ravel())
+    return header + body + '  }\n'
+
+
+def format_orientation_distribution(name, station_nums, eta, twist,
+    eta_fmt='%11.9f'):
+    """Returns an @ORIENTATION_DISTRIBUTION_NAME block (twist angles, in
+    degrees) for the stations of one segment."""
+    values = np.column_stack((station_nums, eta, twist))
+    fmt = _station_orientation_fmt.replace('ETA_FMT', eta_fmt)
+    header = ('  @ORIENTATION_DISTRIBUTION_NAME {{ {0} }} {{\n'
+              '    @ORIENTATION_DEFINITION_TYPE {{ TWIST_ANGLE }}\n'
+              '    @COORDINATE_TYPE {{ ETA_COORDINATE }}\n\n').format(name)
+    body = ('\n'.join([fmt]*len(values))) % tuple(values.ravel())
+    return header + body + '  }\n'
+
+
+def format_curve_mesh_parameters(name, eta, order_of_elements=3,
+    eta_fmt='%11.9f'):
+    """Returns a @CURVE_MESH_PARAMETERS_NAME block with one element between
+    each pair of stations. (If there are only two stations, the ETA_COORDINATEs
+    are left out.)"""
+    s = ('  @CURVE_MESH_PARAMETERS_NAME {{{0}}} {{\n'
+         '    @NUMBER_OF_ELEMENTS {{{1}}}\n'
+         '    @ORDER_OF_ELEMENTS {{{2}}}\n').format(name, len(eta)-1,
+         order_of_elements)
+    if len(eta) > 2:
+        s += ('    @ETA_COORDINATE {' + eta_fmt + '}\n')*len(eta) % tuple(eta)
+        s += '    @COMMENTS {use ETA_COORDINATE, not ETA_VALUE}\n'
+    return s + '  }\n'
+
+
+def format_definition(keyword, blocks):
+    """Wrap a list of NAME blocks in a top-level DYMORE definition block,
+    e.g. format_definition('BEAM_PROPERTY_DEFINITION', [...])."""
+    return '@' + keyword + ' {\n' + '\n'.join(blocks) + '}\n'
+
+
+def format_edge_load_name(load_name, edge_name, table_name,
+    component='APPLIED_FORCE_ALONG_i3', scaling_factor=1.0,
+    time_function_name='scheduleload'):
+    """Returns an @EDGE_LOAD_NAME block for a distributed load that is defined
+    by a data table (see format_data_table_name)."""
+    return """  @EDGE_LOAD_NAME {{{0}}} {{
+    @EDGE_NAME {{{1}}}
+    @LOADING_COMPONENT {{
+      @{2} {{{3}}}
+      @SCALING_FACTOR {{{4:4.1f}}}
+      @TIME_FUNCTION_NAME {{{5}}}
+      @FOLLOWER_FORCE_FLAG {{NO}}
+    }}
+  }}
+""".format(load_name, edge_name, component, table_name, scaling_factor,
+        time_function_name)
+
+
+def format_edge_load(load_name, edge_name, table_name, **kwargs):
+    """Returns an @EDGE_LOAD_DEFINITION block with one distributed load (see
+    format_edge_load_name for the kwargs)."""
+    return format_definition('EDGE_LOAD_DEFINITION', [format_edge_load_name(
+        load_name, edge_name, table_name, **kwargs)])
+
+
+def format_data_table_name(table_name, eta, values,
+    data_type='FORCE_ALONG_I3', comments=None):
+    """Returns a @DATA_TABLE_NAME block of values vs. ETA_COORDINATE."""
+    entries = np.column_stack((eta, values))
+    s = ('  @DATA_TABLE_NAME {{{0}}} {{\n'
+         '    @COORDINATE_TYPE {{ETA_COORDINATE}}\n'
+         '    @DATA_TYPE {{{1}}}\n'
+         '    @TABLE_ENTRIES {{\n').format(table_name, data_type)
+    s += (('      @X_ENTRY {%7.5f} @Y_ENTRY {%9.3f}\n'*len(entries)) %
+          tuple(entries.ravel()))
+    s += '    }\n'
+    if comments is not None:
+        s += '    @COMMENTS {{{0}}}\n'.format(du.formatComments(comments))
+    return s + '  }\n'
+
+
+def format_data_table(table_name, eta, values, **kwargs):
+    """Returns a @DATA_TABLE_DEFINITION block with one data table (see
+    format_data_table_name for the kwargs)."""
+    return format_definition('DATA_TABLE_DEFINITION', [format_data_table_name(
+        table_name, eta, values, **kwargs)])
+
+
+def write_load_file(filename, blocks):
+    """Write load blocks (from format_edge_load, format_data_table, or
+    format_definition) to a DYMORE include file, with Windows line endings."""
+    with open(filename, 'wb') as f:
+        f.write('\n'.join(blocks).replace('\n', '\r\n'))
+
+
+def replace_block(text, keyword, block):
+    """Replace the top-level '@keyword {...}' block in the text of a DYMORE
+    input file. If there is no such block, the new block is appended.
+
+    Raises a Warning if the keyword appears in more than one top-level block,
+    or if its braces don't match.
+
+    """
+    matches = list(re.finditer(r'^@' + keyword + r'\s*\{', text, re.M))
+    if len(matches) == 0:
+        return text.rstrip('\n') + '\n\n' + block
+    if len(matches) > 1:
+        raise Warning("Found {0} '@{1}' blocks in the template; expected 1.".format(len(matches), keyword))
+    start = matches[0].start()
+    depth = 0
+    for i in xrange(matches[0].end()-1, len(text)):
+        if text[i] == '{':
+            depth += 1
+        elif text[i] == '}':
+            depth -= 1
+            if depth == 0:
+                end = i+1
+                break
+    else:
+        raise Warning("Unmatched braces in the '@{0}' block.".format(keyword))
+    if text[end:end+1] == '\n':
+        end += 1
+    return text[:start] + block + text[end:]
+
+
+def build_model(template_filename, model_filename, blocks):
+    """Write a DYMORE input file from a template and a dict of new top-level
+    blocks, {keyword: block}.
+
+    The template's line endings are kept. The template and the model may be
+    the same file.
+
+    """
+    with open(template_filename, 'rb') as f:
+        text = f.read()
+    newline = '\r\n' if '\r\n' in text else '\n'
+    text = text.replace('\r\n', '\n')
+    for keyword in sorted(blocks.keys()):
+        text = replace_block(text, keyword, blocks[keyword])
+    with open(model_filename, 'wb') as f:
+        f.write(text.replace('\n', newline))
+
+
+def blade_model_blocks(blade_path, segments, defn_filename='blade_definition.csv',
+    eta_fmt='%11.9f'):
+    """Render the beam property, orientation distribution, and mesh parameter
+    blocks for a blade.
+
+    Parameters
+    ----------
+    blade_path : str, the blade directory, e.g. 'sandia_blade'
+    segments : list of (property name, orientation name, mesh name,
+        station_nums) tuples (see the module docstring)
+    defn_filename : str, the blade definition file in blade_path (for the
+        spanwise coords and the twist schedule)
+    eta_fmt : str, the format of each ETA_COORDINATE
+
+    Returns a dict of {keyword: block}, for build_model().
+
+    """
+    df = pd.read_csv(os.path.join(blade_path, defn_filename), index_col=0)
+    all_station_nums = sorted(set(n for s in segments for n in s[3]))
+    props = read_beam_properties(blade_path, all_station_nums)
+    rows = dict([(n, i) for (i, n) in enumerate(all_station_nums)])
+    property_blocks = []
+    orientation_blocks = []
+    mesh_blocks = []
+    mesh_names = []
+    for (prop_name, orientation_name, mesh_name, station_nums) in segments:
+        r = np.array([rows[n] for n in station_nums])
+        eta = segment_eta(df.loc[station_nums, 'x1'].values)
+        twist = df.loc[station_nums, 'twist'].values
+        property_blocks.append(format_beam_property(prop_name, station_nums,
+            eta, props['K'][r], props['mass_per_unit_span'][r],
+            props['moments_of_inertia'][r], props['centre_of_mass'][r],
+            eta_fmt=eta_fmt))
+        orientation_blocks.append(format_orientation_distribution(
+            orientation_name, station_nums, eta, twist, eta_fmt=eta_fmt))
+        if mesh_name is not None and mesh_name not in mesh_names:
+            mesh_names.append(mesh_name)
+            mesh_blocks.append(format_curve_mesh_parameters(mesh_name, eta,
+                eta_fmt=eta_fmt))
+    blocks = {
+        'BEAM_PROPERTY_DEFINITION': format_definition(
+            'BEAM_PROPERTY_DEFINITION', property_blocks),
+        'ORIENTATION_DISTRIBUTION_DEFINITION': format_definition(
+            'ORIENTATION_DISTRIBUTION_DEFINITION', orientation_blocks)}
+    if len(mesh_blocks) > 0:
+        blocks['CURVE_MESH_PARAMETERS_DEFINITION'] = format_definition(
+            'CURVE_MESH_PARAMETERS_DEFINITION', mesh_blocks)
+    return blocks
+
+
+def write_blade_model(blade_path, model_filename, segments,
+    template_filename=None, **kwargs):
+    """Render a blade's beam model and write it into a DYMORE input file.
+
+    Parameters
+    ----------
+    blade_path : str, the blade directory, e.g. 'sandia_blade'
+    model_filename : str, the DYMORE input file to write
+    segments : list of (property name, orientation name, mesh name,
+        station_nums) tuples (see the module docstring)
+    template_filename : str, the template DYMORE input file (default: update
+        model_filename in place)
+    kwargs : passed to blade_model_blocks()
+
+    """
+    if template_filename is None:
+        template_filename = model_filename
+    blocks = blade_model_blocks(blade_path, segments, **kwargs)
+    build_model(template_filename, model_filename, blocks)
+    print " Wrote DYMORE input file: " + model_filename
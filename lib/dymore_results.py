@@ -0,0 +1,139 @@
+"""Read DYMORE survey results (.mdt files) once, and interpolate them at the
+spar stations.
+
+Each .mdt file is parsed with np.loadtxt only once. The parsed array is saved
+next to it as a binary .npy file (e.g. 'svy_disp_blade.mdt.npy'), which is
+memory-mapped instead of parsed on later loads, as long as it is newer than
+the .mdt file. Arrays are also kept in memory for the rest of the session, so
+post-processing several load cases of several blades reads each file exactly
+once.
+
+Columns of a survey file:
+  svy_disp_blade.mdt   eta, u1, u2, u3, r1, r2, r3
+                       (displacements and rotations)
+  svy_force_blade.mdt  eta, F1, F2, F3, M1, M2, M3
+                       (force and moment resultants)
+where eta is the ETA_COORDINATE (0 at the root, 1 at the tip).
+
+Usage:
+import lib.dymore_results as dr
+f = 'sandia_blade/beam_model/FIGURES/svy_force_blade.mdt'
+(x, y) = dr.component(f, 'flapwise bending moment', span=100.0)
+y1 = dr.at_stations(f, 'flapwise bending moment', x1_stn, span=100.0)
+
+Last updated: May 13, 2014
+
+"""
+
+
+import os
+import numpy as np
+
+
+# named components: (file type, column)
+COMPONENTS = {
+    'axial displacement':      ('disp', 1),
+    'edgewise':                ('disp', 2),
+    'flapwise':                ('disp', 3),
+    'axial force':             ('force', 1),
+    'edgewise shear force':    ('force', 2),
+    'flapwise shear force':    ('force', 3),
+    'torsional moment':        ('force', 4),
+    'flapwise bending moment': ('force', 5),
+    'edgewise bending moment': ('force', 6)
+    }
+
+# groups of columns
+GROUPS = {
+    'displacement': ('disp', [1,2,3]),
+    'rotation':     ('disp', [4,5,6]),
+    'force':        ('force', [1,2,3]),
+    'moment':       ('force', [4,5,6])
+    }
+
+# {absolute filename: (mtime, array)}, filled by read_mdt()
+_cache = {}
+
+
+def clear_cache():
+    """Forget every array that was read in this session."""
+    _cache.clear()
+
+
+def read_mdt(filename, cache_flag=True):
+    """Returns the array in a DYMORE .mdt file.
+
+    The file is parsed once, and saved as '<filename>.npy', which is memory-
+    mapped on later loads. Set cache_flag=False to parse the file without
+    using (or writing) the .npy file.
+
+    """
+    key = os.path.abspath(filename)
+    mtime = os.path.getmtime(filename)
+    if key in _cache and _cache[key][0] == mtime:
+        return _cache[key][1]
+    npy_filename = filename + '.npy'
+    if (cache_flag and os.path.exists(npy_filename) and
+        os.path.getmtime(npy_filename) >= mtime):
+        a = np.load(npy_filename, mmap_mode='r')
+    else:
+        a = np.loadtxt(filename, ndmin=2)
+        if cache_flag:
+            np.save(npy_filename, a)
+    _cache[key] = (mtime, a)
+    return a
+
+
+def file_type(filename):
+    """Returns 'disp' or 'force' for a survey filename."""
+    name = os.path.basename(filename)
+    for t in ['disp', 'force']:
+        if t in name:
+            return t
+    raise Warning("Can't tell if '{0}' has displacements or forces.".format(
+        filename))
+
+
+def component(filename, name, span=1.0):
+    """Returns (x, y): the spanwise coords (eta*span) and the values of a named
+    component or group (see COMPONENTS and GROUPS) in a survey file.
+
+    y has shape (n,) for a component, or (n,3) for a group.
+
+    """
+    if name in COMPONENTS:
+        (t, cols) = COMPONENTS[name]
+    elif name in GROUPS:
+        (t, cols) = GROUPS[name]
+    else:
+        raise Warning("Unknown component '{0}'; use one of {1}".format(name,
+            sorted(COMPONENTS.keys() + GROUPS.keys())))
+    if file_type(filename) != t:
+        raise Warning("'{0}' is not in '{1}'".format(name, filename))
+    a = read_mdt(filename)
+    return (a[:,0]*span, np.asarray(a[:,cols]))
+
+
+def interp_extrap(x, xp, fp):
+    """Linearly interpolate fp(xp) at x, and extrapolate linearly from the
+    first two and last two points outside of xp. (Vectorized; fp may have
+    shape (n,) or (n,k).)"""
+    x = np.asarray(x, dtype=float)
+    order = np.argsort(xp, kind='mergesort')
+    xp = np.asarray(xp, dtype=float)[order]
+    fp = np.asarray(fp, dtype=float)[order]
+    f = fp.reshape(len(xp), -1)
+    # the segment that each x falls in (the first or last segment outside xp)
+    i = np.clip(np.searchsorted(xp, x, side='right') - 1, 0, len(xp)-2)
+    dx = xp[i+1] - xp[i]
+    t = np.where(dx > 0, (x - xp[i])/np.where(dx > 0, dx, 1.0), 0.0)
+    y = f[i] + t[...,np.newaxis]*(f[i+1] - f[i])
+    return y.reshape(x.shape + fp.shape[1:])
+
+
+def at_stations(filename, name, x1, span=1.0):
+    """Returns the values of a named component or group in a survey file at
+    spanwise coords x1, interpolated (and extrapolated) from the survey
+    points."""
+    (x, y) = component(filename, name, span=span)
+    return interp_extrap(x1, x, y)
@@ -1,43 +1,205 @@
 """Create entities for a 2D unstructured grid.
 
+Nodes and elements use __slots__ to keep large meshes compact in memory. Nodes
+that are not present in an element (e.g. nodes 5-9 of a linear quadrilateral)
+all point to the single shared NULL_NODE, which has node_num=0.
+
+There are no global node or element counters: node and element numbers come
+from the mesh file, and the counts are kept by each grid (e.g.
+<grid>.number_of_nodes), so several grids can be read at once.
+
 Author: Perry Roth-Johnson
 Last modified: April 2, 2014
 
 """
 
 
+import weakref
 import numpy as np
 import matplotlib.pyplot as plt
 from shapely.geometry import Polygon, LineString
-from shapely.geometry.polygon import orient
 from descartes import PolygonPatch
 
 
-class Node:
-    number_of_nodes = 0
+class Node(object):
+    __slots__ = ('node_num', 'x2', 'x3', 'parent_element', 'is_corner_node')
     def __init__(self, node_num, x2, x3):
-        Node.number_of_nodes += 1
         self.node_num = int(node_num)
         self.x2 = float(x2)
         self.x3 = float(x3)
-        self.coords = (self.x2,self.x3)
         self.parent_element = None
         self.is_corner_node = None
 
+    @property
+    def coords(self):
+        """The (x2, x3) coordinate pair of this node."""
+        return (self.x2,self.x3)
+
     def __str__(self):
         return "Node #{0}: ({1:10.8f}, {2:10.8f})".format(self.node_num,
             self.x2, self.x3)
 
 
-class _Element:
-    number_of_elements = 0
+# shared placeholder for nodes that are not present in an element
+# (VABS expects node_num=0 in these slots of the connectivity table)
+NULL_NODE = Node(0, 0.0, 0.0)
+
+
+def _signed_area(nodes):
+    """Returns the signed area of the polygon traced by a sequence of nodes.
+
+    The area is positive if the nodes are ordered counter-clockwise.
+
+    """
+    a = 0.0
+    for i in range(len(nodes)):
+        n0 = nodes[i-1]
+        n1 = nodes[i]
+        a += n0.x2*n1.x3 - n1.x2*n0.x3
+    return a/2.0
+
+
+def _perimeter_coords(node_coords, connectivity, element_class):
+    """Returns an array of perimeter coordinates for a group of elements.
+
+    Parameters
+    ----------
+    node_coords : np.array, shape (number_of_nodes, 2), (x2, x3) coordinates,
+        where row i holds node #(i+1)
+    connectivity : np.array, shape (n, 9), node numbers in the VABS node slots
+        of n elements that are all instances of element_class
+    element_class : a subclass of _Element
+
+    Returns an array with shape (n, number of perimeter nodes, 2).
+
+    """
+    slots = np.array(element_class.perimeter_slots) - 1
+    return node_coords[connectivity[:,slots]-1]
+
+
+def signed_areas(node_coords, connectivity, element_class):
+    """Returns the signed area of each element in a group of elements.
+
+    The area is positive if the element's nodes are ordered counter-clockwise.
+    See _perimeter_coords() for a description of the parameters.
+
+    """
+    xy = _perimeter_coords(node_coords, connectivity, element_class)
+    x = xy[:,:,0]
+    y = xy[:,:,1]
+    x_next = np.roll(x, -1, axis=1)
+    y_next = np.roll(y, -1, axis=1)
+    return 0.5*np.sum(x*y_next - x_next*y, axis=1)
+
+
+def corner_jacobians(node_coords, connectivity, element_class):
+    """Returns the Jacobian determinant at each corner of a group of elements.
+
+    At a corner, the isoparametric mapping only depends on the two edges that
+    meet there, so the Jacobian is the cross product of the edge tangents
+    (straight for linear elements, the end slope of the quadratic edge curve
+    for quadratic elements). All corner Jacobians are positive for a valid
+    counter-clockwise element.
+
+    See _perimeter_coords() for a description of the parameters.
+
+    Returns an array with shape (n, number of corners).
+
+    """
+    xy = _perimeter_coords(node_coords, connectivity, element_class)
+    if element_class.is_quadratic:
+        # perimeter alternates corner, midside, corner, midside, ...
+        c = xy[:,0::2,:]
+        m_next = xy[:,1::2,:]
+        m_prev = np.roll(m_next, 1, axis=1)
+        c_next = np.roll(c, -1, axis=1)
+        c_prev = np.roll(c, 1, axis=1)
+        t_next = (-3.0*c + 4.0*m_next - c_next)/2.0
+        t_prev = (-3.0*c + 4.0*m_prev - c_prev)/2.0
+    else:
+        c = xy
+        t_next = np.roll(c, -1, axis=1) - c
+        t_prev = np.roll(c, 1, axis=1) - c
+    return t_next[:,:,0]*t_prev[:,:,1] - t_next[:,:,1]*t_prev[:,:,0]
+
+
+def _edge_angles(node_coords, connectivity, edge_node_nums):
+    """Returns the angle (radians) of an edge in each element of a group."""
+    n0 = node_coords[connectivity[:,edge_node_nums[0]-1]-1]
+    n1 = node_coords[connectivity[:,edge_node_nums[1]-1]-1]
+    return np.arctan2(n1[:,1] - n0[:,1], n1[:,0] - n0[:,0])
+
+
+def layer_plane_angles(node_coords, connectivity, outer_edge_node_nums,
+    inner_edge_node_nums=None):
+    """Returns the layer plane angle (theta1, degrees) of each element in a
+    group of elements.
+
+    This gives the same results as calling calculate_layer_plane_angle() on
+    each element: the average angle of the outer and inner edges, or just the
+    angle of the outer edge if inner_edge_node_nums is None (triangles).
+
+    Parameters
+    ----------
+    node_coords : np.array, shape (number_of_nodes, 2), (x2, x3) coordinates,
+        where row i holds node #(i+1)
+    connectivity : np.array, shape (n, 9), node numbers in the VABS node slots
+    outer_edge_node_nums : list of 2 corner node numbers (1-4) on the outer
+        edge, e.g. [1,4]
+    inner_edge_node_nums : list of 2 corner node numbers (1-4) on the inner
+        edge, e.g. [2,3]
+
+    """
+    angle = _edge_angles(node_coords, connectivity, outer_edge_node_nums)
+    if inner_edge_node_nums is not None:
+        angle = (angle + _edge_angles(node_coords, connectivity,
+            inner_edge_node_nums))/2.0
+    theta1 = np.degrees(angle)
+    theta1[theta1 < 0.0] += 360.0
+    return theta1
+
+
+class _Element(object):
+    __slots__ = ('elem_num', 'element_set', 'theta1', 'layer_num',
+        'node1', 'node2', 'node3', 'node4', 'node5', 'node6', 'node7',
+        'node8', 'node9', 'nodes', '_outer_edge_node0', '_outer_edge_node1',
+        '_inner_edge_node0', '_inner_edge_node1', '__weakref__')
+    # node slots (1-9) listed in the order of <element>.nodes
+    node_slots = ()
+    # node slots (1-9) listed counter-clockwise around the element perimeter
+    perimeter_slots = ()
+    # for each node slot (1-9), the slot it takes its node from when the
+    # element orientation is reversed about node 1
+    reversed_slots = (1, 2, 3, 4, 5, 6, 7, 8, 9)
+    is_quadratic = False
     def __init__(self, elem_num, layer_num):
-        _Element.number_of_elements += 1
         self.elem_num = int(elem_num)
         self.element_set = None
         self.theta1 = None
         self.layer_num = layer_num
 
+    def _perimeter_nodes(self):
+        """Returns the nodes of this element in order around its perimeter."""
+        return tuple([getattr(self, 'node{0}'.format(i))
+            for i in self.perimeter_slots])
+
+    @property
+    def polygon(self):
+        """A shapely Polygon representation of this element (built on demand)."""
+        return Polygon([node.coords for node in self._perimeter_nodes()])
+
+    def reverse_nodes(self):
+        """Reverse the orientation of this element (CW <-> CCW) about node 1.
+
+        Updates the node slots (node1-node9) and <element>.nodes.
+
+        """
+        old_nodes = [getattr(self, 'node{0}'.format(i)) for i in range(1,10)]
+        for i, j in enumerate(self.reversed_slots):
+            setattr(self, 'node{0}'.format(i+1), old_nodes[j-1])
+        self.nodes = tuple([getattr(self, 'node{0}'.format(i))
+            for i in self.node_slots])
+
     def swap_nodes(self, nodeA, nodeB):
         temp = nodeA
         nodeA = nodeB
@@ -79,34 +241,36 @@ The VABS quadrilateral element node numbering scheme is shown below:
     1-------2
 
     """
-    def __init__(self, elem_num, node1, node2, node3, node4, layer_num):
+    __slots__ = ()
+    node_slots = (1, 2, 3, 4)
+    perimeter_slots = (1, 2, 3, 4)
+    reversed_slots = (1, 4, 3, 2, 5, 6, 7, 8, 9)
+    def __init__(self, elem_num, node1, node2, node3, node4, layer_num,
+        autocorrect=True):
         _Element.__init__(self, elem_num, layer_num)
         self.node1 = node1
         self.node2 = node2
         self.node3 = node3
         self.node4 = node4
         # assign node_num=0 for nodes that are not present
-        self.node5 = Node(0, 0.0, 0.0)
-        self.node6 = Node(0, 0.0, 0.0)
-        self.node7 = Node(0, 0.0, 0.0)
-        self.node8 = Node(0, 0.0, 0.0)
-        self.node9 = Node(0, 0.0, 0.0)
+        self.node5 = NULL_NODE
+        self.node6 = NULL_NODE
+        self.node7 = NULL_NODE
+        self.node8 = NULL_NODE
+        self.node9 = NULL_NODE
         self.nodes = (self.node1,self.node2,self.node3,self.node4)
         for node in self.nodes:
-            node.parent_element = self
-        # Calculate the middle coordinates of this element
-        self.x2_middle = (self.node1.x2 + self.node2.x2
-                          + self.node3.x2 + self.node4.x2)/4.0
-        self.x3_middle = (self.node1.x3 + self.node2.x3
-                          + self.node3.x3 + self.node4.x3)/4.0
-        if not self.is_ccw():      # Try to fix a bad (CW) element
-            self.reorder_nodes()   # Hopefully this makes a good (CCW) element
-            print "  Trying to fix element #{0}. Reorienting...".format(
-                self.elem_num)
-        # Check if the element actually has CCW orientation
-        if not self.is_ccw():
-            fmt = "Element #{:d} is bad! Its nodes are not oriented CCW."
-            raise Warning(fmt.format(self.elem_num))
+            node.parent_element = weakref.proxy(self)
+        if autocorrect:
+            # (for whole meshes, use AbaqusGrid.check_orientation() instead)
+            if not self.is_ccw():      # Try to fix a bad (CW) element
+                self.reorder_nodes()   # Hopefully this makes a good (CCW) element
+                print "  Trying to fix element #{0}. Reorienting...".format(
+                    self.elem_num)
+            # Check if the element actually has CCW orientation
+            if not self.is_ccw():
+                fmt = "Element #{:d} is bad! Its nodes are not oriented CCW."
+                raise Warning(fmt.format(self.elem_num))
 
     def __str__(self):
         return """Element #{0} -----
@@ -115,6 +279,18 @@ The VABS quadrilateral element node numbering scheme is shown below:
             self.node1.node_num, self.node2.node_num, self.node3.node_num,
             self.node4.node_num, self.layer_num)
 
+    @property
+    def x2_middle(self):
+        """The middle x2-coordinate of this element."""
+        return (self.node1.x2 + self.node2.x2
+                + self.node3.x2 + self.node4.x2)/4.0
+
+    @property
+    def x3_middle(self):
+        """The middle x3-coordinate of this element."""
+        return (self.node1.x3 + self.node2.x3
+                + self.node3.x3 + self.node4.x3)/4.0
+
     def plot(self, equal_aspect_ratio=True, plot_centroid=True,
         label_nodes=True, label_element=True, plot_outer_inner_edges=True):
         """Plot this element."""
@@ -268,6 +444,7 @@ elem1.is_ccw(print_flag=True)
                                                            self.node4.node_num)
         # Reorder the nodes in a counter-clockwise fashion.
         (self.node2,self.node4) = self.swap_nodes(self.node2,self.node4)
+        self.nodes = (self.node1,self.node2,self.node3,self.node4)
         if print_flag:
             print "AFTER:"
             print "  node2: #{:d},    node4: #{:d}".format(self.node2.node_num,
@@ -286,69 +463,31 @@ The VABS quadrilateral element node numbering scheme is shown below:
 The central node (9) is optional.
 
     """
+    __slots__ = ()
+    node_slots = (1, 2, 3, 4, 5, 6, 7, 8)
+    perimeter_slots = (1, 5, 2, 6, 3, 7, 4, 8)
+    reversed_slots = (1, 4, 3, 2, 8, 7, 6, 5, 9)
+    is_quadratic = True
     def __init__(self, elem_num, node1, node2, node3, node4, node5, node6,
         node7, node8, layer_num, autocorrect=True):
         _Element.__init__(self, elem_num, layer_num)
-        # create a polygon representation
-        p = Polygon([
-            node1.coords, 
-            node5.coords, 
-            node2.coords, 
-            node6.coords, 
-            node3.coords,
-            node7.coords,
-            node4.coords,
-            node8.coords
-            ])
-        if autocorrect:
-            p_ccw = orient(p)
-            self.polygon = p_ccw
-            # find each node that matches each polygon point
-            node_list = []
-            for point in p_ccw.exterior.coords[:-1]:
-                if point == node1.coords:
-                    node_list.append(node1)
-                elif point == node2.coords:
-                    node_list.append(node2)
-                elif point == node3.coords:
-                    node_list.append(node3)
-                elif point == node4.coords:
-                    node_list.append(node4)
-                elif point == node5.coords:
-                    node_list.append(node5)
-                elif point == node6.coords:
-                    node_list.append(node6)
-                elif point == node7.coords:
-                    node_list.append(node7)
-                elif point == node8.coords:
-                    node_list.append(node8)
-                else:
-                    raise Warning("No point match found!")
-            # assign the nodes in a proper CCW-orientation
-            self.node1 = node_list[0]
-            self.node5 = node_list[1]
-            self.node2 = node_list[2]
-            self.node6 = node_list[3]
-            self.node3 = node_list[4]
-            self.node7 = node_list[5]
-            self.node4 = node_list[6]
-            self.node8 = node_list[7]
-        else:
-            self.polygon = p
-            self.node1 = node1
-            self.node2 = node2
-            self.node3 = node3
-            self.node4 = node4
-            self.node5 = node5
-            self.node6 = node6
-            self.node7 = node7
-            self.node8 = node8
+        self.node1 = node1
+        self.node2 = node2
+        self.node3 = node3
+        self.node4 = node4
+        self.node5 = node5
+        self.node6 = node6
+        self.node7 = node7
+        self.node8 = node8
         # assign node_num=0 for nodes that are not present
-        self.node9 = Node(0, 0.0, 0.0)
+        self.node9 = NULL_NODE
         self.nodes = (self.node1,self.node2,self.node3,self.node4,self.node5,
             self.node6,self.node7,self.node8)
+        if autocorrect and _signed_area(self._perimeter_nodes()) < 0.0:
+            # reverse the node order (about node 1) to get a CCW-orientation
+            self.reverse_nodes()
         for node in self.nodes:
-            node.parent_element = self
+            node.parent_element = weakref.proxy(self)
 
     def __str__(self):
         return """Element #{0} -----
@@ -417,29 +556,26 @@ The VABS triangular element node numbering scheme is shown below:
     1-------2
 
     """
+    __slots__ = ()
+    node_slots = (1, 2, 3)
+    perimeter_slots = (1, 2, 3)
+    reversed_slots = (1, 3, 2, 4, 5, 6, 7, 8, 9)
     def __init__(self, elem_num, node1, node2, node3, layer_num):
         _Element.__init__(self, elem_num, layer_num)
-        # create a polygon representation
-        p = Polygon([
-            node1.coords, 
-            node2.coords, 
-            node3.coords
-            ])
-        self.polygon = p
         self.node1 = node1
         self.node2 = node2
         self.node3 = node3
         # assign node_num=0 for nodes that are not present
-        self.node4 = Node(0, 0.0, 0.0)
-        self.node5 = Node(0, 0.0, 0.0)
-        self.node6 = Node(0, 0.0, 0.0)
-        self.node7 = Node(0, 0.0, 0.0)
-        self.node8 = Node(0, 0.0, 0.0)
-        self.node9 = Node(0, 0.0, 0.0)
+        self.node4 = NULL_NODE
+        self.node5 = NULL_NODE
+        self.node6 = NULL_NODE
+        self.node7 = NULL_NODE
+        self.node8 = NULL_NODE
+        self.node9 = NULL_NODE
         self.nodes = (self.node1,self.node2,self.node3)
         for node in self.nodes:
-            node.parent_element = self
-        
+            node.parent_element = weakref.proxy(self)
+
     def __str__(self):
         return """Element #{0} -----
   Nodes({1}, {2}, {3})
@@ -469,62 +605,32 @@ The VABS triangular element node numbering scheme is shown below:
     1---5---2
 
     """
+    __slots__ = ()
+    node_slots = (1, 2, 3, 5, 6, 7)
+    perimeter_slots = (1, 5, 2, 6, 3, 7)
+    reversed_slots = (1, 3, 2, 4, 7, 6, 5, 8, 9)
+    is_quadratic = True
     def __init__(self, elem_num, node1, node2, node3, node5, node6, node7,
         layer_num, autocorrect=True):
         _Element.__init__(self, elem_num, layer_num)
-        # create a polygon representation
-        p = Polygon([
-            node1.coords, 
-            node5.coords, 
-            node2.coords, 
-            node6.coords, 
-            node3.coords,
-            node7.coords
-            ])
-        if autocorrect:
-            p_ccw = orient(p)
-            self.polygon = p_ccw
-            # find each node that matches each polygon point
-            node_list = []
-            for point in p_ccw.exterior.coords[:-1]:
-                if point == node1.coords:
-                    node_list.append(node1)
-                elif point == node2.coords:
-                    node_list.append(node2)
-                elif point == node3.coords:
-                    node_list.append(node3)
-                elif point == node5.coords:
-                    node_list.append(node5)
-                elif point == node6.coords:
-                    node_list.append(node6)
-                elif point == node7.coords:
-                    node_list.append(node7)
-                else:
-                    raise Warning("No point match found!")
-            # assign the nodes in a proper CCW-orientation
-            self.node1 = node_list[0]
-            self.node5 = node_list[1]
-            self.node2 = node_list[2]
-            self.node6 = node_list[3]
-            self.node3 = node_list[4]
-            self.node7 = node_list[5]
-        else:
-            self.polygon = p
-            self.node1 = node1
-            self.node2 = node2
-            self.node3 = node3
-            self.node5 = node5
-            self.node6 = node6
-            self.node7 = node7
+        self.node1 = node1
+        self.node2 = node2
+        self.node3 = node3
+        self.node5 = node5
+        self.node6 = node6
+        self.node7 = node7
         # assign node_num=0 for nodes that are not present
-        self.node4 = Node(0, 0.0, 0.0)
-        self.node8 = Node(0, 0.0, 0.0)
-        self.node9 = Node(0, 0.0, 0.0)
+        self.node4 = NULL_NODE
+        self.node8 = NULL_NODE
+        self.node9 = NULL_NODE
         self.nodes = (self.node1,self.node2,self.node3,self.node5,self.node6,
             self.node7)
+        if autocorrect and _signed_area(self._perimeter_nodes()) < 0.0:
+            # reverse the node order (about node 1) to get a CCW-orientation
+            self.reverse_nodes()
         for node in self.nodes:
-            node.parent_element = self
-        
+            node.parent_element = weakref.proxy(self)
+
     def __str__(self):
         return """Element #{0} -----
   Nodes({1}, {2}, {3}, {4}, {5}, {6})
@@ -594,3 +700,8 @@ The VABS triangular element node numbering scheme is shown below:
         self.theta1 = np.degrees(outer_angle)
         if self.theta1 < 0.0:
             self.theta1 += 360.0
+
+
+# element classes, indexed by the integer codes in AbaqusGrid.element_types
+ELEMENT_TYPES = (QuadrilateralLinearElement, QuadrilateralQuadraticElement,
+    TriangularLinearElement, TriangularQuadraticElement)
@@ -7,6 +7,7 @@ Last updated: October 11, 2013
 
 
 import os
+import weakref
 import numpy as np
 from shapely.geometry import asLineString, Point, LineString
 from shapely.affinity import translate
@@ -40,7 +41,7 @@ class Layer:
         face_color='#FF0000', edge_color='#000000'):
         self.polygon = polygon
         self.material = material
-        self.parent_part = parent_part
+        self.parent_part = weakref.proxy(parent_part)
         self.name = name
         self.mass = self.polygon.area*self.material.rho  # mass per unit length
         self.left = None  # saved later by <part>.get_and_save_edges()
@@ -0,0 +1,321 @@
+"""Assign layer plane angles from a shared element set rule table, and write
+the VABS input files for every meshed station of a blade in one process.
+
+Each element set name (from TrueGrid) is matched against a table of name
+patterns, which tells us which edges of its elements face outward and inward:
+
+  edges         outer_edge_node_nums   inner_edge_node_nums
+  'LE'          [1,4]                  [2,3]
+  'TE'          [3,2]                  [4,1]
+  'lower'       [2,1]                  [3,4]
+  'upper'       [4,3]                  [1,2]
+  'tri_lower'   [2,1]                  (triangles only have an outer edge)
+  'tri_upper'   [3,2]
+  'tri_lower2'  [3,1]
+  'tri_upper2'  [2,3]
+
+DEFAULT_RULES (below) is shared by all stations of all blades. Station-specific
+exceptions are read from each blade's 'layer_plane_angle_rules.csv' file:
+  first station,last station,element set,edges
+(the element set may be a pattern). Triangular elements that must be split off
+from their quadrilateral element set, and elements that copy theta1 from a
+neighbor, are read from each blade's 'element_fixes.csv' file:
+  station,element number,element set,theta1 from element
+
+The element fixes refer to TrueGrid element numbers, so they are skipped for
+transfinite meshes (see transfinite_mesh.py), whose element sets are all
+named 'tf_*' and need no fixes.
+
+A station that has the same mesh as a station of another blade (biplane
+stations 1-9, 25, and 28-40 are Sandia stations 1-9, 21, and 22-34) repeats
+that station's rows of both files, in the same order, so that both blades
+write the same VABS input file for it (and share it in the station store).
+
+Patterns use shell-style wildcards (see the fnmatch module). The first rule
+that matches an element set name wins, and station-specific exceptions are
+checked before DEFAULT_RULES.
+
+Usage:
+import lib.layer_plane_angles as lpa
+lpa.write_vabs_input_files('sandia_blade')   # all meshed stations
+lpa.write_vabs_input_files('biplane_blade', station_nums=[10,11])
+# skip stations that are already in the station store (see station_store.py)
+lpa.write_vabs_input_files('biplane_blade', store_path='station_store')
+# or, for a single grid:
+g = au.AbaqusGrid('sandia_blade/stn20/mesh_stn20.abq')
+lpa.assign_layer_plane_angles(g, 'sandia_blade', 20)
+
+Last updated: May 12, 2014
+
+"""
+
+
+import os
+import glob
+import fnmatch
+import numpy as np
+import pandas as pd
+import abaqus_utils2 as au
+import vabs_utils as vu
+import station_store as ss
+reload(au)
+reload(vu)
+reload(ss)
+
+
+# outer and inner edge node numbers for each edge type
+EDGES = {
+    'LE':         ([1,4], [2,3]),
+    'TE':         ([3,2], [4,1]),
+    'lower':      ([2,1], [3,4]),
+    'upper':      ([4,3], [1,2]),
+    'tri_lower':  ([2,1], None),
+    'tri_upper':  ([3,2], None),
+    'tri_lower2': ([3,1], None),
+    'tri_upper2': ([2,3], None)
+    }
+
+# element set name patterns shared by all stations, (edges, [patterns])
+DEFAULT_RULES = [
+    # transfinite meshes: node 1 -> node 2 runs along the layer in every
+    #   element (see transfinite_mesh.py)
+    ('tri_lower', ['tf_*_tri']),
+    ('lower', ['tf_*']),
+    # triangular elements (split off from quadrilateral element sets)
+    ('tri_lower', ['*l_tri', '*tel?_tri', '*lap?_tri', 'tefoaml?_tri',
+                   'teunil?_tri', 'is3ttl1t']),
+    ('tri_upper', ['*u_tri', '*teu?_tri', '*uap?_tri', 'tefoamu?_tri',
+                   'teuniu?_tri', 'is3ttu1t', 'tefoamt']),
+    # leading edge panel, shear web 1, and the LE side of the spar caps
+    ('LE', ['lepanel', 'sw1*', 'is1*', 'is2?rsw1', '*le', '*ll', '*ul',
+            'tefoamu', 'teuniaxu']),
+    # shear webs 2 and 3, and the trailing edge
+    ('TE', ['sw2*', 'sw3*', 'is2?lsw2', 'is3??sw?', 'is4??sw3', '*te', '*tet',
+            'tefoam', 'teuniax', 'teuniaxl', 'teuniaxt']),
+    # lower surface
+    ('lower', ['*lower', '*lap?', '*bsw?', '*tel?', '*tel', '*lel', '*lr',
+               '*scl', '*al?', '*fl?', 'tefoaml*', 'teunil?']),
+    # upper surface
+    ('upper', ['*upper', '*uap?', '*asw?', '*teu?', '*teu', '*leu', '*ur',
+               '*scu', '*au?', '*fu?', 'tefoamu?', 'teuniu?'])
+    ]
+
+
+def read_rule_table(blade_path):
+    """Returns the station-specific rules for a blade as a DataFrame, or None
+    if the blade doesn't have a 'layer_plane_angle_rules.csv' file."""
+    filename = os.path.join(blade_path, 'layer_plane_angle_rules.csv')
+    if os.path.exists(filename):
+        return pd.read_csv(filename)
+    else:
+        return None
+
+
+def read_element_fixes(blade_path):
+    """Returns the element fixes for a blade as a DataFrame, or None if the
+    blade doesn't have an 'element_fixes.csv' file."""
+    filename = os.path.join(blade_path, 'element_fixes.csv')
+    if os.path.exists(filename):
+        return pd.read_csv(filename)
+    else:
+        return None
+
+
+def station_rules(station_num, rule_table=None):
+    """Returns the ordered list of (pattern, edges) rules for one station.
+
+    Rules from rule_table (see read_rule_table) for this station come first,
+    followed by DEFAULT_RULES.
+
+    """
+    rules = []
+    if rule_table is not None:
+        t = rule_table[(rule_table['first station'] <= station_num) &
+                       (rule_table['last station'] >= station_num)]
+        rules.extend(zip(t['element set'], t['edges']))
+    for (edges, patterns) in DEFAULT_RULES:
+        rules.extend([(pattern, edges) for pattern in patterns])
+    for (pattern, edges) in rules:
+        if edges not in EDGES:
+            raise Warning("Unknown edges '{0}' for element set '{1}'".format(
+                edges, pattern))
+    return rules
+
+
+def classify_element_sets(element_set_names, rules):
+    """Match element set names against the rules.
+
+    Returns a dict that maps each edge type to a list of element set names.
+    Raises a Warning if any element set name doesn't match a rule.
+
+    """
+    groups = {}
+    unmatched = []
+    for name in element_set_names:
+        for (pattern, edges) in rules:
+            if fnmatch.fnmatchcase(name, pattern):
+                groups.setdefault(edges, []).append(name)
+                break
+        else:
+            unmatched.append(name)
+    if len(unmatched) > 0:
+        raise Warning("No layer plane angle rule for the element sets {0}".format(unmatched))
+    return groups
+
+
+def is_transfinite_mesh(grid):
+    """Returns True if a grid was written by transfinite_mesh.py (all of its
+    element sets are named 'tf_*')."""
+    return (len(grid.element_set_names) > 0 and
+        all(name.startswith('tf_') for name in grid.element_set_names))
+
+
+def assign_layer_plane_angles(grid, blade_path, station_num, rule_table=None,
+    element_fixes=None):
+    """Assign the layer plane angle (theta1) of every element in a grid.
+
+    Parameters
+    ----------
+    grid : au.AbaqusGrid, the grid for this station
+    blade_path : str, the blade directory, e.g. 'sandia_blade'
+    station_num : int, the station number
+    rule_table, element_fixes : DataFrames from read_rule_table() and
+        read_element_fixes(); they are read from blade_path if not given
+        (the element fixes are not used for transfinite meshes)
+
+    Returns a dict that maps each edge type to a list of element set names.
+
+    """
+    if rule_table is None:
+        rule_table = read_rule_table(blade_path)
+    if element_fixes is None:
+        element_fixes = read_element_fixes(blade_path)
+    if element_fixes is not None and not is_transfinite_mesh(grid):
+        fixes = element_fixes[element_fixes['station'] == station_num]
+    else:
+        # (the fixes use TrueGrid element numbers)
+        fixes = None
+    # split off triangular elements into their own element sets
+    if fixes is not None:
+        for (name, f) in fixes.groupby('element set'):
+            grid.assign_element_set(f['element number'].values, name)
+    # calculate the angles of whole groups of element sets at once
+    names = [name for name in grid.element_set_names
+             if len(grid.element_set_index[name]) > 0]
+    groups = classify_element_sets(names, station_rules(station_num,
+        rule_table))
+    for (edges, group_names) in groups.items():
+        (outer_edge_node_nums, inner_edge_node_nums) = EDGES[edges]
+        grid.calculate_layer_plane_angles(grid.element_set_rows(group_names),
+            outer_edge_node_nums=outer_edge_node_nums,
+            inner_edge_node_nums=inner_edge_node_nums)
+    missing = np.nonzero(grid.element_set_codes < 0)[0]
+    if len(missing) > 0:
+        raise Warning("Elements {0} have no element set!".format(
+            [grid.list_of_elements[i].elem_num for i in missing]))
+    # manually correct the theta1 values of some elements
+    if fixes is not None:
+        copies = fixes.dropna(subset=['theta1 from element'])
+        for (num, from_num) in zip(copies['element number'],
+            copies['theta1 from element']):
+            grid.list_of_elements[int(num)-1].theta1 = \
+                grid.list_of_elements[int(from_num)-1].theta1
+    return groups
+
+
+def write_vabs_input_files(blade_path, station_nums=None, flags=None,
+    check_mesh=True, debug_flag=False, store_path=None):
+    """Write the VABS input file for every meshed station of a blade.
+
+    The material, layer, and rule tables are read once, and each station's
+    grid file 'stnXX/mesh_stnXX.abq' is translated to 'stnXX/mesh_stnXX.vabs'.
+    If a station raises a Warning (e.g. a bad mesh, or an element set without
+    a rule), its message is printed, no file is written for it, and the
+    remaining stations are still processed. A station's old VABS output file
+    ('stnXX/mesh_stnXX.vabs.K') is deleted when its VABS input file changes.
+
+    If store_path is given, stations whose VABS input file is already in the
+    station store (see station_store.py) are fetched from the store instead
+    of being written again, and each new VABS input file is added to the store.
+
+    Parameters
+    ----------
+    blade_path : str, the blade directory, e.g. 'sandia_blade'
+    station_nums : list of ints, the stations to write (default: all stations
+        with a grid file)
+    flags : dict, VABS flags (default: the VabsInputFile defaults)
+    check_mesh : bool, check the mesh quality before writing each file
+    debug_flag : bool, print intermediate results to the screen
+    store_path : str, the station store directory (default: don't use a store)
+
+    Returns a list of the VABS input filenames that were written or fetched.
+
+    """
+    material_filename = os.path.join(blade_path, 'materials.csv')
+    layer_filename = os.path.join(blade_path, 'layers.csv')
+    material_table = pd.read_csv(material_filename)
+    layer_table = pd.read_csv(layer_filename)
+    rule_table = read_rule_table(blade_path)
+    element_fixes = read_element_fixes(blade_path)
+    if station_nums is None:
+        grid_files = sorted(glob.glob(os.path.join(blade_path, 'stn[0-9][0-9]',
+            'mesh_stn[0-9][0-9].abq')))
+        station_nums = [int(os.path.basename(f)[8:10]) for f in grid_files]
+    if store_path is not None:
+        all_inputs = ss.blade_station_inputs(blade_path,
+            material_filename=material_filename, layer_filename=layer_filename)
+    kwargs = {}
+    if flags is not None:
+        kwargs['flags'] = flags
+    list_of_vabs_filenames = []
+    list_of_failed_stations = []
+    for station_num in station_nums:
+        stn_str = 'stn{0:02d}'.format(station_num)
+        grid_filename = os.path.join(blade_path, stn_str,
+            'mesh_' + stn_str + '.abq')
+        vabs_filename = os.path.join(blade_path, stn_str,
+            'mesh_' + stn_str + '.vabs')
+        if (store_path is not None and
+            ss.is_stored(all_inputs[station_num], '.vabs', store_path,
+                os.path.join(blade_path, stn_str), station_num)):
+            ss.fetch_station(os.path.join(blade_path, stn_str), station_num,
+                all_inputs[station_num], store_path)
+            print " Found VABS input file in the store: " + vabs_filename
+            list_of_vabs_filenames.append(vabs_filename)
+            continue
+        K_filename = vabs_filename + '.K'
+        old_hash = (ss.file_hash(vabs_filename)
+            if os.path.exists(vabs_filename) else None)
+        try:
+            g = au.AbaqusGrid(grid_filename, debug_flag=debug_flag)
+            assign_layer_plane_angles(g, blade_path, station_num,
+                rule_table=rule_table, element_fixes=element_fixes)
+            vu.VabsInputFile(
+                vabs_filename=vabs_filename,
+                grid=g,
+                material_filename=material_filename,
+                layer_filename=layer_filename,
+                debug_flag=debug_flag,
+                check_mesh=check_mesh,
+                material_table=material_table,
+                layer_table=layer_table,
+                **kwargs)
+        except Warning as w:
+            print " FAILED station #{0:02d}: {1}".format(station_num, w)
+            list_of_failed_stations.append(station_num)
+            continue
+        print " Wrote VABS input file: " + vabs_filename
+        if (os.path.exists(K_filename) and
+            ss.file_hash(vabs_filename) != old_hash):
+            # the old VABS output file doesn't match the new input file, so
+            #   it must not be stored (or used) under the new file's key
+            os.remove(K_filename)
+            print " Deleted old VABS output file: " + K_filename
+        if store_path is not None:
+            ss.store_station(os.path.join(blade_path, stn_str), station_num,
+                all_inputs[station_num], store_path)
+        list_of_vabs_filenames.append(vabs_filename)
+    if len(list_of_failed_stations) > 0:
+        print " No VABS input file was written for stations {0}".format(
+            list_of_failed_stations)
+    return list_of_vabs_filenames
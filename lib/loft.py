@@ -0,0 +1,412 @@
+"""Loft a triangulated 3D surface through the airfoils of a blade.
+
+Every airfoil in a lofted run is resampled to the same parametrization (the
+same number of points on each side of the LE, cosine-spaced by arc length, so
+they bunch up at the LE and TE). Then point j of one station can be joined to
+point j of the next, and the whole run of stations becomes one array with
+shape (number of stations, number of points, 3). The twist and the (x2, x3)
+offset of every station are applied to that array in one vectorized
+transform, and the faces are built from index arithmetic, not station by
+station.
+
+A surface is made of named parts:
+  monoplane stations : 'skin', 'shear web 1', 'shear web 2', 'shear web 3'
+  biplane stations   : 'lower skin', 'upper skin', 'lower shear web 1', ...
+A part is lofted through each run of consecutive stations that have it, so
+the skin of a biplane blade is three separate runs (root, lower and upper
+biplane, and outboard), and each shear web is a thin box through the corners
+of its cross-section. Each run is closed with flat caps at both ends (unless
+caps=False), so every run is watertight.
+
+The surface is written in one buffered write per file, as binary STL (for
+CAD and 3D printing), Wavefront OBJ (text; there is no binary OBJ format, but
+the whole file is formatted at once), or binary legacy VTK (for Paraview), and
+plotted in Mayavi as one triangular mesh, colored by part.
+
+Usage:
+import lib.blade as bl
+import lib.loft as lf
+b = bl.MonoplaneBlade('Sandia blade SNL100-00', 'sandia_blade')
+s = lf.blade_surface(b)
+s.write('sandia_blade/blade.stl')   # or '.obj' or '.vtk'
+s.plot()
+mlab.show()
+
+Last updated: May 13, 2014
+
+"""
+
+
+import struct
+import numpy as np
+import transformation as tf
+import airfoil_utils as afu
+reload(tf)
+reload(afu)
+from mayavi import mlab
+
+
+# shear web numbers, for the part names
+SW_NUMS = [1, 2, 3]
+
+
+class Surface:
+    """A triangulated surface, made of named parts.
+
+    Attributes
+    ----------
+    vertices : np.array, shape (number_of_vertices, 3), (x1, x2, x3) coords
+    faces : np.array, shape (number_of_faces, 3), vertex indices (from 0),
+        counterclockwise when seen from outside
+    part_names : list of str, the name of each part
+    face_parts : np.array, the part index of each face
+    vertex_parts : np.array, the part index of each vertex (parts don't share
+        vertices)
+
+    """
+    def __init__(self):
+        self.vertices = np.zeros((0,3))
+        self.faces = np.zeros((0,3), dtype=int)
+        self.part_names = []
+        self.face_parts = np.zeros((0,), dtype=int)
+        self.vertex_parts = np.zeros((0,), dtype=int)
+
+    def __str__(self):
+        return "Surface: {0} vertices, {1} faces, parts: {2}".format(
+            len(self.vertices), len(self.faces), ', '.join(self.part_names))
+
+    def add(self, name, vertices, faces):
+        """Add a new piece of the part called name (vertex indices in faces
+        count from 0 within this piece)."""
+        if name not in self.part_names:
+            self.part_names.append(name)
+        part = self.part_names.index(name)
+        offset = len(self.vertices)
+        self.vertices = np.vstack((self.vertices, vertices))
+        self.faces = np.vstack((self.faces, np.asarray(faces) + offset))
+        self.face_parts = np.concatenate((self.face_parts,
+            np.ones(len(faces), dtype=int)*part))
+        self.vertex_parts = np.concatenate((self.vertex_parts,
+            np.ones(len(vertices), dtype=int)*part))
+
+    def normals(self):
+        """Returns the unit normal of each face, shape (number_of_faces, 3)."""
+        (a, b, c) = (self.vertices[self.faces[:,i]] for i in range(3))
+        n = np.cross(b - a, c - a)
+        length = np.sqrt(np.sum(n**2, axis=1))
+        length[length == 0.0] = 1.0
+        return n/length[:,np.newaxis]
+
+    def area(self):
+        """Returns the total area of all the faces."""
+        (a, b, c) = (self.vertices[self.faces[:,i]] for i in range(3))
+        return 0.5*np.sum(np.sqrt(np.sum(np.cross(b - a, c - a)**2, axis=1)))
+
+    def write(self, filename):
+        """Write the surface to a .stl, .obj, or .vtk file (by extension)."""
+        ext = filename.lower().rsplit('.', 1)[-1]
+        if ext == 'stl':
+            self.write_stl(filename)
+        elif ext == 'obj':
+            self.write_obj(filename)
+        elif ext == 'vtk':
+            self.write_vtk(filename)
+        else:
+            raise ValueError("Can't write '{0}'! Use a .stl, .obj, or .vtk file.".format(filename))
+
+    def write_stl(self, filename, header='spardesign2 blade surface'):
+        """Write the surface to a binary STL file.
+
+        The attribute word of each facet holds its part index.
+
+        """
+        facets = np.zeros(len(self.faces), dtype=[('normal', '<f4', (3,)),
+            ('vertices', '<f4', (3,3)), ('attribute', '<u2')])
+        facets['normal'] = self.normals()
+        facets['vertices'] = self.vertices[self.faces]
+        facets['attribute'] = self.face_parts
+        f = open(filename, 'wb')
+        f.write(header[:80].ljust(80, ' ') + struct.pack('<I', len(facets)) +
+            facets.tostring())
+        f.close()
+
+    def write_obj(self, filename):
+        """Write the surface to a Wavefront OBJ file, with one group per part.
+        """
+        lines = ['# spardesign2 blade surface\n',
+            ('v %.9g %.9g %.9g\n'*len(self.vertices)) %
+            tuple(self.vertices.ravel())]
+        for (part, name) in enumerate(self.part_names):
+            faces = self.faces[self.face_parts == part] + 1
+            lines.append('g {0}\n'.format(name.replace(' ', '_')))
+            lines.append(('f %d %d %d\n'*len(faces)) % tuple(faces.ravel()))
+        f = open(filename, 'w')
+        f.write(''.join(lines))
+        f.close()
+
+    def write_vtk(self, filename, title='spardesign2 blade surface'):
+        """Write the surface to a binary legacy VTK file (POLYDATA), with the
+        part index of each face as cell data."""
+        n = len(self.faces)
+        polygons = np.column_stack((np.ones(n, dtype=int)*3, self.faces))
+        f = open(filename, 'wb')
+        f.write(''.join([
+            '# vtk DataFile Version 3.0\n{0}\nBINARY\n'.format(title[:255]),
+            'DATASET POLYDATA\n',
+            'POINTS {0} float\n'.format(len(self.vertices)),
+            self.vertices.astype('>f4').tostring(),
+            '\nPOLYGONS {0} {1}\n'.format(n, 4*n),
+            polygons.astype('>i4').tostring(),
+            '\nCELL_DATA {0}\nSCALARS part int 1\nLOOKUP_TABLE default\n'.format(
+                n),
+            self.face_parts.astype('>i4').tostring(),
+            '\n']))
+        f.close()
+
+    def plot(self, colormap='Set2', opacity=1.0, representation='surface'):
+        """Plot the whole surface as one Mayavi mesh, colored by part.
+
+        Returns the mlab surface, e.g. to change its properties later.
+
+        """
+        v = self.vertices
+        return mlab.triangular_mesh(v[:,0], v[:,1], v[:,2], self.faces,
+            scalars=self.vertex_parts.astype(float), colormap=colormap,
+            vmin=0.0, vmax=max(len(self.part_names)-1, 1), opacity=opacity,
+            representation=representation)
+
+
+def _LE_index(P):
+    """Returns the index of the LE (the first point with the smallest x)."""
+    return int(np.argmin(P[:,0]))
+
+
+def common_parametrization(P, points_per_side, LE_index=None):
+    """Resample a closed airfoil curve to a fixed number of points.
+
+    Parameters
+    ----------
+    P : np.array, shape (n, 2), the airfoil coords, from the TE around the LE
+        and back to the TE
+    points_per_side : int, the number of points on each side of the LE
+        (including the LE and the TE)
+    LE_index : int, the index of the LE point in P (default: the first point
+        with the smallest x)
+
+    Returns an array with shape (2*points_per_side - 1, 2): the first
+    points_per_side points run from the TE to the LE, the rest back to the TE.
+    Points are cosine-spaced by arc length on each side.
+
+    """
+    i = _LE_index(P) if LE_index is None else LE_index
+    u = 0.5*(1.0 - np.cos(np.pi*np.linspace(0.0, 1.0, points_per_side)))
+    sides = []
+    for side in (P[:i+1], P[i:]):
+        s = afu.arc_lengths(side)
+        t = u*s[-1]
+        sides.append(np.column_stack((np.interp(t, s, side[:,0]),
+            np.interp(t, s, side[:,1]))))
+    return np.vstack((sides[0], sides[1][1:]))
+
+
+def place_sections(Q, x1, x2, x3, twist):
+    """Twist and offset a stack of sections, all at once.
+
+    Parameters
+    ----------
+    Q : np.array, shape (number_of_stations, number_of_points, 2), the
+        (chordwise, flapwise) coords of each section, about the pitch axis
+    x1, x2, x3 : np.arrays, the spanwise coordinate and the offsets of each
+        station
+    twist : np.array, the twist angle of each station [deg] (zeros for no
+        twist)
+
+    Returns an array with shape (number_of_stations, number_of_points, 3).
+
+    """
+    (x1, x2, x3, twist) = (np.asarray(a, dtype=float)[:,np.newaxis]
+        for a in (x1, x2, x3, twist))
+    (y, z) = tf.rotate_coords(Q[:,:,0], Q[:,:,1], twist)
+    x = np.ones_like(y)*x1
+    return np.dstack((x, y + x2, z + x3))
+
+
+def loft_faces(number_of_sections, number_of_points, ccw=True):
+    """Returns the triangles (shape (2*(s-1)*p, 3)) that join the closed
+    loops of a stack of s sections, with p points each.
+
+    Vertex (i, j) of the stack is number i*p + j. The faces point outward if
+    the loops are counterclockwise in the (chordwise, flapwise) plane (ccw),
+    and are flipped otherwise.
+
+    """
+    (s, p) = (number_of_sections, number_of_points)
+    i = np.arange(s-1)[:,np.newaxis]
+    j = np.arange(p)[np.newaxis,:]
+    a = (i*p + j).ravel()
+    b = (i*p + (j+1) % p).ravel()
+    c = ((i+1)*p + (j+1) % p).ravel()
+    d = ((i+1)*p + j).ravel()
+    if ccw:
+        return np.vstack((np.column_stack((a, b, c)),
+                          np.column_stack((a, c, d))))
+    return np.vstack((np.column_stack((a, c, b)),
+                      np.column_stack((a, d, c))))
+
+
+def _signed_area(P):
+    """Returns the signed area of a closed loop (positive if
+    counterclockwise)."""
+    (x, y) = (P[:,0], P[:,1])
+    return 0.5*np.sum(x*np.roll(y, -1) - np.roll(x, -1)*y)
+
+
+def loft(sections, x1, x2, x3, twist, caps=True):
+    """Loft a triangulated surface through a stack of sections.
+
+    Parameters
+    ----------
+    sections : np.array, shape (number_of_stations, number_of_points, 2),
+        closed loops with the same parametrization (see
+        common_parametrization), about the pitch axis
+    x1, x2, x3, twist : np.arrays, one value per station (see
+        place_sections)
+    caps : bool, do/don't close both ends with a fan of triangles around the
+        middle of the section
+
+    Returns (vertices, faces).
+
+    """
+    (s, p) = sections.shape[:2]
+    ccw = _signed_area(sections[0]) > 0.0
+    vertices = place_sections(sections, x1, x2, x3, twist).reshape(s*p, 3)
+    faces = loft_faces(s, p, ccw)
+    if caps:
+        centers = np.array([vertices[:p].mean(axis=0),
+            vertices[-p:].mean(axis=0)])
+        j = np.arange(p)
+        jn = (j+1) % p
+        (root, tip) = (s*p, s*p + 1)
+        # the root cap faces -x1, the tip cap faces +x1
+        if ccw:
+            root_faces = np.column_stack((np.ones(p, dtype=int)*root, jn, j))
+            tip_faces = np.column_stack((np.ones(p, dtype=int)*tip,
+                (s-1)*p + j, (s-1)*p + jn))
+        else:
+            root_faces = np.column_stack((np.ones(p, dtype=int)*root, j, jn))
+            tip_faces = np.column_stack((np.ones(p, dtype=int)*tip,
+                (s-1)*p + jn, (s-1)*p + j))
+        vertices = np.vstack((vertices, centers))
+        faces = np.vstack((faces, root_faces, tip_faces))
+    return (vertices, faces)
+
+
+def web_corners(P, left, right):
+    """Returns the corners of a shear web cross-section, shape (4, 2):
+    lower left, lower right, upper right, upper left (as in
+    <Station>.find_SW_cs_coords(), but without changing the airfoil).
+
+    P is the airfoil curve (meters), and left and right are the chordwise
+    coords of the web edges.
+
+    """
+    i = _LE_index(P)
+    x = np.array([left, right], dtype=float)
+    y = []
+    for side in (P[:i+1][::-1], P[i:]):
+        y.append(np.interp(x, side[:,0], side[:,1]))
+    (lower, upper) = (np.minimum(y[0], y[1]), np.maximum(y[0], y[1]))
+    return np.array([[left,  lower[0]],
+                     [right, lower[1]],
+                     [right, upper[1]],
+                     [left,  upper[0]]])
+
+
+def _coords_array(coords):
+    return np.column_stack((coords['x'], coords['y'])).astype(float)
+
+
+def _station_parts(station, points_per_side, SW):
+    """Returns {part name: section (np.array, shape (p, 2))} for one station.
+    """
+    st = station.structure
+    af = station.airfoil
+    if station.type == 'monoplane':
+        airfoils = [('', _coords_array(af.coords))]
+    else:
+        airfoils = [('lower ', _coords_array(af.lower_coords)),
+                    ('upper ', _coords_array(af.upper_coords))]
+    parts = {}
+    for (prefix, P) in airfoils:
+        parts[prefix + 'skin'] = common_parametrization(P, points_per_side)
+        if not SW:
+            continue
+        for sw_num in SW_NUMS:
+            web = getattr(st, '{0}shear_web_{1}'.format(
+                prefix.replace(' ', '_'), sw_num))
+            if web.exists():
+                parts['{0}shear web {1}'.format(prefix, sw_num)] = web_corners(
+                    P, web.left, web.right)
+    return parts
+
+
+def _runs(flags):
+    """Returns (start, stop) for each run of consecutive True flags."""
+    runs = []
+    start = None
+    for (i, flag) in enumerate(list(flags) + [False]):
+        if flag and start is None:
+            start = i
+        elif not flag and start is not None:
+            runs.append((start, i))
+            start = None
+    return runs
+
+
+def blade_surface(blade, points_per_side=60, twist_flag=True, SW=True,
+    caps=True, TE_tol=1.0e-9):
+    """Loft the outer skin and the shear webs of a blade.
+
+    Parameters
+    ----------
+    blade : a MonoplaneBlade or BiplaneBlade, with its airfoils scaled and
+        translated (as after <Blade>.__init__), but not yet rotated (don't
+        run <Blade>.plot_all_airfoils(twist_flag=True) first)
+    points_per_side : int, the number of points on each side of the LE of
+        every airfoil
+    twist_flag : bool, do/don't twist the sections about the pitch axis
+    SW : bool, do/don't include the shear webs
+    caps : bool, do/don't close both ends of each run of stations
+    TE_tol : float, a sharp TE (within TE_tol*chord) is lofted with one point
+
+    Returns a Surface.
+
+    """
+    stations = blade.list_of_stations
+    parts = [_station_parts(station, points_per_side, SW)
+        for station in stations]
+    x1 = np.array([station.coords.x1 for station in stations])
+    x2 = np.array([station.coords.x2 for station in stations])
+    x3 = np.array([station.coords.x3 for station in stations])
+    if twist_flag:
+        twist = np.array([station.airfoil.twist for station in stations])
+    else:
+        twist = np.zeros(len(stations))
+    names = []
+    for p in parts:
+        names.extend(sorted(name for name in p if name not in names))
+    surface = Surface()
+    for name in names:
+        for (start, stop) in _runs([name in p for p in parts]):
+            if stop - start < 2:
+                continue
+            Q = np.array([p[name] for p in parts[start:stop]])
+            # drop the repeated point of a sharp TE
+            TE_gap = np.sqrt(np.sum((Q[:,0] - Q[:,-1])**2, axis=1))
+            chord = np.ptp(Q[:,:,0], axis=1)
+            if np.all(TE_gap <= TE_tol*chord):
+                Q = Q[:,:-1]
+            (vertices, faces) = loft(Q, x1[start:stop], x2[start:stop],
+                x3[start:stop], twist[start:stop], caps=caps)
+            surface.add(name, vertices, faces)
+    return surface
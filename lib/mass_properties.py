@@ -0,0 +1,267 @@
+"""Calculate the mass properties of a cross-section directly from its mesh.
+
+The density, first moments, and second moments of every element of an
+AbaqusGrid are integrated at once with Gauss quadrature, using the batched
+shape functions in shape_functions.py. Linear and quadratic quadrilaterals
+and triangles are all supported. The results are the mass per unit length,
+the mass center, the 6x6 mass matrix (in the same layout as the VABS .K file),
+and the mass of each layer and material.
+
+This is much faster than VABS, and doesn't need a solver run, so the mesh
+masses of every station can be cross-checked against VABS (M_11, M_55, M_66)
+and against the polygon masses (<structure>.calculate_mass()). A material
+whose mesh mass is far from its polygon mass usually means that some elements
+were given the wrong layer number.
+
+Usage:
+import lib.abaqus_utils2 as au
+import lib.mass_properties as mp
+g = au.AbaqusGrid('sandia_blade/stn05/mesh_stn05.abq')
+p = mp.grid_mass_properties(g, 'sandia_blade/materials.csv',
+    'sandia_blade/layers.csv')
+p.mass          # mass per unit length
+p.mass_center   # (x2, x3)
+p.M             # 6x6 mass matrix
+p.layer_mass    # {layer number: mass per unit length}
+mp.check_blade('sandia_blade')          # mesh vs. VABS
+mp.check_blade('sandia_blade', blade=b) # ... and vs. the polygons of blade b
+
+Last updated: May 13, 2014
+
+"""
+
+
+import os
+import glob
+import numpy as np
+import pandas as pd
+import grid as gr
+import shape_functions as sf
+import abaqus_utils2 as au
+import vabs_utils as vu
+reload(gr)
+reload(sf)
+reload(au)
+reload(vu)
+
+
+# the number of elements integrated at a time (limits the memory used by the
+#   element arrays)
+CHUNK_SIZE = 20000
+
+
+def mass_integrals(node_coords, connectivity, element_types, rho, order=None):
+    """Integrate the density and its moments over each element.
+
+    Parameters
+    ----------
+    node_coords : np.array, shape (number_of_nodes, 2), (x2, x3) coords, where
+        row i holds node #(i+1)
+    connectivity : np.array, shape (number_of_elements, 9), node numbers in
+        the VABS node slots, like AbaqusGrid.connectivity
+    element_types : np.array of element type codes (indices into
+        gr.ELEMENT_TYPES)
+    rho : np.array, the density of each element (pass ones for the area
+        integrals)
+    order : int, the Gauss rule (default: see sf.gauss_points)
+
+    Returns an array with shape (number_of_elements, 6), where the columns are
+    int(rho), int(rho*x2), int(rho*x3), int(rho*x2^2), int(rho*x3^2), and
+    int(rho*x2*x3) over each element.
+
+    """
+    node_coords = np.asarray(node_coords, dtype=float)
+    connectivity = np.asarray(connectivity, dtype=int)
+    element_types = np.asarray(element_types, dtype=int)
+    rho = np.asarray(rho, dtype=float)
+    integrals = np.zeros((len(connectivity), 6))
+    for (code, cls) in enumerate(gr.ELEMENT_TYPES):
+        all_rows = np.nonzero(element_types == code)[0]
+        if len(all_rows) == 0:
+            continue
+        (points, weights) = sf.gauss_points(cls, order)
+        (N, dN) = sf.evaluate(cls, points)
+        for i in range(0, len(all_rows), CHUNK_SIZE):
+            rows = all_rows[i:i+CHUNK_SIZE]
+            X = sf.element_coords(node_coords, connectivity[rows], cls)
+            detJ = sf.jacobian_determinants(dN, X)
+            if np.any(detJ <= 0.0):
+                raise Warning("Some elements are inverted!")
+            # (x2, x3) at each Gauss point, shape (e, p, 2)
+            xg = np.einsum('pn,enb->epb', N, X)
+            (x2, x3) = (xg[:,:,0], xg[:,:,1])
+            P = np.dstack((np.ones_like(x2), x2, x3, x2**2, x3**2, x2*x3))
+            integrals[rows] = rho[rows][:,np.newaxis]*np.einsum('ep,p,epk->ek',
+                detJ, weights, P)
+    return integrals
+
+
+def mass_matrix(mu, mu_x2, mu_x3, i33, i22, i23):
+    """Returns the 6x6 VABS mass matrix, given the mass integrals int(rho),
+    int(rho*x2), int(rho*x3), int(rho*x2^2), int(rho*x3^2), int(rho*x2*x3).
+    """
+    M = np.zeros((6,6))
+    M[0,0] = M[1,1] = M[2,2] = mu
+    M[0,4] = M[4,0] = mu_x3
+    M[0,5] = M[5,0] = -mu_x2
+    M[1,3] = M[3,1] = -mu_x3
+    M[2,3] = M[3,2] = mu_x2
+    M[3,3] = i22 + i33
+    M[4,4] = i22
+    M[5,5] = i33
+    M[4,5] = M[5,4] = -i23
+    return M
+
+
+class MassProperties:
+    """The mass properties of a cross-section mesh.
+
+    Attributes
+    ----------
+    mass : float, mass per unit length (M_11)
+    mass_center : (x2, x3)
+    M : 6x6 mass matrix, about the origin (as in the VABS .K file)
+    i22, i33, i23 : float, mass moments of inertia about the mass center
+        (flapwise, edgewise, product)
+    area : float, area of the mesh
+    layer_mass : {layer number: mass per unit length}
+
+    """
+    def __init__(self, integrals, area, layer_nums):
+        mi = np.sum(integrals, axis=0)
+        self.M = mass_matrix(*mi)
+        self.mass = mi[0]
+        self.mass_center = (mi[1]/mi[0], mi[2]/mi[0])
+        (x2m, x3m) = self.mass_center
+        self.i22 = mi[4] - mi[0]*x3m**2
+        self.i33 = mi[3] - mi[0]*x2m**2
+        self.i23 = mi[5] - mi[0]*x2m*x3m
+        self.area = area
+        layer_nums = np.asarray(layer_nums, dtype=int)
+        self.layer_mass = dict([(int(l),
+            np.sum(integrals[layer_nums == l,0]))
+            for l in np.unique(layer_nums)])
+
+    def get_key_properties(self):
+        """Returns (M_11, M_55, M_66), as in VabsOutputFile.get_key_properties.
+        """
+        return (self.M[0,0], self.M[4,4], self.M[5,5])
+
+    def material_mass(self, layer_table):
+        """Returns {material name: mass per unit length}, given the layer
+        table (a DataFrame of layers.csv)."""
+        d = {}
+        for (i, row) in layer_table.iterrows():
+            l = int(row['layer number'])
+            if l in self.layer_mass:
+                name = row['material name']
+                d[name] = d.get(name, 0.0) + self.layer_mass[l]
+        return d
+
+
+def element_densities(layer_nums, material_table, layer_table):
+    """Returns the density of each element, given its layer number, the
+    material table (a DataFrame of materials.csv), and the layer table (a
+    DataFrame of layers.csv)."""
+    rho = dict([(int(row['number']), float(row['rho']))
+        for (i, row) in material_table.iterrows()])
+    layers = dict([(int(row['layer number']), int(row['material number']))
+        for (i, row) in layer_table.iterrows()])
+    layer_nums = np.asarray(layer_nums, dtype=int)
+    for l in np.unique(layer_nums):
+        if l not in layers:
+            raise Warning("Layer #{0} is not in the layer table!".format(l))
+        if layers[l] not in rho:
+            raise Warning("Material #{0} (layer #{1}) is not in the material table!".format(
+                layers[l], l))
+    return np.array([rho[layers[l]] for l in layer_nums])
+
+
+def grid_mass_properties(grid, material_filename, layer_filename,
+    material_table=None, layer_table=None):
+    """Returns the MassProperties of an AbaqusGrid.
+
+    As in vabs_utils.VabsInputFile, the material and layer tables can be
+    passed in as DataFrames, to read the files only once for many stations.
+
+    """
+    if material_table is None:
+        material_table = pd.read_csv(material_filename)
+    if layer_table is None:
+        layer_table = pd.read_csv(layer_filename)
+    layer_nums = [e.layer_num for e in grid.list_of_elements]
+    rho = element_densities(layer_nums, material_table, layer_table)
+    # integrate the geometry once, then scale each element by its density
+    integrals = mass_integrals(grid.node_coords, grid.connectivity,
+        grid.element_types, np.ones(len(rho)))
+    area = np.sum(integrals[:,0])
+    return MassProperties(rho[:,np.newaxis]*integrals, area, layer_nums)
+
+
+def _relative_difference(a, b):
+    return (a - b)/b
+
+
+def check_blade(blade_path, blade=None, station_nums=None, tol=0.01,
+    print_flag=True):
+    """Cross-check the mesh mass properties of every meshed station of a blade
+    against VABS and (optionally) the polygons.
+
+    Parameters
+    ----------
+    blade_path : str, the blade directory, e.g. 'sandia_blade'
+    blade : a MonoplaneBlade or BiplaneBlade, whose station structures are
+        used for the polygon masses (default: don't compare the polygons)
+    station_nums : list of ints (default: all stations with a grid file)
+    tol : float, the relative difference that is flagged
+    print_flag : bool, print the flagged stations and materials
+
+    Returns a DataFrame indexed by station number, with the mesh mass
+    properties and their relative differences from the VABS .K file (columns
+    'dM_11', 'dM_55', 'dM_66') and from the polygons ('dmass_polygon'). Missing
+    comparisons are NaN.
+
+    """
+    material_table = pd.read_csv(os.path.join(blade_path, 'materials.csv'))
+    layer_table = pd.read_csv(os.path.join(blade_path, 'layers.csv'))
+    if station_nums is None:
+        grid_files = sorted(glob.glob(os.path.join(blade_path, 'stn[0-9][0-9]',
+            'mesh_stn[0-9][0-9].abq')))
+        station_nums = [int(os.path.basename(f)[8:10]) for f in grid_files]
+    rows = []
+    for station_num in station_nums:
+        stn_str = 'stn{0:02d}'.format(station_num)
+        g = au.AbaqusGrid(os.path.join(blade_path, stn_str,
+            'mesh_' + stn_str + '.abq'))
+        p = grid_mass_properties(g, None, None, material_table=material_table,
+            layer_table=layer_table)
+        (M_11, M_55, M_66) = p.get_key_properties()
+        d = {'station': station_num, 'M_11': M_11, 'M_55': M_55,
+             'M_66': M_66, 'x2_mass_center': p.mass_center[0],
+             'x3_mass_center': p.mass_center[1], 'dM_11': np.nan,
+             'dM_55': np.nan, 'dM_66': np.nan, 'dmass_polygon': np.nan}
+        vabs_filename = os.path.join(blade_path, stn_str,
+            'mesh_' + stn_str + '.vabs.K')
+        if os.path.exists(vabs_filename):
+            vabs_M = vu.VabsOutputFile(vabs_filename).get_key_properties()[4:]
+            for (key, a, b) in zip(['dM_11', 'dM_55', 'dM_66'],
+                    (M_11, M_55, M_66), vabs_M):
+                d[key] = _relative_difference(a, b)
+        if blade is not None:
+            st = blade.list_of_stations[station_num-1].structure
+            d['dmass_polygon'] = _relative_difference(M_11,
+                st.calculate_mass())
+            polygon_mass = st.calculate_material_masses()
+            mesh_mass = p.material_mass(layer_table)
+            for name in sorted(set(polygon_mass) | set(mesh_mass)):
+                diff = _relative_difference(mesh_mass.get(name, 0.0),
+                    polygon_mass.get(name, np.nan))
+                if print_flag and not abs(diff) <= tol:
+                    print " {0}: the mesh mass of {1} is {2:+.1%} off the polygons!".format(
+                        stn_str, name, diff)
+        if print_flag:
+            for key in ['dM_11', 'dM_55', 'dM_66', 'dmass_polygon']:
+                if abs(d[key]) > tol:
+                    print " {0}: {1} = {2:+.1%}".format(stn_str, key, d[key])
+        rows.append(d)
+    return pd.DataFrame(rows).set_index('station')
@@ -1,28 +1,207 @@
 """A module for organizing material property data for a blade.
 
+Each material also precomputes its 3D compliance and stiffness matrices and
+its plane-stress reduced stiffness once, when it is created:
+  .S : 6x6 compliance matrix, in the material axes
+  .C : 6x6 stiffness matrix, in the material axes (C = S^-1)
+  .Q : 3x3 plane-stress reduced stiffness, for [eps11, eps22, 2eps12]
+The 6x6 matrices use the VABS strain order [eps11, 2eps12, 2eps13, eps22,
+2eps23, eps33] (see VOIGT).
+
+The rotation kernels below rotate whole stacks of these matrices at once,
+e.g. one per element of a cross-section mesh, given arrays of the layer plane
+angles (theta1, one per element) and the layup orientation angles (theta3,
+from layers.csv):
+
+  layup_stiffness(C, material_index, theta1, theta3)
+      -> stiffness of every element in the beam axes, shape (e, 6, 6)
+  rotate_plane_stress(Q, theta)
+      -> plane-stress stiffness of every ply, rotated by its angle (Q-bar)
+
+Usage:
+import lib.material as mt
+m = mt.OrthotropicMaterial('E-LT-5500', 41.8e9, 14.0e9, 14.0e9, 2.63e9,
+    2.63e9, 2.63e9, 0.28, 0.28, 0.28, 1920.0, material_num=1)
+m.C     # 6x6 stiffness
+C = mt.stiffness_stack([m1, m2])   # shape (2, 6, 6)
+D = mt.layup_stiffness(C, material_index, theta1, theta3)
+
 Author: Perry Roth-Johnson
-Last updated: October 11, 2013
+Last updated: May 13, 2014
 
 """
 
 
+import numpy as np
+
+
+# Voigt index pairs of the strain components, in VABS order:
+#   [eps11, 2eps12, 2eps13, eps22, 2eps23, eps33]
+VOIGT = [(0,0), (0,1), (0,2), (1,1), (1,2), (2,2)]
+
+
+def orthotropic_compliance(E1, E2, E3, G12, G13, G23, nu12, nu13, nu23):
+    """Returns the 6x6 compliance matrix of an orthotropic material, in its
+    material axes, for strains in VABS order (see VOIGT)."""
+    S = np.zeros((6,6))
+    S[0,0] = 1.0/E1
+    S[3,3] = 1.0/E2
+    S[5,5] = 1.0/E3
+    S[0,3] = S[3,0] = -nu12/E1
+    S[0,5] = S[5,0] = -nu13/E1
+    S[3,5] = S[5,3] = -nu23/E2
+    S[1,1] = 1.0/G12
+    S[2,2] = 1.0/G13
+    S[4,4] = 1.0/G23
+    return S
+
+
+def orthotropic_stiffness(E1, E2, E3, G12, G13, G23, nu12, nu13, nu23):
+    """Returns the 6x6 stiffness matrix of an orthotropic material (the
+    inverse of orthotropic_compliance)."""
+    return np.linalg.inv(orthotropic_compliance(E1, E2, E3, G12, G13, G23,
+        nu12, nu13, nu23))
+
+
+def isotropic_stiffness(E, nu):
+    """Returns the 6x6 stiffness matrix of an isotropic material."""
+    G = E/(2.0*(1.0 + nu))
+    return orthotropic_stiffness(E, E, E, G, G, G, nu, nu, nu)
+
+
+def plane_stress_stiffness(E1, E2, G12, nu12):
+    """Returns the 3x3 plane-stress reduced stiffness Q, for the strains
+    [eps11, eps22, 2eps12] in the 1-2 plane."""
+    nu21 = nu12*E2/E1
+    d = 1.0 - nu12*nu21
+    return np.array([[E1/d,      nu12*E2/d, 0.0],
+                     [nu12*E2/d, E2/d,      0.0],
+                     [0.0,       0.0,       G12]])
+
+
+def material_axes(theta1, theta3):
+    """Returns the material axes of each element in the beam axes (x1, x2,
+    x3), shape (e, 3, 3), where row i is material axis i.
+
+    theta1 is the layer plane angle (a rotation about x1, see
+    AbaqusGrid.calculate_layer_plane_angles), and theta3 is the layup
+    orientation angle of the layer (a rotation about the normal of the layer
+    plane), both in degrees.
+
+    """
+    t1 = np.radians(np.asarray(theta1, dtype=float))
+    t3 = np.radians(np.asarray(theta3, dtype=float))
+    (c1, s1, c3, s3) = (np.cos(t1), np.sin(t1), np.cos(t3), np.sin(t3))
+    zero = np.zeros_like(t1)
+    # the layer plane axes: y1 = x1, y2 along the layer, y3 normal to it
+    y1 = np.column_stack((np.ones_like(t1), zero, zero))
+    y2 = np.column_stack((zero, c1, s1))
+    y3 = np.column_stack((zero, -s1, c1))
+    e1 = c3[:,np.newaxis]*y1 + s3[:,np.newaxis]*y2
+    e2 = -s3[:,np.newaxis]*y1 + c3[:,np.newaxis]*y2
+    return np.dstack((e1, e2, y3)).transpose(0,2,1)
+
+
+def strain_rotation(axes):
+    """Returns the matrices T that transform strains in VABS order from the
+    beam axes to the material axes (eps_material = T eps_beam), shape
+    (e, 6, 6), given the material axes from material_axes()."""
+    T = np.zeros(axes.shape[:-2] + (6,6))
+    for (I, (i, j)) in enumerate(VOIGT):
+        for (J, (k, l)) in enumerate(VOIGT):
+            if k == l:
+                t = axes[...,i,k]*axes[...,j,k]
+            else:
+                # an engineering shear strain is twice the tensor component
+                t = 0.5*(axes[...,i,k]*axes[...,j,l] +
+                         axes[...,i,l]*axes[...,j,k])
+            T[...,I,J] = t if i == j else 2.0*t
+    return T
+
+
+def _congruence(T, C):
+    """Returns T^T C T for stacks of matrices (as two batched products,
+    which is much faster than one three-operand einsum)."""
+    return np.matmul(np.swapaxes(T, -1, -2), np.matmul(C, T))
+
+
+def rotate_stiffness(C, axes):
+    """Returns the stiffness matrices C (in material axes) in the beam axes,
+    C_beam = T^T C T (see strain_rotation)."""
+    return _congruence(strain_rotation(axes), C)
+
+
+def layup_stiffness(C, material_index, theta1, theta3):
+    """Returns the stiffness of every element in the beam axes, shape
+    (e, 6, 6), in one call.
+
+    Parameters
+    ----------
+    C : np.array, shape (m, 6, 6), the stiffness of each material (see
+        stiffness_stack)
+    material_index : np.array of ints, shape (e,), the row of C of each
+        element
+    theta1 : np.array, shape (e,), the layer plane angle of each element [deg]
+    theta3 : np.array, shape (e,), the layup orientation angle of each
+        element [deg]
+
+    """
+    C = np.asarray(C, dtype=float)
+    material_index = np.asarray(material_index, dtype=int)
+    return rotate_stiffness(C[material_index], material_axes(theta1, theta3))
+
+
+def rotate_plane_stress(Q, theta):
+    """Returns the plane-stress stiffness of plies rotated by theta [deg]
+    about their normal (Q-bar), shape (n, 3, 3).
+
+    Q is one 3x3 matrix (see plane_stress_stiffness) or a stack of them,
+    shape (n, 3, 3), one per ply.
+
+    """
+    t = np.radians(np.atleast_1d(np.asarray(theta, dtype=float)))
+    (c, s) = (np.cos(t), np.sin(t))
+    # strain transformation, for [eps11, eps22, 2eps12]
+    T = np.zeros(t.shape + (3,3))
+    T[:,0,0] = T[:,1,1] = c**2
+    T[:,0,1] = T[:,1,0] = s**2
+    T[:,0,2] = c*s
+    T[:,1,2] = -c*s
+    T[:,2,0] = -2.0*c*s
+    T[:,2,1] = 2.0*c*s
+    T[:,2,2] = c**2 - s**2
+    return _congruence(T, np.asarray(Q, dtype=float))
+
+
+def stiffness_stack(materials):
+    """Returns the stiffness matrices of a list of materials, shape
+    (m, 6, 6)."""
+    return np.array([m.C for m in materials])
+
+
 class _Material:
     """Define a material."""
     logfile_name = 'material.log'
-    number_of_materials = 0
-    def __init__(self, name):
-        _Material.number_of_materials += 1
-        self.material_num = _Material.number_of_materials
+    def __init__(self, name, material_num=None):
+        # the material number is owned by the parent blade (its row in the
+        # material properties file), not by a global counter
+        self.material_num = material_num
         self.name = name
-    def __del__(self):
-        _Material.number_of_materials -= 1
-        print " Material deleted, and now _Material.number_of_materials = {0}".format(_Material.number_of_materials)
+    def _label(self):
+        """Returns '#<material_num>, <name>' for the log messages (just the
+        name, for a material without a number)."""
+        if self.material_num is None:
+            return self.name
+        return "#{0}, {1}".format(self.material_num, self.name)
+    def close(self):
+        """Delete this material. (Called by <blade>.close().)"""
+        print " Deleted material {0}".format(self._label())
 
 
 class IsotropicMaterial(_Material):
     """Define the properties of an isotropic material."""
-    def __init__(self, name, E, nu, rho):
-        _Material.__init__(self, name)
+    def __init__(self, name, E, nu, rho, material_num=None):
+        _Material.__init__(self, name, material_num)
         self.type = 'isotropic'
         self.E = float(E)       # Young's modulus
         self.nu = float(nu)     # Poisson's ratio
@@ -30,9 +209,14 @@ class IsotropicMaterial(_Material):
         # calculate the shear modulus from E and nu, ref:
         # wikipedia.org/wiki/Young%27s_modulus#Relation_among_elastic_constants
         self.G = float(E)/(2.0*(1.0+float(nu)))
+        # precompute the compliance and stiffness matrices
+        self.S = orthotropic_compliance(self.E, self.E, self.E, self.G,
+            self.G, self.G, self.nu, self.nu, self.nu)
+        self.C = np.linalg.inv(self.S)
+        self.Q = plane_stress_stiffness(self.E, self.E, self.G, self.nu)
         self.logf = open(_Material.logfile_name, "a")
-        self.logf.write("............(Created material #{0})............\n".format(self.material_num))
-        print " Created material #{0}, {1}".format(self.material_num, self.name)
+        self.logf.write("............(Created material {0})............\n".format(self._label()))
+        print " Created material {0}".format(self._label())
         self.logf.write(str(self) + '\n')
         self.logf.flush()
         self.logf.close()
@@ -47,8 +231,9 @@ rho:  {4:6.1f} (kg/m^3)""".format(self.name, self.E, self.G, self.nu, self.rho)
 
 class OrthotropicMaterial(_Material):
     """Define the properties of an orthotropic material."""
-    def __init__(self, name, E1, E2, E3, G12, G13, G23, nu12, nu13, nu23, rho):
-        _Material.__init__(self, name)
+    def __init__(self, name, E1, E2, E3, G12, G13, G23, nu12, nu13, nu23, rho,
+        material_num=None):
+        _Material.__init__(self, name, material_num)
         self.type = 'orthotropic'
         # Young's modulus
         self.E1 = float(E1)
@@ -68,9 +253,14 @@ class OrthotropicMaterial(_Material):
         self.nu21 = float(nu12) * (float(E2)/float(E1))
         self.nu31 = float(nu13) * (float(E3)/float(E1))
         self.nu32 = float(nu23) * (float(E3)/float(E2))
+        # precompute the compliance and stiffness matrices
+        self.S = orthotropic_compliance(self.E1, self.E2, self.E3, self.G12,
+            self.G13, self.G23, self.nu12, self.nu13, self.nu23)
+        self.C = np.linalg.inv(self.S)
+        self.Q = plane_stress_stiffness(self.E1, self.E2, self.G12, self.nu12)
         self.logf = open(_Material.logfile_name, "a")
-        self.logf.write("............(Created material #{0})............\n".format(self.material_num))
-        print " Created material #{0}, {1}".format(self.material_num, self.name)
+        self.logf.write("............(Created material {0})............\n".format(self._label()))
+        print " Created material {0}".format(self._label())
         self.logf.write(str(self) + '\n')
         self.logf.flush()
         self.logf.close()
@@ -0,0 +1,229 @@
+"""Vectorized quality metrics for a 2D cross-section grid (AbaqusGrid).
+
+Use this module to catch inverted, skewed, or stretched elements (e.g. from
+TrueGrid block fitting) before a VABS run.
+
+Usage:
+import lib.abaqus_utils2 as au
+import lib.mesh_quality as mq
+g = au.AbaqusGrid('sandia_blade/stn10/mesh_stn10.abq')
+q = mq.element_quality(g)
+mq.print_report(g, q)
+mq.check_mesh(g)   # raises a Warning if the mesh is unusable
+
+Metrics (one value per element):
+area - the element area, integrated with Gauss quadrature (curved edges of
+    quadratic elements are accounted for).
+aspect_ratio - the longest corner-to-corner edge divided by the shortest one.
+skew - the equiangle skew of the corner angles: 0 for a square or an
+    equilateral triangle, 1 for a degenerate element.
+min_jacobian - the smallest det(J) over the corners and Gauss points.
+scaled_jacobian - min_jacobian divided by the largest det(J) over the same
+    points: 1 for a parallelogram, <= 0 for an inverted or folded element.
+
+Last updated: May 12, 2014
+
+"""
+
+
+import numpy as np
+import grid as gr
+import shape_functions as sf
+
+
+quality_dtype = [
+    ('elem_num', 'i8'),
+    ('area', 'f8'),
+    ('aspect_ratio', 'f8'),
+    ('skew', 'f8'),
+    ('min_jacobian', 'f8'),
+    ('scaled_jacobian', 'f8')]
+
+# default limits used by check_mesh()
+default_limits = {
+    'min_scaled_jacobian': 0.0,   # reject inverted or folded elements
+    'max_aspect_ratio': None,     # (None = report only)
+    'max_skew': None}             # (None = report only)
+
+
+def _corner_angles(corners):
+    """Returns the interior angles (degrees) at each corner of a group of
+    counter-clockwise polygons, given corner coords with shape (e, c, 2)."""
+    to_next = np.roll(corners, -1, axis=1) - corners
+    to_prev = np.roll(corners, 1, axis=1) - corners
+    cross = (to_next[:,:,0]*to_prev[:,:,1] - to_next[:,:,1]*to_prev[:,:,0])
+    dot = np.sum(to_next*to_prev, axis=2)
+    return np.degrees(np.arctan2(cross, dot))
+
+
+def _group_quality(X, element_class):
+    """Returns (area, aspect_ratio, skew, min_jacobian, scaled_jacobian) for
+    a group of elements of the same type, given nodal coords X (e, n, 2)."""
+    (points, weights) = sf.gauss_points(element_class)
+    (N, dN) = sf.evaluate(element_class, points)
+    detJ_gauss = sf.jacobian_determinants(dN, X)
+    area = np.dot(detJ_gauss, weights)
+    (N_c, dN_c) = sf.evaluate(element_class, sf.corner_points(element_class))
+    detJ = np.hstack((detJ_gauss, sf.jacobian_determinants(dN_c, X)))
+    min_jacobian = detJ.min(axis=1)
+    max_jacobian = detJ.max(axis=1)
+    scaled_jacobian = np.where(max_jacobian > 0.0,
+        min_jacobian/np.where(max_jacobian > 0.0, max_jacobian, 1.0), -1.0)
+    # corner nodes come first in node_slots for every element type
+    number_of_corners = 3 if sf.is_triangle(element_class) else 4
+    corners = X[:,:number_of_corners,:]
+    edges = np.roll(corners, -1, axis=1) - corners
+    lengths = np.sqrt(np.sum(edges**2, axis=2))
+    shortest = lengths.min(axis=1)
+    aspect_ratio = np.where(shortest > 0.0,
+        lengths.max(axis=1)/np.where(shortest > 0.0, shortest, 1.0), np.inf)
+    ideal = 180.0*(number_of_corners - 2)/number_of_corners
+    angles = _corner_angles(corners)
+    skew = np.maximum((angles.max(axis=1) - ideal)/(180.0 - ideal),
+                      (ideal - angles.min(axis=1))/ideal)
+    skew = np.clip(skew, 0.0, 1.0)
+    return (area, aspect_ratio, skew, min_jacobian, scaled_jacobian)
+
+
+def element_quality(grid):
+    """Compute quality metrics for every element in a grid.
+
+    Parameters
+    ----------
+    grid : abaqus_utils2.AbaqusGrid, a parsed grid (with node_coords,
+        connectivity, and element_types arrays)
+
+    Returns a numpy structured array (see quality_dtype), with one row per
+    element, in the same order as grid.list_of_elements.
+
+    """
+    q = np.zeros(grid.number_of_elements, dtype=quality_dtype)
+    q['elem_num'] = [e.elem_num for e in grid.list_of_elements]
+    for (code, cls) in enumerate(gr.ELEMENT_TYPES):
+        rows = np.nonzero(grid.element_types == code)[0]
+        if len(rows) == 0:
+            continue
+        X = sf.element_coords(grid.node_coords, grid.connectivity[rows], cls)
+        (q['area'][rows], q['aspect_ratio'][rows], q['skew'][rows],
+            q['min_jacobian'][rows], q['scaled_jacobian'][rows]) = \
+            _group_quality(X, cls)
+    return q
+
+
+def _element_set_names(grid):
+    """Returns an array of element set names, one per element."""
+    return np.array([str(e.element_set) for e in grid.list_of_elements])
+
+
+def summarize_by_element_set(grid, quality):
+    """Summarize element quality for each element set.
+
+    Returns a dict, keyed by element set name, of dicts with the keys:
+    'number_of_elements', 'total_area', 'min_area', 'max_aspect_ratio',
+    'max_skew', 'min_scaled_jacobian'
+
+    """
+    names = _element_set_names(grid)
+    (set_names, inverse) = np.unique(names, return_inverse=True)
+    count = np.bincount(inverse, minlength=len(set_names))
+    total_area = np.bincount(inverse, weights=quality['area'],
+        minlength=len(set_names))
+    summary = {}
+    for (i, name) in enumerate(set_names):
+        rows = (inverse == i)
+        summary[name] = {
+            'number_of_elements': int(count[i]),
+            'total_area': total_area[i],
+            'min_area': quality['area'][rows].min(),
+            'max_aspect_ratio': quality['aspect_ratio'][rows].max(),
+            'max_skew': quality['skew'][rows].max(),
+            'min_scaled_jacobian': quality['scaled_jacobian'][rows].min()}
+    return summary
+
+
+def worst_elements(quality, n=20, metric='scaled_jacobian'):
+    """Returns the n worst elements, ranked by a quality metric.
+
+    Elements are ranked in ascending order for 'scaled_jacobian',
+    'min_jacobian', and 'area', and in descending order for 'aspect_ratio' and
+    'skew'.
+
+    Returns a structured array (see quality_dtype) with up to n rows.
+
+    """
+    if metric in ('scaled_jacobian', 'min_jacobian', 'area'):
+        order = np.argsort(quality[metric], kind='mergesort')
+    elif metric in ('aspect_ratio', 'skew'):
+        order = np.argsort(-quality[metric], kind='mergesort')
+    else:
+        raise ValueError("Unknown quality metric '{0}'".format(metric))
+    return quality[order[:n]]
+
+
+def find_bad_elements(quality, min_scaled_jacobian=0.0, max_aspect_ratio=None,
+    max_skew=None):
+    """Returns a boolean mask of elements that violate any of the limits.
+
+    Limits set to None are not checked.
+
+    """
+    bad = quality['scaled_jacobian'] <= min_scaled_jacobian
+    if max_aspect_ratio is not None:
+        bad |= quality['aspect_ratio'] > max_aspect_ratio
+    if max_skew is not None:
+        bad |= quality['skew'] > max_skew
+    return bad
+
+
+def print_report(grid, quality, n=10, metric='scaled_jacobian'):
+    """Print per-element-set summaries and the n worst elements."""
+    summary = summarize_by_element_set(grid, quality)
+    names = _element_set_names(grid)
+    print 'Mesh quality: ' + grid.filename
+    fmt_h = '{0:<12} {1:>6} {2:>10} {3:>10} {4:>8} {5:>8}'
+    fmt = '{0:<12} {1:>6d} {2:>10.3e} {3:>10.2f} {4:>8.3f} {5:>8.3f}'
+    print fmt_h.format('element set', 'elems', 'min area', 'max AR',
+        'max skew', 'min sJ')
+    for name in sorted(summary.keys()):
+        s = summary[name]
+        print fmt.format(name, s['number_of_elements'], s['min_area'],
+            s['max_aspect_ratio'], s['max_skew'], s['min_scaled_jacobian'])
+    print ''
+    print 'worst {0} elements (by {1}):'.format(n, metric)
+    rows = dict([(num, i) for (i, num) in enumerate(quality['elem_num'])])
+    fmt_w = '  #{0:<7d} {1:<12} area={2:9.3e}  AR={3:7.2f}  skew={4:5.3f}  sJ={5:6.3f}'
+    for w in worst_elements(quality, n=n, metric=metric):
+        print fmt_w.format(int(w['elem_num']), names[rows[w['elem_num']]],
+            w['area'], w['aspect_ratio'], w['skew'], w['scaled_jacobian'])
+
+
+def check_mesh(grid, min_scaled_jacobian=None, max_aspect_ratio=None,
+    max_skew=None, print_flag=False, soft_warning=False):
+    """Check a grid against quality limits before writing a VABS input file.
+
+    Limits that are not given fall back to mesh_quality.default_limits.
+
+    Returns the quality array (see element_quality()). Raises a Warning that
+    lists the offending elements if any element violates a limit, unless
+    soft_warning=True (then the warning is only printed).
+
+    """
+    if min_scaled_jacobian is None:
+        min_scaled_jacobian = default_limits['min_scaled_jacobian']
+    if max_aspect_ratio is None:
+        max_aspect_ratio = default_limits['max_aspect_ratio']
+    if max_skew is None:
+        max_skew = default_limits['max_skew']
+    q = element_quality(grid)
+    if print_flag:
+        print_report(grid, q)
+    bad = find_bad_elements(q, min_scaled_jacobian=min_scaled_jacobian,
+        max_aspect_ratio=max_aspect_ratio, max_skew=max_skew)
+    if np.any(bad):
+        msg = "The grid '{0}' has {1} bad elements: {2}".format(grid.filename,
+            int(np.sum(bad)), list(q['elem_num'][bad]))
+        if not soft_warning:
+            raise Warning(msg)
+        else:
+            print msg
+    return q
@@ -0,0 +1,519 @@
+"""Calculate the mass and stiffness matrices of a cross-section in Python, as a
+local stand-in for VABS.
+
+The cross-section is a 2D finite element mesh (an AbaqusGrid, or a VABS input
+file). The 3D displacement of the section is split into a rigid section
+motion r (3 translations and 3 rotations) and a warping field V, which is
+interpolated with the element shape functions (see shape_functions.py):
+
+    u(x1, x2, x3) = Z(x2, x3) r(x1) + S(x2, x3) V(x1)
+
+and the 3D strains [eps11, 2eps12, 2eps13, eps22, 2eps23, eps33] are
+
+    eps = Gz psi + B V + Nl V'
+
+where psi = [gamma11, 2gamma12, 2gamma13, kappa1, kappa2, kappa3] are the 1D
+beam strains, B holds the derivatives of the shape functions in the cross-
+section plane, and Nl holds the shape functions (the warping derivatives
+along the span). The energy per unit span is assembled into sparse matrices:
+
+    E = int(B^T D B)       C = int(Nl^T D B)      M = int(Nl^T D Nl)
+    R = int(B^T D Gz)      L = int(Nl^T D Gz)     A = int(Gz^T D Gz)
+
+For a beam loaded only at its ends, the 1D stress resultants theta = [F1,
+F2, F3, M1, M2, M3] vary as theta' = T theta, and the warping and beam strains
+are linear in theta, V = X theta and psi = Y theta, where
+
+    [ E    R ] [ X ]   [ (C - C^T) X T^T + L Y T^T ]
+    [ R^T  A ] [ Y ] = [ I - L^T X T^T             ]
+
+The extension, twist, and bending columns are solved first, and then the
+shear columns, which depend on the bending columns. The energy per unit span
+is theta^T F theta / 2, and the Timoshenko stiffness matrix is F^-1. The
+classical stiffness matrix is the inverse of F without the shear rows and
+columns. (This is the "extremity-free" solution of Giavotto et al., 1983,
+which is also used by BECAS.)
+
+The rigid section motions are taken out of the warping by fixing 6 warping
+dofs at 3 nodes (F doesn't depend on how this is done), so only the sparse
+matrix E is factorized (a sparse LU factorization, once per section), and R
+and A are handled with a 6x6 Schur complement.
+
+The results are written to a .K file with the same layout as a VABS .K file,
+so vabs_utils.VabsOutputFile, plot_MK.py, and the DYMORE and beam solver
+inputs read them like VABS results.
+
+Usage:
+import lib.section_solver as sec
+# from a VABS input file (mesh, layers, materials, and layer plane angles)
+cs = sec.read_vabs_input('sandia_blade/stn05/mesh_stn05.vabs')
+# or from a grid with layer plane angles (see layer_plane_angles.py)
+cs = sec.section_from_grid(g, 'sandia_blade/materials.csv',
+    'sandia_blade/layers.csv')
+p = cs.solve()
+p.K   # 6x6 Timoshenko stiffness matrix (same order as VABS)
+p.M   # 6x6 mass matrix
+p.write_K('sandia_blade/stn05/mesh_stn05.vabs.K')
+# solve many stations in parallel (writes mesh_stnXX.vabs.K)
+sec.solve_stations('sandia_blade', [1, 2, 3], n_processes=4)
+
+Last updated: May 13, 2014
+
+"""
+
+
+import os
+import time
+import multiprocessing
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+import scipy.sparse.linalg as spla
+import grid as gr
+import shape_functions as sf
+import mass_properties as mp
+import material as mt
+reload(gr)
+reload(sf)
+reload(mp)
+reload(mt)
+
+
+# the number of elements integrated at a time (limits the memory used by the
+#   element arrays)
+CHUNK_SIZE = 2000
+
+# rows/columns of the extension, twist, and bending terms in a 6x6 matrix
+_CLASSICAL = [0, 3, 4, 5]
+
+
+class CrossSection:
+    """A cross-section mesh with material properties, ready to be solved.
+
+    Parameters
+    ----------
+    node_coords : np.array, shape (number_of_nodes, 2), (x2, x3) coords, where
+        row i holds node #(i+1)
+    connectivity : np.array, shape (number_of_elements, 9), node numbers in
+        the VABS node slots (0 = no node), like AbaqusGrid.connectivity
+    element_types : np.array of element type codes (indices into
+        gr.ELEMENT_TYPES)
+    D : np.array, shape (number_of_elements, 6, 6), the stiffness matrix of
+        each element in the beam axes (see material.layup_stiffness)
+    rho : np.array, the density of each element
+    name : str, a name for the printed messages
+
+    """
+    def __init__(self, node_coords, connectivity, element_types, D, rho,
+        name='cross-section'):
+        self.node_coords = np.asarray(node_coords, dtype=float)
+        self.connectivity = np.asarray(connectivity, dtype=int)
+        self.element_types = np.asarray(element_types, dtype=int)
+        self.D = np.asarray(D, dtype=float)
+        self.rho = np.asarray(rho, dtype=float)
+        self.name = name
+
+    @property
+    def number_of_nodes(self):
+        return len(self.node_coords)
+
+    @property
+    def number_of_elements(self):
+        return len(self.connectivity)
+
+    def _element_groups(self):
+        """Yields (rows, element_class) for each chunk of elements of the same
+        type."""
+        for (code, cls) in enumerate(gr.ELEMENT_TYPES):
+            rows = np.nonzero(self.element_types == code)[0]
+            for i in range(0, len(rows), CHUNK_SIZE):
+                yield (rows[i:i+CHUNK_SIZE], cls)
+
+    def assemble(self):
+        """Integrate and assemble the sectional matrices.
+
+        Returns a dict with the sparse matrices 'E', 'C', 'M' (3n x 3n), the
+        dense matrices 'R', 'L' (3n x 6) and 'A' (6x6), and the section
+        integrals 'mass' (the 6x6 mass matrix) and 'area', 'x2_area',
+        'x3_area' (for the geometric center).
+
+        """
+        ndof = 3*self.number_of_nodes
+        (E, C, M) = (sp.csr_matrix((ndof,ndof)), sp.csr_matrix((ndof,ndof)),
+            sp.csr_matrix((ndof,ndof)))
+        (R, L) = (np.zeros((ndof,6)), np.zeros((ndof,6)))
+        A = np.zeros((6,6))
+        # mass integrals: rho*[1, x2, x3, x2^2, x3^2, x2*x3], and area
+        mi = np.zeros(6)
+        (area, x2_area, x3_area) = (0.0, 0.0, 0.0)
+        for (rows, cls) in self._element_groups():
+            (points, weights) = sf.gauss_points(cls)
+            (N, dN) = sf.evaluate(cls, points)
+            X = sf.element_coords(self.node_coords, self.connectivity[rows],
+                cls)
+            J = sf.jacobians(dN, X)
+            detJ = J[:,:,0,0]*J[:,:,1,1] - J[:,:,0,1]*J[:,:,1,0]
+            if np.any(detJ <= 0.0):
+                raise Warning("{0} has inverted elements!".format(self.name))
+            invJ = np.empty_like(J)
+            invJ[:,:,0,0] = J[:,:,1,1]/detJ
+            invJ[:,:,1,1] = J[:,:,0,0]/detJ
+            invJ[:,:,0,1] = -J[:,:,0,1]/detJ
+            invJ[:,:,1,0] = -J[:,:,1,0]/detJ
+            # shape function derivatives d/dx2 and d/dx3, shape (e, p, n, 2)
+            dNdx = np.einsum('epba,pna->epnb', invJ, dN)
+            xg = np.einsum('pn,enb->epb', N, X)
+            w = detJ*weights
+            (e, p, n) = (len(rows), len(weights), N.shape[1])
+            B = np.zeros((e, p, 6, n, 3))
+            B[:,:,1,:,0] = dNdx[:,:,:,0]
+            B[:,:,2,:,0] = dNdx[:,:,:,1]
+            B[:,:,3,:,1] = dNdx[:,:,:,0]
+            B[:,:,4,:,1] = dNdx[:,:,:,1]
+            B[:,:,4,:,2] = dNdx[:,:,:,0]
+            B[:,:,5,:,2] = dNdx[:,:,:,1]
+            B = B.reshape(e, p, 6, 3*n)
+            Nl = np.zeros((p, 6, n, 3))
+            for c in range(3):
+                Nl[:,c,:,c] = N
+            Nl = Nl.reshape(p, 6, 3*n)
+            (x2, x3) = (xg[:,:,0], xg[:,:,1])
+            Gz = np.zeros((e, p, 6, 6))
+            Gz[:,:,0,0] = Gz[:,:,1,1] = Gz[:,:,2,2] = 1.0
+            Gz[:,:,0,4] = x3
+            Gz[:,:,0,5] = -x2
+            Gz[:,:,1,3] = -x3
+            Gz[:,:,2,3] = x2
+            # D times each matrix at each point, weighted, then stacked over
+            #   the points, so each integral is one matrix product per element
+            D = self.D[rows][:,np.newaxis,:,:]*w[:,:,np.newaxis,np.newaxis]
+            Nl = np.tile(Nl, (e, 1, 1, 1))
+            (DB, DGz, DNl) = [np.matmul(D, a).reshape(e, 6*p, -1)
+                for a in (B, Gz, Nl)]
+            (B, Gz, Nl) = [a.reshape(e, 6*p, -1).transpose(0,2,1)
+                for a in (B, Gz, Nl)]
+            Ee = np.matmul(B, DB)
+            Ce = np.matmul(Nl, DB)
+            Me = np.matmul(Nl, DNl)
+            Re = np.matmul(B, DGz)
+            Le = np.matmul(Nl, DGz)
+            A += np.sum(np.matmul(Gz, DGz), axis=0)
+            # global dofs: 3*(node number - 1) + component
+            slots = np.array(cls.node_slots) - 1
+            nodes = self.connectivity[rows][:,slots] - 1
+            dofs = (3*nodes[:,:,np.newaxis] + np.arange(3)).reshape(e, 3*n)
+            r = np.repeat(dofs, 3*n, axis=1).ravel()
+            c = np.tile(dofs, (1, 3*n)).ravel()
+            E = E + sp.csr_matrix((Ee.ravel(), (r, c)), shape=(ndof,ndof))
+            C = C + sp.csr_matrix((Ce.ravel(), (r, c)), shape=(ndof,ndof))
+            M = M + sp.csr_matrix((Me.ravel(), (r, c)), shape=(ndof,ndof))
+            for j in range(6):
+                R[:,j] += np.bincount(dofs.ravel(), Re[:,:,j].ravel(), ndof)
+                L[:,j] += np.bincount(dofs.ravel(), Le[:,:,j].ravel(), ndof)
+            rw = self.rho[rows][:,np.newaxis]*w
+            mi += [np.sum(rw), np.sum(rw*x2), np.sum(rw*x3),
+                   np.sum(rw*x2**2), np.sum(rw*x3**2), np.sum(rw*x2*x3)]
+            area += np.sum(w)
+            x2_area += np.sum(w*x2)
+            x3_area += np.sum(w*x3)
+        return {'E': E, 'C': C, 'M': M, 'R': R, 'L': L, 'A': A,
+                'mass': mp.mass_matrix(*mi), 'area': area, 'x2_area': x2_area,
+                'x3_area': x3_area}
+
+    def _fixed_dofs(self):
+        """Returns 6 warping dofs that fix the rigid section motions: u1, u2,
+        u3 at node a, u1 and (u2 or u3) at node b, the node farthest from a,
+        and u1 at node c, the node farthest from the line ab."""
+        x = self.node_coords
+        a = 0
+        b = int(np.argmax(np.sum((x - x[a])**2, axis=1)))
+        (d, n) = (x[b] - x[a], x - x[a])
+        c = int(np.argmax(abs(d[0]*n[:,1] - d[1]*n[:,0])))
+        # rotation about x1 moves node b by (-d[1], d[0])
+        k = 2 if abs(d[0]) > abs(d[1]) else 1
+        return [3*a, 3*a+1, 3*a+2, 3*b, 3*b+k, 3*c]
+
+    def solve(self, print_flag=False):
+        """Returns the SectionProperties of the cross-section."""
+        t0 = time.time()
+        m = self.assemble()
+        t1 = time.time()
+        (E, C, M, R, L, A) = [m[k] for k in ('E', 'C', 'M', 'R', 'L', 'A')]
+        ndof = E.shape[0]
+        free = np.ones(ndof, dtype=bool)
+        free[self._fixed_dofs()] = False
+        # E is symmetric positive definite once the rigid motions are fixed,
+        #   so no pivoting is needed
+        lu = spla.splu(E[free][:,free].tocsc(), permc_spec='MMD_AT_PLUS_A',
+            diag_pivot_thresh=0.0, options={'SymmetricMode': True})
+        Rf = R[free]
+        S = A - np.dot(Rf.T, lu.solve(Rf))
+        def solve_XY(r1, r2):
+            Y = np.linalg.solve(S, r2 - np.dot(Rf.T, lu.solve(r1[free])))
+            X = np.zeros((ndof, r2.shape[1]))
+            X[free] = lu.solve(r1[free] - np.dot(Rf, Y))
+            return (X, Y)
+        # extension, twist, and bending (and a first pass for the shear)
+        (X, Y) = solve_XY(np.zeros((ndof,6)), np.eye(6))
+        # shear: theta' = T theta, where M2' = F3 and M3' = -F2, so the
+        #   columns of X T^T and Y T^T for F2 and F3 are -X[:,5] and X[:,4]
+        (XT, YT) = (_shift(X), _shift(Y))
+        (X[:,1:3], Y[:,1:3]) = solve_XY(
+            (C - C.T).dot(XT[:,1:3]) + np.dot(L, YT[:,1:3]),
+            np.eye(6)[:,1:3] - np.dot(L.T, XT[:,1:3]))
+        (XT, YT) = (_shift(X), _shift(Y))
+        # the energy per unit span, in terms of theta
+        EX = E.dot(X)
+        CX = C.dot(X)
+        F = (np.dot(Y.T, np.dot(A, Y)) + 2.0*np.dot(X.T, np.dot(R, Y)) +
+             np.dot(X.T, EX) + 2.0*np.dot(XT.T, CX) +
+             2.0*np.dot(XT.T, np.dot(L, Y)) + np.dot(XT.T, M.dot(XT)))
+        F = 0.5*(F + F.T)
+        t2 = time.time()
+        if print_flag:
+            print " {0}: {1} elements, {2} dofs, assembled in {3:.2f} s, solved in {4:.2f} s".format(self.name, self.number_of_elements, ndof, t1-t0, t2-t1)
+        return SectionProperties(F, m['mass'], m['area'], m['x2_area'],
+            m['x3_area'])
+
+
+def _shift(X):
+    """Returns X T^T, where theta' = T theta (see CrossSection.solve)."""
+    XT = np.zeros_like(X)
+    XT[:,1] = -X[:,5]
+    XT[:,2] = X[:,4]
+    return XT
+
+
+class SectionProperties:
+    """The mass and stiffness properties of a cross-section.
+
+    Attributes
+    ----------
+    F : 6x6 Timoshenko flexibility matrix
+    K : 6x6 Timoshenko stiffness matrix (1-extension; 2,3-shear; 4-twist;
+        5,6-bending)
+    F_classical, K_classical : 4x4 classical flexibility and stiffness
+        matrices (1-extension; 2-twist; 3,4-bending)
+    M : 6x6 mass matrix
+    mass_center, geometric_center, tension_center, shear_center : (x2, x3)
+
+    """
+    def __init__(self, F, M, area, x2_area, x3_area):
+        self.F = F
+        self.K = np.linalg.inv(F)
+        self.F_classical = F[np.ix_(_CLASSICAL,_CLASSICAL)]
+        self.K_classical = np.linalg.inv(self.F_classical)
+        self.M = M
+        self.mass_center = (M[2,3]/M[0,0], M[0,4]/M[0,0])
+        self.geometric_center = (x2_area/area, x3_area/area)
+        # an axial force at the tension center causes no bending
+        Kc = self.K_classical
+        kappa1 = -Kc[1,0]/Kc[1,1]
+        F1 = Kc[0,0] + Kc[0,1]*kappa1
+        self.tension_center = (-(Kc[3,0] + Kc[3,1]*kappa1)/F1,
+                               (Kc[2,0] + Kc[2,1]*kappa1)/F1)
+        # a shear force at the shear center causes no twist
+        self.shear_center = (-F[3,2]/F[3,3], F[3,1]/F[3,3])
+
+    def write_K(self, filename):
+        """Write the properties to a file with the layout of a VABS .K file
+        (see vabs_utils.VabsOutputFile). An existing file is replaced."""
+        def matrix(A):
+            return ''.join([' ' + ''.join(['{0:20.10E}'.format(a)
+                for a in row]) + '\n' for row in A])
+        def point(name, xy):
+            return '  {0}2 = {1:17.10E}\n  {0}3 = {2:17.10E}\n'.format(name,
+                xy[0], xy[1])
+        rule = ' ' + 56*'=' + '\n\n'
+        blocks = [
+            ('The 6X6 Mass Matrix', matrix(self.M)),
+            ('The Mass Center of the Cross Section',
+                point('Xm', self.mass_center)),
+            ('The Geometric Center of the Cross Section',
+                point('Xg', self.geometric_center)),
+            ('Classical Stiffness Matrix (1-extension; 2-twist; 3,4-bending)',
+                matrix(self.K_classical)),
+            ('Classical Flexibility Matrix (1-extension; 2-twist; 3,4-bending)',
+                matrix(self.F_classical)),
+            ('The Neutral Axes (or Tension Center) of the Cross Section',
+                point('Xt', self.tension_center)),
+            ('Timoshenko Stiffness Matrix (1-extension; 2,3-shear, 4-twist; 5,6-bending)',
+                matrix(self.K)),
+            ('Timoshenko Flexibility Matrix (1-extension; 2,3-shear, 4-twist; 5,6-bending)',
+                matrix(self.F)),
+            ('The Generalized Shear Center of the Cross Section in the User Coordinate System',
+                point('Xs', self.shear_center))]
+        # write a temp file first, then rename it, so nothing that reads the
+        #   .K file (e.g. station_store.sync_blade, or another process) ever
+        #   sees it half written
+        temp_filename = '{0}.{1}.tmp'.format(filename, os.getpid())
+        f = open(temp_filename, 'w')
+        f.write('\n Calculated by lib/section_solver.py (not VABS)\n')
+        for (header, body) in blocks:
+            f.write('\n ' + header + '\n' + rule + body)
+        f.close()
+        if os.path.exists(filename):
+            # (Windows can't rename over an existing file)
+            os.remove(filename)
+        os.rename(temp_filename, filename)
+
+
+def material_stiffness(material_table):
+    """Returns {material number: (6x6 stiffness matrix, density)} for the rows
+    of a material table (a DataFrame of materials.csv)."""
+    materials = {}
+    for (i, row) in material_table.iterrows():
+        if row['type'] == 'isotropic':
+            D = mt.isotropic_stiffness(row['E1'], row['nu12'])
+        elif row['type'] == 'orthotropic':
+            D = mt.orthotropic_stiffness(row['E1'], row['E2'], row['E3'],
+                row['G12'], row['G13'], row['G23'], row['nu12'], row['nu13'],
+                row['nu23'])
+        else:
+            raise Warning("The material type {0} is undefined!".format(
+                row['type']))
+        materials[int(row['number'])] = (D, float(row['rho']))
+    return materials
+
+
+def _element_properties(layer_nums, theta1, layers, materials):
+    """Returns (D, rho) of each element, given {layer number: (material
+    number, layup orientation angle)} and material_stiffness()."""
+    layer_nums = np.asarray(layer_nums, dtype=int)
+    for l in np.unique(layer_nums):
+        if l not in layers:
+            raise Warning("Layer #{0} is not in the layer table!".format(l))
+    # look up each layer once, then index the per-layer arrays by element
+    (layer_list, inverse) = np.unique(layer_nums, return_inverse=True)
+    material_list = sorted(materials)
+    material_index = np.array([material_list.index(layers[l][0])
+        for l in layer_list])[inverse]
+    theta3 = np.array([layers[l][1] for l in layer_list], dtype=float)[inverse]
+    C = np.array([materials[m][0] for m in material_list])
+    rho = np.array([materials[m][1] for m in material_list])[material_index]
+    return (mt.layup_stiffness(C, material_index, theta1, theta3), rho)
+
+
+def section_from_grid(grid, material_filename, layer_filename,
+    material_table=None, layer_table=None):
+    """Returns a CrossSection for an AbaqusGrid, whose elements have layer
+    plane angles (element.theta1, see layer_plane_angles.py).
+
+    As in vabs_utils.VabsInputFile, the material and layer tables can be
+    passed in as DataFrames, to read the files only once for many stations.
+
+    """
+    if material_table is None:
+        material_table = pd.read_csv(material_filename)
+    if layer_table is None:
+        layer_table = pd.read_csv(layer_filename)
+    layers = dict([(int(row['layer number']), (int(row['material number']),
+        float(row['layup orientation angle'])))
+        for (i, row) in layer_table.iterrows()])
+    layer_nums = [e.layer_num for e in grid.list_of_elements]
+    theta1 = [e.theta1 for e in grid.list_of_elements]
+    (D, rho) = _element_properties(layer_nums, theta1, layers,
+        material_stiffness(material_table))
+    return CrossSection(grid.node_coords, grid.connectivity,
+        grid.element_types, D, rho, name=grid.filename)
+
+
+def _element_type(nodes):
+    """Returns the element type code of a row of 9 VABS node slots."""
+    if nodes[3] == 0:
+        cls = gr.TriangularQuadraticElement if nodes[4] else \
+            gr.TriangularLinearElement
+    else:
+        cls = gr.QuadrilateralQuadraticElement if nodes[4] else \
+            gr.QuadrilateralLinearElement
+    return list(gr.ELEMENT_TYPES).index(cls)
+
+
+def read_vabs_input(vabs_filename):
+    """Returns a CrossSection from a VABS input file (format_flag = 1, as
+    written by vabs_utils.VabsInputFile)."""
+    with open(vabs_filename, 'r') as f:
+        lines = [line.partition('#')[0].split() for line in f]
+    lines = [line for line in lines if line]
+    if int(lines[0][0]) != 1:
+        raise Warning("'{0}' must use format_flag = 1!".format(vabs_filename))
+    number_of_layers = int(lines[0][1])
+    flags = [int(a) for a in lines[2]]
+    i = 4 if flags[0] == 1 else 3   # (the initial curvatures, if curve_flag)
+    (nnode, nelem, nmate) = [int(a) for a in lines[i][:3]]
+    i += 1
+    node_coords = np.array(lines[i:i+nnode], dtype=float)[:,1:3]
+    i += nnode
+    connectivity = np.array(lines[i:i+nelem], dtype=int)[:,1:10]
+    i += nelem
+    a = np.array(lines[i:i+nelem], dtype=float)
+    (layer_nums, theta1) = (a[:,1].astype(int), a[:,2])
+    i += nelem
+    layers = {}
+    for line in lines[i:i+number_of_layers]:
+        layers[int(line[0])] = (int(line[1]), float(line[2]))
+    i += number_of_layers
+    materials = {}
+    for m in range(nmate):
+        (material_num, orth) = (int(lines[i][0]), int(lines[i][1]))
+        if orth == 0:
+            (E, nu) = [float(a) for a in lines[i+1]]
+            materials[material_num] = (mt.isotropic_stiffness(E, nu),
+                float(lines[i+2][0]))
+            i += 3
+        else:
+            (E1, E2, E3) = [float(a) for a in lines[i+1]]
+            (G12, G13, G23) = [float(a) for a in lines[i+2]]
+            (nu12, nu13, nu23) = [float(a) for a in lines[i+3]]
+            materials[material_num] = (mt.orthotropic_stiffness(E1, E2, E3, G12,
+                G13, G23, nu12, nu13, nu23), float(lines[i+4][0]))
+            i += 5
+    element_types = np.array([_element_type(row) for row in connectivity])
+    (D, rho) = _element_properties(layer_nums, theta1, layers, materials)
+    return CrossSection(node_coords, connectivity, element_types, D, rho,
+        name=vabs_filename)
+
+
+def _solve_station(vabs_filename):
+    t0 = time.time()
+    p = read_vabs_input(vabs_filename).solve()
+    p.write_K(vabs_filename + '.K')
+    return time.time() - t0
+
+
+def solve_stations(blade_path, station_nums, n_processes=None):
+    """Solve the VABS input files of several stations in parallel, and write
+    each station's .K file (e.g. 'sandia_blade/stn05/mesh_stn05.vabs.K').
+
+    Parameters
+    ----------
+    blade_path : str, the blade directory, e.g. 'sandia_blade'
+    station_nums : list of ints
+    n_processes : int, the number of worker processes (default: the number
+        of CPUs)
+
+    Returns {station_num: the time it took to solve the station [s]}.
+
+    Scripts that call this function on Windows must be guarded by
+    `if __name__ == '__main__':`.
+
+    """
+    filenames = []
+    for station_num in station_nums:
+        stn_str = 'stn{0:02d}'.format(station_num)
+        filename = os.path.abspath(os.path.join(blade_path, stn_str,
+            'mesh_' + stn_str + '.vabs'))
+        if not os.path.exists(filename):
+            raise Warning("The VABS input file for station {0} does not exist!".format(station_num))
+        filenames.append(filename)
+    print "SOLVING {0} cross-sections.....".format(len(filenames))
+    pool = multiprocessing.Pool(n_processes)
+    try:
+        times = pool.map(_solve_station, filenames)
+    finally:
+        pool.close()
+        pool.join()
+    for (station_num, t) in zip(station_nums, times):
+        print " stn{0:02d}: wrote mesh_stn{0:02d}.vabs.K ({1:.1f} s)".format(
+            station_num, t)
+    return dict(zip(station_nums, times))
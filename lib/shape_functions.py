@@ -0,0 +1,244 @@
+"""Isoparametric shape functions and Gauss quadrature for 2D grid elements.
+
+All functions work on whole groups of elements of the same type at once.
+Shape function arrays are ordered like the element's node_slots, e.g.
+(1, 2, 3, 5, 6, 7) for a quadratic triangle.
+
+Natural coordinates of the VABS node slots:
+
+  quadrilaterals (xi, eta in [-1,1])      triangles (r, s >= 0, r+s <= 1)
+    4---7---3                                 3
+    |       |                                 | \
+    8       6                                 7   6
+    |       |                                 |     \
+    1---5---2                                 1--5--2
+
+Usage:
+import lib.shape_functions as sf
+(points, weights) = sf.gauss_points(gr.QuadrilateralQuadraticElement)
+(N, dN) = sf.evaluate(gr.QuadrilateralQuadraticElement, points)
+X = sf.element_coords(g.node_coords, g.connectivity[rows], cls)
+detJ = sf.jacobian_determinants(dN, X)
+
+Last updated: May 12, 2014
+
+"""
+
+
+import numpy as np
+
+
+def _quad_linear(xi, eta):
+    """Bilinear quadrilateral: returns (N, dN/dxi, dN/deta) at each point."""
+    xi_n = np.array([-1.0, 1.0, 1.0, -1.0])
+    eta_n = np.array([-1.0, -1.0, 1.0, 1.0])
+    xi = xi[:,np.newaxis]
+    eta = eta[:,np.newaxis]
+    N = 0.25*(1.0 + xi*xi_n)*(1.0 + eta*eta_n)
+    dN_dxi = 0.25*xi_n*(1.0 + eta*eta_n)
+    dN_deta = 0.25*eta_n*(1.0 + xi*xi_n)
+    return (N, dN_dxi, dN_deta)
+
+
+def _quad_quadratic(xi, eta):
+    """8-node serendipity quadrilateral: returns (N, dN/dxi, dN/deta)."""
+    xi_c = np.array([-1.0, 1.0, 1.0, -1.0])
+    eta_c = np.array([-1.0, -1.0, 1.0, 1.0])
+    xi = xi[:,np.newaxis]
+    eta = eta[:,np.newaxis]
+    # corner nodes 1-4
+    Nc = 0.25*(1.0 + xi*xi_c)*(1.0 + eta*eta_c)*(xi*xi_c + eta*eta_c - 1.0)
+    dNc_dxi = 0.25*xi_c*(1.0 + eta*eta_c)*(2.0*xi*xi_c + eta*eta_c)
+    dNc_deta = 0.25*eta_c*(1.0 + xi*xi_c)*(xi*xi_c + 2.0*eta*eta_c)
+    # midside nodes 5, 7 (on eta = -1, +1) and 6, 8 (on xi = +1, -1)
+    one = np.ones_like(xi)
+    N5 = 0.5*(1.0 - xi**2)*(1.0 - eta)
+    N6 = 0.5*(1.0 + xi)*(1.0 - eta**2)
+    N7 = 0.5*(1.0 - xi**2)*(1.0 + eta)
+    N8 = 0.5*(1.0 - xi)*(1.0 - eta**2)
+    dN5_dxi = -xi*(1.0 - eta)
+    dN6_dxi = 0.5*(1.0 - eta**2)*one
+    dN7_dxi = -xi*(1.0 + eta)
+    dN8_dxi = -0.5*(1.0 - eta**2)*one
+    dN5_deta = -0.5*(1.0 - xi**2)*one
+    dN6_deta = -(1.0 + xi)*eta
+    dN7_deta = 0.5*(1.0 - xi**2)*one
+    dN8_deta = -(1.0 - xi)*eta
+    N = np.hstack((Nc, N5, N6, N7, N8))
+    dN_dxi = np.hstack((dNc_dxi, dN5_dxi, dN6_dxi, dN7_dxi, dN8_dxi))
+    dN_deta = np.hstack((dNc_deta, dN5_deta, dN6_deta, dN7_deta, dN8_deta))
+    return (N, dN_dxi, dN_deta)
+
+
+def _tri_linear(r, s):
+    """Linear triangle: returns (N, dN/dr, dN/ds) at each point."""
+    N = np.column_stack((1.0 - r - s, r, s))
+    dN_dr = np.tile([-1.0, 1.0, 0.0], (len(r),1))
+    dN_ds = np.tile([-1.0, 0.0, 1.0], (len(r),1))
+    return (N, dN_dr, dN_ds)
+
+
+def _tri_quadratic(r, s):
+    """Quadratic (6-node) triangle: returns (N, dN/dr, dN/ds) at each point."""
+    t = 1.0 - r - s
+    N = np.column_stack((t*(2.0*t - 1.0), r*(2.0*r - 1.0), s*(2.0*s - 1.0),
+        4.0*t*r, 4.0*r*s, 4.0*s*t))
+    zero = np.zeros_like(r)
+    dN_dr = np.column_stack((1.0 - 4.0*t, 4.0*r - 1.0, zero,
+        4.0*(t - r), 4.0*s, -4.0*s))
+    dN_ds = np.column_stack((1.0 - 4.0*t, zero, 4.0*s - 1.0,
+        -4.0*r, 4.0*r, 4.0*(t - s)))
+    return (N, dN_dr, dN_ds)
+
+
+# keyed by class name, so the table survives reload(grid)
+_shape_functions = {
+    'QuadrilateralLinearElement': _quad_linear,
+    'QuadrilateralQuadraticElement': _quad_quadratic,
+    'TriangularLinearElement': _tri_linear,
+    'TriangularQuadraticElement': _tri_quadratic}
+
+# natural coordinates of each node slot (1-9)
+_quad_nodes = {1: (-1.0,-1.0), 2: (1.0,-1.0), 3: (1.0,1.0), 4: (-1.0,1.0),
+    5: (0.0,-1.0), 6: (1.0,0.0), 7: (0.0,1.0), 8: (-1.0,0.0)}
+_tri_nodes = {1: (0.0,0.0), 2: (1.0,0.0), 3: (0.0,1.0),
+    5: (0.5,0.0), 6: (0.5,0.5), 7: (0.0,0.5)}
+
+
+def is_triangle(element_class):
+    """Returns True if element_class is a triangular element."""
+    return element_class.__name__ in ('TriangularLinearElement',
+        'TriangularQuadraticElement')
+
+
+def node_points(element_class):
+    """Returns the natural coordinates of the element nodes (in node_slots order).
+
+    Returns an array with shape (number of nodes, 2).
+
+    """
+    if is_triangle(element_class):
+        table = _tri_nodes
+    else:
+        table = _quad_nodes
+    return np.array([table[i] for i in element_class.node_slots])
+
+
+def corner_points(element_class):
+    """Returns the natural coordinates of the element corners, counter-clockwise.
+
+    Returns an array with shape (number of corners, 2).
+
+    """
+    if is_triangle(element_class):
+        return np.array([_tri_nodes[i] for i in (1, 2, 3)])
+    else:
+        return np.array([_quad_nodes[i] for i in (1, 2, 3, 4)])
+
+
+def gauss_points(element_class, order=None):
+    """Returns Gauss quadrature points and weights for an element type.
+
+    The default rule integrates the element mass and stiffness exactly for
+    straight-sided elements: 2x2 points for linear quadrilaterals, 3x3 for
+    quadratic quadrilaterals, 1 point for linear triangles and 3 points for
+    quadratic triangles.
+
+    Parameters
+    ----------
+    element_class : a subclass of gr._Element
+    order : int, number of points per direction for quadrilaterals (1-3), or
+        the total number of points for triangles (1, 3, or 6)
+
+    Returns (points, weights), with shapes (p, 2) and (p,). The triangle
+    weights sum to 0.5, the area of the natural triangle.
+
+    """
+    if is_triangle(element_class):
+        if order is None:
+            order = 3 if element_class.is_quadratic else 1
+        if order == 1:
+            points = np.array([[1.0/3.0, 1.0/3.0]])
+            weights = np.array([0.5])
+        elif order == 3:
+            points = np.array([[1.0/6.0, 1.0/6.0],
+                               [2.0/3.0, 1.0/6.0],
+                               [1.0/6.0, 2.0/3.0]])
+            weights = np.array([1.0, 1.0, 1.0])/6.0
+        elif order == 6:
+            a = 0.445948490915965
+            b = 0.091576213509771
+            wa = 0.223381589678011/2.0
+            wb = 0.109951743655322/2.0
+            points = np.array([[a, a], [1.0-2.0*a, a], [a, 1.0-2.0*a],
+                               [b, b], [1.0-2.0*b, b], [b, 1.0-2.0*b]])
+            weights = np.array([wa, wa, wa, wb, wb, wb])
+        else:
+            raise ValueError("Triangle Gauss rules have 1, 3, or 6 points.")
+    else:
+        if order is None:
+            order = 3 if element_class.is_quadratic else 2
+        if order not in (1, 2, 3):
+            raise ValueError("Quadrilateral Gauss rules have 1-3 points per direction.")
+        (x, w) = np.polynomial.legendre.leggauss(order)
+        (xi, eta) = np.meshgrid(x, x)
+        points = np.column_stack((xi.ravel(), eta.ravel()))
+        weights = np.outer(w, w).ravel()
+    return (points, weights)
+
+
+def evaluate(element_class, points):
+    """Evaluate the shape functions of an element type at natural points.
+
+    Parameters
+    ----------
+    element_class : a subclass of gr._Element
+    points : array, shape (p, 2), natural coordinates
+
+    Returns (N, dN), with shapes (p, n) and (p, n, 2), where n is the number
+    of element nodes and dN[:,:,0], dN[:,:,1] are the derivatives with respect
+    to the first and second natural coordinates.
+
+    """
+    points = np.atleast_2d(np.asarray(points, dtype=float))
+    (N, dN_da, dN_db) = _shape_functions[element_class.__name__](points[:,0],
+        points[:,1])
+    return (N, np.dstack((dN_da, dN_db)))
+
+
+def element_coords(node_coords, connectivity, element_class):
+    """Returns the nodal (x2, x3) coordinates for a group of elements.
+
+    Parameters
+    ----------
+    node_coords : np.array, shape (number_of_nodes, 2), where row i holds
+        node #(i+1)
+    connectivity : np.array, shape (e, 9), node numbers in the VABS node slots
+        of e elements that are all instances of element_class
+    element_class : a subclass of gr._Element
+
+    Returns an array with shape (e, n, 2), in node_slots order.
+
+    """
+    slots = np.array(element_class.node_slots) - 1
+    return node_coords[connectivity[:,slots]-1]
+
+
+def jacobians(dN, X):
+    """Returns the Jacobian matrices for a group of elements at several points.
+
+    J[e,p,a,b] = d(x_b)/d(natural coordinate a) for element e at point p.
+
+    Parameters
+    ----------
+    dN : array, shape (p, n, 2), from evaluate()
+    X : array, shape (e, n, 2), from element_coords()
+
+    """
+    return np.einsum('pna,enb->epab', dN, X)
+
+
+def jacobian_determinants(dN, X):
+    """Returns det(J) for a group of elements at several points, shape (e, p)."""
+    J = jacobians(dN, X)
+    return J[:,:,0,0]*J[:,:,1,1] - J[:,:,0,1]*J[:,:,1,0]
@@ -0,0 +1,424 @@
+"""Estimate the spanwise interpolation error of a blade, and add stations only
+where it is too large.
+
+The blade mass (<blade>.calculate_blade_mass()) is integrated with the
+trapezoid rule over the stations in the blade definition, and the DYMORE
+property tables are interpolated linearly between the same stations. Both are
+only as good as the station spacing, and some gaps (e.g. 27.6 m -> 35.8 m ->
+43.9 m in the Sandia blade) are much longer than others.
+
+Each station's cheap section properties are computed from the polygons of its
+structural parts, without a mesh or VABS:
+  mass     : mass per unit span, sum(rho*A)
+  EA       : axial stiffness, sum(E1*A)
+  EI_flap  : flapwise bending stiffness, sum(E1*int(x3^2)), about the
+             modulus-weighted centroid
+  EI_edge  : edgewise bending stiffness, sum(E1*int(x2^2)), ditto
+(E1 is the axial modulus of each material, 1/S_11, see material.py.)
+
+Then, for each gap between neighboring stations, a trial station is built at
+the middle of the gap, and its properties are compared with the linear
+interpolation of its neighbors. The relative difference is the interpolation
+error of the gap. Only the trial stations whose error is larger than the
+tolerance are kept, and the halves of their gaps are checked the same way,
+until every gap is converged (or max_levels is reached). So the expensive
+stations (meshed, and solved with VABS) are only added where the blade
+properties actually change faster than linearly. A gap whose trial station
+(or one of its end stations) can't be built has no error estimate, so it is
+reported as unconverged instead (see .unconverged), along with the gaps that
+were still too coarse after max_levels.
+
+A new station's row of the blade definition is interpolated from the two
+original stations around it: numbers linearly in x1, parts that only exist
+at one of them from the nearer one (with their chordwise widths scaled by
+the chord, so they still fit on the new airfoil), and the airfoil is a blend
+of the two airfoils (see blend_airfoils), written to the airfoils directory. Gaps
+between a monoplane and a biplane station (the joints) are never refined.
+
+Usage:
+import lib.spanwise_refinement as sr
+r = sr.SpanwiseRefinement('sandia_blade', tol=0.02)
+r.run()
+r.table           # cheap properties of all stations, old and new
+r.history         # number of stations and blade mass after each level
+r.unconverged     # gaps that couldn't be checked, or are still too coarse
+r.write_blade('sandia_blade_refined')   # a new blade path, ready to mesh
+
+Last updated: May 13, 2014
+
+"""
+
+
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+import blade as bl
+import blade_definition as bd
+import loft as lf
+reload(bl)
+reload(bd)
+reload(lf)
+
+
+# the cheap section properties that are checked
+PROPERTIES = ['mass', 'EA', 'EI_flap', 'EI_edge']
+
+# blade definition columns that name an airfoil file (without '.txt')
+AIRFOIL_COLUMNS = ['airfoil', 'airfoil upper']
+
+# chordwise widths and positions [m] of the parts, which are scaled by the
+#   chord when a part only exists at one end of a gap (each one also has an
+#   ' upper' column, scaled by 'chord upper')
+CHORDWISE_COLUMNS = ['spar cap base', 'TE reinf base', 'shear web 1 x2',
+    'shear web 2 x2', 'shear web 3 x2']
+
+# files copied from the blade path into a new blade path
+BLADE_FILES = ['materials.csv', 'layers.csv']
+
+
+def _rings(polygon):
+    """Yields (coords, sign) of the exterior (+1) and holes (-1) of a Polygon
+    or MultiPolygon."""
+    for p in getattr(polygon, 'geoms', [polygon]):
+        yield (np.asarray(p.exterior.coords), 1.0)
+        for ring in p.interiors:
+            yield (np.asarray(ring.coords), -1.0)
+
+
+def polygon_integrals(polygon):
+    """Returns [int(1), int(x2), int(x3), int(x2^2), int(x3^2)] over a
+    polygon, from its vertices (Green's theorem)."""
+    I = np.zeros(5)
+    for (P, sign) in _rings(polygon):
+        (x, y) = (P[:-1,0], P[:-1,1])
+        (xn, yn) = (P[1:,0], P[1:,1])
+        a = x*yn - xn*y
+        ring = np.array([
+            np.sum(a)/2.0,
+            np.sum(a*(x + xn))/6.0,
+            np.sum(a*(y + yn))/6.0,
+            np.sum(a*(x**2 + x*xn + xn**2))/12.0,
+            np.sum(a*(y**2 + y*yn + yn**2))/12.0])
+        # make the exterior positive and the holes negative, whichever way
+        #   the rings are oriented
+        I += sign*np.sign(ring[0])*ring
+    return I
+
+
+def _station_layers(station):
+    st = station.structure
+    if station.type == 'monoplane':
+        return st._list_of_layers
+    return st._list_of_lower_layers + st._list_of_upper_layers
+
+
+def station_properties(station):
+    """Returns {property: value} of the cheap section properties of a station
+    (see PROPERTIES), whose layers have been created."""
+    (mass, EI) = (0.0, np.zeros(5))
+    for layer in _station_layers(station):
+        I = polygon_integrals(layer.polygon)
+        mass += layer.material.rho*I[0]
+        EI += I/layer.material.S[0,0]
+    (EA, x2, x3) = (EI[0], EI[1]/EI[0], EI[2]/EI[0])
+    return {'mass': mass, 'EA': EA,
+            'EI_flap': EI[4] - EA*x3**2,
+            'EI_edge': EI[3] - EA*x2**2}
+
+
+def _read_airfoil(filename):
+    c = np.loadtxt(filename, dtype=[('x', 'f8'), ('y', 'f8')], comments='#')
+    return np.column_stack((c['x'], c['y']))
+
+
+def _LE_index(P):
+    """The LE, as in <Airfoil>.split_at_LE_and_TE(): the first point after
+    the TE with y = 0."""
+    i = np.nonzero(P[1:,1] == 0.0)[0]
+    if len(i) == 0:
+        return int(np.argmin(P[:,0]))
+    return int(i[0]) + 1
+
+
+def blend_airfoils(filename_a, filename_b, w, filename, TE_tol=1.0e-9):
+    """Write the airfoil (1-w)*a + w*b to a file.
+
+    Both airfoils are resampled to the same number of points on each side of
+    the LE (see loft.common_parametrization), so the LE stays at y = 0.
+
+    Returns 'yes' if the blended airfoil has a sharp TE, 'no' otherwise.
+
+    """
+    (Pa, Pb) = (_read_airfoil(filename_a), _read_airfoil(filename_b))
+    (ia, ib) = (_LE_index(Pa), _LE_index(Pb))
+    n = max(ia + 1, len(Pa) - ia, ib + 1, len(Pb) - ib)
+    Q = ((1.0 - w)*lf.common_parametrization(Pa, n, ia) +
+        w*lf.common_parametrization(Pb, n, ib))
+    Q[n-1,1] = 0.0
+    np.savetxt(filename, Q, fmt='%.9f', delimiter='\t')
+    return 'yes' if np.sqrt(np.sum((Q[0] - Q[-1])**2)) <= TE_tol else 'no'
+
+
+class SpanwiseRefinement:
+    """Adaptive spanwise refinement of the stations of a blade.
+
+    Parameters
+    ----------
+    blade_path : str, the blade directory, e.g. 'sandia_blade'
+    tol : float, the largest relative interpolation error of any property at
+        the middle of a gap
+    max_levels : int, the largest number of times a gap is halved
+    min_spacing : float, gaps shorter than twice this [m] are not split
+    properties : list of str, the properties that are checked (see
+        PROPERTIES)
+    defn_filename : str, the blade definition file in blade_path
+
+    Attributes (after run())
+    ----------
+    x1 : np.array, the spanwise coords of all the stations, old and new
+    table : DataFrame, one row per station: x1, the cheap properties, 'new'
+        (True for added stations), 'error' (the interpolation error that
+        added the station), and 'source' (the original station numbers around
+        it)
+    history : DataFrame, one row per level: stations, trial stations, added
+        stations, unconverged gaps, blade mass
+    errors : list of (x1, message) for stations that couldn't be built
+    unconverged : list of (x1 start, x1 end, reason) for the gaps that
+        aren't converged: their trial station or one of their end stations
+        couldn't be built, or they were still too coarse after max_levels
+
+    """
+    def __init__(self, blade_path, tol=0.02, max_levels=4, min_spacing=0.25,
+        properties=PROPERTIES, defn_filename='blade_definition.csv'):
+        self.blade_path = blade_path
+        self.tol = tol
+        self.max_levels = max_levels
+        self.min_spacing = min_spacing
+        self.properties = list(properties)
+        self.definition = bd.load(os.path.join(blade_path, defn_filename))
+        self.rows = self.definition.to_dataframe()
+        self.types = self.definition['type']
+        self.original_x1 = self.definition['x1'].astype(float)
+        self.errors = []
+        self.unconverged = []
+
+    def _bracket(self, x):
+        """Returns (i, w): x is at a fraction w of the way from original
+        station #(i+1) to #(i+2)."""
+        x0 = self.original_x1
+        i = int(np.clip(np.searchsorted(x0, x, side='right') - 1, 0,
+            len(x0) - 2))
+        return (i, (x - x0[i])/(x0[i+1] - x0[i]))
+
+    def interpolate_row(self, x, airfoils_path):
+        """Returns the blade definition row (a Series) of a new station at x,
+        and writes its blended airfoils to airfoils_path."""
+        (i, w) = self._bracket(x)
+        (a, b) = (self.rows.iloc[i], self.rows.iloc[i+1])
+        if w == 0.0:
+            return a.copy()
+        row = a.copy()
+        nearer = a if w <= 0.5 else b
+        for column in self.rows.columns:
+            (va, vb) = (a[column], b[column])
+            if column in self.definition.str_columns:
+                row[column] = nearer[column]
+            elif pd.isnull(va) or pd.isnull(vb):
+                row[column] = nearer[column]
+            else:
+                row[column] = (1.0 - w)*va + w*vb
+        # a part from the nearer station must fit on the interpolated chord
+        #   (e.g. the spar cap of the last station before a tip without one)
+        for column in self.rows.columns:
+            if column.endswith(' upper'):
+                (name, chord) = (column[:-len(' upper')], 'chord upper')
+            else:
+                (name, chord) = (column, 'chord')
+            if (name in CHORDWISE_COLUMNS and chord in row and
+                    (pd.isnull(a[column]) != pd.isnull(b[column])) and
+                    not pd.isnull(row[column])):
+                row[column] *= row[chord]/nearer[chord]
+        row['x1'] = x
+        for column in AIRFOIL_COLUMNS:
+            if (column in row and not pd.isnull(a[column]) and
+                not pd.isnull(b[column]) and a[column] != b[column]):
+                name = '{0}_{1}_{2:04d}'.format(a[column], b[column],
+                    int(round(1.0e4*w)))
+                sharp_TE = blend_airfoils(
+                    os.path.join(airfoils_path, a[column] + '.txt'),
+                    os.path.join(airfoils_path, b[column] + '.txt'),
+                    w, os.path.join(airfoils_path, name + '.txt'))
+                row[column] = name
+                if column == 'airfoil':
+                    row['has sharp TE'] = sharp_TE
+        if 'comment' in row:
+            row['comment'] = 'interpolated between stations #{0} and #{1}'.format(
+                i+1, i+2)
+        return row
+
+    def _write_definition(self, x1, path):
+        """Write a blade path with stations at x1 (and blended airfoils)."""
+        if not os.path.exists(path):
+            os.mkdir(path)
+        airfoils_path = os.path.join(path, 'airfoils')
+        if not os.path.exists(airfoils_path):
+            shutil.copytree(os.path.join(self.blade_path, 'airfoils'),
+                airfoils_path)
+        for filename in BLADE_FILES:
+            if os.path.exists(os.path.join(self.blade_path, filename)):
+                shutil.copy(os.path.join(self.blade_path, filename), path)
+        rows = []
+        for x in x1:
+            j = np.nonzero(self.original_x1 == x)[0]
+            if len(j):
+                rows.append(self.rows.iloc[j[0]].copy())
+            else:
+                rows.append(self.interpolate_row(x, airfoils_path))
+        df = pd.DataFrame(rows, columns=self.rows.columns)
+        df.index = pd.Index(np.arange(1, len(df)+1),
+            name=self.rows.index.name)
+        df.to_csv(os.path.join(path, 'blade_definition.csv'))
+
+    def station_properties(self, x1):
+        """Returns an array of the cheap properties of stations at x1, shape
+        (len(x1), len(properties)), built in a scratch blade path. Stations
+        that can't be built are NaN (see .errors)."""
+        props = np.nan*np.ones((len(x1), len(self.properties)))
+        if len(x1) == 0:
+            return props
+        scratch_path = tempfile.mkdtemp()
+        try:
+            path = os.path.join(scratch_path, 'blade')
+            self._write_definition(x1, path)
+            if np.any(self.types == 'biplane'):
+                b = bl.BiplaneBlade('refinement', path)
+            else:
+                b = bl.MonoplaneBlade('refinement', path)
+            for (i, station) in enumerate(b.list_of_stations):
+                try:
+                    station.airfoil.create_polygon()
+                    station.structure.create_all_layers()
+                    p = station_properties(station)
+                    props[i] = [p[name] for name in self.properties]
+                except Exception as e:
+                    self.errors.append((x1[i], repr(e)))
+            b.close()
+        finally:
+            shutil.rmtree(scratch_path, ignore_errors=True)
+        return props
+
+    def _splittable(self, x1, i):
+        """Can the gap between stations i and i+1 (of x1) be split?"""
+        (j, w) = self._bracket(0.5*(x1[i] + x1[i+1]))
+        return (self.types[j] == self.types[j+1] and
+            x1[i+1] - x1[i] >= 2.0*self.min_spacing)
+
+    def run(self, print_flag=True):
+        """Refine the stations until every gap is converged (or listed in
+        .unconverged).
+
+        Returns the table of all stations (see the class attributes).
+
+        """
+        self.errors = []
+        self.unconverged = []
+        x1 = list(self.original_x1)
+        props = list(self.station_properties(self.original_x1))
+        new = [False]*len(x1)
+        error = [np.nan]*len(x1)
+        gaps = [i for i in range(len(x1)-1) if self._splittable(x1, i)]
+        history = [(0, len(x1), 0, 0, 0, self._mass(x1, props))]
+        for level in range(1, self.max_levels+1):
+            if not gaps:
+                break
+            mid = np.array([0.5*(x1[i] + x1[i+1]) for i in gaps])
+            mid_props = self.station_properties(mid)
+            # the interpolation error at the middle of each gap
+            (a, b) = (np.array([props[i] for i in gaps]),
+                      np.array([props[i+1] for i in gaps]))
+            with np.errstate(invalid='ignore', divide='ignore'):
+                e = np.abs(mid_props - 0.5*(a + b))/np.maximum(np.abs(a),
+                    np.abs(b))
+                # (a property that is zero at both ends has no error)
+                e = np.max(np.where(np.isnan(e), 0.0, e), axis=1)
+            # a gap can't be checked if its trial station or one of its end
+            #   stations couldn't be built
+            failed = (np.all(np.isnan(mid_props), axis=1) |
+                np.all(np.isnan(a), axis=1) | np.all(np.isnan(b), axis=1))
+            e[failed] = np.nan
+            for k in np.nonzero(failed)[0]:
+                self.unconverged.append((x1[gaps[k]], x1[gaps[k]+1],
+                    "a station couldn't be built"))
+            accepted = [k for k in range(len(gaps)) if e[k] > self.tol]
+            # insert the accepted stations, from tip to root, so the indices
+            #   of the other gaps don't move
+            new_gaps = []
+            for k in reversed(accepted):
+                i = gaps[k]
+                x1.insert(i+1, mid[k])
+                props.insert(i+1, mid_props[k])
+                new.insert(i+1, True)
+                error.insert(i+1, e[k])
+                new_gaps = [g + 1 for g in new_gaps]
+                new_gaps = [i, i+1] + new_gaps
+            gaps = [i for i in new_gaps if self._splittable(x1, i)]
+            history.append((level, len(x1), len(mid), len(accepted),
+                np.sum(failed), self._mass(x1, props)))
+            if print_flag:
+                print " Level {0}: added {1} of {2} trial stations (blade mass {3:.1f} kg)".format(
+                    level, len(accepted), len(mid), history[-1][-1])
+        # the halves of the gaps added at the last level were never checked
+        for i in gaps:
+            self.unconverged.append((x1[i], x1[i+1], 'max_levels reached'))
+        self.x1 = np.array(x1)
+        self.table = pd.DataFrame(np.array(props), columns=self.properties)
+        self.table.insert(0, 'x1', self.x1)
+        self.table['new'] = new
+        self.table['error'] = error
+        self.table['source'] = [self._source(x) for x in self.x1]
+        self.table.index = pd.Index(np.arange(1, len(x1)+1),
+            name='blade station')
+        self.history = pd.DataFrame(history, columns=['level', 'stations',
+            'trial stations', 'added stations', 'unconverged gaps',
+            'blade mass'])
+        if print_flag:
+            for (x, message) in self.errors:
+                print " [Warning] the station at x1 = {0:.3f} m couldn't be built ({1})".format(
+                    x, message)
+            for (xa, xb, reason) in self.unconverged:
+                print " [Warning] the gap from x1 = {0:.3f} m to {1:.3f} m isn't converged ({2})".format(
+                    xa, xb, reason)
+        return self.table
+
+    def _mass(self, x1, props):
+        if 'mass' not in self.properties:
+            return np.nan
+        # skip the stations that couldn't be built
+        m = np.array(props)[:,self.properties.index('mass')]
+        ok = ~np.isnan(m)
+        return np.trapz(m[ok], x=np.asarray(x1)[ok])
+
+    def _source(self, x):
+        (i, w) = self._bracket(x)
+        if w == 0.0:
+            return '#{0}'.format(i+1)
+        if w == 1.0:
+            return '#{0}'.format(i+2)
+        return '#{0}-#{1}'.format(i+1, i+2)
+
+    def blade_mass(self):
+        """Returns the blade mass [kg], integrated over all the stations
+        (except the ones in .errors)."""
+        return self._mass(self.x1, self.table[self.properties].values)
+
+    def new_stations(self):
+        """Returns the station numbers (in the refined blade) of the added
+        stations, which still have to be meshed and solved."""
+        return list(self.table.index[self.table['new'].values])
+
+    def write_blade(self, path):
+        """Write the refined blade to a new blade path: blade definition,
+        airfoils (with the blended ones), materials, and layers."""
+        self._write_definition(self.x1, path)
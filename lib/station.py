@@ -15,6 +15,7 @@ Last updated: April 14, 2014
 
 
 import os
+import weakref
 import numpy as np
 import matplotlib.pyplot as plt
 import transformation as tf
@@ -34,6 +35,12 @@ from descartes import PolygonPatch
 from math import isnan
 
 
+# the structural parts whose '.left' and '.right' edges are set by
+#   <Station>.find_part_edges()
+EDGE_PARTS = ['spar_cap', 'TE_reinforcement', 'shear_web_1', 'shear_web_2',
+    'shear_web_3', 'LE_panel', 'aft_panel_1', 'aft_panel_2']
+
+
 class _Station:
     """Define a station for a wind turbine blade.
 
@@ -45,21 +52,27 @@ class _Station:
 
     Usage
     -----
-    import pandas as pd
+    import blade_definition as bd
     import station as stn
-    df = pd.read_csv('Sandia_blade.csv', index_col=0)
-    s5 = stn._Station(df.ix[5])  # import station 5
+    d = bd.load('sandia_blade/blade_definition.csv')
+    s5 = stn._Station(d.row(5), 'sandia_blade')  # import station 5
 
     """
     logfile_name = 'station.log'
-    number_of_stations = 0
-    def __init__(self, stn_series, blade_path):
+    def __init__(self, stn_series, blade_path, station_num=None):
         """Create a new blade station.
 
         Parameters
         ---------
-        stn_series : pandas.Series, properties for this station
+        stn_series : blade_definition.StationRow (or pandas.Series),
+            properties for this station
         blade_path: string, the local target directory for storing blade data
+        station_num : int, the blade station number (default: the index of
+            stn_series in the blade definition, i.e. stn_series.name)
+
+        The station number is owned by the parent blade (there is no global
+        station counter), so several blades may be built at once, e.g. on
+        threads or in one long-lived process.
 
         Attributes
         ----------
@@ -255,7 +268,7 @@ class _Station:
 
         Methods
         -------
-        .__del__() : delete this station
+        .close() : delete this station
         .create_plot() : create a plot for this station
         .show_plot() : show the plot
         .save_plot() : save the plot in the station path as a PNG file
@@ -283,16 +296,17 @@ class _Station:
 
         Usage
         -----    
-        _Station(b._df.ix[5], 'sandia_blade')
+        _Station(b.definition.row(5), 'sandia_blade')
         # this creates station #5 of the Sandia blade
-        # _df is a pandas DataFrame containing properties of all blade stations
-        # _df.ix[5] gets the Series object for station #5 from DataFrame _df
+        # definition holds the properties of all blade stations
+        # definition.row(5) gets the StationRow for station #5
         # Note: _Stations are usually not created directly. New _Stations are
         # usually created by the _Blade class.
 
         """
-        _Station.number_of_stations += 1
-        self.station_num = _Station.number_of_stations
+        if station_num is None:
+            station_num = stn_series.name
+        self.station_num = int(station_num)
         self.station_path = os.path.join(blade_path, 'stn{0:02d}'.format(self.station_num))
         try:
             os.mkdir(self.station_path)
@@ -309,9 +323,9 @@ class _Station:
         self.logf.flush()
         self.logf.close()
 
-    def __del__(self):
-        _Station.number_of_stations = _Station.number_of_stations - 1
-        print " Station deleted, and now _Station.number_of_stations = {0}".format(_Station.number_of_stations)
+    def close(self):
+        """Delete this station. (Called by <blade>.close().)"""
+        print " Deleted blade station #{0}".format(self.station_num)
 
     def create_plot(self, legend_flag=False):
         """Create a plot for this station.
@@ -352,13 +366,28 @@ class _Station:
         patch = PolygonPatch(polygon, fc=face_color, ec=edge_color, alpha=alpha)
         axes.add_patch(patch)
 
+    def _part_edges(self, prefix=''):
+        """Returns the chordwise coords (in meters) of the left and right
+        edges of all the structural parts in this station.
+
+        Must run <Station>.find_part_edges() first.
+
+        """
+        st = self.structure
+        edges = []
+        for name in EDGE_PARTS:
+            part = getattr(st, prefix + name)
+            if part.exists():
+                edges += [part.left, part.right]
+        return [x for x in edges if x is not None and not isnan(x)]
+
 
 class MonoplaneStation(_Station):
     """Define a monoplane station for a wind turbine blade."""
-    def __init__(self, stn_series, blade_path, parent_blade):
+    def __init__(self, stn_series, blade_path, parent_blade, station_num=None):
         """Create a new biplane station for a biplane blade."""
-        _Station.__init__(self, stn_series, blade_path)
-        self.parent_blade = parent_blade
+        _Station.__init__(self, stn_series, blade_path, station_num)
+        self.parent_blade = weakref.proxy(parent_blade)
         self.type = 'monoplane'
         self.airfoil = airf.MonoplaneAirfoil(
             name=stn_series['airfoil'],
@@ -497,6 +526,18 @@ class MonoplaneStation(_Station):
                 st.aft_panel_2.right = np.nan
                 raise Warning("'aft panel 2, right' is undefined for station #{0}".format(self.station_num))
 
+    def resample_airfoil_coords(self, max_error=1.0e-4, spacing='curvature'):
+        """Resample the airfoil coordinates to a chordal error, keeping a
+        point at each part edge (see airfoil_utils.py).
+
+        Must run <Station>.airfoil.read_coords() and
+        <Station>.find_part_edges() first, and before
+        <Station>.airfoil.scale_and_translate_coords().
+
+        """
+        self.airfoil.resample_coords(max_error, spacing,
+            part_edges=self._part_edges())
+
     def plot_parts(self, ax=None):
         """Plots the structural parts in this blade station."""
         if ax is None:
@@ -682,10 +723,10 @@ class MonoplaneStation(_Station):
 
 class BiplaneStation(_Station):
     """Define a biplane station for a biplane wind turbine blade."""
-    def __init__(self, stn_series, blade_path, parent_blade):
+    def __init__(self, stn_series, blade_path, parent_blade, station_num=None):
         """Create a new biplane station for a biplane blade."""
-        _Station.__init__(self, stn_series, blade_path)
-        self.parent_blade = parent_blade
+        _Station.__init__(self, stn_series, blade_path, station_num)
+        self.parent_blade = weakref.proxy(parent_blade)
         self.type = 'biplane'
         self.airfoil = airf.BiplaneAirfoil(
             name=stn_series['airfoil']+'_biplane',
@@ -883,6 +924,19 @@ class BiplaneStation(_Station):
                 st.lower_aft_panel_2.right = np.nan
                 raise Warning("'aft panel 2, right' is undefined for station #{0}".format(self.station_num))
 
+    def resample_airfoil_coords(self, max_error=1.0e-4, spacing='curvature'):
+        """Resample the lower and upper airfoil coordinates to a chordal
+        error, keeping a point at each part edge (see airfoil_utils.py).
+
+        Must run <Station>.airfoil.read_coords() and
+        <Station>.find_part_edges() first, and before
+        <Station>.airfoil.scale_and_translate_coords().
+
+        """
+        self.airfoil.resample_coords(max_error, spacing,
+            lower_part_edges=self._part_edges('lower_'),
+            upper_part_edges=self._part_edges('upper_'))
+
     def find_SW_cs_coords(self):
         """Find the corners of each shear web cross-section.
 
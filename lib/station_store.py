@@ -0,0 +1,410 @@
+"""A content-addressed store for station artifacts that are shared by blades.
+
+Each station is keyed by a hash of the inputs that define its cross-section:
+its row in the blade definition file (without the spanwise position and other
+columns that don't change the cross-section), the contents of its airfoil
+coordinate file(s), and the contents of the material and layer files. (The
+material strengths don't change the cross-section's VABS results, so they
+are left out of the material file's hash.)
+
+The VABS files of a station also depend on its mesh and on how the layer
+plane angles are assigned, so they are keyed by a hash of all of the above,
+plus the contents of the station's mesh file and the station's rows of the
+blade's 'layer_plane_angle_rules.csv' and 'element_fixes.csv' files. Meshes,
+VABS input files, and VABS output files are stored once under their keys:
+  station_store/
+    <key>/
+      inputs.json     (the normalized inputs that were hashed)
+      mesh.abq        (TrueGrid mesh, ABAQUS format)
+    <VABS key>/
+      inputs.json
+      mesh.vabs       (VABS input file)
+      mesh.vabs.K     (VABS mass and stiffness matrices)
+and are copied into the station path of every blade or alt config that
+contains an identical station, e.g. 'biplane_blade/stn25/mesh_stn25.vabs'. A
+station that is already in the store never needs to be remeshed or re-solved.
+Identical stations only share their VABS files if their rows of the rule and
+element fixes files are the same, so a biplane station with the same mesh as
+a Sandia station repeats the Sandia station's rows (see
+layer_plane_angles.py).
+
+Files are always copied (never hard-linked) in and out of the store, because
+VabsInputFile and VABS itself rewrite the files in a station path in place,
+and a stored file must never change.
+
+Usage:
+import lib.station_store as ss
+ss.sync_blade('sandia_blade')    # store the Sandia blade's artifacts
+ss.sync_blade('biplane_blade')   # fetch the shared stations for the biplane
+ss.stations_missing('biplane_blade', '.vabs.K')   # stations that need VABS
+
+Last updated: May 13, 2014
+
+"""
+
+
+import os
+import csv
+import json
+import shutil
+import filecmp
+import hashlib
+import numpy as np
+import pandas as pd
+
+
+DEFAULT_STORE_PATH = 'station_store'
+
+# artifact suffixes, appended to 'mesh_stnXX' in a station path and to 'mesh'
+# in the store
+ARTIFACTS = ['.abq', '.vabs', '.vabs.K']
+
+# blade definition columns that don't change the cross-section
+IGNORED_COLUMNS = ['x1', 'x2', 'x3', 'k2', 'k3', 'lower SW ref pt fraction',
+                   'upper SW ref pt fraction', 'comment']
+
+# material file columns that don't change the cross-section's VABS results
+STRENGTH_COLUMNS = ['Xt', 'Xc', 'Yt', 'Yc', 'Zt', 'Zc', 'S12', 'S13', 'S23']
+
+# blade definition columns that name an airfoil file in airfoils_path
+AIRFOIL_COLUMNS = ['airfoil', 'airfoil upper']
+
+# inputs that change the VABS files of a station, but not its mesh
+VABS_INPUTS = ['mesh', 'rules', 'element fixes']
+
+# artifacts that are made from the mesh (keyed by the VABS inputs)
+VABS_ARTIFACTS = ['.vabs', '.vabs.K']
+
+
+def file_hash(filename):
+    """Returns the SHA-1 hash of a text file, ignoring Windows line endings."""
+    with open(filename, 'rb') as f:
+        s = f.read()
+    return hashlib.sha1(s.replace('\r\n', '\n')).hexdigest()
+
+
+def material_hash(filename):
+    """Returns the SHA-1 hash of a material file, without its strength
+    columns. (A material file without strength columns has the same hash as
+    file_hash().)"""
+    with open(filename, 'rb') as f:
+        rows = list(csv.reader(f))
+    keep = [i for (i, column) in enumerate(rows[0])
+            if column not in STRENGTH_COLUMNS]
+    s = ''.join([','.join([row[i] for i in keep]) + '\n' for row in rows])
+    return hashlib.sha1(s).hexdigest()
+
+
+def read_tables(rule_filename, fixes_filename):
+    """Returns (rule table, element fixes) as DataFrames, from a blade's
+    'layer_plane_angle_rules.csv' and 'element_fixes.csv' files (None for a
+    missing file)."""
+    tables = []
+    for filename in (rule_filename, fixes_filename):
+        if filename is not None and os.path.exists(filename):
+            tables.append(pd.read_csv(filename))
+        else:
+            tables.append(None)
+    return tuple(tables)
+
+
+def rule_inputs(station_num, rule_table=None, element_fixes=None):
+    """Returns a dict of a station's rows of the rule table and the element
+    fixes (see layer_plane_angles.py), without the station numbers, so that
+    identical stations of different blades get the same inputs. Tables without
+    any rows for this station are left out."""
+    inputs = {}
+    if rule_table is not None:
+        t = rule_table[(rule_table['first station'] <= station_num) &
+                       (rule_table['last station'] >= station_num)]
+        if len(t) > 0:
+            inputs['rules'] = [[str(name), str(edges)]
+                for (name, edges) in zip(t['element set'], t['edges'])]
+    if element_fixes is not None:
+        f = element_fixes[element_fixes['station'] == station_num]
+        if len(f) > 0:
+            inputs['element fixes'] = [
+                [int(num), str(name), None if pd.isnull(from_num)
+                    else int(from_num)]
+                for (num, name, from_num) in zip(f['element number'],
+                    f['element set'], f['theta1 from element'])]
+    return inputs
+
+
+def station_inputs(stn_series, airfoils_path, material_hash, layer_hash):
+    """Returns a dict of the normalized inputs that define a station.
+
+    Blank cells are dropped, so that a monoplane station of a biplane blade
+    (with blank biplane columns and a zero gap-to-chord ratio) has the same
+    inputs as the same station of a monoplane blade.
+
+    Parameters
+    ----------
+    stn_series : pandas.Series, one row of a blade definition file
+    airfoils_path : str, the directory that contains the airfoil files
+    material_hash, layer_hash : str, hashes of the material and layer files
+
+    """
+    inputs = {'materials': material_hash, 'layers': layer_hash}
+    for (column, value) in stn_series.iteritems():
+        if column in IGNORED_COLUMNS:
+            continue
+        if isinstance(value, float) and np.isnan(value):
+            continue
+        if column == 'type' and value == 'monoplane':
+            continue
+        if column == 'gap-to-chord ratio' and value == 0:
+            continue
+        if column in AIRFOIL_COLUMNS:
+            value = file_hash(os.path.join(airfoils_path, value + '.txt'))
+        if isinstance(value, np.generic):
+            value = value.item()
+        inputs[column] = value
+    return inputs
+
+
+def station_key(inputs):
+    """Returns the store key (a SHA-1 hex digest) for a dict of inputs."""
+    return hashlib.sha1(json.dumps(inputs, sort_keys=True)).hexdigest()
+
+
+def blade_station_inputs(blade_path, defn_filename='blade_definition.csv',
+    airfoils_path='airfoils', material_filename=None, layer_filename=None,
+    rule_filename=None, fixes_filename=None):
+    """Returns a dict of {station_num: inputs} for every station of a blade.
+
+    The material, layer, rule, and element fixes files default to
+    'materials.csv', 'layers.csv', 'layer_plane_angle_rules.csv', and
+    'element_fixes.csv' in blade_path. (The alt configs in
+    'alt_biplane_configs/' don't have their own, so pass the biplane blade's
+    files for them.)
+
+    The inputs include the station's rules and element fixes (see
+    rule_inputs()), but not its mesh (see artifact_key()).
+
+    """
+    if material_filename is None:
+        material_filename = os.path.join(blade_path, 'materials.csv')
+    if layer_filename is None:
+        layer_filename = os.path.join(blade_path, 'layers.csv')
+    if rule_filename is None:
+        rule_filename = os.path.join(blade_path, 'layer_plane_angle_rules.csv')
+    if fixes_filename is None:
+        fixes_filename = os.path.join(blade_path, 'element_fixes.csv')
+    (rule_table, element_fixes) = read_tables(rule_filename, fixes_filename)
+    materials = material_hash(material_filename)
+    layer_hash = file_hash(layer_filename)
+    df = pd.read_csv(os.path.join(blade_path, defn_filename), index_col=0)
+    airfoils_path = os.path.join(blade_path, airfoils_path)
+    d = {}
+    for (station_num, stn_series) in df.iterrows():
+        inputs = station_inputs(stn_series, airfoils_path, materials,
+            layer_hash)
+        inputs.update(rule_inputs(int(station_num), rule_table,
+            element_fixes))
+        d[int(station_num)] = inputs
+    return d
+
+
+def _copy(src, dst):
+    """Copy src to dst, through a temp file, so dst is never half written
+    and a hard link at dst (from an older store) is broken, not rewritten."""
+    temp = '{0}.{1}.tmp'.format(dst, os.getpid())
+    shutil.copy2(src, temp)
+    if os.path.exists(dst):
+        # (Windows can't rename over an existing file)
+        os.remove(dst)
+    os.rename(temp, dst)
+
+
+def _station_artifact(station_path, station_num, suffix):
+    return os.path.join(station_path,
+        'mesh_stn{0:02d}{1}'.format(station_num, suffix))
+
+
+def _store_artifact(store_path, key, suffix):
+    return os.path.join(store_path, key, 'mesh' + suffix)
+
+
+def artifact_inputs(inputs, suffix, mesh_hash=None):
+    """Returns the inputs that key the artifact with this suffix, or None if
+    it can't be keyed yet.
+
+    The mesh ('.abq') is keyed without the VABS_INPUTS. The VABS files are
+    keyed with them, including the hash of the mesh they were made from, so
+    they need mesh_hash.
+
+    """
+    if suffix not in VABS_ARTIFACTS:
+        return dict((k, v) for (k, v) in inputs.items()
+            if k not in VABS_INPUTS)
+    if mesh_hash is None:
+        return None
+    d = dict(inputs)
+    d['mesh'] = mesh_hash
+    return d
+
+
+def artifact_key(inputs, suffix, mesh_hash=None):
+    """Returns the store key of the artifact with this suffix, or None (see
+    artifact_inputs())."""
+    d = artifact_inputs(inputs, suffix, mesh_hash)
+    return None if d is None else station_key(d)
+
+
+def mesh_hash(inputs, station_path=None, station_num=None,
+    store_path=DEFAULT_STORE_PATH):
+    """Returns the hash of a station's mesh: the mesh in its station path if
+    there is one, otherwise the stored mesh for these inputs (if store_path
+    isn't None), otherwise None."""
+    filenames = []
+    if station_path is not None:
+        filenames.append(_station_artifact(station_path, station_num, '.abq'))
+    if store_path is not None:
+        filenames.append(_store_artifact(store_path,
+            artifact_key(inputs, '.abq'), '.abq'))
+    for filename in filenames:
+        if os.path.exists(filename):
+            return file_hash(filename)
+    return None
+
+
+def is_stored(inputs, suffix, store_path=DEFAULT_STORE_PATH,
+    station_path=None, station_num=None):
+    """Returns True if the artifact with this suffix (e.g. '.vabs.K') is in the
+    store for a station with these inputs (and the mesh in its station path,
+    if given; see mesh_hash())."""
+    key = artifact_key(inputs, suffix, mesh_hash(inputs, station_path,
+        station_num, store_path))
+    return key is not None and os.path.exists(_store_artifact(store_path,
+        key, suffix))
+
+
+def store_station(station_path, station_num, inputs,
+    store_path=DEFAULT_STORE_PATH):
+    """Add a station's artifacts to the store.
+
+    The VABS files are keyed by the mesh in the station path (they are only
+    stored if there is one). Artifacts that are already stored under their
+    key are not replaced. Returns a list of the suffixes of the artifacts that
+    were added.
+
+    """
+    added = []
+    for suffix in ARTIFACTS:
+        src = _station_artifact(station_path, station_num, suffix)
+        if not os.path.exists(src):
+            continue
+        d = artifact_inputs(inputs, suffix, mesh_hash(inputs, station_path,
+            station_num, store_path=None))
+        if d is None:
+            continue
+        key_path = os.path.join(store_path, station_key(d))
+        dst = _store_artifact(store_path, station_key(d), suffix)
+        if not os.path.exists(dst):
+            if not os.path.exists(key_path):
+                os.makedirs(key_path)
+                with open(os.path.join(key_path, 'inputs.json'), 'w') as f:
+                    json.dump(d, f, sort_keys=True, indent=2)
+            _copy(src, dst)
+            added.append(suffix)
+    return added
+
+
+def fetch_station(station_path, station_num, inputs,
+    store_path=DEFAULT_STORE_PATH):
+    """Copy a station's stored artifacts into its station path.
+
+    A station without a mesh gets the stored one. The VABS files that are
+    stored for the station's mesh replace the ones in the station path, if
+    they differ (e.g. files written before a rule or layer change). A mesh in
+    the station path is never replaced: it is an input of the VABS files'
+    key, so a remeshed station keeps its own mesh and gets (or needs) its own
+    VABS files.
+
+    Returns a list of the suffixes of the artifacts that were fetched.
+
+    """
+    fetched = []
+    for suffix in ARTIFACTS:
+        dst = _station_artifact(station_path, station_num, suffix)
+        if suffix not in VABS_ARTIFACTS and os.path.exists(dst):
+            continue
+        key = artifact_key(inputs, suffix, mesh_hash(inputs, station_path,
+            station_num, store_path=None))
+        if key is None:
+            continue
+        src = _store_artifact(store_path, key, suffix)
+        if not os.path.exists(src):
+            continue
+        if os.path.exists(dst) and filecmp.cmp(src, dst, shallow=False):
+            continue
+        if not os.path.exists(station_path):
+            os.makedirs(station_path)
+        _copy(src, dst)
+        fetched.append(suffix)
+    return fetched
+
+
+def sync_blade(blade_path, store_path=DEFAULT_STORE_PATH, station_nums=None,
+    print_flag=True, **kwargs):
+    """Store the artifacts of every station of a blade, then fetch any that
+    this blade is missing but an identical station of another blade has.
+
+    Parameters
+    ----------
+    blade_path : str, the blade directory, e.g. 'biplane_blade'
+    store_path : str, the store directory
+    station_nums : list of ints, the stations to sync (default: all stations)
+    print_flag : bool, print each stored and fetched artifact to the screen
+    kwargs : passed to blade_station_inputs()
+
+    Returns a dict of {station_num: key}, where key is the key of the
+    station's mesh.
+
+    """
+    all_inputs = blade_station_inputs(blade_path, **kwargs)
+    if station_nums is None:
+        station_nums = sorted(all_inputs.keys())
+    keys = {}
+    for station_num in station_nums:
+        inputs = all_inputs[station_num]
+        keys[station_num] = artifact_key(inputs, '.abq')
+        station_path = os.path.join(blade_path,
+            'stn{0:02d}'.format(station_num))
+        added = store_station(station_path, station_num, inputs, store_path)
+        fetched = fetch_station(station_path, station_num, inputs, store_path)
+        if '.abq' in fetched:
+            # the VABS files can only be keyed once there's a mesh
+            added += store_station(station_path, station_num, inputs,
+                store_path)
+        if print_flag:
+            mesh = mesh_hash(inputs, station_path, station_num, store_path)
+            for suffix in added:
+                print " Stored {0} stn #{1:02d} {2} --> {3}".format(blade_path,
+                    station_num, suffix,
+                    artifact_key(inputs, suffix, mesh)[:10])
+            for suffix in fetched:
+                print " Fetched {0} stn #{1:02d} {2} <-- {3}".format(
+                    blade_path, station_num, suffix,
+                    artifact_key(inputs, suffix, mesh)[:10])
+    return keys
+
+
+def stations_missing(blade_path, suffix, store_path=DEFAULT_STORE_PATH,
+    station_nums=None, **kwargs):
+    """Returns the station numbers of a blade that have no artifact with this
+    suffix (e.g. '.vabs.K'), either in the station path or in the store."""
+    all_inputs = blade_station_inputs(blade_path, **kwargs)
+    if station_nums is None:
+        station_nums = sorted(all_inputs.keys())
+    missing = []
+    for station_num in station_nums:
+        station_path = os.path.join(blade_path,
+            'stn{0:02d}'.format(station_num))
+        if not (os.path.exists(_station_artifact(station_path, station_num,
+                suffix)) or
+                is_stored(all_inputs[station_num], suffix, store_path,
+                    station_path, station_num)):
+            missing.append(station_num)
+    return missing
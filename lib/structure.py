@@ -31,10 +31,13 @@ Last updated: April 14, 2014
 
 
 import os
+import weakref
 import numpy as np
 import matplotlib.pyplot as plt
 import layer as l
+import transfinite_mesh as tm
 reload(l)
+reload(tm)
 from math import isnan
 from shapely.geometry import Polygon, asLineString
 from shapely.ops import cascaded_union
@@ -46,10 +49,15 @@ from operator import attrgetter
 # ref: https://wiki.python.org/moin/HowTo/Sorting#Operator_Module_Functions
 
 
+# the gap [m] closed between neighboring parts when their union is invalid
+#   (see merge_all_polygons())
+MERGE_GAP = 1.0e-9
+
+
 class Part:
     """Define the dimensions of a structural part."""
     def __init__(self, parent_structure, base, height):
-        self.parent_structure = parent_structure
+        self.parent_structure = weakref.proxy(parent_structure)
         self.base = base
         self.height = height
         self.left = None    # assigned later by <station>.find_part_edges()
@@ -1379,7 +1387,7 @@ class MonoplaneStructure:
                  h_int_surf_3_triax, h_int_surf_3_resin, h_int_surf_4_triax,
                  h_int_surf_4_resin, h_ext_surf_triax, h_ext_surf_gelcoat,
                  parent_station):
-        self.parent_station = parent_station
+        self.parent_station = weakref.proxy(parent_station)
         self._list_of_layers = []
         self._dict_of_edge_nums = {}
         self.truegrid_input_filename = 'mesh_stn{0:02d}_start.tg'.format(self.parent_station.station_num)
@@ -1653,6 +1661,11 @@ class MonoplaneStructure:
                 sw3 = self.shear_web_3.layer['biax, left'].polygon.union(self.shear_web_3.layer['foam'].polygon)
                 sw3 = sw3.union(self.shear_web_3.layer['biax, right'].polygon)
                 p = p.union(sw3)
+        if not (p.is_valid and p.geom_type == 'Polygon'):
+            # the edges of neighboring parts (offset separately from the
+            #   airfoil) can be a round-off apart, which leaves an invalid
+            #   union; close the gaps and merge again
+            p = cascaded_union([q.buffer(MERGE_GAP) for q in list_of_polygons])
         if plot_flag:
             # plot the merged polygon
             patch2 = PolygonPatch(p, fc='#4000FF', ec = '#000000', alpha=0.8)
@@ -1676,6 +1689,19 @@ class MonoplaneStructure:
         self.mass = m
         return m
 
+    def calculate_material_masses(self):
+        """Add the mass (per unit length) of all polygons in this station, by
+        material.
+
+        Returns a dictionary of {material name: mass per unit length}.
+
+        """
+        d = {}
+        for layer in self._list_of_layers:
+            name = layer.material.name
+            d[name] = d.get(name, 0.0) + layer.mass
+        return d
+
     def calculate_all_percent_areas(self, print_flag=False):
         """Calculate the percent areas of all parts in this station.
 
@@ -2082,6 +2108,52 @@ class MonoplaneStructure:
         print " Wrote TrueGrid input file for Station #{0}.".format(
             self.parent_station.station_num)
 
+    def write_transfinite_mesh(self, additional_layers=[],
+        alt_TE_reinforcement=False, element_size=0.05, thickness_cells=1,
+        filename=None):
+        """Mesh all the layers with transfinite block meshes (no TrueGrid).
+
+        Meshes the same layers as write_truegrid_inputfile() (all alt layers,
+        plus additional_layers), and writes the mesh with its element sets
+        directly to the ABAQUS file `mesh_stnXX.abq` in `station_path` (see
+        transfinite_mesh.py). The element sets are all named 'tf_*', so the
+        rows of element_fixes.csv (TrueGrid element numbers) are not applied
+        to this mesh (see layer_plane_angles.py).
+
+        Parameters
+        ----------
+        additional_layers : list, contains uncut layers that should be meshed
+        alt_TE_reinforcement : bool, True if TE reinforcement has been cut by
+            bounding polygons, False otherwise
+        element_size : float, the target element length [m] along the layers
+        thickness_cells : int, the minimum number of elements across a layer
+        filename : str, the ABAQUS file name (default: `mesh_stnXX.abq`)
+
+        Returns the transfinite_mesh.TransfiniteMesh object.
+
+        """
+        stn = self.parent_station
+        parts = [self.root_buildup, self.external_surface,
+            self.internal_surface_1, self.internal_surface_2,
+            self.internal_surface_3, self.internal_surface_4]
+        if alt_TE_reinforcement:
+            parts.append(self.TE_reinforcement)
+        layers = []
+        for part in parts:
+            if part.exists():
+                layers.extend([layer_obj for (layer_name, layer_obj)
+                    in sorted(part.alt_layer.items())])
+        layers.extend(additional_layers)
+        m = tm.mesh_layers(layers, element_size=element_size,
+            thickness_cells=thickness_cells)
+        if filename is None:
+            filename = 'mesh_stn{0:02d}.abq'.format(stn.station_num)
+        m.write_abaqus(os.path.join(stn.station_path, filename),
+            title='blade station #{0}'.format(stn.station_num))
+        print " Wrote transfinite mesh for Station #{0}: {1} nodes, {2} elements.".format(
+            stn.station_num, m.number_of_nodes, m.number_of_elements)
+        return m
+
     def write_truegrid_header(self, outputfile_type='abaqus'):
         """Create a TrueGrid input file and write the header.
 
@@ -2690,7 +2762,7 @@ class BiplaneStructure:
                  h_int_surf_3_triax_u, h_int_surf_3_resin_u,
                  h_int_surf_4_triax_u, h_int_surf_4_resin_u,
                  h_ext_surf_triax_u, h_ext_surf_gelcoat_u, parent_station):
-        self.parent_station = parent_station
+        self.parent_station = weakref.proxy(parent_station)
         self._list_of_lower_layers = []
         self._list_of_upper_layers = []
         self.truegrid_input_filename = 'mesh_stn{0:02d}_start.tg'.format(self.parent_station.station_num)
@@ -3255,6 +3327,11 @@ class BiplaneStructure:
                     sw3 = self.upper_shear_web_3.layer['biax, left'].polygon.union(self.upper_shear_web_3.layer['foam'].polygon)
                     sw3 = sw3.union(self.upper_shear_web_3.layer['biax, right'].polygon)
                     p = p.union(sw3)
+        if not (p.is_valid and p.geom_type == 'Polygon'):
+            # the edges of neighboring parts (offset separately from the
+            #   airfoil) can be a round-off apart, which leaves an invalid
+            #   union; close the gaps and merge again
+            p = cascaded_union([q.buffer(MERGE_GAP) for q in list_of_polygons])
         if plot_flag:
             # plot the merged polygon
             patch2 = PolygonPatch(p, fc='#4000FF', ec = '#000000', alpha=0.8)
@@ -3459,6 +3536,19 @@ class BiplaneStructure:
         m = m_l + m_u
         self.mass = m
         return m
+
+    def calculate_material_masses(self):
+        """Add the mass (per unit length) of all polygons in this station, by
+        material.
+
+        Returns a dictionary of {material name: mass per unit length}.
+
+        """
+        d = {}
+        for layer in self._list_of_lower_layers + self._list_of_upper_layers:
+            name = layer.material.name
+            d[name] = d.get(name, 0.0) + layer.mass
+        return d
         
     def calculate_all_percent_areas(self):
         """Calculate the percent areas of all parts in this station.
@@ -3812,6 +3902,52 @@ class BiplaneStructure:
         print " Wrote TrueGrid input file for Station #{0}.".format(
             self.parent_station.station_num)
 
+    def write_transfinite_mesh(self, additional_layers=[],
+        alt_TE_reinforcement=False, element_size=0.05, thickness_cells=1,
+        filename=None):
+        """Mesh all the layers with transfinite block meshes (no TrueGrid).
+
+        Meshes the same layers as write_truegrid_inputfile() (all alt layers,
+        plus additional_layers), and writes the mesh with its element sets
+        directly to the ABAQUS file `mesh_stnXX.abq` in `station_path` (see
+        transfinite_mesh.py). The element sets are all named 'tf_*', so the
+        rows of element_fixes.csv (TrueGrid element numbers) are not applied
+        to this mesh (see layer_plane_angles.py).
+
+        Parameters
+        ----------
+        additional_layers : list, contains uncut layers that should be meshed
+        alt_TE_reinforcement : bool, True if TE reinforcement has been cut by
+            bounding polygons, False otherwise
+        element_size : float, the target element length [m] along the layers
+        thickness_cells : int, the minimum number of elements across a layer
+        filename : str, the ABAQUS file name (default: `mesh_stnXX.abq`)
+
+        Returns the transfinite_mesh.TransfiniteMesh object.
+
+        """
+        stn = self.parent_station
+        parts = [self.lower_root_buildup, self.lower_external_surface,
+            self.lower_internal_surface_1, self.lower_internal_surface_2,
+            self.lower_internal_surface_3, self.lower_internal_surface_4]
+        if alt_TE_reinforcement:
+            parts.append(self.lower_TE_reinforcement)
+        layers = []
+        for part in parts:
+            if part.exists():
+                layers.extend([layer_obj for (layer_name, layer_obj)
+                    in sorted(part.alt_layer.items())])
+        layers.extend(additional_layers)
+        m = tm.mesh_layers(layers, element_size=element_size,
+            thickness_cells=thickness_cells)
+        if filename is None:
+            filename = 'mesh_stn{0:02d}.abq'.format(stn.station_num)
+        m.write_abaqus(os.path.join(stn.station_path, filename),
+            title='blade station #{0}'.format(stn.station_num))
+        print " Wrote transfinite mesh for Station #{0}: {1} nodes, {2} elements.".format(
+            stn.station_num, m.number_of_nodes, m.number_of_elements)
+        return m
+
     def write_truegrid_header(self, outputfile_type='abaqus'):
         """Create a TrueGrid input file and write the header.
 
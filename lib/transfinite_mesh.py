@@ -0,0 +1,672 @@
+"""Mesh the layers of a cross-section with structured quadratic blocks, without
+TrueGrid.
+
+Each layer is one block: a region bounded by 4 edges (left, bottom, right,
+top), like the block meshes in <structure>.write_block_mesh(). Every edge is
+resampled at uniform arc length (segment by segment, see assign_cells()), and
+the nodes inside the block are placed by transfinite interpolation (a Coons
+patch) between the 4 edge arrays, for all nodes of the block at once. The
+elements are 8-node quadratic quadrilaterals (VABS node numbering,
+counter-clockwise):
+
+    4---7---3
+    |       |
+    8       6
+    |       |
+    1---5---2
+
+Node 1 -> node 2 runs along the layer (the longer pair of opposite edges), so
+every element set uses the 'lower' layer plane angle rule (see
+layer_plane_angles.DEFAULT_RULES). A layer with only 3 edges (a triangular
+region) is a block with a collapsed right edge; its last column of elements
+is written as 6-node triangles, in a separate element set ('<name>_tri').
+
+Coincident nodes on the block boundaries are merged across blocks with a
+spatial hash (like the TrueGrid command 'stp 0.0001'), so the block meshes
+are joined into one mesh. For the nodes of neighboring blocks to coincide,
+edges shared by two blocks (and opposite edges of the same block) get the same
+number of elements. An edge that is only partly shared (e.g. a shear web biax
+layer, which touches several internal surface layers) is split into segments
+at the corners of its neighbors; see assign_cells().
+
+The mesh is written to an ABAQUS file (e.g. 'mesh_stn05.abq') that
+abaqus_utils2.AbaqusGrid can read, with one element set per layer, so steps 2
+and 3 of the TrueGrid workflow are skipped.
+
+Usage:
+import lib.transfinite_mesh as tm
+# after cutting the alt layers in path_to_blade_lib/prep_stnXX_mesh.py
+st.write_transfinite_mesh(additional_layers=[
+    st.spar_cap.layer['upper'],
+    st.spar_cap.layer['lower'],
+    st.TE_reinforcement.layer['uniax']])
+# or, for any list of layers:
+m = tm.mesh_layers(layers, element_size=0.05)
+m.write_abaqus('sandia_blade/stn05/mesh_stn05.abq', title='blade station #5')
+
+Last updated: May 13, 2014
+
+"""
+
+
+import numpy as np
+
+
+# the minimum space between nodes at biax plies is (0.836-0.833)/8 = 0.000375,
+#   so merge nodes that are closer than this (see write_truegrid_footer)
+DEFAULT_TOLERANCE = 0.0001
+
+
+class _SpatialHash(object):
+    """Find points within a tolerance of each other, in (about) constant time.
+
+    Each point is stored in a square cell of size tol. A new point is matched
+    against the points in its cell and the 8 neighboring cells.
+
+    """
+    def __init__(self, tol=DEFAULT_TOLERANCE):
+        self.tol = float(tol)
+        self._cells = {}
+        self._coords = {}
+
+    def find(self, x, y):
+        """Returns the id of a point within tol of (x, y), or None."""
+        i = int(np.floor(x/self.tol))
+        j = int(np.floor(y/self.tol))
+        tol2 = self.tol**2
+        for di in (-1, 0, 1):
+            for dj in (-1, 0, 1):
+                for point_id in self._cells.get((i+di, j+dj), ()):
+                    (px, py) = self._coords[point_id]
+                    if (px-x)**2 + (py-y)**2 <= tol2:
+                        return point_id
+        return None
+
+    def insert(self, x, y, point_id):
+        """Returns the id of a point within tol of (x, y); if there isn't one,
+        (x, y) is stored with point_id, and point_id is returned."""
+        found = self.find(x, y)
+        if found is not None:
+            return found
+        key = (int(np.floor(x/self.tol)), int(np.floor(y/self.tol)))
+        self._cells.setdefault(key, []).append(point_id)
+        self._coords[point_id] = (x, y)
+        return point_id
+
+
+def edge_length(edge):
+    """Returns the arc length of an edge (an array of (x2, x3) coords)."""
+    return np.sum(np.hypot(*np.diff(edge, axis=0).T))
+
+
+def arc_lengths(edge):
+    """Returns the arc length at each point of an edge, starting from 0."""
+    return np.concatenate(([0.0],
+        np.cumsum(np.hypot(*np.diff(edge, axis=0).T))))
+
+
+def point_at(edge, t):
+    """Returns the point(s) at arc length(s) t along an edge."""
+    edge = np.asarray(edge, dtype=float)
+    s = arc_lengths(edge)
+    return np.column_stack((np.interp(t, s, edge[:,0]),
+                            np.interp(t, s, edge[:,1])))
+
+
+def resample(edge, n, bounds=None, counts=None):
+    """Returns n+1 points spaced at uniform arc length along an edge.
+
+    If bounds (the arc lengths where each segment of the edge starts and ends)
+    and counts (the number of intervals in each segment) are given, each
+    segment is spaced uniformly, and n = sum(counts).
+
+    """
+    edge = np.asarray(edge, dtype=float)
+    s = arc_lengths(edge)
+    if s[-1] == 0.0:
+        # a collapsed edge (a single point)
+        return np.repeat(edge[:1], n+1, axis=0)
+    if bounds is None:
+        t = np.linspace(0.0, s[-1], n+1)
+    else:
+        t = np.concatenate([np.linspace(bounds[k], bounds[k+1], c+1)[:-1]
+            for (k, c) in enumerate(counts)] + [[s[-1]]])
+    return point_at(edge, t)
+
+
+def orient_edges(left, bottom, right, top):
+    """Returns (left, bottom, right, top), reversed as needed so that:
+
+    bottom runs from corner P00 to P10, top from P01 to P11,
+    left runs from P00 to P01, right from P10 to P11,
+
+    and the block is counter-clockwise (P00, P10, P11, P01). If right is None
+    (a triangular region), it is collapsed to the point where bottom and top
+    meet.
+
+    """
+    left = np.asarray(left, dtype=float)
+    bottom = np.asarray(bottom, dtype=float)
+    top = np.asarray(top, dtype=float)
+    def gap(p, edge):
+        return min(np.hypot(*(p - edge[0])), np.hypot(*(p - edge[-1])))
+    # start bottom at the end nearest to the left edge
+    if gap(bottom[0], left) > gap(bottom[-1], left):
+        bottom = bottom[::-1]
+    if np.hypot(*(left[0] - bottom[0])) > np.hypot(*(left[-1] - bottom[0])):
+        left = left[::-1]
+    if np.hypot(*(top[0] - left[-1])) > np.hypot(*(top[-1] - left[-1])):
+        top = top[::-1]
+    if right is None:
+        right = np.array([bottom[-1], bottom[-1]])
+    else:
+        right = np.asarray(right, dtype=float)
+        if (np.hypot(*(right[0] - bottom[-1])) >
+            np.hypot(*(right[-1] - bottom[-1]))):
+            right = right[::-1]
+    # make the block counter-clockwise (positive signed area of the boundary,
+    #   which may be curved, e.g. around the leading edge)
+    boundary = np.vstack((bottom, right, top[::-1], left[::-1]))
+    x = boundary[:,0]
+    y = boundary[:,1]
+    area = 0.5*np.sum(x*np.roll(y, -1) - np.roll(x, -1)*y)
+    if area < 0.0:
+        if right.ptp(axis=0).max() == 0.0:
+            # keep a collapsed edge on the right: mirror the block about
+            #   the bottom edge by swapping bottom and top
+            (left, bottom, top) = (left[::-1], top, bottom)
+            right = np.array([bottom[-1], bottom[-1]])
+        else:
+            (left, right) = (right, left)
+            (bottom, top) = (bottom[::-1], top[::-1])
+    return (left, bottom, right, top)
+
+
+def cycle_edges(edges):
+    """Returns (left, bottom, right, top) for 3 or 4 edges listed in order
+    around a region (e.g. <layer>.edges, from <layer>.get_edges2()).
+
+    The longer pair of opposite edges becomes bottom and top. For 3 edges
+    (a triangular region), right is None.
+
+    """
+    edges = [np.asarray(e, dtype=float) for e in edges]
+    if len(edges) == 4:
+        lengths = [edge_length(e) for e in edges]
+        if lengths[0] + lengths[2] < lengths[1] + lengths[3]:
+            edges = edges[1:] + edges[:1]
+        return (edges[3][::-1], edges[0], edges[1], edges[2][::-1])
+    elif len(edges) == 3:
+        # put the longest edge on the bottom; the region collapses at the
+        #   corner between bottom and the next edge
+        i = int(np.argmax([edge_length(e) for e in edges]))
+        edges = edges[i:] + edges[:i]
+        return (edges[2][::-1], edges[0], None, edges[1][::-1])
+    else:
+        raise Warning("A block must have 3 or 4 edges, not {0}!".format(
+            len(edges)))
+
+
+def _fractions(points):
+    """Returns the fraction of the arc length at each of a list of points."""
+    s = arc_lengths(points)
+    if s[-1] == 0.0:
+        return np.linspace(0.0, 1.0, len(points))
+    return s/s[-1]
+
+
+def transfinite_patch(L, B, R, T):
+    """Returns the (m+1, n+1, 2) array of points of a Coons patch.
+
+    B and T are the m+1 points along the bottom and top edges, and L and R
+    are the n+1 points along the left and right edges, oriented as in
+    orient_edges(). The points on each edge may be spaced unevenly; the
+    parameters (u, v) of each interior point are blended between the arc
+    length fractions of the points on opposite edges.
+
+    """
+    (m, n) = (len(B)-1, len(L)-1)
+    a = np.linspace(0.0, 1.0, m+1)[:,np.newaxis]
+    b = np.linspace(0.0, 1.0, n+1)[np.newaxis,:]
+    u = ((1.0-b)*_fractions(B)[:,np.newaxis] +
+         b*_fractions(T)[:,np.newaxis])[:,:,np.newaxis]
+    v = ((1.0-a)*_fractions(L)[np.newaxis,:] +
+         a*_fractions(R)[np.newaxis,:])[:,:,np.newaxis]
+    (P00, P10, P01, P11) = (B[0], B[-1], T[0], T[-1])
+    B = B[:,np.newaxis,:]
+    T = T[:,np.newaxis,:]
+    L = L[np.newaxis,:,:]
+    R = R[np.newaxis,:,:]
+    return ((1.0-v)*B + v*T + (1.0-u)*L + u*R -
+            ((1.0-u)*(1.0-v)*P00 + u*(1.0-v)*P10 +
+             (1.0-u)*v*P01 + u*v*P11))
+
+
+class _Block(object):
+    """One layer of a cross-section, to be meshed as a structured block."""
+    def __init__(self, name, layer_num, left, bottom, right, top):
+        self.name = name
+        self.layer_num = int(layer_num)
+        if right is not None and (edge_length(left) + edge_length(right) >
+            edge_length(bottom) + edge_length(top)):
+            # run bottom and top along the layer (the longer pair of edges)
+            (left, bottom, right, top) = (bottom, right, top, left)
+        (self.left, self.bottom, self.right,
+            self.top) = orient_edges(left, bottom, right, top)
+        # for each edge: the arc lengths where its segments start and end,
+        #   and the number of elements in each segment (see assign_cells)
+        self.bounds = [None]*4
+        self.counts = [None]*4
+
+    @property
+    def i_cells(self):
+        """The number of elements along bottom and top."""
+        return sum(self.counts[1])
+
+    @property
+    def j_cells(self):
+        """The number of elements along left and right."""
+        return sum(self.counts[0])
+
+    def edges(self):
+        """Returns [left, bottom, right, top]."""
+        return [self.left, self.bottom, self.right, self.top]
+
+    def collapsed(self, k):
+        """Returns True if edge k is collapsed to a point."""
+        return self.edges()[k].ptp(axis=0).max() == 0.0
+
+    def edge_points(self, k):
+        """Returns the nodes (2 per element) along edge k."""
+        counts = [2*c for c in self.counts[k]]
+        return resample(self.edges()[k], sum(counts), self.bounds[k], counts)
+
+
+def layer_name(layer):
+    """Returns the name of a layer, e.g. 'ShearWeb1; biax, left'."""
+    part = layer.parent_part
+    part_name = part.__class__.__name__
+    if part_name in ['ShearWeb', 'AftPanel', 'InternalSurface']:
+        return '{0}{1}; {2}'.format(part_name, part.num, layer.name)
+    else:
+        return '{0}; {1}'.format(part_name, layer.name)
+
+
+def element_set_name(name):
+    """Returns an ABAQUS element set name for a layer name.
+
+    e.g. 'ExternalSurface; gelcoat, upper spar cap' ->
+         'tf_ExternalSurface_gelcoat_upper_spar_cap'
+
+    """
+    words = name.replace(';', ' ').replace(',', ' ').split()
+    return 'tf_' + '_'.join(words)
+
+
+def close_loop(edges, tol=DEFAULT_TOLERANCE):
+    """Returns a list of edges that join end to end around a region.
+
+    Each edge is reversed as needed to start where the previous edge ends, and
+    a straight edge is put in each gap (e.g. where a small edge was thrown out
+    by <layer>.get_edges2()).
+
+    """
+    edges = [np.asarray(e, dtype=float) for e in edges]
+    def gap(p, edge):
+        return min(np.hypot(*(p - edge[0])), np.hypot(*(p - edge[-1])))
+    loop = [edges[0]]
+    if gap(edges[0][0], edges[1]) < gap(edges[0][-1], edges[1]):
+        loop[0] = edges[0][::-1]
+    for edge in edges[1:]:
+        end = loop[-1][-1]
+        if np.hypot(*(edge[-1]-end)) < np.hypot(*(edge[0]-end)):
+            edge = edge[::-1]
+        if np.hypot(*(edge[0]-end)) > tol:
+            loop.append(np.array([end, edge[0]]))
+        loop.append(edge)
+    if np.hypot(*(loop[0][0]-loop[-1][-1])) > tol:
+        loop.append(np.array([loop[-1][-1], loop[0][0]]))
+    return loop
+
+
+def merge_edges(edges, n=4):
+    """Join edges of a closed loop until there are only n of them.
+
+    The two edges that meet at the smallest turning angle (the smoothest
+    corner) are joined first.
+
+    """
+    edges = list(edges)
+    def turn(a, b):
+        (u, v) = (a[-1]-a[-2], b[1]-b[0])
+        return abs(np.arctan2(u[0]*v[1]-u[1]*v[0], np.dot(u, v)))
+    while len(edges) > n:
+        k = int(np.argmin([turn(edges[i], edges[(i+1)%len(edges)])
+                           for i in range(len(edges))]))
+        if k == len(edges)-1:
+            edges = [np.vstack((edges[-1], edges[0][1:]))] + edges[1:-1]
+        else:
+            edges[k:k+2] = [np.vstack((edges[k], edges[k+1][1:]))]
+    return edges
+
+
+def layer_edges(layer, tol=1e-07):
+    """Returns (left, bottom, right, top) for a layer.
+
+    Alternate layers (cut by a bounding polygon, see
+    poly_utils.cut_plot_and_write_alt_layer) use <layer>.edges, joined into a
+    closed loop of 3 or 4 edges, and other layers use the edges saved by
+    <layer>.get_and_save_edges().
+
+    """
+    if len(layer.corners) > 0 or len(layer.edges) > 0:
+        # this is an alternate layer
+        if len(layer.edges) == 0:
+            layer.get_edges2()
+        # throw out small edges (see <layer>.write_alt_layer_edges2())
+        edges = [e for e in layer.edges
+                 if not (len(e) == 2 and edge_length(e) < tol)]
+        return cycle_edges(merge_edges(close_loop(edges)))
+    if layer.left is None:
+        layer.get_and_save_edges()
+    return (layer.left, layer.bottom, layer.right, layer.top)
+
+
+def _project(edge, s, p):
+    """Returns (distance, arc length) of the point on an edge nearest to p."""
+    a = edge[:-1]
+    d = np.diff(edge, axis=0)
+    dd = np.sum(d*d, axis=1)
+    dd[dd == 0.0] = 1.0
+    t = np.clip(np.sum((p-a)*d, axis=1)/dd, 0.0, 1.0)
+    dist = np.hypot(*(a + t[:,np.newaxis]*d - p).T)
+    k = np.argmin(dist)
+    return (dist[k], s[k] + t[k]*(s[k+1]-s[k]))
+
+
+def _unmatched(t1, t2, snap):
+    """Returns the values in sorted list t1 that are not paired with a value
+    in sorted list t2, pairing them in order with the nearest value, and only
+    if within snap."""
+    (i, j, unmatched) = (0, 0, [])
+    while i < len(t1):
+        if j < len(t2) and abs(t1[i]-t2[j]) < snap:
+            d = abs(t1[i]-t2[j])
+            if i+1 < len(t1) and abs(t1[i+1]-t2[j]) < d:
+                unmatched.append(t1[i])
+                i += 1
+            elif j+1 < len(t2) and abs(t1[i]-t2[j+1]) < d:
+                j += 1
+            else:
+                (i, j) = (i+1, j+1)
+        elif j >= len(t2) or t1[i] < t2[j]:
+            unmatched.append(t1[i])
+            i += 1
+        else:
+            j += 1
+    return unmatched
+
+
+def split_edges(blocks, element_size=0.05, tol=DEFAULT_TOLERANCE,
+    max_passes=50):
+    """Returns {(b, k): sorted arc lengths where edge k of block b is split}.
+
+    An edge is split wherever a corner of another block lies on it (a
+    T-junction). The splits are copied to the opposite edge of the block (at
+    the same fraction of its length), unless they pair up one-to-one with the
+    splits already there (within element_size/2), and from there to the edges
+    of its neighbors, until nothing changes.
+
+    """
+    keys = [(b, k) for (b, block) in enumerate(blocks) for k in range(4)
+            if not block.collapsed(k)]
+    edges = [blocks[b].edges()[k] for (b, k) in keys]
+    s = [arc_lengths(e) for e in edges]
+    lo = np.array([e.min(axis=0) for e in edges]) - tol
+    hi = np.array([e.max(axis=0) for e in edges]) + tol
+    splits = dict([(key, []) for key in keys])
+    def add_point(p):
+        changed = False
+        for c in np.nonzero(np.all((p >= lo) & (p <= hi), axis=1))[0]:
+            (dist, t) = _project(edges[c], s[c], p)
+            if dist < tol and tol < t < s[c][-1]-tol:
+                if not any([abs(t-q) < tol for q in splits[keys[c]]]):
+                    splits[keys[c]].append(t)
+                    changed = True
+        return changed
+    for block in blocks:
+        for p in (block.bottom[0], block.bottom[-1], block.top[0],
+            block.top[-1]):
+            add_point(p)
+    for n in range(max_passes):
+        new_points = []
+        for (b, block) in enumerate(blocks):
+            for (k1, k2) in ((0, 2), (2, 0), (1, 3), (3, 1)):
+                if block.collapsed(k1) or block.collapsed(k2):
+                    continue
+                (L1, L2) = (edge_length(block.edges()[k1]),
+                    edge_length(block.edges()[k2]))
+                t1 = [t/L1*L2 for t in sorted(splits[(b, k1)])]
+                for t2 in _unmatched(t1, sorted(splits[(b, k2)]),
+                    0.5*element_size):
+                    new_points.append(point_at(block.edges()[k2], [t2])[0])
+        changed = False
+        for p in new_points:
+            changed = add_point(p) or changed
+        if not changed:
+            break
+    for key in keys:
+        splits[key].sort()
+    return splits
+
+
+def assign_cells(blocks, element_size=0.05, thickness_cells=1,
+    tol=DEFAULT_TOLERANCE):
+    """Set the number of elements along the edges of every block.
+
+    The edges are split into segments at T-junctions (see split_edges()).
+    Opposite segments of a block, and segments shared by two blocks (the same
+    end points, within tol), must have the same number of elements, so the
+    segments are gathered into groups. Each group gets ceil(L/element_size)
+    elements, where L is the longest segment in the group. The left and right
+    edges of each block (the edges across the layer thickness) get at least
+    thickness_cells elements.
+
+    """
+    splits = split_edges(blocks, element_size=element_size, tol=tol)
+    for (b, block) in enumerate(blocks):
+        for (k1, k2) in ((0, 2), (1, 3)):
+            if block.collapsed(k2):
+                bounds = [0.0] + splits[(b, k1)] + [
+                    edge_length(block.edges()[k1])]
+                block.bounds[k1] = bounds
+                block.bounds[k2] = [0.0]*len(bounds)
+                continue
+            if len(splits[(b, k1)]) != len(splits[(b, k2)]):
+                # the splits don't pair up: leave a hanging node here
+                print " WARNING: could not match the segments of", block.name
+                splits[(b, k1)] = []
+                splits[(b, k2)] = []
+            for k in (k1, k2):
+                block.bounds[k] = [0.0] + splits[(b, k)] + [
+                    edge_length(block.edges()[k])]
+    # union-find over the segments
+    segments = []  # (block number, edge number, segment number)
+    index = {}
+    for (b, block) in enumerate(blocks):
+        for k in range(4):
+            for i in range(len(block.bounds[k])-1):
+                index[(b, k, i)] = len(segments)
+                segments.append((b, k, i))
+    parent = range(len(segments))
+    def root(a):
+        while parent[a] != a:
+            parent[a] = parent[parent[a]]
+            a = parent[a]
+        return a
+    def union(a, b):
+        parent[root(a)] = root(b)
+    corners = _SpatialHash(tol)
+    shared = {}
+    for (b, k, i) in segments:
+        block = blocks[b]
+        if i == 0 and k in (2, 3):
+            # left, right and bottom, top
+            for j in range(len(block.bounds[k])-1):
+                union(index[(b, k-2, j)], index[(b, k, j)])
+        if block.collapsed(k):
+            continue
+        ends = point_at(block.edges()[k], block.bounds[k][i:i+2])
+        ends = [corners.insert(p[0], p[1], (b, k, i, j))
+                for (j, p) in enumerate(ends)]
+        key = frozenset(ends)
+        if key in shared:
+            union(index[(b, k, i)], shared[key])
+        else:
+            shared[key] = index[(b, k, i)]
+    cells = {}
+    for (b, k, i) in segments:
+        bounds = blocks[b].bounds[k]
+        r = root(index[(b, k, i)])
+        n = int(np.ceil((bounds[i+1]-bounds[i])/element_size))
+        if k in (0, 2) and len(bounds) == 2:
+            n = max(n, thickness_cells)
+        cells[r] = max(cells.get(r, 1), n)
+    for (b, block) in enumerate(blocks):
+        for k in range(4):
+            block.counts[k] = [cells[root(index[(b, k, i)])]
+                for i in range(len(block.bounds[k])-1)]
+
+
+class TransfiniteMesh(object):
+    """A cross-section mesh of structured quadratic blocks.
+
+    Attributes
+    ----------
+    node_coords : np.array, shape (number_of_nodes, 2), (x2, x3) coords, where
+        row i holds node #(i+1)
+    elements : list of (element set name, layer_num, connectivity) for each
+        group of elements; connectivity is an int array of node numbers, with
+        8 columns (quadrilaterals) or 6 columns (triangles, nodes 1,2,3,5,6,7)
+    number_of_nodes : int
+    number_of_elements : int
+
+    """
+    def __init__(self, tol=DEFAULT_TOLERANCE):
+        self.tol = tol
+        self._hash = _SpatialHash(tol)
+        self._coords = []
+        self.number_of_nodes = 0
+        self.number_of_elements = 0
+        self.elements = []
+
+    @property
+    def node_coords(self):
+        if len(self._coords) == 0:
+            return np.zeros((0,2))
+        return np.vstack(self._coords)
+
+    def _new_nodes(self, points):
+        """Returns the node numbers of new (unmerged) nodes at points."""
+        nums = np.arange(len(points)) + self.number_of_nodes + 1
+        self._coords.append(points)
+        self.number_of_nodes += len(points)
+        return nums
+
+    def add_block(self, block):
+        """Mesh one block, and merge its boundary nodes with the mesh."""
+        X = transfinite_patch(*[block.edge_points(k) for k in range(4)])
+        (m, n) = (X.shape[0]-1, X.shape[1]-1)
+        ids = np.zeros((m+1, n+1), dtype=int)
+        # nodes on the block boundary are merged through the spatial hash
+        boundary = np.zeros((m+1, n+1), dtype=bool)
+        boundary[[0,-1],:] = True
+        boundary[:,[0,-1]] = True
+        for (a, b) in zip(*np.nonzero(boundary)):
+            (x, y) = X[a,b]
+            found = self._hash.find(x, y)
+            if found is None:
+                found = self._new_nodes(X[a,b][np.newaxis,:])[0]
+                self._hash.insert(x, y, found)
+            ids[a,b] = found
+        # interior nodes are new, except the element centers (no 9th node)
+        interior = ~boundary
+        interior[1::2,1::2] = False
+        ids[interior] = self._new_nodes(X[interior])
+        conn = np.column_stack([c.ravel() for c in (
+            ids[0:-1:2,0:-1:2], ids[2::2,0:-1:2], ids[2::2,2::2],
+            ids[0:-1:2,2::2], ids[1::2,0:-1:2], ids[2::2,1::2],
+            ids[1::2,2::2], ids[0:-1:2,1::2])])
+        # elements with a collapsed right side (node2 = node3) are triangles
+        tri = (conn[:,1] == conn[:,2])
+        name = element_set_name(block.name)
+        if np.any(~tri):
+            self.elements.append((name, block.layer_num, conn[~tri]))
+        if np.any(tri):
+            self.elements.append((name + '_tri', block.layer_num,
+                conn[tri][:,[0,1,3,4,6,7]]))
+        self.number_of_elements += len(conn)
+
+    def write_abaqus(self, filename, title='cross-section'):
+        """Write the mesh to an ABAQUS-formatted file.
+
+        Elements are numbered in the order of self.elements. Each element set
+        is written in an *ELEMENT block with ELSET=SS<k>M<layer_num>, so
+        AbaqusGrid reads the layer number from the element header, followed
+        by *ELSET blocks with the element set names.
+
+        """
+        f = open(filename, 'w')
+        f.write("*HEADING\n")
+        f.write(title + "\n")
+        f.write("*NODE,NSET=NALL\n")
+        for (i, (x2, x3)) in enumerate(self.node_coords):
+            f.write("{0:d},{1:.8f},{2:.8f},0.0\n".format(i+1, x2, x3))
+        elem_num = 1
+        element_sets = []
+        for (k, (name, layer_num, conn)) in enumerate(self.elements):
+            elem_type = 'S8R' if conn.shape[1] == 8 else 'STRI65'
+            f.write("*ELEMENT,TYPE={0},ELSET=SS{1}M{2}\n".format(elem_type,
+                k+1, layer_num))
+            nums = np.arange(elem_num, elem_num+len(conn))
+            for (e, row) in zip(nums, conn):
+                f.write("{0:d},".format(e) +
+                    ",".join([str(node) for node in row]) + "\n")
+            element_sets.append((name, nums))
+            elem_num += len(conn)
+        for (name, nums) in element_sets:
+            f.write("*ELSET,ELSET={0}\n".format(name))
+            for i in range(0, len(nums), 16):
+                f.write(",".join([str(e) for e in nums[i:i+16]]) + ",\n")
+        f.close()
+
+
+def mesh_layers(layers, element_size=0.05, thickness_cells=1,
+    tol=DEFAULT_TOLERANCE):
+    """Returns a TransfiniteMesh of a list of layers (one block per layer).
+
+    Parameters
+    ----------
+    layers : list of layer.Layer objects
+    element_size : float, the target element length [m] along the edges
+    thickness_cells : int, the minimum number of elements across each layer
+    tol : float, nodes closer than tol [m] are merged
+
+    """
+    blocks = []
+    names = set()
+    for layer in layers:
+        (left, bottom, right, top) = layer_edges(layer)
+        name = layer_name(layer)
+        if name in names:
+            # e.g. layers with the same name on both airfoils of a biplane
+            name = name + ' {0}'.format(len(blocks)+1)
+        names.add(name)
+        blocks.append(_Block(name, layer.material.material_num, left,
+            bottom, right, top))
+    assign_cells(blocks, element_size=element_size,
+        thickness_cells=thickness_cells, tol=tol)
+    m = TransfiniteMesh(tol=tol)
+    for block in blocks:
+        m.add_block(block)
+    return m
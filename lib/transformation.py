@@ -39,4 +39,21 @@ def rotate_coord_pair(x, y, t, degree_units=True):
                       [y]])
     p_new = np.dot(R, p_old)
     return (float(p_new[0]), float(p_new[1]))
+
+
+def rotate_coords(x, y, t, degree_units=True):
+    """Rotate arrays of (x,y) coordinates by theta degrees, all at once.
+
+    Same as rotate_coord_pair(), but x, y, and t may be numpy arrays (which
+    are broadcast against each other), e.g. one twist angle per station.
+
+    Returns the rotated (x,y) coordinates as a tuple of numpy arrays.
+
+    """
+    (x, y, t) = (np.asarray(x, dtype=float), np.asarray(y, dtype=float),
+        np.asarray(t, dtype=float))
+    if degree_units:
+        t = np.deg2rad(t)  # convert rotation angle to radians
+    (c, s) = (np.cos(t), np.sin(t))
+    return (c*x - s*y, s*x + c*y)
     
\ No newline at end of file
@@ -0,0 +1,382 @@
+"""Recover the 3D stresses and strains in each cross-section with VABS, and
+find the elements that are closest to failure.
+
+The sectional force and moment resultants [F1, F2, F3, M1, M2, M3] at each
+station come from the built-in beam solver (StaticSolution.
+station_resultants) or from a DYMORE force survey (dymore_resultants). For
+every station, a copy of its VABS input file, 'mesh_stnXX_recover.vabs', is
+solved once with recover_flag=0, and then once per load case with
+recover_flag=1 and the load case's resultants appended to the file. The
+element stresses and strains of each load case are saved as
+'mesh_stnXX_<load case>.vabs.ELE'. The load cases of a station run one after
+the other (they share the station's recovery file), and the stations run
+concurrently, n_processes at a time.
+
+Each line of a .ELE file has the element number, then the element's strains
+and stresses in the beam coordinate system, then its strains and stresses in
+the material coordinate system:
+  [eps11, 2eps12, 2eps13, eps22, 2eps23, eps33,
+   sigma11, sigma12, sigma13, sigma22, sigma23, sigma33]
+A .ELE file is parsed once (see dymore_results.read_mdt), and memory-mapped
+after that. The rows are put in the same order as the elements in the VABS
+input file, which is the order of AbaqusGrid.list_of_elements.
+
+The strengths of each material [Pa] are in the material file's strength
+columns, Xt, Xc, Yt, Yc, Zt, Zc (tension and compression along the material
+1, 2, and 3 axes) and S12, S13, S23 (shear). A blank strength is not checked
+(it is treated as infinite). The max-stress and Tsai-Wu failure indices of
+every element are computed all at once (an index >= 1 means failure), and the
+elements with the highest indices are ranked at each station.
+
+Usage:
+import lib.beam_solver as bs
+import lib.vabs_recovery as vr
+m = bs.biplane_model('biplane_blade')
+s = m.solve([[bs.tip_load('tip_v', forces=[0,0,1.0e+05])]],
+    case_names=['tip_flap'])
+(station_nums, resultants) = s.station_resultants()
+vr.run_recovery('biplane_blade', station_nums, resultants, s.case_names)
+df = vr.critical_elements('biplane_blade', 10, 'tip_flap')
+d = vr.blade_critical_elements('biplane_blade', station_nums, 'tip_flap')
+
+Last updated: May 13, 2014
+
+"""
+
+
+import os
+import shutil
+import subprocess
+import numpy as np
+import pandas as pd
+from multiprocessing.pool import ThreadPool
+import dymore_results as dr
+import station_store as ss
+reload(dr)
+reload(ss)
+
+
+DEFAULT_PATH_TO_VABS_EXE = 'D:\\Programs\\VABS\\vabs_3-7'
+DEFAULT_VABS_EXE = 'VABSIII.exe'
+
+# columns of a .ELE file
+STRAIN_COLUMNS = {'beam': range(1,7), 'material': range(13,19)}
+STRESS_COLUMNS = {'beam': range(7,13), 'material': range(19,25)}
+
+# stress components [sigma11, sigma12, sigma13, sigma22, sigma23, sigma33]
+_NORMAL = [0, 3, 5]   # sigma11, sigma22, sigma33
+_SHEAR = [1, 2, 4]    # sigma12, sigma13, sigma23
+# strength columns (ss.STRENGTH_COLUMNS), in the same order
+_TENSION = [0, 2, 4]       # Xt, Yt, Zt
+_COMPRESSION = [1, 3, 5]   # Xc, Yc, Zc
+_SHEAR_STRENGTH = [6, 7, 8]   # S12, S13, S23
+
+
+def station_filename(blade_path, station_num, suffix='.vabs'):
+    """Returns the path to a station file, e.g. 'biplane_blade/stn10/
+    mesh_stn10.vabs'."""
+    stn_str = 'stn{0:02d}'.format(station_num)
+    return os.path.join(blade_path, stn_str, 'mesh_' + stn_str + suffix)
+
+
+def recovery_filename(blade_path, station_num):
+    return station_filename(blade_path, station_num, '_recover.vabs')
+
+
+def ele_filename(blade_path, station_num, case_name):
+    """Returns the .ELE file of a load case at a station, e.g. 'biplane_blade/
+    stn10/mesh_stn10_tip_flap.vabs.ELE'."""
+    return station_filename(blade_path, station_num,
+        '_{0}.vabs.ELE'.format(case_name))
+
+
+def dymore_resultants(force_filename, x1, span=1.0):
+    """Returns the resultants [F1, F2, F3, M1, M2, M3] from a DYMORE force
+    survey (e.g. 'FIGURES/svy_force_blade.mdt') at spanwise coords x1, shape
+    (n_stations, 6)."""
+    return np.hstack((dr.at_stations(force_filename, 'force', x1, span=span),
+                      dr.at_stations(force_filename, 'moment', x1,
+                          span=span)))
+
+
+def recovery_lines(resultants, timoshenko=True, displacements=(0,0,0),
+    rotation=np.eye(3)):
+    """Returns the recovery inputs to append to a VABS input file.
+
+    The stresses and strains only depend on the resultants; the beam
+    displacements and rotation matrix are only used for the 3D displacements.
+    The distributed loads (and their derivatives) are zero.
+
+    """
+    (F1, F2, F3, M1, M2, M3) = resultants
+    fmt = ' '.join(['{{{0}:> 14.6e}}'.format(i) for i in range(3)]) + '\n'
+    s = '\n' + fmt.format(*displacements)
+    for row in rotation:
+        s += fmt.format(*row)
+    s += '\n{0:> 14.6e} {1:> 14.6e} {2:> 14.6e} {3:> 14.6e}\n'.format(F1, M1,
+        M2, M3)
+    if timoshenko:
+        s += '{0:> 14.6e} {1:> 14.6e}\n\n'.format(F2, F3)
+        s += 4*(' '.join(6*['{0:> 14.6e}'.format(0.0)]) + '\n')
+    return s
+
+
+def write_recovery_file(vabs_filename, filename, resultants=None, **kwargs):
+    """Copy a VABS input file to filename, and set its recover_flag. If
+    resultants are given, recover_flag is 1 and the recovery inputs are
+    appended (see recovery_lines); otherwise, recover_flag is 0."""
+    with open(vabs_filename, 'r') as f:
+        lines = f.readlines()
+    # line 2: Timoshenko_flag  recover_flag  thermal_flag
+    (values, sep, comment) = lines[1].partition('#')
+    flags = values.split()
+    timoshenko = (flags[0] == '1')
+    flags[1] = '0' if resultants is None else '1'
+    lines[1] = '{0} {1} {2}    {3}{4}'.format(flags[0], flags[1], flags[2],
+        sep, comment)
+    s = ''.join(lines).rstrip() + '\n'
+    if resultants is not None:
+        s += recovery_lines(resultants, timoshenko=timoshenko, **kwargs)
+    with open(filename, 'w') as f:
+        f.write(s)
+
+
+def _run_vabs(filename, path_to_VABS_exe, vabs_exe):
+    return subprocess.call([os.path.join(path_to_VABS_exe, vabs_exe),
+        os.path.abspath(filename)], cwd=path_to_VABS_exe)
+
+
+def _recover_station(job):
+    (blade_path, station_num, loads, path_to_VABS_exe, vabs_exe) = job
+    vabs_filename = station_filename(blade_path, station_num)
+    filename = recovery_filename(blade_path, station_num)
+    # constitutive analysis (VABS keeps what the recovery needs)
+    write_recovery_file(vabs_filename, filename)
+    _run_vabs(filename, path_to_VABS_exe, vabs_exe)
+    finished = []
+    for (case_name, resultants) in loads:
+        write_recovery_file(vabs_filename, filename, resultants)
+        if os.path.exists(filename + '.ELE'):
+            os.remove(filename + '.ELE')
+        _run_vabs(filename, path_to_VABS_exe, vabs_exe)
+        if os.path.exists(filename + '.ELE'):
+            shutil.move(filename + '.ELE', ele_filename(blade_path,
+                station_num, case_name))
+            finished.append(case_name)
+    return (station_num, finished)
+
+
+def run_recovery(blade_path, station_nums, resultants, case_names,
+    path_to_VABS_exe=DEFAULT_PATH_TO_VABS_EXE, vabs_exe=DEFAULT_VABS_EXE,
+    n_processes=4):
+    """Write the VABS recovery input files for every station and load case,
+    and run VABS on them, n_processes stations at a time.
+
+    Parameters
+    ----------
+    blade_path : str, the blade directory, e.g. 'biplane_blade'
+    station_nums : list of ints
+    resultants : array, shape (n_stations, 6, n_cases), the resultants
+        [F1, F2, F3, M1, M2, M3] at each station (see StaticSolution.
+        station_resultants)
+    case_names : list of strs, the name of each load case
+
+    Returns {station_num: list of the load cases that were recovered}.
+
+    """
+    if not os.path.exists(path_to_VABS_exe):
+        raise Warning("The path '{0}' to the VABS executable does not exist!".format(path_to_VABS_exe))
+    resultants = np.asarray(resultants, dtype=float).reshape(
+        len(station_nums), 6, -1)
+    if resultants.shape[2] != len(case_names):
+        raise Warning("There are {0} load cases, but {1} case names!".format(
+            resultants.shape[2], len(case_names)))
+    jobs = []
+    for (i, station_num) in enumerate(station_nums):
+        if not os.path.exists(station_filename(blade_path, station_num)):
+            raise Warning("The VABS input file for station {0} does not exist!".format(station_num))
+        loads = [(case_name, resultants[i,:,c])
+                 for (c, case_name) in enumerate(case_names)]
+        jobs.append((blade_path, station_num, loads, path_to_VABS_exe,
+            vabs_exe))
+    print "RUNNING VABS recovery for {0} stations.....".format(len(jobs))
+    pool = ThreadPool(n_processes)
+    try:
+        results = dict(pool.map(_recover_station, jobs))
+    finally:
+        pool.close()
+        pool.join()
+    for station_num in station_nums:
+        missing = [c for c in case_names if c not in results[station_num]]
+        if missing:
+            print " stn{0:02d}: no .ELE file for {1}".format(station_num,
+                missing)
+    return results
+
+
+def read_element_layers(vabs_filename):
+    """Returns (elem_nums, layer_nums), the element and layer numbers in a
+    VABS input file, in the same order as AbaqusGrid.list_of_elements."""
+    with open(vabs_filename, 'r') as f:
+        lines = f.readlines()
+    for (i, line) in enumerate(lines):
+        if 'nnode' in line:
+            (nnode, nelem) = [int(n) for n in line.split()[:2]]
+            break
+    else:
+        raise Warning("Couldn't find the number of nodes and elements in '{0}'".format(vabs_filename))
+    data = [line for line in lines[i+1:] if line.strip()]
+    a = np.array([line.split()[:2] for line in
+        data[nnode+nelem:nnode+2*nelem]], dtype=int)
+    return (a[:,0], a[:,1])
+
+
+def read_ele(filename, elem_nums, coords='material'):
+    """Returns (strains, stresses) from a VABS .ELE file, shape
+    (n_elements, 6), in the order of elem_nums (see read_element_layers).
+
+    coords is 'material' or 'beam', the coordinate system of the strains and
+    stresses. The strains are [eps11, 2eps12, 2eps13, eps22, 2eps23, eps33],
+    and the stresses are [sigma11, sigma12, sigma13, sigma22, sigma23,
+    sigma33].
+
+    """
+    a = dr.read_mdt(filename)
+    if a.shape[1] < 25:
+        raise Warning("'{0}' doesn't have the {1} strains and stresses!".format(filename, coords))
+    if not np.array_equal(a[:,0], elem_nums):
+        # put the rows in the order of elem_nums
+        rows = np.argsort(a[:,0], kind='mergesort')
+        i = rows[np.searchsorted(a[rows,0], elem_nums)]
+        if not np.array_equal(a[i,0], elem_nums):
+            raise Warning("'{0}' doesn't have every element!".format(
+                filename))
+        a = a[i]
+    return (a[:,STRAIN_COLUMNS[coords]], a[:,STRESS_COLUMNS[coords]])
+
+
+def read_strengths(material_filename):
+    """Returns {material number: strengths}, the strengths [Xt, Xc, Yt, Yc,
+    Zt, Zc, S12, S13, S23] of each material, with np.inf for blank (or
+    missing) strengths."""
+    mf = pd.read_csv(material_filename)
+    s = np.empty((len(mf), len(ss.STRENGTH_COLUMNS)))
+    for (j, column) in enumerate(ss.STRENGTH_COLUMNS):
+        if column in mf.columns:
+            s[:,j] = mf[column].values
+        else:
+            s[:,j] = np.nan
+    s[np.isnan(s)] = np.inf
+    return dict(zip(mf['number'].values, s))
+
+
+def element_materials(layer_nums, layer_filename):
+    """Returns the material number of each element, from its layer number."""
+    lf = pd.read_csv(layer_filename)
+    materials = dict(zip(lf['layer number'].values,
+        lf['material number'].values))
+    return np.array([materials[n] for n in layer_nums])
+
+
+def element_strengths(material_nums, strengths):
+    """Returns the strengths of each element, shape (n_elements, 9)."""
+    (numbers, table) = zip(*sorted(strengths.items()))
+    i = np.searchsorted(np.array(numbers), material_nums)
+    return np.array(table)[i]
+
+
+def max_stress_index(stresses, strengths):
+    """Returns the max-stress failure index of each element, the largest
+    ratio of a stress component to its strength.
+
+    Parameters
+    ----------
+    stresses : array, shape (..., 6), material coordinate system
+    strengths : array, shape (..., 9), broadcast against stresses
+
+    """
+    s = stresses[...,_NORMAL]
+    normal = np.where(s >= 0.0, s/strengths[...,_TENSION],
+        -s/strengths[...,_COMPRESSION])
+    shear = np.abs(stresses[...,_SHEAR])/strengths[...,_SHEAR_STRENGTH]
+    return np.maximum(normal.max(axis=-1), shear.max(axis=-1))
+
+
+def tsai_wu_index(stresses, strengths):
+    """Returns the (3D) Tsai-Wu failure index of each element. The
+    interaction coefficients are F_ij = -0.5*sqrt(F_ii*F_jj).
+
+    Parameters
+    ----------
+    stresses : array, shape (..., 6), material coordinate system
+    strengths : array, shape (..., 9), broadcast against stresses
+
+    """
+    T = strengths[...,_TENSION]
+    C = strengths[...,_COMPRESSION]
+    S = strengths[...,_SHEAR_STRENGTH]
+    F = 1.0/T - 1.0/C
+    Fii = 1.0/(T*C)
+    s = stresses[...,_NORMAL]
+    t = stresses[...,_SHEAR]
+    index = (F*s).sum(axis=-1) + (Fii*s**2).sum(axis=-1)
+    index += ((t/S)**2).sum(axis=-1)
+    for (i, j) in [(0,1), (0,2), (1,2)]:
+        Fij = -0.5*np.sqrt(Fii[...,i]*Fii[...,j])
+        index += 2.0*Fij*s[...,i]*s[...,j]
+    return index
+
+
+CRITERIA = {'max stress': max_stress_index, 'Tsai-Wu': tsai_wu_index}
+
+
+def failure_indices(blade_path, station_num, case_name,
+    material_filename=None, layer_filename=None):
+    """Returns a DataFrame of the failure indices of every element at a
+    station, for one load case, with the columns 'element', 'layer',
+    'material', 'max stress', and 'Tsai-Wu'.
+
+    The material and layer files default to 'materials.csv' and 'layers.csv'
+    in blade_path.
+
+    """
+    if material_filename is None:
+        material_filename = os.path.join(blade_path, 'materials.csv')
+    if layer_filename is None:
+        layer_filename = os.path.join(blade_path, 'layers.csv')
+    (elem_nums, layer_nums) = read_element_layers(
+        station_filename(blade_path, station_num))
+    (strains, stresses) = read_ele(ele_filename(blade_path, station_num,
+        case_name), elem_nums)
+    material_nums = element_materials(layer_nums, layer_filename)
+    strengths = element_strengths(material_nums,
+        read_strengths(material_filename))
+    df = pd.DataFrame({'element': elem_nums, 'layer': layer_nums,
+        'material': material_nums},
+        columns=['element', 'layer', 'material'] + sorted(CRITERIA.keys()))
+    for (name, criterion) in CRITERIA.items():
+        df[name] = criterion(stresses, strengths)
+    return df
+
+
+def critical_elements(blade_path, station_num, case_name,
+    criterion='Tsai-Wu', n=10, **kwargs):
+    """Returns a DataFrame of the n elements with the highest failure index
+    (see CRITERIA) at a station, for one load case, ranked from the most
+    critical. kwargs are passed to failure_indices()."""
+    df = failure_indices(blade_path, station_num, case_name, **kwargs)
+    df = df.iloc[np.argsort(-df[criterion].values, kind='mergesort')[:n]]
+    df.index = np.arange(1, len(df)+1)
+    df.index.name = 'rank'
+    return df
+
+
+def blade_critical_elements(blade_path, station_nums, case_name, **kwargs):
+    """Returns {station_num: critical_elements()} for every station with a
+    .ELE file for the load case. kwargs are passed to critical_elements()."""
+    d = {}
+    for station_num in station_nums:
+        if os.path.exists(ele_filename(blade_path, station_num, case_name)):
+            d[station_num] = critical_elements(blade_path, station_num,
+                case_name, **kwargs)
+    return d
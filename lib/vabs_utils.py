@@ -15,7 +15,9 @@ Last updated: April 1, 2014
 import numpy as np
 import pandas as pd
 import abaqus_utils2 as au
+import mesh_quality as mq
 reload(au)
+reload(mq)
 
 
 class VabsInputFile:
@@ -31,9 +33,19 @@ class VabsInputFile:
     layer_filename='sandia_blade/layers.csv',
     debug_flag=True)
 
+    Before writing, the grid is checked with mesh_quality.check_mesh(), and a
+    Warning is raised if it has inverted or folded elements. The per-element
+    quality metrics are saved in f.mesh_quality. Set check_mesh=False to skip
+    the check.
+
+    When writing many input files for the same blade, read the material and
+    layer files once, and pass the DataFrames in with material_table and
+    layer_table (the filenames are then only kept for reference).
+
     """
     def __init__(self, vabs_filename, grid, material_filename, layer_filename,
-        debug_flag=False,
+        debug_flag=False, check_mesh=True, material_table=None,
+        layer_table=None,
         flags={
             'format'           : 1,
             'Timoshenko'       : 1,
@@ -51,13 +63,21 @@ class VabsInputFile:
         self.grid = grid
         # read material file to determine the number of materials
         self.material_filename = material_filename
-        self._mf = pd.read_csv(self.material_filename)
+        if material_table is None:
+            material_table = pd.read_csv(self.material_filename)
+        self._mf = material_table
         self.number_of_materials = len(self._mf)
         # read layer file to determine the number of layers
         self.layer_filename = layer_filename
-        self._lf = pd.read_csv(self.layer_filename)
+        if layer_table is None:
+            layer_table = pd.read_csv(self.layer_filename)
+        self._lf = layer_table
         self.number_of_layers = len(self._lf)
         self.flags = flags
+        if check_mesh:
+            self.mesh_quality = mq.check_mesh(self.grid, print_flag=debug_flag)
+        else:
+            self.mesh_quality = None
         self._write_input_file(debug_flag=debug_flag)
 
     def _write_input_file(self, debug_flag=False):
@@ -226,7 +246,7 @@ class VabsOutputFile:
         """Save the Timoshenko stiffness matrix from the VABS output file."""
         # find the index of the header line for the VABS stiffness matrix
         for i, line in enumerate(self.vabs_file):
-            if line == ' Timoshenko Stiffness Matrix (1-extension; 2,3-shear, 4-twist; 5,6-bending)\n':
+            if line.strip() == 'Timoshenko Stiffness Matrix (1-extension; 2,3-shear, 4-twist; 5,6-bending)':
                 vabs_index = i
         # extract the VABS stiffness matrix
         stiffness_matrix_lines = self.vabs_file[vabs_index+3:vabs_index+3+6]
@@ -238,7 +258,7 @@ class VabsOutputFile:
         """Save the mass matrix from the VABS output file."""
         # find the index of the header line for the VABS mass matrix
         for i, line in enumerate(self.vabs_file):
-            if line == ' The 6X6 Mass Matrix\n':
+            if line.strip() == 'The 6X6 Mass Matrix':
                 vabs_index = i
         # extract the VABS mass matrix
         mass_matrix_lines = self.vabs_file[vabs_index+3:vabs_index+3+6]
@@ -0,0 +1,39 @@
+"""A script to start a build server that keeps the Sandia blade and the
+biplane blade warm in memory.
+
+Both blades are built once, then the server answers requests from other
+processes until one of them sends 'shutdown' (see lib/build_server.py). A
+station is only rebuilt when its overrides or its input files change, so
+mesh prep commands (rebuild a station, get its polygons, edges, or masses,
+cut its layers) return in milliseconds instead of rebuilding a whole blade.
+
+The server makes a new random authkey each time it starts, and writes it to
+a file in your home directory that only you can read; bs.connect() reads it
+from there. Clients are served one at a time, so close your client (c.close())
+when you're done, or the other clients will wait.
+
+Usage
+-----
+This script must be run from the project root directory (spardesign2), in
+its own terminal (it doesn't return until the server is shut down).
+$ python run_build_server.py
+Then, from an IPython console:
+|> import lib.build_server as bs
+|> c = bs.connect()
+|> c.masses('sandia_blade', 5)
+|> c.close()
+
+Last updated: May 13, 2014
+
+"""
+
+
+import lib.build_server as bs
+reload(bs)
+
+
+BLADES = ['sandia_blade', 'biplane_blade']
+
+
+if __name__ == '__main__':
+    bs.serve(blade_paths=BLADES)
@@ -0,0 +1,49 @@
+"""A script to run a parametric design sweep of the biplane blade.
+
+Every combination of the parameter values in `sweep` is built and evaluated
+in parallel (see lib/design_sweep.py), and the results are saved in the
+SQLite database 'design_sweep.db'. Variants that are already in the database
+are skipped, so this script can be stopped and rerun at any time. The
+results of the sweep are printed to the screen.
+
+Usage
+-----
+This script must be run from the project root directory (spardesign2).
+|> %run run_design_sweep
+
+Last updated: May 13, 2014
+
+"""
+
+
+import lib.design_sweep as ds
+import lib.station_store as ss
+reload(ds)
+reload(ss)
+
+
+# -----------------------------------------------
+# update these parameters!
+blade_path = 'biplane_blade'
+sweep = [
+    # (column, values, 'set' or 'scale', station_nums or None)
+    # blade length: the stations keep their cross-sections, so every variant
+    #   gets beam results from the stations in the station store
+    ('x1', [0.95, 1.0, 1.05], 'scale', None)]
+# variants that change the cross-sections only get beam results after their
+#   new stations are meshed, solved, and synced to the station store, e.g.
+# sweep = [
+#     ('gap-to-chord ratio', [0.75, 1.0, 1.25], 'scale', range(10,25)),
+#     ('stagger-to-chord ratio', [0.0, 0.25], 'set', range(10,25)),
+#     ('spar cap height', [0.9, 1.0, 1.1], 'scale', None)]
+n_processes = None   # the number of CPUs
+# -----------------------------------------------
+
+# the worker processes re-import this script on Windows
+if __name__ == '__main__':
+    # the monoplane stations of the biplane blade use the meshes of the Sandia
+    #   blade, so store those first (see sync_station_store.py)
+    ss.sync_blade('sandia_blade', print_flag=False)
+    results = ds.run_sweep(blade_path, sweep, n_processes=n_processes)
+    print results[['key', 'params', 'status', 'blade_mass', 'n_sections',
+        'tip_deflection', 'f1']].to_string()
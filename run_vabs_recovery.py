@@ -0,0 +1,54 @@
+"""A script to recover the 3D stresses in every cross-section of each blade
+with VABS, and to print the most critical elements at each station.
+
+Each blade's load cases are solved with the built-in beam solver (see
+lib/beam_solver.py), and the sectional resultants at every station are
+passed to VABS for recovery (see lib/vabs_recovery.py). Then, the n_critical
+elements with the highest Tsai-Wu failure index at each station are printed
+to the screen, for the load case recovery_case.
+
+Usage
+-----
+This script must be run from the project root directory (spardesign2).
+|> %run run_vabs_recovery
+
+Last updated: May 13, 2014
+
+"""
+
+
+import os
+import lib.beam_solver as bs
+import lib.vabs_recovery as vr
+reload(bs)
+reload(vr)
+
+
+# -----------------------------------------------
+# update these parameters!
+path_to_VABS_exe = 'D:\\Programs\\VABS\\vabs_3-7'
+n_processes = 4
+recovery_case = 'BEM_dist_flap'
+criterion = 'Tsai-Wu'
+n_critical = 5
+# -----------------------------------------------
+
+blades = [
+    ('sandia_blade', bs.monoplane_model),
+    ('biplane_blade', bs.biplane_model)]
+
+for (blade_path, model_function) in blades:
+    m = model_function(blade_path)
+    cases = bs.read_dymore_load_cases(os.path.join(blade_path, 'beam_model'))
+    case_names = sorted(cases.keys())
+    s = m.solve([cases[name] for name in case_names], case_names=case_names)
+    (station_nums, resultants) = s.station_resultants()
+    vr.run_recovery(blade_path, station_nums, resultants, case_names,
+        path_to_VABS_exe=path_to_VABS_exe, n_processes=n_processes)
+    d = vr.blade_critical_elements(blade_path, station_nums, recovery_case,
+        criterion=criterion, n=n_critical)
+    print " {0}: critical elements ({1}, {2})".format(blade_path,
+        recovery_case, criterion)
+    for station_num in sorted(d.keys()):
+        print "   stn{0:02d}".format(station_num)
+        print d[station_num].to_string()
@@ -1,7 +1,9 @@
 """Plot flapwise deflection vs. span for the Sandia blade.
 
+Each .mdt file is only parsed once (see lib/dymore_results.py).
+
 Author: Perry Roth-Johnson
-Last updated: April 10, 2014
+Last updated: May 13, 2014
 
 """
 
@@ -9,8 +11,8 @@ Last updated: April 10, 2014
 import numpy as np
 import matplotlib.pyplot as plt
 import lib.blade as bl
-from scipy.interpolate import interp1d
-from scipy import array
+import lib.dymore_results as dr
+reload(dr)
 
 
 ### parameters ###
@@ -21,32 +23,13 @@ gmfc='None'        # global marker face color (none/empty)
 mec_ms='red'       # marker edge color for monoplane spars
 
 
-def extrap1d(interpolator):
-    # copied from http://stackoverflow.com/questions/2745329/how-to-make-scipy-interpolate-give-a-an-extrapolated-result-beyond-the-input-ran
-    xs = interpolator.x
-    ys = interpolator.y
-    def pointwise(x):
-        if x < xs[0]:
-            return ys[0]+(x-xs[0])*(ys[1]-ys[0])/(xs[1]-xs[0])
-        elif x > xs[-1]:
-            return ys[-1]+(x-xs[-1])*(ys[-1]-ys[-2])/(xs[-1]-xs[-2])
-        else:
-            return interpolator(x)
-    def ufunclike(xs):
-        return array(map(pointwise, array(xs)))
-    return ufunclike
-
 def plot_monoblade_displacement(component, skip_num=1, span=100.0, 
     filename='sandia_blade/beam_model/FIGURES/svy_disp_blade.mdt'):
     """Plot the displacement or rotation vs. span for a monoplane blade."""
-    AB = np.loadtxt(filename)
-    B = span
-    AB[:,0] = AB[:,0]*B
-    if component == 'flapwise':
-        col=3
-    else:
+    if component != 'flapwise':
         raise NotImplementedError("`component` keyword must be 'flapwise'")
-    plt.plot(AB[::skip_num,0], AB[::skip_num,col], 'rs--', markerfacecolor=gmfc,
+    (x, y) = dr.component(filename, component, span=span)
+    plt.plot(x[::skip_num], y[::skip_num], 'rs--', markerfacecolor=gmfc,
         markersize=gms, linewidth=glw, markeredgewidth=gmew, 
         markeredgecolor=mec_ms, label='Sandia blade (beam model, DYMORE)',
         zorder=2)
@@ -62,26 +45,11 @@ Input
 x1 <np.array>: x1-coordinates of all 24 spar stations
 
     """
-    # read in all forces and moments calculated by DYMORE
-    AB = np.loadtxt(filename)
-    # the blade length, 100.0 meters
-    B = span
-    # multiply column 0 (eta-coordinates) by the span length, B
-    AB[:,0] = AB[:,0]*B
-    # plot the span (column 0) along the x-axis -------------------------------
-    x = AB[:,0]
-    if component == 'axial force':
-        col = 1
-    elif component == 'flapwise bending moment':
-        col = 5
-    else:
+    if component not in ['axial force', 'flapwise bending moment']:
         raise NotImplementedError("`component` keyword must be 'axial force' or 'flapwise bending moment'")
-    y = AB[:,col]
     # get force results at all the spar stations, using interpolation
     # (instead of using the default results at Gaussian integration points)
-    f_i = interp1d(x,y)
-    f_x = extrap1d(f_i)
-    y1 = f_x(x1)  # use extrapolations function returned by 'extrap1d'
+    y1 = dr.at_stations(filename, component, x1, span=span)
     # plot the results to the screen ------------------------------------------
     plt.plot(x1, y1/1000.0, 'rs--', markerfacecolor=gmfc, markersize=gms, 
         linewidth=glw, markeredgewidth=gmew, markeredgecolor=mec_ms, 
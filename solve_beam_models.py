@@ -0,0 +1,61 @@
+"""A script to solve the DYMORE load cases of each blade with the built-in
+beam solver (see lib/beam_solver.py), instead of running DYMORE, and to find
+the natural frequencies of each blade.
+
+Every 'load_*.dat' file in each blade's 'beam_model/' directory is one load
+case. All the load cases of a blade are solved at once, and the tip
+displacements of each load case are printed to the screen. Then, the
+flapwise deflection (u3) under the BEM distributed flap load is plotted
+along the span of each blade. The lowest n_modes natural frequencies of each
+blade are printed to the screen, too.
+
+Usage
+-----
+This script must be run from the project root directory (spardesign2).
+|> %run solve_beam_models
+
+Last updated: May 13, 2014
+
+"""
+
+
+import os
+import matplotlib.pyplot as plt
+import lib.beam_solver as bs
+reload(bs)
+
+
+plot_case = 'BEM_dist_flap'
+n_modes = 6
+
+blades = [
+    ('sandia_blade', bs.monoplane_model, 'vertexB', 'k'),
+    ('biplane_blade', bs.biplane_model, 'tip_v', 'r')]
+
+plt.figure()
+for (blade_path, model_function, tip_vertex, color) in blades:
+    m = model_function(blade_path)
+    cases = bs.read_dymore_load_cases(os.path.join(blade_path, 'beam_model'))
+    case_names = sorted(cases.keys())
+    s = m.solve([cases[name] for name in case_names], case_names=case_names)
+    print " {0}: tip displacements (u1, u2, u3) [m]".format(blade_path)
+    tip = s.vertex(tip_vertex)
+    for name in case_names:
+        c = s.case(name)
+        print "   {0:<20s} {1:9.4f} {2:9.4f} {3:9.4f}".format(name,
+            tip[0,c], tip[1,c], tip[2,c])
+    modes = m.modes(n_modes=n_modes)
+    print " {0}: natural frequencies [Hz]".format(blade_path)
+    print "   " + " ".join(["{0:7.3f}".format(f) for f in modes.frequencies])
+    c = s.case(plot_case)
+    label = blade_path
+    for edge_name in m.edge_names:
+        e = s.edge(edge_name)
+        plt.plot(e['x1'], e['displacement'][:,2,c], color+'-', label=label)
+        label = None
+plt.xlabel('span, x1 [m]')
+plt.ylabel('flapwise deflection, u3 [m]')
+plt.title(plot_case)
+plt.legend(loc='upper left')
+plt.grid('on')
+plt.show()
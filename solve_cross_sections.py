@@ -0,0 +1,35 @@
+"""A script to solve every cross-section of the Sandia blade and the biplane
+blade without VABS.
+
+The VABS input file of every station that is missing a .vabs.K file is
+solved in parallel with the built-in cross-section solver in
+lib.section_solver, which writes the mass and stiffness matrices to a .K file
+with the same layout as VABS. Stations already in 'station_store/' are
+skipped, and new results are copied into the store.
+
+Usage
+-----
+This script must be run from the project root directory (spardesign2).
+|> %run solve_cross_sections
+
+Last updated: May 13, 2014
+
+"""
+
+
+import lib.section_solver as sec
+import lib.station_store as ss
+reload(sec)
+reload(ss)
+
+
+BLADES = ['sandia_blade', 'biplane_blade']
+
+
+# the worker processes re-import this script on Windows
+if __name__ == '__main__':
+    for blade_path in BLADES:
+        station_nums = ss.stations_missing(blade_path, '.vabs.K')
+        # (solve_stations prints the time of each station)
+        sec.solve_stations(blade_path, station_nums)
+        ss.sync_blade(blade_path)
@@ -0,0 +1,59 @@
+"""A script to share station artifacts between blades with the station store.
+
+Every station of every blade is keyed by a hash of its geometry-relevant
+inputs (see lib/station_store.py). This script adds each blade's meshes, VABS
+input files, and VABS output files to the store, then copies any stored
+artifacts that a blade is missing (or has stale copies of) into its station
+paths. For example, the
+monoplane stations of the biplane blade (stations 1-9, 25, and 28-40) get their
+files from the identical stations of the Sandia blade (stations 1-9, 21, and
+22-34).
+
+The store lives in the project root directory:
+  station_store/
+    <key>/
+      inputs.json
+      mesh.abq
+    <VABS key>/
+      inputs.json
+      mesh.vabs
+      mesh.vabs.K
+Unlike the station paths, it is not deleted by clean.py.
+
+Usage
+-----
+This script must be run from the project root directory (spardesign2).
+|> %run sync_station_store
+
+Last updated: May 13, 2014
+
+"""
+
+
+import os
+import glob
+import lib.station_store as ss
+reload(ss)
+
+
+# --- sandia blade ------------------------------------------------------------
+ss.sync_blade('sandia_blade')
+
+# --- biplane blade -----------------------------------------------------------
+ss.sync_blade('biplane_blade')
+
+# --- alt biplane configs -----------------------------------------------------
+# (the alt configs use the biplane blade's materials, layers, rules, and
+#   element fixes)
+for config_path in sorted(glob.glob(os.path.join('alt_biplane_configs', '*'))):
+    ss.sync_blade(config_path,
+        material_filename=os.path.join('biplane_blade', 'materials.csv'),
+        layer_filename=os.path.join('biplane_blade', 'layers.csv'),
+        rule_filename=os.path.join('biplane_blade',
+            'layer_plane_angle_rules.csv'),
+        fixes_filename=os.path.join('biplane_blade', 'element_fixes.csv'))
+
+for blade_path in ['sandia_blade', 'biplane_blade']:
+    for suffix in ss.ARTIFACTS:
+        print " {0}: stations without {1} files: {2}".format(blade_path, suffix,
+            ss.stations_missing(blade_path, suffix))
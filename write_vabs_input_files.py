@@ -0,0 +1,47 @@
+"""A script to write the VABS input files for every meshed station at once.
+
+Each station's TrueGrid mesh (<blade_path>/stnXX/mesh_stnXX.abq) is parsed,
+the layer plane angles are assigned from the shared element set rule table
+(see lib/layer_plane_angles.py), and the VABS input file is written to
+<blade_path>/stnXX/mesh_stnXX.vabs. The material and layer files for each
+blade are only read once.
+
+Stations that are already in the station store (see lib/station_store.py) are
+linked from the store instead of being written again, and each new VABS input
+file is added to the store. (The monoplane stations of the biplane blade are
+shared with the Sandia blade this way.)
+
+Station-specific rules and element fixes are stored in each blade_path:
+  sandia_blade/
+    layer_plane_angle_rules.csv
+    element_fixes.csv
+  biplane_blade/
+    layer_plane_angle_rules.csv
+    element_fixes.csv
+
+Usage
+-----
+This script must be run from the project root directory (spardesign2).
+|> %run write_vabs_input_files
+Then, run VABS on the new input files with run_all_vabs.py in
+sandia_blade_lib/ or biplane_blade_lib/.
+
+Last updated: May 12, 2014
+
+"""
+
+
+import lib.layer_plane_angles as lpa
+reload(lpa)
+
+
+sandia_flag = True
+biplane_flag = True
+
+# --- sandia blade ------------------------------------------------------------
+if sandia_flag:
+    lpa.write_vabs_input_files('sandia_blade', store_path='station_store')
+
+# --- biplane blade -----------------------------------------------------------
+if biplane_flag:
+    lpa.write_vabs_input_files('biplane_blade', store_path='station_store')